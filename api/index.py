@@ -9,10 +9,10 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-# 使用轻量版NLP服务
+# 使用轻量版NLP服务（延迟到首次使用时才加载，缩短冷启动）
 try:
-    import backend.services.nlp_service_light as nlp_service_module
-    sys.modules['backend.services.nlp_service'] = nlp_service_module
+    from backend.services.registry import alias_module
+    alias_module('backend.services.nlp_service', 'backend.services.nlp_service_light')
 except ImportError as e:
     print(f"Warning: Could not import nlp_service_light: {e}")
 
@@ -5,20 +5,29 @@ FastAPI主应用
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from typing import List, Dict, Any, Optional
 import logging
 
 from backend.services.database import neo4j_service
+from backend.services.metrics import metrics
+from backend.services.annotation_history import annotation_history
+from backend.services.feedback_index import feedback_index
+from backend.services.graph_events import graph_events
+from backend.api.middleware import MetricsMiddleware, ResponseCacheMiddleware
 from backend.models.schema import KnowledgePoint, Question, QuestionType, DifficultyLevel
 from backend.api.routes import knowledge_routes, question_routes, annotation_routes, analytics_routes, ai_agent_routes, init_routes
 
-# Conditionally import meganno_routes only if not in Vercel
-try:
+from backend.services.registry import services
+
+# MEGAnno+依赖requests，未安装时（如Vercel）不注册其路由；服务本身在首次调用时才加载
+MEGANNO_AVAILABLE = services.available("meganno_service")
+if MEGANNO_AVAILABLE:
     from backend.api.routes import meganno_routes
-    MEGANNO_AVAILABLE = True
-except ImportError:
-    MEGANNO_AVAILABLE = False
+
+# LAZY_SERVICES=false 时在导入阶段加载全部服务（常驻进程部署）
+if not services.lazy:
+    services.preload()
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +40,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 只读接口的ETag/响应缓存（最内层，缓存命中的响应同样经过CORS和计时中间件）
+app.add_middleware(ResponseCacheMiddleware)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +52,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求计时（METRICS_ENABLED未开启时直接透传）
+app.add_middleware(MetricsMiddleware)
+
 # 静态文件服务
 app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
 
@@ -71,7 +86,11 @@ async def startup_event():
 async def shutdown_event():
     """应用关闭事件"""
     logger.info("关闭系统...")
+    annotation_history.close()
+    feedback_index.save()
     neo4j_service.close()
+    if graph_events.broker is not None:
+        graph_events.broker.close()
 
 
 # 根路由 - 返回前端页面
@@ -109,6 +128,37 @@ async def health_check():
     """健康检查接口"""
     return {"status": "healthy", "message": "K12英语知识图谱系统运行正常"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus文本格式的性能指标"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="指标未启用，请设置 METRICS_ENABLED=true")
+    return PlainTextResponse(
+        content=metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/graph-events")
+async def recent_graph_events(limit: int = 50):
+    """最近的图数据变更事件及各实体版本号（排查缓存失效问题）"""
+    graph_events.poll(force=True)
+    return {
+        "version": graph_events.version.token(),
+        "broker": graph_events.broker.path if graph_events.broker is not None else None,
+        "entity_versions": graph_events.version.entity_versions(),
+        "events": [event.to_dict() for event in graph_events.recent(limit)]
+    }
+
+@app.get("/schema/indexes")
+async def index_usage_report():
+    """索引和约束的状态、使用次数，以及缺失/未使用/未声明的索引"""
+    if not neo4j_service.driver and not neo4j_service.connect():
+        raise HTTPException(status_code=500, detail="数据库连接失败")
+    try:
+        return neo4j_service.get_index_usage()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"索引报告生成失败: {str(e)}")
+
 @app.get("/test-db")
 async def test_database():
     """测试数据库连接和数据"""
@@ -120,7 +170,7 @@ async def test_database():
                 return {"error": "Failed to connect to database"}
         
         # 测试查询
-        with neo4j_service.driver.session() as session:
+        with neo4j_service.read_session() as session:
             # 统计数据
             kp_result = session.run("MATCH (kp:KnowledgePoint) RETURN count(kp) as count")
             kp_count = kp_result.single()["count"]
@@ -154,7 +204,7 @@ async def debug_analytics():
         # 直接查询数据库验证
         direct_stats = {}
         if db_connected and neo4j_service.driver:
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 kp_result = session.run("MATCH (kp:KnowledgePoint) RETURN count(kp) as count")
                 q_result = session.run("MATCH (q:Question) RETURN count(q) as count")
                 rel_result = session.run("MATCH ()-[r:TESTS]->() RETURN count(r) as count")
@@ -0,0 +1,151 @@
+"""
+API中间件
+请求级计时与Neo4j查询计数、只读接口的ETag/响应缓存
+"""
+import time
+
+from backend.services.metrics import metrics
+from backend.services.response_cache import response_cache, cache_key
+from backend.services.graph_events import graph_events
+
+
+def _route_label(scope) -> str:
+    """使用路由模板而非原始路径作为标签，避免路径参数导致标签爆炸"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", None) or getattr(route, "name", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """记录每个HTTP请求的耗时、状态码和Neo4j查询次数（纯ASGI实现）"""
+
+    def __init__(self, app, registry=None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        registry = self.registry
+        if not registry.enabled or scope["type"] != "http" or scope.get("path") == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = registry.begin_request()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            query_count = registry.end_request(token)
+            route = _route_label(scope)
+            method = scope.get("method", "GET")
+            registry.inc("http_requests_total", route=route, method=method, status=status["code"])
+            registry.observe("http_request_duration_seconds", elapsed, route=route, method=method)
+            registry.observe("neo4j_queries_per_request", query_count, route=route)
+
+
+# 缓存的只读接口 -> 响应依赖的实体（节点标签 / 关系类型），只有这些实体变更时缓存才失效
+CACHEABLE_PATHS = {
+    "/api/knowledge/hierarchy/tree": ("KnowledgePoint", "HAS_SUB_POINT"),
+    "/api/knowledge/search": ("KnowledgePoint",),
+    "/api/analytics/coverage": ("KnowledgePoint", "Question", "TESTS"),
+    "/api/analytics/difficulty-distribution": ("Question",),
+    "/api/analytics/type-distribution": ("Question",),
+}
+
+CACHE_CONTROL = b"private, no-cache"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # 弱比较：忽略 W/ 前缀
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+class ResponseCacheMiddleware:
+    """
+    只读接口的条件请求与进程内响应缓存（纯ASGI实现）
+
+    - ETag由依赖实体的版本号生成，If-None-Match命中时直接返回304
+    - 依赖实体未变更时的重复请求直接返回缓存的响应体，不访问数据库
+    - Cache-Control: no-cache 让浏览器每次带ETag重新验证
+    """
+
+    def __init__(self, app, cache=None, paths=CACHEABLE_PATHS, events=None):
+        self.app = app
+        self.cache = cache or response_cache
+        self.paths = paths
+        self.events = events or graph_events
+
+    async def __call__(self, scope, receive, send):
+        cache = self.cache
+        if (not cache.enabled or scope["type"] != "http" or scope.get("method") not in ("GET", "HEAD")
+                or scope.get("path") not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        # 先重放其他worker发布的变更事件
+        self.events.poll()
+        entities = self.paths[scope["path"]]
+        key = cache_key(scope["path"], scope.get("query_string", b""))
+        version = cache.version.version_of(entities)
+        etag = cache.etag(key, entities)
+        request_headers = {name: value for name, value in scope.get("headers", [])}
+
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match and _etag_matches(if_none_match.decode("latin-1"), etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode("latin-1")), (b"cache-control", CACHE_CONTROL)]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        bypass = b"no-cache" in request_headers.get(b"cache-control", b"")
+        entry = None if bypass else cache.get(key, entities)
+        if entry is not None:
+            await self._send(send, entry.status, entry.headers, entry.body, etag, scope["method"])
+            return
+
+        started = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                started.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        status = started.get("status", 500)
+        headers = [(name, value) for name, value in started.get("headers", [])
+                   if name.lower() not in (b"etag", b"cache-control")]
+
+        if status != 200:
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        cache.put(key, version, status, headers, body)
+        # 处理期间发生写操作时不下发ETag，避免客户端把旧数据当作新版本缓存
+        unchanged = cache.version.version_of(entities) == version
+        await self._send(send, status, headers, body, etag if unchanged else None, scope["method"])
+
+    @staticmethod
+    async def _send(send, status, headers, body, etag, method):
+        headers = list(headers) + [(b"cache-control", CACHE_CONTROL)]
+        if etag:
+            headers.append((b"etag", etag.encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
@@ -1,15 +1,24 @@
 """
 AI Agent自动标注相关API路由
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+import json
+import asyncio
+import logging
 
-from backend.services.ai_agent_service import ai_agent_service
+from backend.services.registry import ai_agent_service
+from backend.services.annotation_history import annotation_history
+from backend.services.near_duplicate_index import near_duplicate_index, READY_TIMEOUT
+from backend.services.stream_import import StreamingImportPipeline, DEFAULT_BATCH_SIZE
 from backend.services.database import neo4j_service
 from backend.models.schema import Question
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 class AutoAnnotationRequest(BaseModel):
@@ -27,6 +36,7 @@ class AIAgentConfigRequest(BaseModel):
     confidence_threshold: float = 0.3
     max_auto_annotations: int = 5
     learning_enabled: bool = True
+    reuse_duplicate_annotations: bool = True
 
 
 class AnnotationFeedback(BaseModel):
@@ -69,23 +79,47 @@ async def batch_auto_annotate_questions(request: BatchAutoAnnotationRequest,
 
 
 @router.post("/smart-import")
-async def smart_import_questions(questions_data: List[Dict[str, Any]]):
+async def smart_import_questions(questions_data: List[Dict[str, Any]], dedup: bool = False,
+                                 similarity_threshold: Optional[float] = None):
     """
     智能导入题目并自动标注
     支持从外部数据源导入题目时自动进行标注
+
+    dedup=true 时跳过与题库（或本批次中前面的题目）近似重复的题目，
+    直接返回重复题目的已有标注，不再重复导入和标注；
+    近似重复索引在等待时间内未能构建完成时照常导入，结果中 dedup_unavailable 为 true
     """
     try:
         imported_questions = []
         annotation_results = []
+        duplicates = []
+        dedup_unavailable = False
+        if dedup and not await asyncio.to_thread(near_duplicate_index.wait_ready, READY_TIMEOUT):
+            dedup_unavailable = True
+            dedup = False
         
         for q_data in questions_data:
             # 创建题目对象
             question = Question(**q_data)
             
+            if dedup:
+                match = near_duplicate_index.find_similar(question, threshold=similarity_threshold, limit=1)
+                if match:
+                    labels = neo4j_service.find_knowledge_points_by_question(match[0]["question_id"])
+                    duplicates.append({
+                        "content": question.content,
+                        "duplicate_of": match[0]["question_id"],
+                        "similarity": match[0]["similarity"],
+                        "knowledge_points": labels
+                    })
+                    continue
+            
             # 保存题目到数据库
             question_id = neo4j_service.create_question(question)
             question.id = question_id
             imported_questions.append(question)
+            # 立即加入索引，同一批次中后面的重复题目也能被识别
+            near_duplicate_index.add(question_id, question.content)
             
             # 自动标注
             annotation_result = await ai_agent_service.auto_annotate_question(question)
@@ -94,13 +128,59 @@ async def smart_import_questions(questions_data: List[Dict[str, Any]]):
         return {
             "imported_count": len(imported_questions),
             "annotation_results": annotation_results,
+            "duplicate_count": len(duplicates),
+            "duplicates": duplicates,
+            "dedup_unavailable": dedup_unavailable,
             "status": "completed",
             "message": f"成功导入并标注 {len(imported_questions)} 道题目"
+                       + (f"，跳过 {len(duplicates)} 道近似重复题目" if duplicates else "")
+                       + ("（近似重复索引不可用，未去重）" if dedup_unavailable else "")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"智能导入失败: {str(e)}")
 
 
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    边读取请求体边返回结果的流式响应
+
+    StreamingResponse 默认并发监听断开事件，会把尚未读取的请求体消息一并消费掉；
+    这里只负责发送，客户端断开由读取请求体时的 ClientDisconnect 感知
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+@router.post("/smart-import/stream")
+async def smart_import_stream(request: Request, annotate: bool = True, dedup: bool = False,
+                              similarity_threshold: Optional[float] = None, offset: int = 0,
+                              batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    流式智能导入（请求体为NDJSON，每行一道题目，支持 Content-Encoding: gzip）
+
+    按批校验、批量写入、批量标注，每行结果（带行号）以NDJSON流式返回，最后一行为 {"summary": {...}}；
+    各批结果可能乱序到达，连接中断后用 offset=已连续收到结果的最大行号 续传（写入为MERGE，重叠部分可重复执行）
+    """
+    pipeline = StreamingImportPipeline(
+        ai_agent_service, batch_size=min(max(batch_size, 1), 1000), annotate=annotate, dedup=dedup,
+        similarity_threshold=similarity_threshold, offset=offset
+    )
+    compressed = request.headers.get("content-encoding", "").lower() in ("gzip", "deflate")
+
+    async def body():
+        try:
+            async for item in pipeline.run(request.stream(), compressed=compressed):
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        except ClientDisconnect:
+            logger.warning(f"流式导入客户端断开，已处理 {pipeline.counts['rows']} 行")
+        except Exception as e:
+            logger.error(f"流式导入失败: {e}")
+            yield json.dumps({"error": f"智能导入失败: {str(e)}", "summary": pipeline.counts}, ensure_ascii=False) + "\n"
+
+    return _DuplexStreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @router.get("/config")
 async def get_ai_agent_config():
     """获取AI Agent当前配置"""
@@ -165,19 +245,49 @@ async def trigger_auto_annotation(question_id: str):
 async def get_auto_annotation_stats():
     """获取自动标注统计信息"""
     try:
-        # 这里可以实现统计逻辑
-        # 暂时返回模拟数据
+        summary = annotation_history.summary()
+        recent = annotation_history.query(kind="annotation", limit=10)
+        confidences = [
+            ann["confidence"] for record in recent for ann in record.get("auto_annotations", [])
+        ]
         return {
-            "total_auto_annotations": 0,
-            "success_rate": 0.0,
-            "average_confidence": 0.0,
-            "most_annotated_knowledge_points": [],
-            "recent_activity": []
+            "feedback_index": ai_agent_service.feedback_index.summary(),
+            "total_auto_annotations": summary["total_annotations"],
+            "total_feedback": summary["total_feedback"],
+            "success_rate": summary["feedback_accuracy"],
+            "average_confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+            "most_annotated_knowledge_points": [
+                {"knowledge_point_id": kp_id, "count": count}
+                for kp_id, count in summary["top_knowledge_points"]
+            ],
+            "recent_activity": [
+                {
+                    "question_id": record["question_id"],
+                    "timestamp": record["timestamp"],
+                    "applied_count": record["applied_count"]
+                }
+                for record in recent
+            ]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取统计信息失败: {str(e)}")
 
 
+@router.get("/history")
+async def get_annotation_history(question_id: Optional[str] = None,
+                                 kp_id: Optional[str] = None,
+                                 kind: Optional[str] = None,
+                                 limit: int = 50):
+    """按题目或知识点查询标注历史（kind: annotation / feedback）"""
+    try:
+        records = annotation_history.query(
+            question_id=question_id, kp_id=kp_id, kind=kind, limit=max(1, min(limit, 500))
+        )
+        return {"records": records, "count": len(records)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询标注历史失败: {str(e)}")
+
+
 @router.post("/retrain")
 async def retrain_ai_agent(background_tasks: BackgroundTasks):
     """重新训练AI Agent（基于用户反馈）"""
@@ -193,11 +303,10 @@ async def retrain_ai_agent(background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=f"启动重训练失败: {str(e)}")
 
 
-async def _retrain_agent_task():
-    """重新训练AI Agent的后台任务"""
-    # 这里实现实际的重训练逻辑
-    # 1. 收集用户反馈数据
-    # 2. 分析标注准确率
-    # 3. 调整模型参数
-    # 4. 更新关键词匹配规则
-    pass
+def _retrain_agent_task():
+    """重新训练AI Agent的后台任务（同步函数，由线程池执行，不阻塞事件循环）"""
+    try:
+        result = ai_agent_service.rebuild_feedback_index()
+        logger.info(f"AI Agent重训练完成: {result}")
+    except Exception as e:
+        logger.error(f"AI Agent重训练失败: {e}")
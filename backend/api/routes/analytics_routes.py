@@ -1,11 +1,12 @@
 """
 数据分析相关API路由
 """
+import asyncio
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Any
 from pydantic import BaseModel
 
-from backend.services.analytics_service import analytics_service
+from backend.services.registry import analytics_service
 
 router = APIRouter()
 
@@ -30,7 +31,7 @@ class LearningPathRequest(BaseModel):
 async def get_knowledge_coverage():
     """获取知识点覆盖分析"""
     try:
-        result = analytics_service.get_knowledge_coverage_analysis()
+        result = await asyncio.to_thread(analytics_service.get_knowledge_coverage_analysis)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
@@ -40,7 +41,7 @@ async def get_knowledge_coverage():
 async def get_difficulty_distribution():
     """获取题目难度分布"""
     try:
-        result = analytics_service.get_difficulty_distribution()
+        result = await asyncio.to_thread(analytics_service.get_difficulty_distribution)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
@@ -50,7 +51,7 @@ async def get_difficulty_distribution():
 async def get_question_type_distribution():
     """获取题目类型分布"""
     try:
-        result = analytics_service.get_question_type_distribution()
+        result = await asyncio.to_thread(analytics_service.get_question_type_distribution)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
@@ -60,7 +61,7 @@ async def get_question_type_distribution():
 async def get_knowledge_hierarchy():
     """获取知识点层级结构分析"""
     try:
-        result = analytics_service.get_knowledge_hierarchy_analysis()
+        result = await asyncio.to_thread(analytics_service.get_knowledge_hierarchy_analysis)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
@@ -70,7 +71,7 @@ async def get_knowledge_hierarchy():
 async def get_knowledge_correlations():
     """获取知识点关联分析"""
     try:
-        result = analytics_service.get_knowledge_correlation_analysis()
+        result = await asyncio.to_thread(analytics_service.get_knowledge_correlation_analysis)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
@@ -80,7 +81,8 @@ async def get_knowledge_correlations():
 async def recommend_learning_path(request: LearningPathRequest):
     """生成学习路径推荐"""
     try:
-        result = analytics_service.generate_learning_path_recommendation(
+        result = await asyncio.to_thread(
+            analytics_service.generate_learning_path_recommendation,
             request.target_knowledge_points
         )
         return result
@@ -108,7 +110,7 @@ async def analyze_weak_points(request: WeakPointAnalysisRequest):
 async def get_comprehensive_report():
     """获取综合分析报告"""
     try:
-        result = analytics_service.get_comprehensive_report()
+        result = await asyncio.to_thread(analytics_service.get_comprehensive_report)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"报告生成失败: {str(e)}")
@@ -123,7 +125,8 @@ async def get_ai_agent_accuracy(
 ):
     """获取AI Agent标注准确率分析（支持分页）"""
     try:
-        result = analytics_service.get_ai_agent_accuracy_analysis_paginated(
+        result = await asyncio.to_thread(
+            analytics_service.get_ai_agent_accuracy_analysis_paginated,
             page=page,
             page_size=page_size,
             difficulty=difficulty,
@@ -138,8 +141,8 @@ async def get_ai_agent_accuracy(
 async def get_dashboard_stats():
     """获取仪表板统计数据"""
     try:
-        coverage = analytics_service.get_knowledge_coverage_analysis()
-        difficulty = analytics_service.get_difficulty_distribution()
+        coverage = await asyncio.to_thread(analytics_service.get_knowledge_coverage_analysis)
+        difficulty = await asyncio.to_thread(analytics_service.get_difficulty_distribution)
         
         # 计算标注覆盖率
         total_kps = coverage["summary"].get("total_knowledge_points", 0)
@@ -151,7 +154,7 @@ async def get_dashboard_stats():
         if not neo4j_service.driver:
             neo4j_service.connect()
         
-        with neo4j_service.driver.session() as session:
+        with neo4j_service.read_session() as session:
             annotated_result = session.run("MATCH (q:Question)-[:TESTS]->() RETURN count(DISTINCT q) as count")
             annotated_questions = annotated_result.single()["count"]
         
@@ -2,12 +2,16 @@
 标注相关API路由
 提供题目标注和NLP辅助标注功能
 """
+import asyncio
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 from backend.services.database import neo4j_service
-from backend.services.nlp_service import nlp_service
+from backend.services.registry import nlp_service
+from backend.services.annotation_cascade import cascades
+from backend.services.annotation_tables import annotation_tables
+from backend.models.schema import Question, question_id
 
 router = APIRouter()
 
@@ -19,6 +23,21 @@ class AnnotationRequest(BaseModel):
     selected_knowledge_points: List[Dict[str, Any]] = []
 
 
+class CascadeConfigRequest(BaseModel):
+    """级联关卡阈值更新请求（stage 为空时更新全部关卡）"""
+    stage: Optional[str] = None
+    enabled: Optional[bool] = None
+    accept_confidence: Optional[float] = None
+    accept_margin: Optional[float] = None
+    reject_confidence: Optional[float] = None
+
+
+class AnnotationTablesUpdate(BaseModel):
+    """关键词/规则表更新请求：覆盖指定的表（值为null时恢复内置表），其余表保持当前版本"""
+    tables: Dict[str, Any]
+    version: Optional[str] = None
+
+
 class AnnotationSuggestion(BaseModel):
     """标注建议模型"""
     knowledge_point_id: str
@@ -27,18 +46,48 @@ class AnnotationSuggestion(BaseModel):
     reason: str
 
 
+class KnowledgePointLink(BaseModel):
+    """题目-知识点标注"""
+    knowledge_point_id: str
+    weight: float = 1.0
+
+
+class AnnotatedQuestion(BaseModel):
+    """带标注的题目（保存时整体替换题目的标注）"""
+    question: Question
+    knowledge_points: List[KnowledgePointLink] = []
+
+
+class BatchAnnotatedQuestions(BaseModel):
+    """批量保存请求模型"""
+    items: List[AnnotatedQuestion]
+
+
+def _to_save_item(item: AnnotatedQuestion) -> Dict[str, Any]:
+    question = item.question
+    if not question.id:
+        question.id = question_id(question.content)
+    return {
+        "id": question.id,
+        "properties": question.dict(exclude={"id"}),
+        "links": [{"kp_id": kp.knowledge_point_id, "weight": kp.weight} for kp in item.knowledge_points]
+    }
+
+
 @router.post("/suggest")
 async def suggest_knowledge_points(request: AnnotationRequest) -> Dict[str, Any]:
     """NLP辅助标注 - 建议知识点"""
     try:
-        suggestions = nlp_service.suggest_knowledge_points(
-            request.question_content, 
-            request.question_type
-        )
+        with annotation_tables.pin() as tables:
+            suggestions = nlp_service.suggest_knowledge_points(
+                request.question_content, 
+                request.question_type
+            )
         
         return {
             "suggestions": suggestions,
             "count": len(suggestions),
+            "tables_version": tables.version,
             "message": "知识点建议生成成功"
         }
     except Exception as e:
@@ -68,31 +117,125 @@ async def collaborative_suggest_knowledge_points(request: AnnotationRequest):
         raise HTTPException(status_code=500, detail=f"协作推荐失败: {str(e)}")
 
 
+@router.get("/cascade")
+async def get_cascade_stats():
+    """各级联标注流程的关卡阈值和升级率（服务首次使用后才会出现）"""
+    try:
+        return {name: cascade.stats() for name, cascade in cascades.items()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取级联统计失败: {str(e)}")
+
+
+@router.put("/cascade/{cascade_name}")
+async def update_cascade_config(cascade_name: str, request: CascadeConfigRequest):
+    """更新级联关卡阈值"""
+    cascade = cascades.get(cascade_name)
+    if cascade is None:
+        raise HTTPException(status_code=404, detail=f"级联流程不存在: {cascade_name}")
+    try:
+        values = {k: v for k, v in request.dict().items() if k != "stage" and v is not None}
+        return {"message": "级联阈值更新成功", "config": cascade.configure(request.stage, **values)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"级联阈值更新失败: {str(e)}")
+
+
+@router.get("/tables")
+async def get_annotation_tables():
+    """当前生效的关键词/规则表版本、来源，以及仍在旧版本上执行的请求数"""
+    try:
+        return annotation_tables.info()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取关键词/规则表状态失败: {str(e)}")
+
+
+@router.get("/tables/export")
+async def export_annotation_tables(include_builtin: bool = True):
+    """导出当前生效的表（表文件格式，可编辑后通过 PUT /tables 发布）"""
+    try:
+        return annotation_tables.export(include_builtin)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导出关键词/规则表失败: {str(e)}")
+
+
+@router.post("/tables/reload")
+async def reload_annotation_tables(wait: bool = False):
+    """重新读取表文件/图数据库中的表，后台编译后替换（wait=true 时等待完成）"""
+    try:
+        # 等待后台编译线程，放到线程池中执行，不阻塞事件循环
+        return await asyncio.to_thread(annotation_tables.reload, wait=wait)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"重新加载关键词/规则表失败: {str(e)}")
+
+
+@router.put("/tables")
+async def update_annotation_tables(request: AnnotationTablesUpdate):
+    """发布新版本的关键词/规则表：编译成功后保存到表来源，本进程立即切换，其他worker收到变更事件后切换"""
+    try:
+        # 编译和保存表在线程池中执行，不阻塞事件循环
+        active = await asyncio.to_thread(annotation_tables.apply, request.tables, request.version)
+        return {"message": "关键词/规则表更新成功", "active": active}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"关键词/规则表更新失败: {str(e)}")
+
+
 @router.post("/submit")
 async def submit_annotation(
     question_id: str, 
     knowledge_point_annotations: List[Dict[str, Any]]
 ):
-    """提交标注结果"""
+    """提交标注结果（替换题目现有的全部标注）"""
     try:
-        # 删除现有的标注关系
-        # TODO: 实现删除现有关系的功能
-        
-        # 创建新的标注关系
-        for annotation in knowledge_point_annotations:
-            kp_id = annotation.get("knowledge_point_id")
-            weight = annotation.get("weight", 1.0)
-            
-            neo4j_service.link_question_to_knowledge(question_id, kp_id, weight)
+        result = neo4j_service.replace_question_annotations(question_id, knowledge_point_annotations)
+        if result is None:
+            raise HTTPException(status_code=404, detail="题目不存在")
         
         return {
             "message": "标注提交成功",
-            "annotated_count": len(knowledge_point_annotations)
+            "annotated_count": result["linked"],
+            "removed_count": result["removed"],
+            "missing_knowledge_points": result["missing_knowledge_points"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"标注提交失败: {str(e)}")
 
 
+@router.post("/save")
+async def save_annotated_question(item: AnnotatedQuestion):
+    """创建或更新题目并替换其标注（单个事务）"""
+    try:
+        result = neo4j_service.save_annotated_questions([_to_save_item(item)])[0]
+        return {
+            "id": result["id"],
+            "annotated_count": result["linked"],
+            "removed_count": result["removed"],
+            "missing_knowledge_points": result["missing_knowledge_points"],
+            "message": "题目保存成功"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"题目保存失败: {str(e)}")
+
+
+@router.post("/save-batch")
+async def save_annotated_questions(request: BatchAnnotatedQuestions):
+    """批量创建或更新题目并替换其标注（全部成功或全部回滚）"""
+    try:
+        results = neo4j_service.save_annotated_questions([_to_save_item(item) for item in request.items])
+        return {
+            "results": results,
+            "saved_count": len(results),
+            "annotated_count": sum(r["linked"] for r in results),
+            "message": f"批量保存成功，共 {len(results)} 道题目"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量保存失败: {str(e)}")
+
+
 @router.get("/stats")
 async def get_annotation_stats():
     """获取标注统计信息"""
@@ -17,8 +17,7 @@ async def init_database():
         neo4j_service.connect()
         
         # 创建约束和索引
-        neo4j_service.create_constraints()
-        neo4j_service.create_indexes()
+        neo4j_service.initialize_database()
         
         # 添加基础知识点
         knowledge_points = [
@@ -118,6 +117,28 @@ async def health_check():
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
 
 
+@router.post("/migrate-question-ids")
+async def migrate_question_ids(dry_run: bool = True):
+    """
+    一次性迁移：旧ID题目改写为按题干生成的ID，题干相同的重复题目合并（dry_run=false 时执行）
+    """
+    try:
+        if not neo4j_service.driver:
+            if not neo4j_service.connect():
+                raise HTTPException(status_code=500, detail="数据库连接失败")
+        result = neo4j_service.migrate_question_ids(dry_run=dry_run)
+        return {
+            "status": "dry_run" if dry_run else "completed",
+            **result,
+            "message": f"{'将' if dry_run else '已'}改写 {result['renamed']} 个题目ID，合并 {result['merged']} 个重复题目"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"题目ID迁移失败: {e}")
+        raise HTTPException(status_code=500, detail=f"题目ID迁移失败: {str(e)}")
+
+
 @router.post("/load-opensource-data")
 async def load_opensource_data():
     """加载开源英语教育数据"""
@@ -133,80 +154,29 @@ async def load_opensource_data():
         knowledge_points = open_source_integrator.get_all_knowledge_points()
         questions = open_source_integrator.get_all_questions()
         
-        # 导入知识点
-        imported_kp = 0
-        with neo4j_service.driver.session() as session:
-            for i, kp in enumerate(knowledge_points):
-                kp_id = f"kp_opensource_{i+1:03d}"
-                
-                # 检查是否已存在
-                existing = session.run("MATCH (kp:KnowledgePoint {name: $name}) RETURN kp", {"name": kp['name']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (kp:KnowledgePoint {
-                            id: $id,
-                            name: $name,
-                            description: $description,
-                            difficulty: $difficulty,
-                            keywords: $keywords,
-                            grade_levels: $grade_levels,
-                            source: $source,
-                            cefr_level: $cefr_level
-                        })
-                    """, {
-                        "id": kp_id,
-                        "name": kp['name'],
-                        "description": kp['description'],
-                        "difficulty": kp['difficulty'],
-                        "keywords": kp['keywords'],
-                        "grade_levels": kp['grade_levels'],
-                        "source": kp.get('source', 'Open Source'),
-                        "cefr_level": kp.get('cefr_level', 'A1')
-                    })
-                    imported_kp += 1
-        
-        # 导入题目
-        imported_q = 0
-        with neo4j_service.driver.session() as session:
-            for i, q in enumerate(questions):
-                q_id = f"q_opensource_{i+1:03d}"
-                
-                # 检查是否已存在
-                existing = session.run("MATCH (q:Question {content: $content}) RETURN q", {"content": q['content']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (q:Question {
-                            id: $id,
-                            content: $content,
-                            question_type: $question_type,
-                            options: $options,
-                            answer: $answer,
-                            analysis: $analysis,
-                            difficulty: $difficulty,
-                            source: $source,
-                            grade_level: $grade_level
-                        })
-                    """, {
-                        "id": q_id,
-                        "content": q['content'],
-                        "question_type": q['question_type'],
-                        "options": q['options'],
-                        "answer": q['answer'],
-                        "analysis": q.get('analysis', ''),
-                        "difficulty": q['difficulty'],
-                        "source": q.get('source', 'Open Source'),
-                        "grade_level": q.get('grade_level', '未设置')
-                    })
-                    
-                    # 创建关系
-                    for kp_name in q.get("knowledge_points", []):
-                        session.run("""
-                            MATCH (q:Question {id: $q_id})
-                            MATCH (kp:KnowledgePoint {name: $kp_name})
-                            MERGE (q)-[:TESTS {weight: 0.8}]->(kp)
-                        """, {"q_id": q_id, "kp_name": kp_name})
-                    
-                    imported_q += 1
+        # 导入知识点（按名称MERGE，重复导入不会产生重复节点）
+        imported_kp = neo4j_service.merge_knowledge_points([{
+            "name": kp['name'],
+            "description": kp['description'],
+            "difficulty": kp['difficulty'],
+            "keywords": kp['keywords'],
+            "grade_levels": kp['grade_levels'],
+            "source": kp.get('source', 'Open Source'),
+            "cefr_level": kp.get('cefr_level', 'A1')
+        } for kp in knowledge_points], source="load-opensource-data")
+        
+        # 导入题目（按题干生成的ID MERGE，重复导入不会产生重复节点）
+        imported_q = neo4j_service.merge_questions([{
+            "content": q['content'],
+            "question_type": q['question_type'],
+            "options": q['options'],
+            "answer": q['answer'],
+            "analysis": q.get('analysis', ''),
+            "difficulty": q['difficulty'],
+            "source": q.get('source', 'Open Source'),
+            "grade_level": q.get('grade_level', '未设置'),
+            "knowledge_points": q.get("knowledge_points", [])
+        } for q in questions], weight=0.8, source="load-opensource-data")
         
         return {
             "status": "completed",
@@ -237,78 +207,28 @@ async def load_educational_standards():
         knowledge_points = educational_standards_data.get_all_knowledge_points()
         questions = educational_standards_data.get_all_questions()
         
-        # 导入知识点
-        imported_kp = 0
-        with neo4j_service.driver.session() as session:
-            for i, kp in enumerate(knowledge_points):
-                kp_id = f"kp_edu_{i+1:03d}"
-                
-                # 检查是否已存在
-                existing = session.run("MATCH (kp:KnowledgePoint {name: $name}) RETURN kp", {"name": kp['name']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (kp:KnowledgePoint {
-                            id: $id,
-                            name: $name,
-                            difficulty: $difficulty,
-                            keywords: $keywords,
-                            grade_levels: $grade_levels,
-                            source: $source,
-                            cefr_level: $cefr_level
-                        })
-                    """, {
-                        "id": kp_id,
-                        "name": kp['name'],
-                        "difficulty": kp['difficulty'],
-                        "keywords": kp['keywords'],
-                        "grade_levels": kp['grade_levels'],
-                        "source": kp.get('source', 'Educational Standards'),
-                        "cefr_level": kp.get('cefr_level', 'A1')
-                    })
-                    imported_kp += 1
-        
-        # 导入题目
-        imported_q = 0
-        with neo4j_service.driver.session() as session:
-            for i, q in enumerate(questions):
-                q_id = f"q_edu_{i+1:03d}"
-                
-                # 检查是否已存在（基于内容去重）
-                existing = session.run("MATCH (q:Question {content: $content}) RETURN q", {"content": q['content']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (q:Question {
-                            id: $id,
-                            content: $content,
-                            question_type: $question_type,
-                            options: $options,
-                            answer: $answer,
-                            analysis: $analysis,
-                            difficulty: $difficulty,
-                            source: $source,
-                            grade_level: $grade_level
-                        })
-                    """, {
-                        "id": q_id,
-                        "content": q['content'],
-                        "question_type": q['question_type'],
-                        "options": q['options'],
-                        "answer": q['answer'],
-                        "analysis": q.get('analysis', ''),
-                        "difficulty": q['difficulty'],
-                        "source": q.get('source', 'Educational Standards'),
-                        "grade_level": q.get('grade_level', '未设置')
-                    })
-                    
-                    # 创建关系
-                    for kp_name in q.get("knowledge_points", []):
-                        session.run("""
-                            MATCH (q:Question {id: $q_id})
-                            MATCH (kp:KnowledgePoint {name: $kp_name})
-                            MERGE (q)-[:TESTS {weight: 0.9}]->(kp)
-                        """, {"q_id": q_id, "kp_name": kp_name})
-                    
-                    imported_q += 1
+        # 导入知识点（按名称MERGE，重复导入不会产生重复节点）
+        imported_kp = neo4j_service.merge_knowledge_points([{
+            "name": kp['name'],
+            "difficulty": kp['difficulty'],
+            "keywords": kp['keywords'],
+            "grade_levels": kp['grade_levels'],
+            "source": kp.get('source', 'Educational Standards'),
+            "cefr_level": kp.get('cefr_level', 'A1')
+        } for kp in knowledge_points], source="load-educational-standards")
+        
+        # 导入题目（按题干生成的ID MERGE，重复导入不会产生重复节点）
+        imported_q = neo4j_service.merge_questions([{
+            "content": q['content'],
+            "question_type": q['question_type'],
+            "options": q['options'],
+            "answer": q['answer'],
+            "analysis": q.get('analysis', ''),
+            "difficulty": q['difficulty'],
+            "source": q.get('source', 'Educational Standards'),
+            "grade_level": q.get('grade_level', '未设置'),
+            "knowledge_points": q.get("knowledge_points", [])
+        } for q in questions], weight=0.9, source="load-educational-standards")
         
         return {
             "status": "completed",
@@ -339,51 +259,18 @@ async def load_real_datasets():
         # 获取真实数据集
         questions = real_dataset_integrator.get_all_real_questions()
         
-        # 导入题目
-        imported_q = 0
-        with neo4j_service.driver.session() as session:
-            for i, q in enumerate(questions):
-                # 使用内容哈希生成唯一ID
-                import hashlib
-                content_hash = hashlib.md5(q['content'].encode()).hexdigest()[:8]
-                q_id = f"q_real_{content_hash}"
-                
-                # 检查是否已存在（基于内容去重）
-                existing = session.run("MATCH (q:Question {content: $content}) RETURN q", {"content": q['content']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (q:Question {
-                            id: $id,
-                            content: $content,
-                            question_type: $question_type,
-                            options: $options,
-                            answer: $answer,
-                            analysis: $analysis,
-                            difficulty: $difficulty,
-                            source: $source,
-                            grade_level: $grade_level
-                        })
-                    """, {
-                        "id": q_id,
-                        "content": q['content'],
-                        "question_type": q['question_type'],
-                        "options": q['options'],
-                        "answer": q['answer'],
-                        "analysis": q.get('analysis', ''),
-                        "difficulty": q['difficulty'],
-                        "source": q.get('source', 'Real Dataset'),
-                        "grade_level": q.get('grade_level', '未设置')
-                    })
-                    
-                    # 创建关系
-                    for kp_name in q.get("knowledge_points", []):
-                        session.run("""
-                            MATCH (q:Question {id: $q_id})
-                            MATCH (kp:KnowledgePoint {name: $kp_name})
-                            MERGE (q)-[:TESTS {weight: 0.95}]->(kp)
-                        """, {"q_id": q_id, "kp_name": kp_name})
-                    
-                    imported_q += 1
+        # 导入题目（按题干生成的ID MERGE，重复导入不会产生重复节点）
+        imported_q = neo4j_service.merge_questions([{
+            "content": q['content'],
+            "question_type": q['question_type'],
+            "options": q['options'],
+            "answer": q['answer'],
+            "analysis": q.get('analysis', ''),
+            "difficulty": q['difficulty'],
+            "source": q.get('source', 'Real Dataset'),
+            "grade_level": q.get('grade_level', '未设置'),
+            "knowledge_points": q.get("knowledge_points", [])
+        } for q in questions], weight=0.95, source="load-real-datasets")
         
         # 获取统计信息
         stats = real_dataset_integrator.get_statistics()
@@ -470,51 +357,18 @@ async def sync_local_data():
             if not neo4j_service.connect():
                 raise HTTPException(status_code=500, detail="数据库连接失败")
         
-        # 导入本地题目
-        imported_q = 0
-        with neo4j_service.driver.session() as session:
-            for i, q in enumerate(local_questions):
-                # 使用内容哈希生成唯一ID
-                import hashlib
-                content_hash = hashlib.md5(q['content'].encode()).hexdigest()[:8]
-                q_id = f"q_local_{content_hash}"
-                
-                # 检查是否已存在
-                existing = session.run("MATCH (q:Question {content: $content}) RETURN q", {"content": q['content']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (q:Question {
-                            id: $id,
-                            content: $content,
-                            question_type: $question_type,
-                            options: $options,
-                            answer: $answer,
-                            analysis: $analysis,
-                            difficulty: $difficulty,
-                            source: $source,
-                            grade_level: $grade_level
-                        })
-                    """, {
-                        "id": q_id,
-                        "content": q['content'],
-                        "question_type": q['question_type'],
-                        "options": q['options'],
-                        "answer": q['answer'],
-                        "analysis": q.get('analysis', ''),
-                        "difficulty": q['difficulty'],
-                        "source": q.get('source', 'Local Database'),
-                        "grade_level": q.get('grade_level', '未设置')
-                    })
-                    
-                    # 创建关系
-                    for kp_name in q.get("knowledge_points", []):
-                        session.run("""
-                            MATCH (q:Question {id: $q_id})
-                            MATCH (kp:KnowledgePoint {name: $kp_name})
-                            MERGE (q)-[:TESTS {weight: 1.0}]->(kp)
-                        """, {"q_id": q_id, "kp_name": kp_name})
-                    
-                    imported_q += 1
+        # 导入本地题目（按题干生成的ID MERGE，重复导入不会产生重复节点）
+        imported_q = neo4j_service.merge_questions([{
+            "content": q['content'],
+            "question_type": q['question_type'],
+            "options": q['options'],
+            "answer": q['answer'],
+            "analysis": q.get('analysis', ''),
+            "difficulty": q['difficulty'],
+            "source": q.get('source', 'Local Database'),
+            "grade_level": q.get('grade_level', '未设置'),
+            "knowledge_points": q.get("knowledge_points", [])
+        } for q in local_questions], weight=1.0, source="sync-local-data")
         
         return {
             "status": "completed",
@@ -543,57 +397,24 @@ async def load_final_batch():
         # 获取最终批次题目
         questions = final_question_batch.get_final_questions()
         
-        # 导入题目
-        imported_q = 0
-        with neo4j_service.driver.session() as session:
-            for i, q in enumerate(questions):
-                # 使用内容哈希生成唯一ID
-                import hashlib
-                content_hash = hashlib.md5(q['content'].encode()).hexdigest()[:8]
-                q_id = f"q_final_{content_hash}"
-                
-                # 检查是否已存在
-                existing = session.run("MATCH (q:Question {content: $content}) RETURN q", {"content": q['content']})
-                if existing.single() is None:
-                    session.run("""
-                        CREATE (q:Question {
-                            id: $id,
-                            content: $content,
-                            question_type: $question_type,
-                            options: $options,
-                            answer: $answer,
-                            analysis: $analysis,
-                            difficulty: $difficulty,
-                            source: $source,
-                            grade_level: $grade_level
-                        })
-                    """, {
-                        "id": q_id,
-                        "content": q['content'],
-                        "question_type": q['question_type'],
-                        "options": q['options'],
-                        "answer": q['answer'],
-                        "analysis": q.get('analysis', ''),
-                        "difficulty": q['difficulty'],
-                        "source": q.get('source', 'Final Batch'),
-                        "grade_level": q.get('grade_level', '未设置')
-                    })
-                    
-                    # 创建关系
-                    for kp_name in q.get("knowledge_points", []):
-                        session.run("""
-                            MATCH (q:Question {id: $q_id})
-                            MATCH (kp:KnowledgePoint {name: $kp_name})
-                            MERGE (q)-[:TESTS {weight: 1.0}]->(kp)
-                        """, {"q_id": q_id, "kp_name": kp_name})
-                    
-                    imported_q += 1
+        # 导入题目（按题干生成的ID MERGE，重复导入不会产生重复节点）
+        imported_q = neo4j_service.merge_questions([{
+            "content": q['content'],
+            "question_type": q['question_type'],
+            "options": q['options'],
+            "answer": q['answer'],
+            "analysis": q.get('analysis', ''),
+            "difficulty": q['difficulty'],
+            "source": q.get('source', 'Final Batch'),
+            "grade_level": q.get('grade_level', '未设置'),
+            "knowledge_points": q.get("knowledge_points", [])
+        } for q in questions], weight=1.0, source="load-final-batch")
         
         # 获取最终统计
         final_stats = final_question_batch.get_statistics()
         
         # 检查总数
-        with neo4j_service.driver.session() as session:
+        with neo4j_service.read_session() as session:
             total_result = session.run("MATCH (q:Question) RETURN count(q) as total")
             final_total = total_result.single()["total"]
         
@@ -1,9 +1,11 @@
 """
 知识点相关API路由
 """
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Dict, Any
 from backend.services.database import neo4j_service
+from backend.services.graph_events import graph_events
 from backend.models.schema import KnowledgePoint
 
 router = APIRouter()
@@ -57,7 +59,7 @@ async def create_knowledge_hierarchy(parent_id: str, child_id: str):
 async def get_knowledge_hierarchy():
     """获取知识点层级树"""
     try:
-        hierarchy = neo4j_service.get_knowledge_hierarchy()
+        hierarchy = await asyncio.to_thread(neo4j_service.get_knowledge_hierarchy)
         return {"hierarchy": hierarchy}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
@@ -81,7 +83,8 @@ async def add_missing_knowledge_points():
         if not neo4j_service.driver:
             neo4j_service.connect()
         
-        with neo4j_service.driver.session() as session:
+        with graph_events.change(("KnowledgePoint", "HAS_SUB_POINT"), "bulk_load", source="add-missing-kps"), \
+                neo4j_service.write_session() as session:
             # 添加情态动词
             session.run("""
                 MERGE (kp:KnowledgePoint {name: '情态动词'})
@@ -163,7 +166,7 @@ async def debug_nlp_service():
         # 获取知识点ID映射
         kp_id_map = {}
         if db_connected and neo4j_service.driver:
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 result = session.run("MATCH (kp:KnowledgePoint) RETURN kp.id as id, kp.name as name LIMIT 10")
                 kp_id_map = {record["name"]: record["id"] for record in result}
         
@@ -207,7 +210,7 @@ async def debug_preposition_recognition():
         
         kp_id_map = {}
         if db_connected and neo4j_service.driver:
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 result = session.run("MATCH (kp:KnowledgePoint {name: '介词'}) RETURN kp.id as id, kp.name as name")
                 record = result.single()
                 if record:
@@ -268,7 +271,8 @@ async def sync_database():
         
         sync_results = []
         
-        with neo4j_service.driver.session() as session:
+        with graph_events.change(("KnowledgePoint", "HAS_SUB_POINT"), "bulk_load", source="sync-database"), \
+                neo4j_service.write_session() as session:
             # 检查并添加情态动词
             result = session.run("MATCH (kp:KnowledgePoint {name: '情态动词'}) RETURN kp.id as id")
             existing = result.single()
@@ -3,10 +3,10 @@ MEGAnno+ 集成API路由
 提供与MEGAnno+平台集成的增强标注功能
 """
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
-from backend.services.meganno_integration import meganno_service
+from backend.services.registry import meganno_service
 from backend.models.schema import Question
 
 router = APIRouter()
@@ -18,6 +18,7 @@ class MEGAnnoConfig(BaseModel):
     integration_enabled: bool = True
     confidence_boost_factor: float = 0.2
     human_feedback_weight: float = 0.3
+    cascade: Optional[Dict[str, Any]] = None  # 级联关卡阈值，如 {"accept_confidence": 0.85}
 
 
 class EnhancedAnnotationRequest(BaseModel):
@@ -104,7 +105,8 @@ async def get_meganno_config():
             "meganno_endpoint": meganno_service.meganno_endpoint,
             "integration_enabled": meganno_service.integration_enabled,
             "confidence_boost_factor": meganno_service.confidence_boost_factor,
-            "human_feedback_weight": meganno_service.human_feedback_weight
+            "human_feedback_weight": meganno_service.human_feedback_weight,
+            "cascade": meganno_service.cascade.config()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取配置失败: {str(e)}")
@@ -1,14 +1,25 @@
 """
 题目相关API路由
 """
+import asyncio
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel
 from backend.services.database import neo4j_service
+from backend.services.near_duplicate_index import near_duplicate_index
+from backend.services.question_catalog import question_catalog
 from backend.models.schema import Question
 
 router = APIRouter()
 
 
+class SimilarQuestionRequest(BaseModel):
+    """近似重复查询请求模型"""
+    content: str
+    threshold: Optional[float] = None
+    limit: int = 5
+
+
 @router.get("/")
 async def get_questions(
     page: int = 1,
@@ -16,7 +27,8 @@ async def get_questions(
     difficulty: str = None,
     question_type: str = None,
     grade_level: str = None,
-    source: str = None
+    source: str = None,
+    knowledge_point: str = None
 ):
     """获取题目列表（支持分页和筛选）"""
     try:
@@ -25,75 +37,24 @@ async def get_questions(
             if not neo4j_service.connect():
                 raise HTTPException(status_code=500, detail="数据库连接失败")
         
-        # 构建筛选条件
-        conditions = []
-        params = {}
-        
-        if difficulty:
-            conditions.append("q.difficulty = $difficulty")
-            params["difficulty"] = difficulty
-        
-        if question_type:
-            conditions.append("q.question_type = $question_type")
-            params["question_type"] = question_type
-            
-        if grade_level:
-            conditions.append("q.grade_level = $grade_level")
-            params["grade_level"] = grade_level
-            
-        if source:
-            conditions.append("q.source CONTAINS $source")
-            params["source"] = source
-        
-        where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
-        
-        # 计算总数
-        count_query = f"""
-            MATCH (q:Question)
-            {where_clause}
-            RETURN count(q) as total
-        """
-        
-        # 分页查询
         skip_count = (page - 1) * page_size
-        params.update({"skip": skip_count, "limit": page_size})
-        
-        data_query = f"""
-            MATCH (q:Question)
-            {where_clause}
-            OPTIONAL MATCH (q)-[r:TESTS]->(kp:KnowledgePoint)
-            RETURN q.id as id, q.content as content, q.question_type as question_type,
-                   q.options as options, q.answer as answer, q.analysis as analysis,
-                   q.difficulty as difficulty, q.source as source, q.grade_level as grade_level,
-                   collect(kp.name) as knowledge_points
-            ORDER BY q.id
-            SKIP $skip
-            LIMIT $limit
-        """
+        filters = {
+            "difficulty": difficulty,
+            "question_type": question_type,
+            "grade_level": grade_level,
+            "source": source,
+            "knowledge_point": knowledge_point
+        }
         
-        with neo4j_service.driver.session() as session:
-            # 获取总数
-            count_result = session.run(count_query, {k: v for k, v in params.items() if k not in ["skip", "limit"]})
-            total_count = count_result.single()["total"]
-            
-            # 获取分页数据
-            result = session.run(data_query, params)
-            
-            questions = []
-            for record in result:
-                question_data = {
-                    "id": record["id"],
-                    "content": record["content"],
-                    "question_type": record["question_type"],
-                    "options": record["options"] or [],
-                    "answer": record["answer"],
-                    "analysis": record["analysis"],
-                    "difficulty": record["difficulty"],
-                    "source": record["source"],
-                    "grade_level": record["grade_level"],
-                    "knowledge_points": [kp for kp in record["knowledge_points"] if kp]
-                }
-                questions.append(question_data)
+        # 优先用进程内题目目录筛选计数和分页，只向数据库取当前页的题目
+        page_ids = question_catalog.query(
+            {**filters, "knowledge_points": knowledge_point}, skip_count, page_size
+        )
+        if page_ids is not None:
+            total_count = page_ids["total"]
+            questions = [_question_data(record) for record in neo4j_service.get_questions_by_ids(page_ids["ids"])]
+        else:
+            total_count, questions = _query_questions(filters, skip_count, page_size)
         
         # 计算分页信息
         total_pages = (total_count + page_size - 1) // page_size
@@ -108,17 +69,126 @@ async def get_questions(
                 "has_next": page < total_pages,
                 "has_prev": page > 1
             },
-            "filters": {
-                "difficulty": difficulty,
-                "question_type": question_type,
-                "grade_level": grade_level,
-                "source": source
-            }
+            "filters": filters
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取题目失败: {str(e)}")
 
+
+@router.get("/facets")
+async def get_question_facets(
+    difficulty: str = None,
+    question_type: str = None,
+    grade_level: str = None,
+    source: str = None,
+    knowledge_point: str = None
+):
+    """在筛选结果内按题型、难度、年级、来源、知识点分面计数"""
+    try:
+        result = question_catalog.facet_counts({
+            "difficulty": difficulty,
+            "question_type": question_type,
+            "grade_level": grade_level,
+            "source": source,
+            "knowledge_points": knowledge_point
+        })
+        if result is None:
+            raise HTTPException(status_code=503, detail="题目目录不可用")
+        return {**result, "catalog": question_catalog.stats()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"分面统计失败: {str(e)}")
+
+
+@router.post("/catalog/rebuild")
+async def rebuild_question_catalog():
+    """从数据库全量重建题目目录"""
+    try:
+        return await asyncio.to_thread(question_catalog.rebuild)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"重建失败: {str(e)}")
+
+
+def _question_data(record) -> Dict[str, Any]:
+    return {
+        "id": record["id"],
+        "content": record["content"],
+        "question_type": record["question_type"],
+        "options": record["options"] or [],
+        "answer": record["answer"],
+        "analysis": record["analysis"],
+        "difficulty": record["difficulty"],
+        "source": record["source"],
+        "grade_level": record["grade_level"],
+        "knowledge_points": [kp for kp in record["knowledge_points"] if kp]
+    }
+
+
+def _query_questions(filters: Dict[str, Any], skip_count: int, page_size: int):
+    """题目目录不可用时直接用Cypher筛选、计数和分页"""
+    # 构建筛选条件
+    conditions = []
+    params = {}
+    
+    if filters["difficulty"]:
+        conditions.append("q.difficulty = $difficulty")
+        params["difficulty"] = filters["difficulty"]
+    
+    if filters["question_type"]:
+        conditions.append("q.question_type = $question_type")
+        params["question_type"] = filters["question_type"]
+        
+    if filters["grade_level"]:
+        conditions.append("q.grade_level = $grade_level")
+        params["grade_level"] = filters["grade_level"]
+        
+    if filters["source"]:
+        conditions.append("q.source CONTAINS $source")
+        params["source"] = filters["source"]
+    
+    if filters["knowledge_point"]:
+        conditions.append("EXISTS { MATCH (q)-[:TESTS]->(:KnowledgePoint {name: $knowledge_point}) }")
+        params["knowledge_point"] = filters["knowledge_point"]
+    
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+    
+    # 计算总数
+    count_query = f"""
+        MATCH (q:Question)
+        {where_clause}
+        RETURN count(q) as total
+    """
+    
+    # 分页查询
+    params.update({"skip": skip_count, "limit": page_size})
+    
+    data_query = f"""
+        MATCH (q:Question)
+        {where_clause}
+        OPTIONAL MATCH (q)-[r:TESTS]->(kp:KnowledgePoint)
+        RETURN q.id as id, q.content as content, q.question_type as question_type,
+               q.options as options, q.answer as answer, q.analysis as analysis,
+               q.difficulty as difficulty, q.source as source, q.grade_level as grade_level,
+               collect(kp.name) as knowledge_points
+        ORDER BY q.id
+        SKIP $skip
+        LIMIT $limit
+    """
+    
+    with neo4j_service.read_session() as session:
+        # 获取总数
+        count_result = session.run(count_query, {k: v for k, v in params.items() if k not in ["skip", "limit"]})
+        total_count = count_result.single()["total"]
+        
+        # 获取分页数据
+        result = session.run(data_query, params)
+        questions = [_question_data(record) for record in result]
+    
+    return total_count, questions
+
+
 @router.post("/", response_model=Dict[str, str])
 async def create_question(question: Question):
     """创建题目"""
@@ -129,6 +199,26 @@ async def create_question(question: Question):
         raise HTTPException(status_code=500, detail=f"创建失败: {str(e)}")
 
 
+@router.post("/similar")
+async def find_similar_questions(request: SimilarQuestionRequest):
+    """查找题干近似重复的题目（MinHash/LSH索引）"""
+    try:
+        matches = await asyncio.to_thread(near_duplicate_index.find_similar, request.content,
+                                          request.threshold, request.limit)
+        return {"similar": matches, "count": len(matches), "index": near_duplicate_index.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+
+
+@router.post("/similar/rebuild")
+async def rebuild_similarity_index():
+    """从数据库全量重建近似重复索引"""
+    try:
+        return await asyncio.to_thread(near_duplicate_index.rebuild)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"重建失败: {str(e)}")
+
+
 @router.post("/{question_id}/knowledge/{kp_id}")
 async def link_question_to_knowledge(question_id: str, kp_id: str, weight: float = 1.0):
     """将题目链接到知识点"""
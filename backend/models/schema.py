@@ -2,6 +2,8 @@
 知识图谱Schema定义
 定义了K12英语知识图谱的实体类型和关系类型
 """
+import hashlib
+import unicodedata
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 from enum import Enum
@@ -120,6 +122,33 @@ class Requires(Relationship):
     strength: float = 1.0  # 依赖强度
 
 
+# ===== 确定性ID =====
+# 由内容的SHA-256生成：同一题干/知识点名称在任意进程、任意次导入中得到相同ID，
+# 写入时按ID MERGE，重复导入不再产生重复节点
+
+ID_HASH_LENGTH = 16  # 64位，百万级节点下碰撞概率可忽略
+
+
+def normalize_text(text: str) -> str:
+    """ID计算前的规范化：Unicode NFKC（全角/半角统一）并合并空白"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def content_id(prefix: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{prefix}_{digest[:ID_HASH_LENGTH]}"
+
+
+def question_id(content: str) -> str:
+    """题目ID（按题干）"""
+    return content_id("q", content)
+
+
+def knowledge_point_id(name: str) -> str:
+    """知识点ID（按名称）"""
+    return content_id("kp", name)
+
+
 # ===== Cypher查询辅助类 =====
 
 class GraphSchema:
@@ -141,24 +170,74 @@ class GraphSchema:
         "REQUIRES": "前置要求"
     }
     
+    # 约束（唯一约束自带索引，MERGE (kp:KnowledgePoint {name: ...}) 走索引查找）
+    CONSTRAINTS = {
+        "knowledge_point_id": "CREATE CONSTRAINT knowledge_point_id IF NOT EXISTS FOR (kp:KnowledgePoint) REQUIRE kp.id IS UNIQUE",
+        "knowledge_point_name_unique": "CREATE CONSTRAINT knowledge_point_name_unique IF NOT EXISTS FOR (kp:KnowledgePoint) REQUIRE kp.name IS UNIQUE",
+        "question_id": "CREATE CONSTRAINT question_id IF NOT EXISTS FOR (q:Question) REQUIRE q.id IS UNIQUE",
+        "textbook_id": "CREATE CONSTRAINT textbook_id IF NOT EXISTS FOR (t:Textbook) REQUIRE t.id IS UNIQUE",
+        "chapter_id": "CREATE CONSTRAINT chapter_id IF NOT EXISTS FOR (c:Chapter) REQUIRE c.id IS UNIQUE",
+        # 关键词/规则表版本（MERGE 按版本号）
+        "annotation_tables_version": "CREATE CONSTRAINT annotation_tables_version IF NOT EXISTS "
+                                     "FOR (t:AnnotationTables) REQUIRE t.version IS UNIQUE",
+    }
+
+    # 索引，覆盖题目列表/准确率视图的筛选条件和知识点搜索
+    INDEXES = {
+        "question_type": "CREATE INDEX question_type IF NOT EXISTS FOR (q:Question) ON (q.question_type)",
+        "question_difficulty": "CREATE INDEX question_difficulty IF NOT EXISTS FOR (q:Question) ON (q.difficulty)",
+        "question_grade_level": "CREATE INDEX question_grade_level IF NOT EXISTS FOR (q:Question) ON (q.grade_level)",
+        # 题型+难度+年级组合筛选，前缀（题型、题型+难度）同样可用
+        "question_type_difficulty_grade": "CREATE INDEX question_type_difficulty_grade IF NOT EXISTS "
+                                          "FOR (q:Question) ON (q.question_type, q.difficulty, q.grade_level)",
+        # 写入时按题干哈希查找旧ID题目（题干可能超出索引键长度上限，不直接索引 content）
+        "question_content_hash": "CREATE INDEX question_content_hash IF NOT EXISTS FOR (q:Question) ON (q.content_hash)",
+        # CONTAINS 查询使用文本索引
+        "question_source_text": "CREATE TEXT INDEX question_source_text IF NOT EXISTS FOR (q:Question) ON (q.source)",
+        "knowledge_point_name_text": "CREATE TEXT INDEX knowledge_point_name_text IF NOT EXISTS "
+                                     "FOR (kp:KnowledgePoint) ON (kp.name)",
+        "tests_weight": "CREATE INDEX tests_weight IF NOT EXISTS FOR ()-[r:TESTS]-() ON (r.weight)",
+    }
+
+    # 被唯一约束取代的旧索引：同一属性上已有普通索引时无法创建唯一约束
+    # 约束名 -> (旧索引名, 约束无法创建时保留/重建旧索引的语句)
+    LEGACY_INDEXES = {
+        "knowledge_point_name_unique": (
+            "knowledge_point_name",
+            "CREATE INDEX knowledge_point_name IF NOT EXISTS FOR (kp:KnowledgePoint) ON (kp.name)"
+        ),
+    }
+
+    # 不再使用、初始化时删除的索引
+    OBSOLETE_INDEXES = ["question_content"]
+
+    # 违反唯一约束的重复数据（有重复时约束无法创建）
+    DUPLICATE_CHECKS = {
+        "knowledge_point_name_unique": """
+            MATCH (kp:KnowledgePoint)
+            WITH kp.name AS value, count(*) AS count
+            WHERE count > 1
+            RETURN value, count
+            ORDER BY count DESC, value
+            LIMIT 100
+            """,
+    }
+
     @staticmethod
     def get_create_constraints_cypher() -> List[str]:
         """获取创建约束的Cypher语句"""
-        return [
-            "CREATE CONSTRAINT knowledge_point_id IF NOT EXISTS FOR (kp:KnowledgePoint) REQUIRE kp.id IS UNIQUE",
-            "CREATE CONSTRAINT question_id IF NOT EXISTS FOR (q:Question) REQUIRE q.id IS UNIQUE",
-            "CREATE CONSTRAINT textbook_id IF NOT EXISTS FOR (t:Textbook) REQUIRE t.id IS UNIQUE", 
-            "CREATE CONSTRAINT chapter_id IF NOT EXISTS FOR (c:Chapter) REQUIRE c.id IS UNIQUE"
-        ]
+        return list(GraphSchema.CONSTRAINTS.values())
     
     @staticmethod
     def get_create_indexes_cypher() -> List[str]:
         """获取创建索引的Cypher语句"""
-        return [
-            "CREATE INDEX knowledge_point_name IF NOT EXISTS FOR (kp:KnowledgePoint) ON (kp.name)",
-            "CREATE INDEX question_type IF NOT EXISTS FOR (q:Question) ON (q.question_type)",
-            "CREATE INDEX question_difficulty IF NOT EXISTS FOR (q:Question) ON (q.difficulty)"
-        ]
+        return list(GraphSchema.INDEXES.values())
+
+    @staticmethod
+    def get_drop_legacy_index_cypher(constraint: str) -> Optional[str]:
+        """删除被该约束取代的旧索引的Cypher语句（在创建约束之前执行）"""
+        legacy = GraphSchema.LEGACY_INDEXES.get(constraint)
+        return f"DROP INDEX {legacy[0]} IF EXISTS" if legacy else None
 
 
 # ===== 示例数据结构 =====
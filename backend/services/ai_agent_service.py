@@ -11,6 +11,10 @@ import re
 
 from backend.services.database import neo4j_service
 from backend.services.nlp_service import nlp_service
+from backend.services.metrics import metrics
+from backend.services.annotation_history import annotation_history
+from backend.services.feedback_index import feedback_index
+from backend.services.near_duplicate_index import near_duplicate_index
 from backend.models.schema import Question, KnowledgePoint
 
 logger = logging.getLogger(__name__)
@@ -23,13 +27,19 @@ class AIAgentService:
         self.confidence_threshold = 0.3  # 自动标注的最低置信度阈值
         self.max_auto_annotations = 5    # 每道题最多自动标注的知识点数量
         self.learning_enabled = True     # 是否启用学习功能
+        self.reuse_duplicate_annotations = True  # 近似重复题目直接复用已有标注
+        self.history = annotation_history
+        self.feedback_index = feedback_index
+        self.duplicate_index = near_duplicate_index
         
-    async def auto_annotate_question(self, question: Question) -> Dict[str, Any]:
+    async def auto_annotate_question(self, question: Question,
+                                     suggestions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         自动标注单个题目
         
         Args:
             question: 题目对象
+            suggestions: 已计算好的知识点建议（批量标注时整批推理），为空时调用NLP服务
             
         Returns:
             标注结果字典
@@ -37,32 +47,47 @@ class AIAgentService:
         try:
             logger.info(f"开始自动标注题目: {question.content[:50]}...")
             
-            # 1. 使用NLP服务获取知识点建议
-            suggestions = nlp_service.suggest_knowledge_points(
-                question.content, 
-                question.question_type
-            )
+            # 0. 近似重复的题目直接复用已有标注，跳过NLP和决策
+            duplicate = None
+            if self.reuse_duplicate_annotations:
+                with metrics.timer("annotation_stage_duration_seconds", scorer="ai_agent", stage="dedup"):
+                    duplicate, auto_annotations = self.find_duplicate_annotations(question)
             
-            # 2. 应用AI Agent的智能决策
-            auto_annotations = await self._make_annotation_decisions(
-                question, suggestions
-            )
+            if duplicate:
+                suggestions = []
+            else:
+                # 1. 使用NLP服务获取知识点建议（批量标注时已整批推理）
+                if suggestions is None:
+                    with metrics.timer("annotation_stage_duration_seconds", scorer="ai_agent", stage="suggest"):
+                        suggestions = nlp_service.suggest_knowledge_points(
+                            question.content, 
+                            question.question_type
+                        )
+                
+                # 2. 应用AI Agent的智能决策
+                with metrics.timer("annotation_stage_duration_seconds", scorer="ai_agent", stage="decide"):
+                    auto_annotations = await self._make_annotation_decisions(
+                        question, suggestions
+                    )
             
             # 3. 如果有高置信度的标注，自动应用
             applied_annotations = []
             if auto_annotations:
-                applied_annotations = await self._apply_auto_annotations(
-                    question, auto_annotations
-                )
+                with metrics.timer("annotation_stage_duration_seconds", scorer="ai_agent", stage="apply"):
+                    applied_annotations = await self._apply_auto_annotations(
+                        question, auto_annotations
+                    )
             
             # 4. 记录标注历史
-            await self._log_annotation_history(question, auto_annotations, applied_annotations)
+            with metrics.timer("annotation_stage_duration_seconds", scorer="ai_agent", stage="log_history"):
+                await self._log_annotation_history(question, auto_annotations, applied_annotations)
             
             result = {
                 "question_id": question.id,
                 "suggestions": suggestions,
                 "auto_annotations": auto_annotations,
                 "applied_annotations": applied_annotations,
+                "duplicate_of": duplicate,
                 "status": "completed",
                 "timestamp": datetime.now().isoformat()
             }
@@ -79,6 +104,33 @@ class AIAgentService:
                 "timestamp": datetime.now().isoformat()
             }
     
+    def find_duplicate_annotations(self, question: Question) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        查找已标注的近似重复题目，并把它的标注转换为本题的自动标注
+
+        Returns:
+            (重复题目 {"question_id", "similarity"}, 标注列表)；没有已标注的重复题目时为 (None, [])
+        """
+        try:
+            matches = self.duplicate_index.find_similar(question, limit=3, exclude=[question.id] if question.id else [])
+            for match in matches:
+                labels = neo4j_service.find_knowledge_points_by_question(match["question_id"])
+                if not labels:
+                    continue
+                annotations = [{
+                    "knowledge_point_id": label["knowledge_point"].get("id", ""),
+                    "knowledge_point_name": label["knowledge_point"].get("name", ""),
+                    "confidence": match["similarity"],
+                    "decision_score": match["similarity"],
+                    "weight": label["weight"] if label["weight"] is not None else 1.0,
+                    "reason": f"复用近似重复题目 {match['question_id']} 的标注（相似度 {match['similarity']:.2f}）",
+                    "auto_applied": True
+                } for label in labels[:self.max_auto_annotations]]
+                return match, annotations
+        except Exception as e:
+            logger.warning(f"查找近似重复题目失败: {e}")
+        return None, []
+    
     async def _make_annotation_decisions(self, question: Question, 
                                        suggestions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -208,11 +260,9 @@ class AIAgentService:
     
     async def _get_historical_accuracy_boost(self, kp_id: str, 
                                            question_type: str) -> float:
-        """根据历史标注准确率给出加权"""
+        """根据历史标注准确率给出加权（-0.2 ~ 0.2，查询内存索引）"""
         try:
-            # 这里可以查询历史标注的准确率
-            # 暂时返回固定值，实际应用中可以基于用户反馈数据计算
-            return 0.1
+            return self.feedback_index.get_boost(kp_id, question_type)
         except Exception:
             return 0.0
     
@@ -284,19 +334,15 @@ class AIAgentService:
                                     applied_annotations: List[Dict[str, Any]]):
         """记录标注历史（用于后续学习和改进）"""
         try:
-            history_record = {
-                "question_id": question.id,
-                "question_content": question.content[:100],  # 只记录前100字符
-                "question_type": question.question_type,
-                "timestamp": datetime.now().isoformat(),
-                "total_suggestions": len(auto_annotations),
-                "applied_count": len(applied_annotations),
-                "auto_annotations": auto_annotations,
-                "applied_annotations": applied_annotations
-            }
-            
-            # 这里可以将记录保存到日志文件或数据库
-            logger.info(f"标注历史记录: {json.dumps(history_record, ensure_ascii=False, indent=2)}")
+            # 写入标注历史存储（后台线程批量落盘）
+            self.history.record_annotation(
+                question.id,
+                question.question_type,
+                question.content,
+                auto_annotations,
+                applied_annotations
+            )
+            logger.debug(f"标注历史: 题目 {question.id} 建议 {len(auto_annotations)} 个，应用 {len(applied_annotations)} 个")
             
         except Exception as e:
             logger.error(f"记录标注历史失败: {e}")
@@ -309,9 +355,17 @@ class AIAgentService:
         success_count = 0
         error_count = 0
         
-        for question in questions:
+        # 使用线性分类器时整批题目一次推理
+        batch_suggestions = [None] * len(questions)
+        if nlp_service.linear_engine.enabled:
+            with metrics.timer("annotation_stage_duration_seconds", scorer="ai_agent", stage="suggest_batch"):
+                batch_suggestions = nlp_service.suggest_knowledge_points_batch(
+                    [(question.content, question.question_type) for question in questions]
+                )
+        
+        for question, suggestions in zip(questions, batch_suggestions):
             try:
-                result = await self.auto_annotate_question(question)
+                result = await self.auto_annotate_question(question, suggestions)
                 results.append(result)
                 
                 if result.get("status") == "completed":
@@ -351,6 +405,9 @@ class AIAgentService:
         if "learning_enabled" in config:
             self.learning_enabled = bool(config["learning_enabled"])
         
+        if "reuse_duplicate_annotations" in config:
+            self.reuse_duplicate_annotations = bool(config["reuse_duplicate_annotations"])
+        
         logger.info(f"AI Agent配置已更新: 置信度阈值={self.confidence_threshold}, "
                    f"最大标注数={self.max_auto_annotations}, 学习功能={'启用' if self.learning_enabled else '禁用'}")
     
@@ -359,9 +416,15 @@ class AIAgentService:
         return {
             "confidence_threshold": self.confidence_threshold,
             "max_auto_annotations": self.max_auto_annotations,
-            "learning_enabled": self.learning_enabled
+            "learning_enabled": self.learning_enabled,
+            "reuse_duplicate_annotations": self.reuse_duplicate_annotations,
+            "annotation_engine": nlp_service.linear_engine.status()
         }
     
+    def rebuild_feedback_index(self) -> Dict[str, Any]:
+        """从标注历史重建反馈准确率索引"""
+        return self.feedback_index.rebuild(self.history.iter_records(kind="feedback"))
+    
     async def evaluate_annotation_quality(self, question_id: str, 
                                         user_feedback: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -372,9 +435,6 @@ class AIAgentService:
             user_feedback: 用户反馈 {"annotations": [{"kp_id": "xx", "is_correct": True}]}
         """
         try:
-            # 获取AI Agent的原始标注
-            # 这里应该从历史记录中获取
-            
             # 计算准确率
             feedback_annotations = user_feedback.get("annotations", [])
             if not feedback_annotations:
@@ -384,13 +444,15 @@ class AIAgentService:
             total_count = len(feedback_annotations)
             accuracy = correct_count / total_count if total_count > 0 else 0
             
-            # 记录反馈用于后续改进
-            feedback_record = {
-                "question_id": question_id,
-                "accuracy": accuracy,
-                "feedback": user_feedback,
-                "timestamp": datetime.now().isoformat()
-            }
+            # 从历史记录中获取AI Agent的原始标注，用于确定题型和未被反馈覆盖的标注
+            original = self.history.latest_annotation(question_id)
+            question_type = user_feedback.get("question_type") or (original or {}).get("question_type", "")
+            original_kp_ids = [ann["kp_id"] for ann in (original or {}).get("auto_annotations", [])]
+            feedback_kp_ids = {str(ann.get("kp_id", "")) for ann in feedback_annotations}
+            
+            # 记录反馈用于后续改进，并增量更新准确率索引
+            record = self.history.record_feedback(question_id, question_type, feedback_annotations, accuracy)
+            self.feedback_index.record(record)
             
             logger.info(f"标注质量评估: 题目 {question_id}, 准确率 {accuracy:.2%}")
             
@@ -399,6 +461,8 @@ class AIAgentService:
                 "accuracy": accuracy,
                 "correct_count": correct_count,
                 "total_count": total_count,
+                "original_annotations": original_kp_ids,
+                "unreviewed_annotations": [kp_id for kp_id in original_kp_ids if kp_id not in feedback_kp_ids],
                 "status": "evaluated"
             }
             
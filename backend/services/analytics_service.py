@@ -8,9 +8,14 @@ from collections import defaultdict, Counter
 import json
 
 from backend.services.database import neo4j_service
+from backend.services.question_catalog import question_catalog
+from backend.services.single_flight import SingleFlight, coalesce
 
 logger = logging.getLogger(__name__)
 
+# 仪表板同时打开时大量相同的分析请求合并为一次计算
+analytics_flight = SingleFlight("analytics")
+
 
 class AnalyticsService:
     """数据分析服务类"""
@@ -26,6 +31,7 @@ class AnalyticsService:
                 return False
         return True
     
+    @coalesce(analytics_flight)
     def get_knowledge_coverage_analysis(self) -> Dict[str, Any]:
         """获取知识点覆盖分析"""
         try:
@@ -33,7 +39,7 @@ class AnalyticsService:
             if not self._ensure_db_connection():
                 return {"coverage_data": [], "summary": {}}
             
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 # 统计每个知识点对应的题目数量
                 result = session.run("""
                     MATCH (kp:KnowledgePoint)
@@ -80,6 +86,12 @@ class AnalyticsService:
             logger.error(f"知识点覆盖分析失败: {e}")
             return {"coverage_data": [], "summary": {}}
     
+    def _catalog_counts(self, facet: str) -> Optional[List[Tuple[Any, int]]]:
+        """题目目录中某个分面的 (取值, 数量)，按数量降序；目录不可用时返回None"""
+        result = question_catalog.facet_counts(facets=(facet,))
+        return list(result["facets"][facet].items()) if result is not None else None
+    
+    @coalesce(analytics_flight)
     def get_difficulty_distribution(self) -> Dict[str, Any]:
         """获取题目难度分布"""
         try:
@@ -87,76 +99,81 @@ class AnalyticsService:
             if not self._ensure_db_connection():
                 return {"difficulty_distribution": [], "total_questions": 0}
             
-            with neo4j_service.driver.session() as session:
-                # 统计各难度级别的题目数量
-                result = session.run("""
-                    MATCH (q:Question)
-                    RETURN q.difficulty as difficulty, count(q) as count
-                """)
-                
-                difficulty_data = []
-                total_questions = 0
-                
-                for record in result:
-                    difficulty = record["difficulty"] or "未设置"
-                    count = record["count"]
-                    difficulty_data.append({
-                        "difficulty": difficulty,
-                        "count": count
-                    })
-                    total_questions += count
-                
-                # 计算百分比
-                for item in difficulty_data:
-                    item["percentage"] = round(item["count"] / total_questions * 100, 2) if total_questions > 0 else 0
-                
-                return {
-                    "difficulty_distribution": difficulty_data,
-                    "total_questions": total_questions
-                }
+            # 统计各难度级别的题目数量（优先使用进程内题目目录）
+            records = self._catalog_counts("difficulty")
+            if records is None:
+                with neo4j_service.read_session() as session:
+                    result = session.run("""
+                        MATCH (q:Question)
+                        RETURN q.difficulty as difficulty, count(q) as count
+                    """)
+                    records = [(record["difficulty"], record["count"]) for record in result]
+            
+            difficulty_data = []
+            total_questions = 0
+            
+            for difficulty, count in records:
+                difficulty_data.append({
+                    "difficulty": difficulty or "未设置",
+                    "count": count
+                })
+                total_questions += count
+            
+            # 计算百分比
+            for item in difficulty_data:
+                item["percentage"] = round(item["count"] / total_questions * 100, 2) if total_questions > 0 else 0
+            
+            return {
+                "difficulty_distribution": difficulty_data,
+                "total_questions": total_questions
+            }
         
         except Exception as e:
             logger.error(f"难度分布分析失败: {e}")
             return {"difficulty_distribution": [], "total_questions": 0}
     
+    @coalesce(analytics_flight)
     def get_question_type_distribution(self) -> Dict[str, Any]:
         """获取题目类型分布"""
         try:
-            with neo4j_service.driver.session() as session:
-                result = session.run("""
-                    MATCH (q:Question)
-                    RETURN q.question_type as question_type, count(q) as count
-                    ORDER BY count DESC
-                """)
-                
-                type_data = []
-                total_questions = 0
-                
-                for record in result:
-                    count = record["count"]
-                    type_data.append({
-                        "question_type": record["question_type"],
-                        "count": count
-                    })
-                    total_questions += count
-                
-                # 计算百分比
-                for item in type_data:
-                    item["percentage"] = round(item["count"] / total_questions * 100, 2) if total_questions > 0 else 0
-                
-                return {
-                    "type_distribution": type_data,
-                    "total_questions": total_questions
-                }
+            records = self._catalog_counts("question_type")
+            if records is None:
+                with neo4j_service.read_session() as session:
+                    result = session.run("""
+                        MATCH (q:Question)
+                        RETURN q.question_type as question_type, count(q) as count
+                        ORDER BY count DESC
+                    """)
+                    records = [(record["question_type"], record["count"]) for record in result]
+            
+            type_data = []
+            total_questions = 0
+            
+            for question_type, count in records:
+                type_data.append({
+                    "question_type": question_type,
+                    "count": count
+                })
+                total_questions += count
+            
+            # 计算百分比
+            for item in type_data:
+                item["percentage"] = round(item["count"] / total_questions * 100, 2) if total_questions > 0 else 0
+            
+            return {
+                "type_distribution": type_data,
+                "total_questions": total_questions
+            }
         
         except Exception as e:
             logger.error(f"题目类型分布分析失败: {e}")
             return {"type_distribution": [], "total_questions": 0}
     
+    @coalesce(analytics_flight)
     def get_knowledge_hierarchy_analysis(self) -> Dict[str, Any]:
         """获取知识点层级结构分析"""
         try:
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 # 获取层级关系
                 result = session.run("""
                     MATCH (parent:KnowledgePoint)-[:HAS_SUB_POINT]->(child:KnowledgePoint)
@@ -228,10 +245,11 @@ class AnalyticsService:
                 "max_depth": 0
             }
     
+    @coalesce(analytics_flight)
     def get_ai_agent_accuracy_analysis(self) -> Dict[str, Any]:
         """分析AI Agent标注准确率"""
         try:
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 # 获取所有已标注的题目
                 result = session.run("""
                     MATCH (q:Question)-[r:TESTS]->(kp:KnowledgePoint)
@@ -357,10 +375,11 @@ class AnalyticsService:
         
         return expected
 
+    @coalesce(analytics_flight)
     def get_knowledge_correlation_analysis(self) -> Dict[str, Any]:
         """获取知识点关联分析"""
         try:
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 # 找出经常一起出现的知识点对
                 result = session.run("""
                     MATCH (q:Question)-[:TESTS]->(kp1:KnowledgePoint)
@@ -406,13 +425,14 @@ class AnalyticsService:
             logger.error(f"知识点关联分析失败: {e}")
             return {"correlations": [], "prerequisites": []}
     
+    @coalesce(analytics_flight)
     def generate_learning_path_recommendation(self, target_knowledge_points: List[str]) -> Dict[str, Any]:
         """生成学习路径推荐"""
         try:
             if not target_knowledge_points:
                 return {"learning_path": [], "total_steps": 0}
             
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 learning_paths = {}
                 
                 for target_kp in target_knowledge_points:
@@ -483,7 +503,7 @@ class AnalyticsService:
                     "message": "学生答题全部正确，无薄弱知识点"
                 }
             
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 # 统计错题涉及的知识点
                 result = session.run("""
                     MATCH (q:Question)-[r:TESTS]->(kp:KnowledgePoint)
@@ -584,6 +604,7 @@ class AnalyticsService:
         else:
             return "较轻"
     
+    @coalesce(analytics_flight)
     def get_comprehensive_report(self) -> Dict[str, Any]:
         """获取综合分析报告"""
         try:
@@ -616,6 +637,7 @@ class AnalyticsService:
             return {"error": str(e)}
 
 
+    @coalesce(analytics_flight)
     def get_ai_agent_accuracy_analysis_paginated(self, page: int = 1, page_size: int = 15, 
                                                difficulty: str = None, question_type: str = None) -> Dict[str, Any]:
         """获取AI Agent标注准确率分析（分页版，去重）"""
@@ -624,7 +646,7 @@ class AnalyticsService:
             if not self._ensure_db_connection():
                 return {"error": "数据库连接失败"}
             
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 # 构建筛选条件
                 conditions = []
                 params = {}
@@ -718,13 +740,14 @@ class AnalyticsService:
             logger.error(f"AI Agent准确率分析失败: {e}")
             return {"error": str(e)}
     
+    @coalesce(analytics_flight)
     def _get_total_questions_count(self) -> int:
         """获取题目总数"""
         try:
             if not self._ensure_db_connection():
                 return 0
             
-            with neo4j_service.driver.session() as session:
+            with neo4j_service.read_session() as session:
                 result = session.run("MATCH (q:Question) RETURN count(q) as total")
                 return result.single()["total"]
         except:
@@ -0,0 +1,170 @@
+"""
+级联标注策略
+多阶段标注流程先运行廉价的关键词打分，只有最高置信度或top1/top2置信度间隔
+落在不确定区间内的题目才进入后续代价较高的阶段（LabelLLM分析、MEGAnno+验证、专家反馈）。
+每个阶段之后的关卡阈值可单独配置，并统计各关卡的升级率
+"""
+import os
+import logging
+import threading
+from typing import List, Dict, Any, Optional, NamedTuple, Iterable
+
+from dotenv import load_dotenv
+
+from backend.services.metrics import metrics
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+ACCEPT = "accept"
+REJECT = "reject"
+ESCALATE = "escalate"
+
+
+class StageThresholds(NamedTuple):
+    """关卡阈值"""
+    accept_confidence: float  # 最高置信度不低于该值且间隔足够时提前结束
+    accept_margin: float      # top1与top2置信度之差的下限
+    reject_confidence: float  # 最高置信度低于该值时提前结束（没有可信的候选）
+
+
+class CascadeDecision(NamedTuple):
+    """关卡判定结果"""
+    stage: str
+    outcome: str
+    top_confidence: float
+    margin: float
+
+    @property
+    def escalate(self) -> bool:
+        return self.outcome == ESCALATE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "outcome": self.outcome,
+            "top_confidence": round(self.top_confidence, 4),
+            "margin": round(self.margin, 4)
+        }
+
+
+def _default_thresholds() -> StageThresholds:
+    return StageThresholds(
+        accept_confidence=float(os.getenv("ANNOTATION_CASCADE_ACCEPT", "0.8")),
+        accept_margin=float(os.getenv("ANNOTATION_CASCADE_MARGIN", "0.15")),
+        reject_confidence=float(os.getenv("ANNOTATION_CASCADE_REJECT", "0.0"))
+    )
+
+
+class AnnotationCascade:
+    """一个多阶段标注流程的级联策略"""
+
+    def __init__(self, name: str, stages: Iterable[str],
+                 thresholds: Optional[Dict[str, StageThresholds]] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            name: 流程名（指标标签）
+            stages: 关卡名，按流程顺序；关卡位于同名阶段之后
+            thresholds: 各关卡阈值，缺省使用 ANNOTATION_CASCADE_* 环境变量
+            enabled: 为False时所有题目都走完整流程（仍然统计）
+        """
+        if enabled is None:
+            enabled = os.getenv("ANNOTATION_CASCADE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.name = name
+        self.enabled = enabled
+        self.stages = list(stages)
+        self.thresholds = {stage: (thresholds or {}).get(stage) or _default_thresholds() for stage in self.stages}
+        self._counts = {stage: {ACCEPT: 0, REJECT: 0, ESCALATE: 0} for stage in self.stages}
+        self._lock = threading.Lock()
+
+    def decide(self, stage: str, suggestions: List[Dict[str, Any]],
+               confidence_key: str = "confidence") -> CascadeDecision:
+        """根据当前阶段的建议决定提前结束还是进入下一阶段"""
+        confidences = sorted((s.get(confidence_key) or 0.0 for s in suggestions or []), reverse=True)
+        top = confidences[0] if confidences else 0.0
+        margin = top - confidences[1] if len(confidences) > 1 else top
+        limits = self.thresholds[stage]
+
+        if not self.enabled:
+            outcome = ESCALATE
+        elif top < limits.reject_confidence:
+            outcome = REJECT
+        elif top >= limits.accept_confidence and margin >= limits.accept_margin:
+            outcome = ACCEPT
+        else:
+            outcome = ESCALATE
+
+        with self._lock:
+            self._counts[stage][outcome] += 1
+        metrics.inc("annotation_cascade_total", cascade=self.name, stage=stage, outcome=outcome)
+        return CascadeDecision(stage, outcome, top, margin)
+
+    def configure(self, stage: Optional[str] = None, **values) -> Dict[str, Any]:
+        """
+        更新关卡阈值（stage 为空时更新全部关卡）
+
+            cascade.configure("keyword", accept_confidence=0.85, accept_margin=0.2)
+        """
+        if "enabled" in values:
+            self.enabled = bool(values.pop("enabled"))
+        unknown = set(values) - set(StageThresholds._fields)
+        if unknown:
+            raise ValueError(f"未知的阈值: {', '.join(sorted(unknown))}")
+        if stage is not None and stage not in self.thresholds:
+            raise ValueError(f"未知的关卡: {stage}")
+        for name in [stage] if stage else self.stages:
+            self.thresholds[name] = self.thresholds[name]._replace(
+                **{key: float(value) for key, value in values.items() if value is not None}
+            )
+        logger.info(f"级联策略 {self.name} 已更新: {self.config()}")
+        return self.config()
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "stages": {stage: self.thresholds[stage]._asdict() for stage in self.stages}
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """各关卡的判定次数和升级率"""
+        with self._lock:
+            counts = {stage: dict(values) for stage, values in self._counts.items()}
+        stages = {}
+        for stage in self.stages:
+            evaluated = sum(counts[stage].values())
+            stages[stage] = {
+                "evaluated": evaluated,
+                "accepted": counts[stage][ACCEPT],
+                "rejected": counts[stage][REJECT],
+                "escalated": counts[stage][ESCALATE],
+                "escalation_rate": round(counts[stage][ESCALATE] / evaluated, 4) if evaluated else 0.0
+            }
+        first = stages[self.stages[0]]["evaluated"] if self.stages else 0
+        last = stages[self.stages[-1]]["escalated"] if self.stages else 0
+        return {
+            **self.config(),
+            "questions": first,
+            # 走完整流程的题目比例
+            "full_pipeline_rate": round(last / first, 4) if first else 0.0,
+            "gates": stages
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            for values in self._counts.values():
+                for outcome in values:
+                    values[outcome] = 0
+
+
+# 已注册的级联策略（协作标注、MEGAnno+增强标注）
+cascades: Dict[str, AnnotationCascade] = {}
+
+
+def register_cascade(name: str, stages: Iterable[str]) -> AnnotationCascade:
+    if name not in cascades:
+        cascades[name] = AnnotationCascade(name, stages)
+    return cascades[name]
+
+
+metrics.describe("annotation_cascade_total", "Annotation cascade gate decisions by cascade, stage and outcome")
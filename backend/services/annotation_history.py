@@ -0,0 +1,515 @@
+"""
+标注历史存储服务
+追加写入的JSONL分段文件 + 后台写线程批量落盘 + 内存索引，
+支持按题目/知识点查询，并为AI Agent的反馈学习提供历史准确率。
+内存中的记录按与磁盘相同的大小分段，超过 max_segments 时最旧的分段连同其索引和统计一起淘汰。
+已有分段在首次使用时由后台线程加载，加载完成前查询只包含本进程新写入的记录。
+多个worker共用目录：各进程持有当前写入分段的共享文件锁，轮转时跳过其他进程正在写入的分段
+"""
+import os
+import json
+import glob
+import queue
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Deque
+from dotenv import load_dotenv
+
+from backend.services.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows：其他进程打开中的文件本身无法删除
+    fcntl = None
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "annotation-history-"
+SEGMENT_SUFFIX = ".jsonl"
+
+_STOP = object()
+
+
+class _Segment:
+    """一个分段文件及其在内存中的记录（按写入顺序）"""
+
+    __slots__ = ("path", "bytes", "records")
+
+    def __init__(self, path: str, size: int = 0):
+        self.path = path
+        self.bytes = size
+        self.records: List[Dict[str, Any]] = []
+
+
+class AnnotationHistoryStore:
+    """标注历史存储类"""
+
+    def __init__(self, directory: Optional[str] = None,
+                 batch_size: int = 200,
+                 flush_interval: float = 1.0,
+                 max_segment_bytes: int = 16 * 1024 * 1024,
+                 max_segments: int = 20,
+                 max_queue_size: int = 10000):
+        self.directory = directory or os.getenv("ANNOTATION_HISTORY_DIR", "data/annotation_history")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.RLock()
+        self._writer: Optional[threading.Thread] = None
+        self._written_path: Optional[str] = None
+        # 当前写入的分段文件（持有共享锁，其他进程轮转时不会删除）
+        self._written_file = None
+        self._segment_seq = 0
+        self._persistent = True
+        self._dropped = 0
+
+        # 内存索引（首次使用时在后台从磁盘加载），只包含保留分段中的记录
+        self._loaded = False
+        self._load_thread: Optional[threading.Thread] = None
+        self._load_done = threading.Event()
+        self._segments: Deque[_Segment] = deque()
+        self._segment: Optional[_Segment] = None
+        self._by_question: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_kp: Dict[str, List[Dict[str, Any]]] = {}
+        self._kp_feedback: Dict[Tuple[str, str], List[int]] = {}
+        # 预先汇总的统计，summary() 不需要遍历记录
+        self._counts = {"annotation": 0, "feedback": 0}
+        self._kp_annotation_counts: Dict[str, int] = {}
+        self._feedback_totals = [0, 0]
+
+    # ===== 写入 =====
+
+    def record_annotation(self, question_id: str, question_type: str, question_content: str,
+                          auto_annotations: List[Dict[str, Any]],
+                          applied_annotations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """记录一次AI标注结果"""
+        record = {
+            "kind": "annotation",
+            "question_id": question_id,
+            "question_type": question_type,
+            "question_content": (question_content or "")[:100],
+            "timestamp": datetime.now().isoformat(),
+            "total_suggestions": len(auto_annotations),
+            "applied_count": len(applied_annotations),
+            "auto_annotations": [
+                {
+                    "kp_id": ann.get("knowledge_point_id", ""),
+                    "kp_name": ann.get("knowledge_point_name", ""),
+                    "confidence": ann.get("confidence", 0.0),
+                    "decision_score": ann.get("decision_score", 0.0),
+                    "auto_applied": ann.get("auto_applied", False)
+                }
+                for ann in auto_annotations
+            ],
+            "applied_kp_ids": [ann.get("knowledge_point_id", "") for ann in applied_annotations]
+        }
+        self.append(record)
+        return record
+
+    def record_feedback(self, question_id: str, question_type: str,
+                        annotations: List[Dict[str, Any]], accuracy: float) -> Dict[str, Any]:
+        """记录一次用户反馈"""
+        record = {
+            "kind": "feedback",
+            "question_id": question_id,
+            "question_type": question_type,
+            "timestamp": datetime.now().isoformat(),
+            "accuracy": accuracy,
+            "annotations": [
+                {"kp_id": str(ann.get("kp_id", "")), "is_correct": bool(ann.get("is_correct", False))}
+                for ann in annotations
+            ]
+        }
+        self.append(record)
+        return record
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录：立即进入内存索引并分配到当前分段，由后台线程批量写盘"""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._ensure_loaded()
+            segment = self._current_segment(len(line.encode("utf-8")))
+            segment.records.append(record)
+            self._index(record)
+            self._ensure_writer()
+            if not self._persistent:
+                return
+            try:
+                # 在锁内入队，保证写盘顺序与内存顺序一致
+                self._queue.put_nowait((segment.path, line))
+            except queue.Full:
+                self._dropped += 1
+                metrics.inc("annotation_history_dropped_total")
+                logger.warning("标注历史写入队列已满，丢弃一条记录")
+
+    # ===== 查询 =====
+
+    def query(self, question_id: Optional[str] = None, kp_id: Optional[str] = None,
+              kind: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """按题目或知识点查询历史记录，按时间倒序返回"""
+        with self._lock:
+            self._ensure_loaded()
+            if question_id is not None:
+                records = self._by_question.get(question_id, [])
+                if kp_id is not None:
+                    records = [r for r in records if kp_id in self._record_kp_ids(r)]
+            elif kp_id is not None:
+                records = self._by_kp.get(kp_id, [])
+            else:
+                return self._latest(kind, limit)
+
+            if kind is not None:
+                records = [r for r in records if r.get("kind") == kind]
+            return list(reversed(records[-limit:])) if limit else list(reversed(records))
+
+    def _latest(self, kind: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """从最新的分段向前取记录，只遍历到凑够 limit 条为止"""
+        result = []
+        for segment in reversed(self._segments):
+            for record in reversed(segment.records):
+                if kind is None or record.get("kind") == kind:
+                    result.append(record)
+                    if limit and len(result) >= limit:
+                        return result
+        return result
+
+    def latest_annotation(self, question_id: str) -> Optional[Dict[str, Any]]:
+        """题目最近一次的AI标注记录"""
+        records = self.query(question_id=question_id, kind="annotation", limit=1)
+        return records[0] if records else None
+
+    def get_feedback_accuracy(self, kp_id: str, question_type: Optional[str] = None) -> Tuple[int, int]:
+        """
+        知识点的历史反馈准确情况
+
+        Returns:
+            (正确数, 反馈总数)；question_type为空时汇总所有题型
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if question_type is not None:
+                correct, total = self._kp_feedback.get((kp_id, question_type), (0, 0))
+                return correct, total
+            correct = total = 0
+            for (feedback_kp, _), (c, t) in self._kp_feedback.items():
+                if feedback_kp == kp_id:
+                    correct += c
+                    total += t
+            return correct, total
+
+    def iter_records(self, kind: Optional[str] = None):
+        """按时间顺序遍历保留的全部记录（等待已有分段加载完成）"""
+        self.wait_loaded()
+        with self._lock:
+            self._ensure_loaded()
+            records = [r for segment in self._segments for r in segment.records
+                       if kind is None or r.get("kind") == kind]
+        yield from records
+
+    def summary(self) -> Dict[str, Any]:
+        """历史统计概览"""
+        with self._lock:
+            self._ensure_loaded()
+            feedback_correct, feedback_total = self._feedback_totals
+            return {
+                "total_annotations": self._counts["annotation"],
+                "total_feedback": self._counts["feedback"],
+                "feedback_accuracy": feedback_correct / feedback_total if feedback_total else 0.0,
+                "questions": len(self._by_question),
+                "top_knowledge_points": sorted(self._kp_annotation_counts.items(),
+                                               key=lambda x: x[1], reverse=True)[:10],
+                "pending_writes": self._queue.qsize(),
+                "dropped": self._dropped,
+                "persistent": self._persistent,
+                "loaded": self._loaded,
+                "segment": self._segment.path if self._segment is not None else None,
+                "segments": len(self._segments)
+            }
+
+    # ===== 后台写入 =====
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待队列中的记录全部写盘"""
+        if not self._persistent or self._writer is None:
+            return True
+        done = threading.Event()
+
+        def _wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=_wait, daemon=True).start()
+        return done.wait(timeout)
+
+    def close(self):
+        """停止后台写线程（写完剩余记录）"""
+        writer = self._writer
+        if writer is None:
+            return
+        self._queue.put(_STOP)
+        writer.join(timeout=10)
+        self._writer = None
+        self._close_written_file()
+
+    def _ensure_writer(self):
+        if not self._persistent or (self._writer is not None and self._writer.is_alive()):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            # 只读文件系统（如Serverless环境）下只保留内存历史
+            logger.warning(f"无法创建标注历史目录 {self.directory}: {e}，仅保留内存记录")
+            self._persistent = False
+            return
+        self._writer = threading.Thread(target=self._writer_loop, name="annotation-history-writer", daemon=True)
+        self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"写入标注历史失败: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, str]]):
+        """batch 为 (分段路径, JSON行)，按分段连续写入"""
+        with metrics.timer("annotation_history_write_seconds"):
+            start = 0
+            while start < len(batch):
+                path = batch[start][0]
+                end = start
+                while end < len(batch) and batch[end][0] == path:
+                    end += 1
+                if path != self._written_path:
+                    # 开始写新分段时删除多余的旧分段文件
+                    self._open_written_file(path)
+                    self._prune_segments()
+                self._written_file.write("".join(line for _, line in batch[start:end]))
+                self._written_file.flush()
+                start = end
+        metrics.inc("annotation_history_records_total", len(batch))
+
+    def _current_segment(self, size: int) -> _Segment:
+        """当前分段已满时开启新分段，内存中超出 max_segments 的旧分段随之淘汰"""
+        segment = self._segment
+        if segment is None or segment.bytes >= self.max_segment_bytes:
+            self._segment_seq += 1
+            stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{stamp}-{self._segment_seq:04d}{SEGMENT_SUFFIX}")
+            segment = self._segment = _Segment(path)
+            self._segments.append(segment)
+            while len(self._segments) > self.max_segments:
+                self._evict(self._segments.popleft())
+        segment.bytes += size
+        return segment
+
+    def _segment_files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")))
+
+    def _open_written_file(self, path: str):
+        self._close_written_file()
+        self._written_path = path
+        self._written_file = open(path, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(self._written_file.fileno(), fcntl.LOCK_SH)
+
+    def _close_written_file(self):
+        if self._written_file is not None:
+            self._written_file.close()
+            self._written_file = None
+            self._written_path = None
+
+    def _prune_segments(self):
+        """
+        轮转：只保留最近的max_segments个分段文件（含当前分段）
+
+        其他worker正在写入的分段（持有共享锁）不删除，待其轮转后由之后的轮转清理
+        """
+        segments = [s for s in self._segment_files() if s != self._written_path]
+        excess = len(segments) + 1 - self.max_segments
+        for old in segments[:max(excess, 0)]:
+            try:
+                if fcntl is None:
+                    os.remove(old)
+                    continue
+                with open(old, "rb") as f:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    os.remove(old)
+            except FileNotFoundError:
+                # 其他worker已删除
+                continue
+            except OSError as e:
+                logger.warning(f"删除旧标注历史分段失败 {old}: {e}")
+
+    # ===== 内存索引 =====
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """启动加载（如尚未开始）并等待已有分段加载完成"""
+        with self._lock:
+            self._ensure_loaded()
+        return self._load_done.wait(timeout)
+
+    def _ensure_loaded(self):
+        """在锁内调用：首次使用时启动后台加载，不阻塞请求"""
+        if self._loaded or self._load_thread is not None:
+            return
+        if not os.path.isdir(self.directory):
+            self._loaded = True
+            self._load_done.set()
+            return
+        # 在锁内列出文件：此后本进程新建的分段已在内存中，不会重复加载
+        paths = self._segment_files()[-self.max_segments:]
+        self._load_thread = threading.Thread(target=self._load, args=(paths,),
+                                             name="annotation-history-load", daemon=True)
+        self._load_thread.start()
+
+    def _load(self, paths: List[str]):
+        """在锁外读取并索引已有分段，再与加载期间新写入的记录合并"""
+        try:
+            staged = AnnotationHistoryStore(self.directory, max_segment_bytes=self.max_segment_bytes,
+                                            max_segments=self.max_segments)
+            loaded = staged._read_segments(paths)
+            with self._lock:
+                for segment in self._segments:
+                    for record in segment.records:
+                        staged._index(record)
+                staged._segments.extend(self._segments)
+                for name in ("_segments", "_by_question", "_by_kp", "_kp_feedback",
+                             "_counts", "_kp_annotation_counts", "_feedback_totals"):
+                    setattr(self, name, getattr(staged, name))
+                while len(self._segments) > self.max_segments:
+                    self._evict(self._segments.popleft())
+                self._loaded = True
+            if loaded:
+                logger.info(f"已加载标注历史 {loaded} 条")
+        except Exception as e:
+            logger.error(f"加载标注历史失败: {e}")
+            with self._lock:
+                self._loaded = True
+        finally:
+            self._load_done.set()
+
+    def _read_segments(self, paths: List[str]) -> int:
+        loaded = 0
+        for path in paths:
+            segment = _Segment(path)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        segment.bytes += len(line.encode("utf-8"))
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # 进程异常退出时最后一行可能不完整
+                            continue
+                        segment.records.append(record)
+                        self._index(record)
+                        loaded += 1
+            except OSError as e:
+                logger.warning(f"读取标注历史分段失败 {path}: {e}")
+            self._segments.append(segment)
+        return loaded
+
+    @staticmethod
+    def _record_kp_ids(record: Dict[str, Any]) -> List[str]:
+        if record.get("kind") == "feedback":
+            return [ann["kp_id"] for ann in record.get("annotations", [])]
+        return [ann["kp_id"] for ann in record.get("auto_annotations", [])]
+
+    def _index(self, record: Dict[str, Any]):
+        kind = record.get("kind", "annotation")
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        self._by_question.setdefault(record.get("question_id", ""), []).append(record)
+        for kp_id in set(self._record_kp_ids(record)):
+            self._by_kp.setdefault(kp_id, []).append(record)
+            if kind == "annotation":
+                self._kp_annotation_counts[kp_id] = self._kp_annotation_counts.get(kp_id, 0) + 1
+
+        if kind == "feedback":
+            question_type = record.get("question_type") or ""
+            for ann in record.get("annotations", []):
+                correct = 1 if ann.get("is_correct") else 0
+                stats = self._kp_feedback.setdefault((ann["kp_id"], question_type), [0, 0])
+                stats[0] += correct
+                stats[1] += 1
+                self._feedback_totals[0] += correct
+                self._feedback_totals[1] += 1
+
+    def _evict(self, segment: _Segment):
+        """从索引和统计中移除一个分段的记录（分段内的记录是各索引列表中最旧的一段前缀）"""
+        by_question: Dict[str, int] = {}
+        by_kp: Dict[str, int] = {}
+        for record in segment.records:
+            kind = record.get("kind", "annotation")
+            self._counts[kind] = self._counts.get(kind, 0) - 1
+            question_id = record.get("question_id", "")
+            by_question[question_id] = by_question.get(question_id, 0) + 1
+            for kp_id in set(self._record_kp_ids(record)):
+                by_kp[kp_id] = by_kp.get(kp_id, 0) + 1
+                if kind == "annotation":
+                    self._kp_annotation_counts[kp_id] -= 1
+                    if not self._kp_annotation_counts[kp_id]:
+                        del self._kp_annotation_counts[kp_id]
+            if kind == "feedback":
+                question_type = record.get("question_type") or ""
+                for ann in record.get("annotations", []):
+                    correct = 1 if ann.get("is_correct") else 0
+                    key = (ann["kp_id"], question_type)
+                    stats = self._kp_feedback[key]
+                    stats[0] -= correct
+                    stats[1] -= 1
+                    if not stats[1]:
+                        del self._kp_feedback[key]
+                    self._feedback_totals[0] -= correct
+                    self._feedback_totals[1] -= 1
+        for index, counts in ((self._by_question, by_question), (self._by_kp, by_kp)):
+            for key, count in counts.items():
+                del index[key][:count]
+                if not index[key]:
+                    del index[key]
+
+
+# 全局标注历史实例
+annotation_history = AnnotationHistoryStore()
+metrics.describe("annotation_history_write_seconds", "Annotation history batch write latency")
+metrics.describe("annotation_history_records_total", "Annotation history records written to disk")
+metrics.describe("annotation_history_dropped_total", "Annotation history records dropped because the queue was full")
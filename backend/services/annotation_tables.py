@@ -0,0 +1,504 @@
+"""
+可热更新的关键词表和规则表
+关键词模式、增强知识库和语言特征规则表可由带版本的JSON文件或图数据库中的 AnnotationTables 节点覆盖，
+在后台线程编译成新的只读快照后原子替换当前快照（RCU）：推荐请求开始时固定（pin）当前快照，
+整个请求期间使用同一版本，进行中的请求在旧版本上完成，之后的请求使用新版本。
+表文件变化（按修改时间检查）、收到 AnnotationTables 变更事件或调用重新加载接口时触发编译，
+调整关键词不再需要修改源代码并滚动重启标注worker
+
+表文件格式（未出现的表使用内置表，表名与知识库制品的分段名一致）:
+    {"version": "2026-10-19.1", "tables": {"nlp_light.keyword_patterns": {...}, "rules.linguistic_features": [...]}}
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, NamedTuple
+
+from dotenv import load_dotenv
+
+from backend.services.metrics import metrics
+from backend.services.graph_events import graph_events, GraphChange
+from backend.services.kb_artifact import PROJECT_ROOT
+from backend.services.linguistic_rules import (
+    LinguisticRuleEngine, linguistic_feature_engine, linguistic_pattern_engine,
+    rules_from_spec, rules_to_spec
+)
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLES_PATH = os.path.join("data", "annotation_tables.json")
+TABLES_ENTITY = "AnnotationTables"
+BUILTIN_VERSION = "builtin"
+
+
+class TableSpec(NamedTuple):
+    """已注册的表：内置表、编译函数和导出函数"""
+    default: Callable[[], Any]
+    compile: Callable[[Any], Any]
+    dump: Callable[[Any], Any]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def compile_keyword_patterns(value: Any) -> Dict[str, List[str]]:
+    """关键词模式表: 知识点 -> 关键词列表"""
+    if not isinstance(value, dict):
+        raise ValueError("关键词模式表须为 {知识点: [关键词, ...]}")
+    for kp_name, words in value.items():
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+            raise ValueError(f"知识点 {kp_name} 的关键词须为字符串列表")
+    return value
+
+
+def compile_knowledge_base(value: Any) -> Dict[str, Dict[str, Any]]:
+    """增强知识库: 知识点 -> {"keywords": {类别: [关键词, ...]}, ...}"""
+    if not isinstance(value, dict):
+        raise ValueError("增强知识库须为 {知识点: {...}}")
+    for kp_name, kp_info in value.items():
+        if not isinstance(kp_info, dict):
+            raise ValueError(f"知识点 {kp_name} 的描述须为对象")
+        for category, words in kp_info.get("keywords", {}).items():
+            if not isinstance(words, list) or not words or not all(isinstance(word, str) for word in words):
+                raise ValueError(f"知识点 {kp_name} 的关键词类别 {category} 须为非空字符串列表")
+    return value
+
+
+def compile_rules(value: Any) -> LinguisticRuleEngine:
+    """规则表: 内置规则引擎原样使用，规则描述列表编译为新的规则引擎"""
+    if isinstance(value, LinguisticRuleEngine):
+        return value
+    if not isinstance(value, list):
+        raise ValueError("规则表须为规则描述列表")
+    return LinguisticRuleEngine(rules_from_spec(value))
+
+
+def dump_rules(engine: LinguisticRuleEngine) -> List[Dict[str, Any]]:
+    return rules_to_spec(rule for rules in engine.rules.values() for rule in rules)
+
+
+def tables_digest(tables: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(tables, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def parse_tables_payload(data: Any) -> Dict[str, Any]:
+    """校验表文件内容，返回 {"version": ..., "tables": {...}}"""
+    if not isinstance(data, dict) or not isinstance(data.get("tables"), dict):
+        raise ValueError("表文件须为 {\"version\": ..., \"tables\": {表名: 表内容}}")
+    version = data.get("version")
+    if version is not None and not isinstance(version, str):
+        raise ValueError("version 须为字符串")
+    return {"version": version, "tables": data["tables"]}
+
+
+class TableSnapshot:
+    """编译完成的只读表快照（替换后不再修改，读者计数由 AnnotationTables 维护）"""
+
+    def __init__(self, version: str, digest: str, origin: str, overrides: Dict[str, Any],
+                 tables: Dict[str, Any], compile_seconds: float):
+        self.version = version
+        self.digest = digest
+        self.origin = origin
+        self.overrides = overrides
+        self.tables = tables
+        self.compile_seconds = compile_seconds
+        self.activated_at = datetime.now().isoformat()
+        self.readers = 0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.tables[name]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "digest": self.digest[:12],
+            "origin": self.origin,
+            "activated_at": self.activated_at,
+            "compile_ms": round(self.compile_seconds * 1000, 2),
+            "readers": self.readers,
+            "tables": {
+                name: {
+                    "origin": "override" if name in self.overrides else "builtin",
+                    "knowledge_points": len(table.rules if isinstance(table, LinguisticRuleEngine) else table)
+                }
+                for name, table in self.tables.items()
+            },
+            "unused_overrides": sorted(set(self.overrides) - set(self.tables))
+        }
+
+
+class AnnotationTables:
+    """
+    关键词/规则表注册表
+
+    各服务注册自己的表（内置表 + 编译函数），通过 current()[表名] 读取；
+    推荐入口用 pin() / @pinned 固定快照，保证一次推荐只看到一个版本
+    """
+
+    def __init__(self, source: Optional[str] = None, path: Optional[str] = None,
+                 check_interval: Optional[float] = None, events=None):
+        """
+        Args:
+            source: file（表文件）/ graph（AnnotationTables 节点）/ off（只用内置表），缺省读 ANNOTATION_TABLES_SOURCE
+            path: 表文件路径，相对路径按项目根目录解析，缺省读 ANNOTATION_TABLES_PATH
+            check_interval: 检查表来源是否变化的间隔（秒），0 表示只响应事件和手动重新加载
+        """
+        self.source = (source or os.getenv("ANNOTATION_TABLES_SOURCE", "file")).lower()
+        if self.source not in ("file", "graph", "off"):
+            logger.warning(f"未知的 ANNOTATION_TABLES_SOURCE={self.source}，使用内置表")
+            self.source = "off"
+        path = path or os.getenv("ANNOTATION_TABLES_PATH", DEFAULT_TABLES_PATH)
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+        if check_interval is None:
+            check_interval = float(os.getenv("ANNOTATION_TABLES_CHECK_INTERVAL", "5"))
+        self.check_interval = check_interval
+
+        self._specs: Dict[str, TableSpec] = {}
+        self._snapshot: Optional[TableSnapshot] = None
+        self._draining: List[TableSnapshot] = []
+        self._pinned: ContextVar[Optional[TableSnapshot]] = ContextVar("annotation_tables_pinned", default=None)
+        self._lock = threading.Lock()
+        # 编译和替换串行执行，避免后台重新加载与 apply() 交错
+        self._compile_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._reload_requested = False
+        self._file_stamp = None
+        self._next_check = 0.0
+        self._history = deque(maxlen=10)
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+        (events or graph_events).subscribe(self._on_change, entities=(TABLES_ENTITY,))
+
+    # ===== 注册与读取 =====
+
+    def register(self, name: str, default: Callable[[], Any], compile: Callable[[Any], Any] = _identity,
+                 dump: Callable[[Any], Any] = _identity):
+        """
+        注册一张表（服务初始化时调用）
+
+        Args:
+            name: 表名（与知识库制品分段名一致，如 nlp_light.keyword_patterns）
+            default: 返回内置表的函数，只在没有覆盖时调用
+            compile: 把表内容编译为运行时结构，内容无效时抛出 ValueError
+            dump: 把运行时结构转换回可写入表文件的内容（导出用）
+        """
+        with self._compile_lock:
+            self._specs[name] = TableSpec(default, compile, dump)
+            snapshot = self._snapshot
+            if snapshot is not None:
+                # 快照已建立后注册的表直接编译进当前快照（读者此前不可能访问该表）
+                snapshot.tables[name] = self._compile_table(name, snapshot.overrides.get(name))
+
+    def current(self) -> TableSnapshot:
+        """当前请求固定的快照；未固定时返回最新快照"""
+        snapshot = self._pinned.get()
+        if snapshot is not None:
+            return snapshot
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._initial_load()
+        if self.source != "off" and self.check_interval > 0:
+            self._maybe_check_source()
+        return snapshot
+
+    @contextmanager
+    def pin(self):
+        """在上下文中固定当前快照（可嵌套，内层沿用外层的快照）"""
+        pinned = self._pinned.get()
+        if pinned is not None:
+            yield pinned
+            return
+        self.current()
+        # 在锁内取快照并计数，与 _swap() 互斥，保证被替换的快照一定能看到读者
+        with self._lock:
+            snapshot = self._snapshot
+            snapshot.readers += 1
+        token = self._pinned.set(snapshot)
+        try:
+            yield snapshot
+        finally:
+            self._pinned.reset(token)
+            with self._lock:
+                snapshot.readers -= 1
+                if snapshot.readers == 0 and snapshot in self._draining:
+                    self._draining.remove(snapshot)
+
+    def pinned(self, func: Callable) -> Callable:
+        """装饰器：函数执行期间固定快照"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.pin():
+                return func(*args, **kwargs)
+        return wrapper
+
+    # ===== 加载与替换 =====
+
+    def reload(self, wait: bool = False, timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        在后台线程重新读取表来源并编译，成功后原子替换当前快照
+
+        编译期间的重复请求合并为编译结束后的一次重新加载
+
+        Args:
+            wait: 等待本次重新加载完成后再返回
+        """
+        with self._lock:
+            self._reload_requested = True
+            thread = self._reload_thread
+            if thread is None:
+                thread = threading.Thread(target=self._reload_loop, name="annotation-tables-reload", daemon=True)
+                self._reload_thread = thread
+                thread.start()
+        if wait:
+            thread.join(timeout)
+        return self.info()
+
+    def apply(self, tables: Dict[str, Any], version: Optional[str] = None, persist: bool = True) -> Dict[str, Any]:
+        """
+        在当前生效版本上覆盖指定的表（值为None表示恢复内置表），编译成功后保存到表来源、
+        替换当前快照并通知其他worker重新加载
+
+        Args:
+            tables: 表名 -> 表内容
+            version: 版本号，为空时使用内容摘要
+            persist: 为False时只在本进程生效（脚本调试用）
+
+        Raises:
+            ValueError: 表内容无效（当前快照保持不变）
+        """
+        if self._snapshot is None:
+            self._initial_load()
+        with self._compile_lock:
+            active = self._snapshot
+            overrides = dict(active.overrides)
+            for name, value in tables.items():
+                if value is None:
+                    overrides.pop(name, None)
+                else:
+                    overrides[name] = value
+            digest = tables_digest(overrides)
+            version = version or (digest[:12] if overrides else BUILTIN_VERSION)
+            origin = self.source if persist and self.source != "off" else "local"
+            snapshot = self._compile(version, digest, origin, overrides)
+            if origin == "file":
+                self._write_file(version, overrides)
+            elif origin == "graph":
+                self._write_graph(version, overrides)
+            self._swap(snapshot)
+        if origin == "file":
+            # 图数据库来源由 save_annotation_tables 发布事件
+            graph_events.publish(TABLES_ENTITY, "updated", ids=(version,), source="annotation_tables")
+        return snapshot.info()
+
+    def _initial_load(self) -> TableSnapshot:
+        with self._compile_lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            try:
+                payload, stamp = self._read_source()
+            except Exception as e:
+                logger.warning(f"关键词/规则表加载失败，使用内置表: {e.__class__.__name__}: {e}")
+                self.last_error = f"{e.__class__.__name__}: {e}"
+                payload, stamp = None, None
+            try:
+                snapshot = self._compile_payload(payload)
+            except ValueError as e:
+                logger.error(f"关键词/规则表编译失败，使用内置表: {e}")
+                self.last_error = str(e)
+                snapshot = self._compile_payload(None)
+            self._file_stamp = stamp
+            self._next_check = time.monotonic() + self.check_interval
+            self._swap(snapshot)
+            return snapshot
+
+    def _reload_loop(self):
+        while True:
+            with self._lock:
+                if not self._reload_requested:
+                    self._reload_thread = None
+                    return
+                self._reload_requested = False
+            self._reload_once()
+
+    def _reload_once(self):
+        with self._compile_lock:
+            try:
+                payload, stamp = self._read_source()
+                self._file_stamp = stamp
+                tables = payload["tables"] if payload else {}
+                active = self._snapshot
+                if active is not None and tables_digest(tables) == active.digest and \
+                        (payload or {}).get("version") in (None, active.version):
+                    metrics.inc("annotation_tables_reloads_total", source=self.source, outcome="unchanged")
+                    return
+                snapshot = self._compile_payload(payload)
+            except Exception as e:
+                self.failures += 1
+                error = f"{e.__class__.__name__}: {e}"
+                if error != self.last_error:
+                    logger.error(f"关键词/规则表重新加载失败，继续使用版本 "
+                                 f"{self._snapshot.version if self._snapshot else BUILTIN_VERSION}: {error}")
+                self.last_error = error
+                metrics.inc("annotation_tables_reloads_total", source=self.source, outcome="failed")
+                return
+            self.last_error = None
+            self._swap(snapshot)
+
+    def _compile_payload(self, payload: Optional[Dict[str, Any]]) -> TableSnapshot:
+        if not payload:
+            return self._compile(BUILTIN_VERSION, tables_digest({}), BUILTIN_VERSION, {})
+        digest = tables_digest(payload["tables"])
+        return self._compile(payload["version"] or digest[:12], digest, self.source, payload["tables"])
+
+    def _compile(self, version: str, digest: str, origin: str, overrides: Dict[str, Any]) -> TableSnapshot:
+        started = time.perf_counter()
+        active = self._snapshot
+        tables = {}
+        for name in self._specs:
+            override = overrides.get(name)
+            if active is not None and name in active.tables and active.overrides.get(name) == override:
+                # 内容未变化的表沿用当前快照中已编译的结构
+                tables[name] = active.tables[name]
+            else:
+                tables[name] = self._compile_table(name, override)
+        elapsed = time.perf_counter() - started
+        metrics.observe("annotation_tables_compile_seconds", elapsed)
+        return TableSnapshot(version, digest, origin, overrides, tables, elapsed)
+
+    def _compile_table(self, name: str, override: Any) -> Any:
+        spec = self._specs[name]
+        if override is None:
+            return spec.compile(spec.default())
+        try:
+            return spec.compile(override)
+        except Exception as e:
+            raise ValueError(f"表 {name} 无效: {e}")
+
+    def _swap(self, snapshot: TableSnapshot):
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+            if previous is not None and previous.readers > 0:
+                self._draining.append(previous)
+            draining = sum(s.readers for s in self._draining)
+        self.reloads += 1
+        self._history.appendleft({"version": snapshot.version, "digest": snapshot.digest[:12],
+                                  "origin": snapshot.origin, "activated_at": snapshot.activated_at})
+        metrics.inc("annotation_tables_reloads_total", source=self.source, outcome="swapped")
+        if previous is not None:
+            logger.info(f"关键词/规则表已切换: {previous.version} -> {snapshot.version}（{snapshot.origin}，"
+                        f"编译 {snapshot.compile_seconds * 1000:.1f}ms，{draining} 个请求在旧版本上完成）")
+
+    # ===== 表来源 =====
+
+    def _maybe_check_source(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        if self.source == "graph":
+            # 图数据库查询放在后台线程；版本未变化时不重新编译
+            self.reload()
+        elif self._stat_file() != self._file_stamp:
+            self.reload()
+
+    def _stat_file(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_source(self):
+        """读取表来源，返回 (表文件内容或None, 文件状态)"""
+        if self.source == "file":
+            stamp = self._stat_file()
+            if stamp is None:
+                return None, None
+            with open(self.path, "r", encoding="utf-8") as f:
+                return parse_tables_payload(json.load(f)), stamp
+        if self.source == "graph":
+            from backend.services.database import neo4j_service
+            if not neo4j_service.driver:
+                raise RuntimeError("数据库未连接")
+            record = neo4j_service.get_annotation_tables()
+            if record is None:
+                return None, None
+            return parse_tables_payload({"version": record["version"], "tables": json.loads(record["payload"])}), None
+        return None, None
+
+    def _write_file(self, version: str, overrides: Dict[str, Any]):
+        """先写临时文件再原子替换，其他worker不会读到写了一半的文件"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "tables": overrides}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._file_stamp = self._stat_file()
+
+    def _write_graph(self, version: str, overrides: Dict[str, Any]):
+        from backend.services.database import neo4j_service
+        if not neo4j_service.driver:
+            raise RuntimeError("数据库未连接")
+        neo4j_service.save_annotation_tables(version, json.dumps(overrides, ensure_ascii=False))
+
+    def _on_change(self, event: GraphChange):
+        # 本进程发布的事件已在 apply() 中替换快照；范围未知的写事件与表无关
+        if event.remote and TABLES_ENTITY in event.entities:
+            self.reload()
+
+    # ===== 查看与导出 =====
+
+    def export(self, include_builtin: bool = True) -> Dict[str, Any]:
+        """导出当前生效的表（可作为表文件的起点编辑后发布）"""
+        snapshot = self.current()
+        tables = dict(snapshot.overrides)
+        if include_builtin:
+            for name, spec in self._specs.items():
+                if name not in tables:
+                    tables[name] = spec.dump(snapshot[name])
+        return {"version": snapshot.version, "tables": tables}
+
+    def info(self) -> Dict[str, Any]:
+        snapshot = self._snapshot or self._initial_load()
+        with self._lock:
+            draining = [{"version": s.version, "readers": s.readers} for s in self._draining]
+            reloading = self._reload_thread is not None
+        return {
+            "source": self.source,
+            "path": self.path if self.source == "file" else None,
+            "check_interval": self.check_interval,
+            "active": snapshot.info(),
+            "draining": draining,
+            "reloading": reloading,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "history": list(self._history)
+        }
+
+
+# 全局实例；各服务注册自己的关键词表，规则表在此注册
+annotation_tables = AnnotationTables()
+annotation_tables.register("rules.linguistic_features", lambda: linguistic_feature_engine, compile_rules, dump_rules)
+annotation_tables.register("rules.linguistic_patterns", lambda: linguistic_pattern_engine, compile_rules, dump_rules)
+
+metrics.describe("annotation_tables_reloads_total", "Keyword/rule table reloads by source and outcome")
+metrics.describe("annotation_tables_compile_seconds", "Time to compile a keyword/rule table snapshot")
@@ -8,6 +8,8 @@ import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from backend.services.annotation_cascade import register_cascade
+
 logger = logging.getLogger(__name__)
 
 class CollaborativeAnnotationService:
@@ -16,6 +18,8 @@ class CollaborativeAnnotationService:
     def __init__(self):
         self.confidence_threshold = 0.3
         self.collaboration_enabled = True
+        # 关键词打分或LabelLLM分析已足够确定时跳过后续阶段
+        self.cascade = register_cascade("collaborative", ("keyword", "labelllm"))
         
     async def enhanced_annotation(self, question_content: str, question_type: str = "选择题") -> Dict[str, Any]:
         """
@@ -27,15 +31,24 @@ class CollaborativeAnnotationService:
             
             # 第一阶段：AI Agent基础分析
             ai_result = await self._ai_agent_analysis(question_content, question_type)
+            decision = self.cascade.decide("keyword", ai_result["suggestions"])
+            if not decision.escalate:
+                return self._early_exit_result(decision, ai_result["suggestions"], ai_result)
             
             # 第二阶段：LabelLLM语言特征分析
             labelllm_result = await self._labelllm_analysis(question_content, question_type)
+            # 两个阶段对同一知识点的建议只保留最高置信度，否则一致的结论会使差距接近0而总是升级
+            candidates = self._best_per_knowledge_point(ai_result["suggestions"] + labelllm_result["suggestions"])
+            decision = self.cascade.decide("labelllm", candidates)
+            if not decision.escalate:
+                return self._early_exit_result(decision, candidates, ai_result, labelllm_result)
             
             # 第三阶段：MEGAnno多模态验证
             meganno_result = await self._meganno_validation(question_content, ai_result, labelllm_result)
             
             # 第四阶段：协作决策融合
             final_result = await self._collaborative_decision(ai_result, labelllm_result, meganno_result)
+            final_result.setdefault("collaboration_summary", {})["cascade"] = decision.to_dict()
             
             logger.info(f"协作标注完成，推荐 {len(final_result.get('suggestions', []))} 个知识点")
             return final_result
@@ -44,6 +57,45 @@ class CollaborativeAnnotationService:
             logger.error(f"协作标注失败: {e}")
             return {"suggestions": [], "error": str(e), "status": "failed"}
     
+    def _early_exit_result(self, decision, candidates: List[Dict[str, Any]], ai_result: Dict,
+                           labelllm_result: Optional[Dict] = None) -> Dict[str, Any]:
+        """级联提前结束：直接采用当前阶段的建议（同一知识点取最高置信度）"""
+        best = []
+        if decision.outcome == "accept":
+            best = [suggestion for suggestion in self._best_per_knowledge_point(candidates)
+                    if suggestion.get("confidence", 0) >= self.confidence_threshold]
+        
+        final_suggestions = [{
+            **suggestion,
+            "collaboration_score": suggestion.get("confidence", 0),
+            "sources": [suggestion.get("source", "AI_Agent")],
+            "validation": "cascade_early_exit"
+        } for suggestion in best]
+        final_suggestions.sort(key=lambda x: x.get("collaboration_score", 0), reverse=True)
+        
+        return {
+            "suggestions": final_suggestions[:5],
+            "collaboration_summary": {
+                "ai_agent_count": len(ai_result.get("suggestions", [])),
+                "labelllm_count": len(labelllm_result.get("suggestions", [])) if labelllm_result else 0,
+                "meganno_validated": 0,
+                "final_count": len(final_suggestions),
+                "cascade": decision.to_dict()
+            },
+            "status": "completed",
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _best_per_knowledge_point(suggestions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """同一知识点（按名称）只保留置信度最高的建议"""
+        best: Dict[str, Dict[str, Any]] = {}
+        for suggestion in suggestions:
+            kp_name = suggestion.get("knowledge_point_name", "")
+            if suggestion.get("confidence", 0) > best.get(kp_name, {}).get("confidence", -1):
+                best[kp_name] = suggestion
+        return list(best.values())
+    
     async def _ai_agent_analysis(self, question_content: str, question_type: str) -> Dict[str, Any]:
         """AI Agent基础分析"""
         try:
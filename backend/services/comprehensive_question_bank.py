@@ -6,14 +6,17 @@ import json
 import logging
 from typing import List, Dict, Any
 
+from backend.services.kb_artifact import load_section
+
 logger = logging.getLogger(__name__)
 
 class ComprehensiveQuestionBank:
     """综合英语题库"""
     
     def __init__(self):
-        self.question_bank = self._build_comprehensive_bank()
-        self.knowledge_points = self._build_comprehensive_knowledge_points()
+        self.question_bank = load_section("question_bank.questions") or self._build_comprehensive_bank()
+        self.knowledge_points = (load_section("question_bank.knowledge_points")
+                                 or self._build_comprehensive_knowledge_points())
     
     def _build_comprehensive_knowledge_points(self) -> List[Dict[str, Any]]:
         """构建全面的知识点库"""
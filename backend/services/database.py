@@ -1,22 +1,31 @@
 """
 Neo4j数据库连接和操作服务
+
+会话显式区分读写：READ会话在路由集群（neo4j:// URI）中分发到跟随者/只读副本，
+WRITE会话发往主节点；单机（bolt://）部署时两者连接同一实例
 """
 import os
 import logging
-from typing import List, Dict, Any, Optional
-from neo4j import GraphDatabase, Driver, Session
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from neo4j import GraphDatabase, Driver, Session, Record, READ_ACCESS, WRITE_ACCESS
 from dotenv import load_dotenv
 
 from backend.models.schema import (
     KnowledgePoint, Question, Textbook, Chapter,
-    GraphSchema
+    GraphSchema, question_id, knowledge_point_id
 )
+from backend.services.metrics import instrument_driver
+from backend.services.graph_events import graph_events, track_writes
+from backend.services.single_flight import SingleFlight, coalesce
 
 # 加载环境变量
 load_dotenv("config.env")
 
 logger = logging.getLogger(__name__)
 
+# 只读查询的并发合并
+read_flight = SingleFlight("neo4j_read")
+
 
 class Neo4jService:
     """Neo4j数据库服务类"""
@@ -27,18 +36,31 @@ class Neo4jService:
         self.uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.username = os.getenv("NEO4J_USERNAME", "neo4j")
         self.password = os.getenv("NEO4J_PASSWORD", "password")
-        
+        self.database = os.getenv("NEO4J_DATABASE") or None
+        # 进程内共享书签：写入后的读会话等待副本追上该写入，读到自己的写
+        self.bookmark_manager = GraphDatabase.bookmark_manager()
+        # 托管事务遇到瞬时错误时的最长重试时间（驱动默认30秒，数据库不可用时请求会被拖住这么久）
+        self.max_retry_time = float(os.getenv("NEO4J_MAX_RETRY_TIME", "5"))
+
+    @property
+    def routing(self) -> bool:
+        """是否为路由（集群）连接"""
+        return self.uri.split("://", 1)[0] in ("neo4j", "neo4j+s", "neo4j+ssc")
+
     def connect(self) -> bool:
         """连接到Neo4j数据库"""
         try:
-            self.driver = GraphDatabase.driver(
+            self.driver = track_writes(instrument_driver(GraphDatabase.driver(
                 self.uri, 
-                auth=(self.username, self.password)
-            )
+                auth=(self.username, self.password),
+                max_transaction_retry_time=self.max_retry_time
+            )))
             # 测试连接
-            with self.driver.session() as session:
+            with self.read_session() as session:
                 result = session.run("RETURN 1 as test")
                 result.single()
+            # 连接前（数据库不可用时）缓存的结果作废
+            graph_events.publish("*", "connected", source="connect")
             logger.info("Successfully connected to Neo4j")
             return True
         except Exception as e:
@@ -49,153 +71,289 @@ class Neo4jService:
         """关闭数据库连接"""
         if self.driver:
             self.driver.close()
+
+    # ===== 会话 =====
+
+    def session(self, access_mode: str = WRITE_ACCESS, **config) -> Session:
+        """打开指定访问模式的会话"""
+        if self.database:
+            config.setdefault("database", self.database)
+        config.setdefault("bookmark_manager", self.bookmark_manager)
+        return self.driver.session(default_access_mode=access_mode, **config)
+
+    def read_session(self, **config) -> Session:
+        """只读会话（分析、搜索、列表等查询）"""
+        return self.session(READ_ACCESS, **config)
+
+    def write_session(self, **config) -> Session:
+        """写会话（标注、导入等写操作）"""
+        return self.session(WRITE_ACCESS, **config)
+
+    def execute_read(self, transaction_function: Callable, *args, **kwargs):
+        """在只读托管事务中执行，连接中断或集群切换等瞬时错误时自动重试"""
+        with self.read_session() as session:
+            return session.execute_read(transaction_function, *args, **kwargs)
+
+    def execute_write(self, transaction_function: Callable, *args, **kwargs):
+        """在写托管事务中执行，瞬时错误时自动重试（事务函数须可重复执行）"""
+        with self.write_session() as session:
+            return session.execute_write(transaction_function, *args, **kwargs)
+
+    def read_records(self, cypher: str, parameters: Optional[Dict[str, Any]] = None) -> List[Record]:
+        """
+        在只读会话中执行查询并取回全部记录（按读路由，不重试）
+
+        数据库不可用时立即失败，调用方（标注、去重等）可以马上回退；需要重试的读取用 execute_read
+        """
+        with self.read_session() as session:
+            return list(session.run(cypher, parameters or {}))
     
     def initialize_database(self):
-        """初始化数据库 - 创建约束和索引"""
+        """初始化数据库 - 创建约束和索引（可重复执行）"""
         if not self.driver:
             raise Exception("Database not connected")
             
-        with self.driver.session() as session:
-            # 创建约束
-            for constraint in GraphSchema.get_create_constraints_cypher():
+        # 已有重复数据时唯一约束无法创建，保留旧索引并跳过该约束
+        violations = self.find_constraint_violations()
+        with graph_events.change("schema", "updated", source="initialize_database"), \
+                self.write_session() as session:
+            # 创建约束（先删除被约束取代的旧索引）
+            for name, constraint in GraphSchema.CONSTRAINTS.items():
+                if violations.get(name):
+                    logger.warning(f"Skipped constraint {name}, duplicate values exist: "
+                                   f"{[row['value'] for row in violations[name][:10]]}")
+                    if name in GraphSchema.LEGACY_INDEXES:
+                        session.run(GraphSchema.LEGACY_INDEXES[name][1]).consume()
+                    continue
+                drop_legacy = GraphSchema.get_drop_legacy_index_cypher(name)
                 try:
-                    session.run(constraint)
+                    if drop_legacy:
+                        session.run(drop_legacy).consume()
+                    session.run(constraint).consume()
                     logger.info(f"Created constraint: {constraint}")
                 except Exception as e:
-                    logger.warning(f"Constraint may already exist: {e}")
+                    # IF NOT EXISTS 下失败通常是已有数据违反约束（如检查后新写入的重名知识点）
+                    logger.warning(f"Failed to create constraint, existing data may violate it: {e}")
+                    if drop_legacy:
+                        # 约束未建成时恢复旧索引，避免该属性上没有索引
+                        session.run(GraphSchema.LEGACY_INDEXES[name][1]).consume()
             
-            # 创建索引
+            # 创建索引（先删除不再使用的索引）
+            for name in GraphSchema.OBSOLETE_INDEXES:
+                session.run(f"DROP INDEX {name} IF EXISTS").consume()
             for index in GraphSchema.get_create_indexes_cypher():
                 try:
-                    session.run(index)
+                    session.run(index).consume()
                     logger.info(f"Created index: {index}")
                 except Exception as e:
-                    logger.warning(f"Index may already exist: {e}")
+                    logger.warning(f"Failed to create index: {e}")
+
+        # 旧版本写入的题目补上题干哈希，写入时才能按哈希找到它们
+        self.backfill_question_content_hashes()
+
+    def find_constraint_violations(self) -> Dict[str, List[Dict[str, Any]]]:
+        """违反唯一约束的重复数据：{约束名: [{"value": 重复值, "count": 节点数}]}，无重复的约束不列出"""
+        violations = {}
+        for name, cypher in GraphSchema.DUPLICATE_CHECKS.items():
+            rows = [{"value": record["value"], "count": record["count"]} for record in self.read_records(cypher)]
+            if rows:
+                violations[name] = rows
+        return violations
+
+    def get_index_usage(self) -> Dict[str, Any]:
+        """索引和约束的状态及使用情况，对照 GraphSchema 中声明的索引和约束"""
+        indexes = self.read_records("""
+            SHOW INDEXES
+            YIELD name, type, entityType, labelsOrTypes, properties, state, populationPercent,
+                  readCount, lastRead, trackedSince, owningConstraint
+        """)
+        constraints = self.read_records("""
+            SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties, ownedIndex
+        """)
+        declared_indexes = set(GraphSchema.INDEXES)
+        declared_constraints = set(GraphSchema.CONSTRAINTS)
+
+        index_rows = []
+        for record in indexes:
+            row = {
+                "name": record["name"],
+                "type": record["type"],
+                "entity_type": record["entityType"],
+                "labels_or_types": record["labelsOrTypes"],
+                "properties": record["properties"],
+                "state": record["state"],
+                "population_percent": record["populationPercent"],
+                "read_count": record["readCount"],
+                "last_read": str(record["lastRead"]) if record["lastRead"] is not None else None,
+                "tracked_since": str(record["trackedSince"]) if record["trackedSince"] is not None else None,
+                "owning_constraint": record["owningConstraint"],
+            }
+            row["declared"] = row["name"] in declared_indexes or row["owning_constraint"] in declared_constraints
+            index_rows.append(row)
+        constraint_rows = [{
+            "name": record["name"],
+            "type": record["type"],
+            "labels_or_types": record["labelsOrTypes"],
+            "properties": record["properties"],
+            "owned_index": record["ownedIndex"],
+            "declared": record["name"] in declared_constraints
+        } for record in constraints]
+
+        existing = {row["name"] for row in index_rows} | {row["name"] for row in constraint_rows}
+        return {
+            "indexes": index_rows,
+            "constraints": constraint_rows,
+            # 声明了但数据库中不存在（未初始化或创建失败）
+            "missing": sorted((declared_indexes | declared_constraints) - existing),
+            # 自统计开始以来从未被查询使用
+            "unused": sorted(row["name"] for row in index_rows
+                             if row["type"] != "LOOKUP" and not row["read_count"]),
+            "not_online": sorted(row["name"] for row in index_rows if row["state"] != "ONLINE"),
+            "undeclared": sorted(row["name"] for row in index_rows
+                                 if not row["declared"] and row["type"] != "LOOKUP"),
+            # 因重复数据无法创建的唯一约束及重复值（清理后重新执行 /api/init-database）
+            "duplicates": self.find_constraint_violations(),
+        }
     
     def clear_database(self):
         """清空数据库（谨慎使用）"""
         if not self.driver:
             raise Exception("Database not connected")
             
-        with self.driver.session() as session:
+        with graph_events.change("*", "deleted", source="clear_database"), self.write_session() as session:
             session.run("MATCH (n) DETACH DELETE n")
             logger.info("Database cleared")
     
     # ===== 知识点操作 =====
     
     def create_knowledge_point(self, kp: KnowledgePoint) -> str:
-        """创建知识点"""
-        with self.driver.session() as session:
+        """
+        创建或更新知识点（按名称MERGE，重复调用不会产生重复节点）
+
+        新建时ID取 kp.id，未提供时由名称生成；已存在的知识点保留原ID并更新属性
+
+        Returns:
+            知识点ID
+        """
+        if not kp.id:
+            kp.id = knowledge_point_id(kp.name)
+        properties = {k: v for k, v in kp.dict(exclude={"id", "name"}).items() if v is not None}
+
+        with graph_events.change("KnowledgePoint", "upserted", source="create_knowledge_point") as change, \
+                self.write_session() as session:
             cypher = """
-            CREATE (kp:KnowledgePoint {
-                id: $id,
-                name: $name,
-                description: $description,
-                level: $level,
-                difficulty: $difficulty,
-                keywords: $keywords
-            })
+            MERGE (kp:KnowledgePoint {name: $name})
+            ON CREATE SET kp.id = $id
+            SET kp += $properties
             RETURN kp.id as id
             """
-            
-            # 生成ID如果没有提供
-            if not kp.id:
-                kp.id = f"kp_{hash(kp.name) % 1000000}"
-            
-            result = session.run(cypher, {
-                "id": kp.id,
-                "name": kp.name,
-                "description": kp.description,
-                "level": kp.level,
-                "difficulty": kp.difficulty,
-                "keywords": kp.keywords
-            })
-            
-            return result.single()["id"]
+            result = session.run(cypher, {"id": kp.id, "name": kp.name, "properties": properties})
+            kp_id = result.single()["id"]
+            change.ids.append(kp_id)
+            return kp_id
     
+    @coalesce(read_flight)
     def get_knowledge_point(self, kp_id: str) -> Optional[Dict[str, Any]]:
         """获取知识点"""
-        with self.driver.session() as session:
-            cypher = "MATCH (kp:KnowledgePoint {id: $id}) RETURN kp"
-            result = session.run(cypher, {"id": kp_id})
-            record = result.single()
-            return dict(record["kp"]) if record else None
+        records = self.read_records("MATCH (kp:KnowledgePoint {id: $id}) RETURN kp", {"id": kp_id})
+        return dict(records[0]["kp"]) if records else None
     
+    @coalesce(read_flight)
     def search_knowledge_points(self, keyword: str) -> List[Dict[str, Any]]:
         """搜索知识点"""
-        with self.driver.session() as session:
-            cypher = """
-            MATCH (kp:KnowledgePoint)
-            WHERE kp.name CONTAINS $keyword 
-               OR any(k in kp.keywords WHERE k CONTAINS $keyword)
-               OR kp.description CONTAINS $keyword
-            RETURN kp
-            ORDER BY kp.name
-            """
-            result = session.run(cypher, {"keyword": keyword})
-            return [dict(record["kp"]) for record in result]
+        cypher = """
+        MATCH (kp:KnowledgePoint)
+        WHERE kp.name CONTAINS $keyword 
+           OR any(k in kp.keywords WHERE k CONTAINS $keyword)
+           OR kp.description CONTAINS $keyword
+        RETURN kp
+        ORDER BY kp.name
+        """
+        return [dict(record["kp"]) for record in self.read_records(cypher, {"keyword": keyword})]
     
     def create_knowledge_hierarchy(self, parent_id: str, child_id: str):
         """创建知识点层级关系"""
-        with self.driver.session() as session:
+        with graph_events.change("HAS_SUB_POINT", "linked", ids=(parent_id, child_id),
+                                 source="create_knowledge_hierarchy"), self.write_session() as session:
             cypher = """
             MATCH (parent:KnowledgePoint {id: $parent_id})
             MATCH (child:KnowledgePoint {id: $child_id})
-            CREATE (parent)-[:HAS_SUB_POINT]->(child)
+            MERGE (parent)-[:HAS_SUB_POINT]->(child)
             """
             session.run(cypher, {"parent_id": parent_id, "child_id": child_id})
     
     # ===== 题目操作 =====
     
     def create_question(self, question: Question) -> str:
-        """创建题目"""
-        with self.driver.session() as session:
-            cypher = """
-            CREATE (q:Question {
-                id: $id,
-                content: $content,
-                question_type: $question_type,
-                options: $options,
-                answer: $answer,
-                analysis: $analysis,
-                source: $source,
-                difficulty: $difficulty
-            })
+        """
+        创建或更新题目（按ID MERGE，未提供ID时由题干生成，重复导入不会产生重复节点）
+
+        Returns:
+            题目ID
+        """
+        if not question.id:
+            question.id = question_id(question.content)
+        row = {"id": question.id, "properties": {k: v for k, v in question.dict(exclude={"id"}).items() if v is not None}}
+        cypher = """
+            MERGE (q:Question {id: $id})
+            SET q += $properties
             RETURN q.id as id
             """
-            
-            # 生成ID如果没有提供
-            if not question.id:
-                question.id = f"q_{hash(question.content) % 1000000}"
-            
-            result = session.run(cypher, {
-                "id": question.id,
-                "content": question.content,
-                "question_type": question.question_type,
-                "options": question.options,
-                "answer": question.answer,
-                "analysis": question.analysis,
-                "source": question.source,
-                "difficulty": question.difficulty
-            })
-            
-            return result.single()["id"]
+
+        def _create(tx):
+            self._resolve_question_ids(tx, [row])
+            return tx.run(cypher, row).single()["id"]
+
+        with graph_events.change("Question", "upserted", source="create_question") as change, \
+                self.write_session() as session:
+            question.id = session.execute_write(_create)
+            change.ids.append(question.id)
+            return question.id
+
+    @staticmethod
+    def _resolve_question_ids(tx, rows: List[Dict[str, Any]]):
+        """
+        写入题目前补上 content_hash，并让按题干生成ID的行沿用同题干已有题目的ID（旧ID题目不会被重复创建）
+
+        Args:
+            rows: [{"id", "properties"}]，原地修改；properties 中没有 content 的行和显式指定的其他ID不处理
+        """
+        candidates = []
+        for row in rows:
+            content = row["properties"].get("content")
+            if not content:
+                continue
+            # content_hash 即按题干生成的ID，旧ID题目由 backfill_question_content_hashes 补齐
+            row["properties"]["content_hash"] = question_id(content)
+            if row["id"] == row["properties"]["content_hash"]:
+                candidates.append(row)
+        if not candidates:
+            return
+        existing = {record["hash"]: record["ids"] for record in tx.run("""
+            UNWIND $hashes AS hash
+            MATCH (q:Question {content_hash: hash})
+            RETURN hash, collect(q.id) AS ids
+            """, {"hashes": list({row["id"] for row in candidates})})}
+        for row in candidates:
+            ids = existing.get(row["id"])
+            if ids and row["id"] not in ids:
+                row["id"] = min(ids)
     
+    @coalesce(read_flight)
     def get_question(self, question_id: str) -> Optional[Dict[str, Any]]:
         """获取题目"""
-        with self.driver.session() as session:
-            cypher = "MATCH (q:Question {id: $id}) RETURN q"
-            result = session.run(cypher, {"id": question_id})
-            record = result.single()
-            return dict(record["q"]) if record else None
+        records = self.read_records("MATCH (q:Question {id: $id}) RETURN q", {"id": question_id})
+        return dict(records[0]["q"]) if records else None
     
     def link_question_to_knowledge(self, question_id: str, kp_id: str, weight: float = 1.0):
         """将题目链接到知识点"""
-        with self.driver.session() as session:
+        with graph_events.change("TESTS", "linked", ids=(question_id, kp_id),
+                                 source="link_question_to_knowledge"), self.write_session() as session:
             cypher = """
             MATCH (q:Question {id: $question_id})
             MATCH (kp:KnowledgePoint {id: $kp_id})
-            CREATE (q)-[:TESTS {weight: $weight}]->(kp)
+            MERGE (q)-[r:TESTS]->(kp)
+            SET r.weight = $weight
             """
             session.run(cypher, {
                 "question_id": question_id, 
@@ -203,56 +361,381 @@ class Neo4jService:
                 "weight": weight
             })
     
+    def save_annotated_questions(self, items: List[Dict[str, Any]],
+                                 upsert_questions: bool = True) -> List[Dict[str, Any]]:
+        """
+        批量保存题目及其标注（单个事务，一次往返）
+
+        每道题的TESTS关系整体替换为提交的知识点集合，重复提交不会产生重复边
+
+        Args:
+            items: [{"id": 题目ID, "properties": {题目属性},
+                     "links": [{"kp_id": 知识点ID, "weight": 权重}]}]
+            upsert_questions: True时按ID创建或更新题目；False时只处理已存在的题目
+
+        Returns:
+            [{"id", "linked", "removed", "missing_knowledge_points"}]，题目不存在时不返回该项
+        """
+        payload = []
+        for item in items:
+            # 同一知识点重复提交时保留最大权重
+            links: Dict[str, float] = {}
+            for link in item.get("links", []):
+                kp_id = link.get("kp_id")
+                if kp_id:
+                    links[kp_id] = max(float(link.get("weight", 1.0)), links.get(kp_id, 0.0))
+            payload.append({
+                "id": item["id"],
+                "properties": {k: v for k, v in (item.get("properties") or {}).items() if v is not None},
+                "links": [{"kp_id": kp_id, "weight": weight} for kp_id, weight in links.items()]
+            })
+
+        match_clause = (
+            "MERGE (q:Question {id: item.id})\n            SET q += item.properties"
+            if upsert_questions else
+            "MATCH (q:Question {id: item.id})"
+        )
+        cypher = f"""
+            UNWIND $items AS item
+            {match_clause}
+            WITH q, item
+            CALL {{
+                WITH q
+                OPTIONAL MATCH (q)-[old:TESTS]->(:KnowledgePoint)
+                DELETE old
+                RETURN count(old) AS removed
+            }}
+            CALL {{
+                WITH q, item
+                UNWIND item.links AS link
+                MATCH (kp:KnowledgePoint {{id: link.kp_id}})
+                MERGE (q)-[r:TESTS]->(kp)
+                SET r.weight = link.weight
+                RETURN collect(kp.id) AS linked_ids
+            }}
+            RETURN q.id AS id, removed, linked_ids,
+                   [link IN item.links WHERE NOT link.kp_id IN linked_ids | link.kp_id] AS missing
+            """
+
+        def _save(tx):
+            self._resolve_question_ids(tx, payload)
+            result = tx.run(cypher, {"items": payload})
+            return [dict(record) for record in result]
+
+        entities = ("Question", "TESTS") if upsert_questions else ("TESTS",)
+        with graph_events.change(entities, "updated", source="save_annotated_questions") as change, \
+                self.write_session() as session:
+            records = session.execute_write(_save)
+            change.ids.extend(item["id"] for item in payload)
+
+        return [{
+            "id": record["id"],
+            "linked": len(record["linked_ids"]),
+            "removed": record["removed"],
+            "missing_knowledge_points": record["missing"]
+        } for record in records]
+
+    def merge_knowledge_points(self, knowledge_points: List[Dict[str, Any]], source: str = "") -> int:
+        """
+        批量导入知识点（单个事务，按名称MERGE，已存在的知识点不修改）
+
+        Args:
+            knowledge_points: [{"name": 名称, 其他属性...}]，未提供id时由名称生成
+            source: 写入变更事件的来源
+
+        Returns:
+            新建的知识点数
+        """
+        rows = [{
+            "name": kp["name"],
+            "id": kp.get("id") or knowledge_point_id(kp["name"]),
+            "properties": {k: v for k, v in kp.items() if k not in ("id", "name") and v is not None}
+        } for kp in knowledge_points]
+        cypher = """
+            UNWIND $rows AS row
+            MERGE (kp:KnowledgePoint {name: row.name})
+            ON CREATE SET kp.id = row.id, kp += row.properties
+            """
+
+        def _merge(tx):
+            return tx.run(cypher, {"rows": rows}).consume().counters.nodes_created
+
+        with graph_events.change("KnowledgePoint", "bulk_load", ids=[row["id"] for row in rows],
+                                 source=source), self.write_session() as session:
+            return session.execute_write(_merge)
+
+    def merge_questions(self, questions: List[Dict[str, Any]], weight: float = 1.0, source: str = "",
+                        update_existing: bool = False) -> int:
+        """
+        批量导入题目（单个事务，按题干生成的ID MERGE）
+
+        题干（规范化后）与已有题目相同时沿用已有题目的ID（未执行 migrate_question_ids 的旧ID题目不会被重复创建）；
+        题目按 knowledge_points 中的知识点名称关联，已有的TESTS关系保留原权重
+
+        Args:
+            questions: [{"content": 题干, "knowledge_points": [知识点名称], 其他属性...}]
+            weight: 新建TESTS关系的权重
+            source: 写入变更事件的来源
+            update_existing: True时用提交的属性更新已存在的题目（与 create_question 相同），否则不修改
+
+        Returns:
+            新建的题目数
+        """
+        rows = [{
+            "id": q.get("id") or question_id(q["content"]),
+            "properties": {k: v for k, v in q.items() if k not in ("id", "knowledge_points") and v is not None},
+            "knowledge_points": list(q.get("knowledge_points", []))
+        } for q in questions]
+        set_clause = "SET" if update_existing else "ON CREATE SET"
+        cypher = f"""
+            UNWIND $rows AS row
+            MERGE (q:Question {{id: row.id}})
+            {set_clause} q += row.properties
+            WITH q, row
+            UNWIND row.knowledge_points AS kp_name
+            MATCH (kp:KnowledgePoint {{name: kp_name}})
+            MERGE (q)-[r:TESTS]->(kp)
+            ON CREATE SET r.weight = $weight
+            """
+
+        def _merge(tx):
+            self._resolve_question_ids(tx, rows)
+            return tx.run(cypher, {"rows": rows, "weight": weight}).consume().counters.nodes_created
+
+        with graph_events.change(("Question", "TESTS"), "bulk_load", source=source) as change, \
+                self.write_session() as session:
+            created = session.execute_write(_merge)
+            change.ids.extend(row["id"] for row in rows)
+            return created
+
+    def migrate_question_ids(self, dry_run: bool = False, batch_size: int = 500) -> Dict[str, Any]:
+        """
+        一次性迁移：把旧ID（q_real_*、q_final_* 等）改写为按题干生成的ID，题干相同的重复题目合并为一个
+
+        合并时保留ID已是新ID的节点（没有则取ID最小的节点），其余节点的TESTS关系并入保留节点（权重取较大值）后删除。
+        标注历史中的题目ID不改写，按返回的映射自行对照
+
+        Returns:
+            {"questions", "renamed", "merged", "mapping": {旧ID: 新ID}}
+        """
+        records = self.read_records(
+            "MATCH (q:Question) WHERE q.content IS NOT NULL RETURN q.id AS id, q.content AS content"
+        )
+        groups: Dict[str, List[str]] = {}
+        for record in records:
+            groups.setdefault(question_id(record["content"]), []).append(record["id"])
+
+        plans = []
+        mapping: Dict[str, str] = {}
+        for target, ids in groups.items():
+            if ids == [target]:
+                continue
+            keep = target if target in ids else min(ids, key=str)
+            plans.append({"target": target, "keep": keep, "drop": [i for i in ids if i != keep]})
+            mapping.update({i: target for i in ids if i != target})
+
+        summary = {
+            "questions": len(records),
+            "renamed": sum(1 for plan in plans if plan["keep"] != plan["target"]),
+            "merged": sum(len(plan["drop"]) for plan in plans),
+            "mapping": mapping
+        }
+        if dry_run:
+            return summary
+        if not plans:
+            self.backfill_question_content_hashes()
+            return summary
+
+        move_links = """
+            UNWIND $plans AS plan
+            MATCH (keep:Question {id: plan.keep})
+            UNWIND plan.drop AS drop_id
+            MATCH (:Question {id: drop_id})-[old:TESTS]->(kp:KnowledgePoint)
+            MERGE (keep)-[r:TESTS]->(kp)
+            ON CREATE SET r.weight = old.weight
+            ON MATCH SET r.weight = CASE WHEN coalesce(old.weight, 0) > coalesce(r.weight, 0)
+                                         THEN old.weight ELSE r.weight END
+            """
+        replace_nodes = """
+            UNWIND $plans AS plan
+            OPTIONAL MATCH (duplicate:Question) WHERE duplicate.id IN plan.drop
+            DETACH DELETE duplicate
+            WITH DISTINCT plan
+            MATCH (keep:Question {id: plan.keep})
+            SET keep.id = plan.target, keep.content_hash = plan.target
+            """
+
+        def _migrate(tx, batch):
+            tx.run(move_links, {"plans": batch}).consume()
+            tx.run(replace_nodes, {"plans": batch}).consume()
+
+        for start in range(0, len(plans), batch_size):
+            batch = plans[start:start + batch_size]
+            ids = [i for plan in batch for i in [plan["target"], plan["keep"], *plan["drop"]]]
+            with graph_events.change(("Question", "TESTS"), "updated", ids=ids, source="migrate_question_ids"), \
+                    self.write_session() as session:
+                session.execute_write(_migrate, batch)
+        self.backfill_question_content_hashes()
+        logger.info(f"题目ID迁移完成: 改写 {summary['renamed']} 个，合并 {summary['merged']} 个重复题目")
+        return summary
+
+    def backfill_question_content_hashes(self, batch_size: int = 1000) -> int:
+        """为缺少 content_hash 的题目（旧版本写入）补上题干哈希，返回补齐的题目数"""
+        records = self.read_records("""
+            MATCH (q:Question) WHERE q.content_hash IS NULL AND q.content IS NOT NULL
+            RETURN q.id AS id, q.content AS content
+            """)
+        rows = [{"id": record["id"], "hash": question_id(record["content"])} for record in records]
+        for start in range(0, len(rows), batch_size):
+            self.execute_write(lambda tx, batch: tx.run("""
+                UNWIND $rows AS row
+                MATCH (q:Question {id: row.id})
+                SET q.content_hash = row.hash
+                """, {"rows": batch}).consume(), rows[start:start + batch_size])
+        if rows:
+            logger.info(f"已为 {len(rows)} 道题目补齐 content_hash")
+        return len(rows)
+
+    def replace_question_annotations(self, question_id: str,
+                                     annotations: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """用提交的知识点集合替换题目的全部标注，题目不存在时返回None"""
+        results = self.save_annotated_questions([{
+            "id": question_id,
+            "links": [
+                {"kp_id": ann.get("knowledge_point_id"), "weight": ann.get("weight", 1.0)}
+                for ann in annotations
+            ]
+        }], upsert_questions=False)
+        return results[0] if results else None
+
     # ===== 复杂查询 =====
-    
+
+    @coalesce(read_flight)
     def find_questions_by_knowledge_point(self, kp_name: str) -> List[Dict[str, Any]]:
         """根据知识点查找题目"""
-        with self.driver.session() as session:
-            cypher = """
-            MATCH (q:Question)-[r:TESTS]->(kp:KnowledgePoint)
-            WHERE kp.name = $kp_name
-            RETURN q, r.weight as weight
-            ORDER BY r.weight DESC
-            """
-            result = session.run(cypher, {"kp_name": kp_name})
-            return [{"question": dict(record["q"]), "weight": record["weight"]} 
-                   for record in result]
+        cypher = """
+        MATCH (q:Question)-[r:TESTS]->(kp:KnowledgePoint)
+        WHERE kp.name = $kp_name
+        RETURN q, r.weight as weight
+        ORDER BY r.weight DESC
+        """
+        return [{"question": dict(record["q"]), "weight": record["weight"]} 
+               for record in self.read_records(cypher, {"kp_name": kp_name})]
     
+    @coalesce(read_flight)
     def find_knowledge_points_by_question(self, question_id: str) -> List[Dict[str, Any]]:
         """根据题目查找相关知识点"""
-        with self.driver.session() as session:
+        cypher = """
+        MATCH (q:Question {id: $question_id})-[r:TESTS]->(kp:KnowledgePoint)
+        RETURN kp, r.weight as weight
+        ORDER BY r.weight DESC
+        """
+        return [{"knowledge_point": dict(record["kp"]), "weight": record["weight"]} 
+               for record in self.read_records(cypher, {"question_id": question_id})]
+    
+    @coalesce(read_flight)
+    def get_question_stems(self, question_ids: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+        """题目ID和题干，question_ids 为None时返回全部题目"""
+        if question_ids is None:
+            records = self.read_records("MATCH (q:Question) RETURN q.id as id, q.content as content")
+        else:
+            records = self.read_records(
+                "UNWIND $ids AS id MATCH (q:Question {id: id}) RETURN q.id as id, q.content as content",
+                {"ids": list(question_ids)}
+            )
+        return [(record["id"], record["content"] or "") for record in records if record["id"]]
+
+    @coalesce(read_flight)
+    def get_question_catalog_rows(self, question_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """题目目录所需的元数据（不含题干），question_ids 为None时返回全部题目"""
+        projection = """
+        OPTIONAL MATCH (q)-[:TESTS]->(kp:KnowledgePoint)
+        RETURN q.id as id, q.question_type as question_type, q.difficulty as difficulty,
+               q.grade_level as grade_level, q.source as source,
+               collect(kp.name) as knowledge_points
+        """
+        if question_ids is None:
+            records = self.read_records("MATCH (q:Question)" + projection)
+        else:
+            records = self.read_records(
+                "UNWIND $ids AS id MATCH (q:Question {id: id})" + projection, {"ids": list(question_ids)}
+            )
+        return [dict(record) for record in records if record["id"]]
+
+    def get_annotated_questions(self) -> List[Dict[str, Any]]:
+        """已标注的题目（题干、题型及考查的知识点），用于离线训练"""
+        cypher = """
+        MATCH (q:Question)-[:TESTS]->(kp:KnowledgePoint)
+        RETURN q.id as id, q.content as content, q.question_type as question_type,
+               collect(DISTINCT {id: kp.id, name: kp.name}) as knowledge_points
+        """
+        return [dict(record) for record in self.read_records(cypher) if record["content"]]
+
+    @coalesce(read_flight)
+    def get_questions_by_ids(self, question_ids: List[str]) -> List[Dict[str, Any]]:
+        """按给定顺序获取题目详情及其考查的知识点名称"""
+        cypher = """
+        UNWIND range(0, size($ids) - 1) AS position
+        MATCH (q:Question {id: $ids[position]})
+        OPTIONAL MATCH (q)-[:TESTS]->(kp:KnowledgePoint)
+        WITH position, q, collect(kp.name) as knowledge_points
+        RETURN q.id as id, q.content as content, q.question_type as question_type,
+               q.options as options, q.answer as answer, q.analysis as analysis,
+               q.difficulty as difficulty, q.source as source, q.grade_level as grade_level,
+               knowledge_points
+        ORDER BY position
+        """
+        if not question_ids:
+            return []
+        return [dict(record) for record in self.read_records(cypher, {"ids": list(question_ids)})]
+
+    # ===== 关键词/规则表 =====
+
+    def get_annotation_tables(self) -> Optional[Dict[str, Any]]:
+        """当前生效的关键词/规则表版本（payload 为表名 -> 表内容的JSON文本）"""
+        cypher = """
+        MATCH (t:AnnotationTables {active: true})
+        RETURN t.version as version, t.payload as payload, toString(t.created_at) as created_at
+        ORDER BY t.created_at DESC LIMIT 1
+        """
+        records = self.read_records(cypher)
+        return dict(records[0]) if records else None
+
+    def save_annotation_tables(self, version: str, payload: str) -> str:
+        """保存关键词/规则表的新版本并设为生效（旧版本保留，便于回滚）"""
+        with graph_events.change("AnnotationTables", "updated", ids=(version,),
+                                 source="save_annotation_tables"), self.write_session() as session:
             cypher = """
-            MATCH (q:Question {id: $question_id})-[r:TESTS]->(kp:KnowledgePoint)
-            RETURN kp, r.weight as weight
-            ORDER BY r.weight DESC
+            OPTIONAL MATCH (previous:AnnotationTables {active: true})
+            SET previous.active = false
+            WITH count(previous) as retired
+            MERGE (t:AnnotationTables {version: $version})
+            SET t.payload = $payload, t.created_at = datetime(), t.active = true
+            RETURN t.version as version
             """
-            result = session.run(cypher, {"question_id": question_id})
-            return [{"knowledge_point": dict(record["kp"]), "weight": record["weight"]} 
-                   for record in result]
-    
+            return session.run(cypher, {"version": version, "payload": payload}).single()["version"]
+
+    @coalesce(read_flight)
     def get_knowledge_hierarchy(self) -> List[Dict[str, Any]]:
         """获取知识点层级结构"""
-        with self.driver.session() as session:
-            cypher = """
-            MATCH (parent:KnowledgePoint)-[:HAS_SUB_POINT]->(child:KnowledgePoint)
-            RETURN DISTINCT parent.name as parent_name, child.name as child_name,
-                   parent.id as parent_id, child.id as child_id
-            ORDER BY parent.name, child.name
-            """
-            result = session.run(cypher)
-            return [dict(record) for record in result]
+        cypher = """
+        MATCH (parent:KnowledgePoint)-[:HAS_SUB_POINT]->(child:KnowledgePoint)
+        RETURN DISTINCT parent.name as parent_name, child.name as child_name,
+               parent.id as parent_id, child.id as child_id
+        ORDER BY parent.name, child.name
+        """
+        return [dict(record) for record in self.read_records(cypher)]
     
+    @coalesce(read_flight)
     def recommend_prerequisite_knowledge(self, kp_id: str) -> List[Dict[str, Any]]:
         """推荐前置知识点"""
-        with self.driver.session() as session:
-            cypher = """
-            MATCH (target:KnowledgePoint {id: $kp_id})<-[:REQUIRES*1..3]-(prereq:KnowledgePoint)
-            RETURN DISTINCT prereq, length(path) as distance
-            ORDER BY distance
-            """
-            result = session.run(cypher, {"kp_id": kp_id})
-            return [{"knowledge_point": dict(record["prereq"]), "distance": record["distance"]} 
-                   for record in result]
+        cypher = """
+        MATCH (target:KnowledgePoint {id: $kp_id})<-[:REQUIRES*1..3]-(prereq:KnowledgePoint)
+        RETURN DISTINCT prereq, length(path) as distance
+        ORDER BY distance
+        """
+        return [{"knowledge_point": dict(record["prereq"]), "distance": record["distance"]} 
+               for record in self.read_records(cypher, {"kp_id": kp_id})]
 
 
 # 全局数据库实例
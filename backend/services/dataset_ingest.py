@@ -0,0 +1,433 @@
+"""
+本地数据集导入流水线
+从CSV/TSV/JSONL/JSON/XLSX文件流式读取行，按列映射配置转换为题目或知识点，
+生成器流水线中完成规范化、校验和去重，再以批量MERGE写入数据库。
+行的解析、映射和校验可分片到多个进程并行执行，适合供应商提供的大型题库文件
+"""
+import os
+import io
+import csv
+import sys
+import json
+import gzip
+import time
+import logging
+from itertools import islice
+from collections import deque
+from multiprocessing import Pool
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Tuple, Union
+
+from pydantic import ValidationError
+
+from backend.models.schema import Question, KnowledgePoint, normalize_text, question_id, knowledge_point_id
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "tsv", "jsonl", "json", "xlsx")
+LIST_FIELDS = ("options", "keywords", "knowledge_points", "grade_levels")
+DEFAULT_SEPARATOR = ";"
+
+# 行解析结果
+OK, ERROR = "ok", "error"
+# 工作进程算好的题干MinHash签名，去重时取出，不写入数据库
+SIGNATURE_FIELD = "_minhash_signature"
+
+
+class ColumnMapping:
+    """
+    列映射配置（JSON文件）
+
+        {
+            "kind": "question",                       # question / knowledge_point
+            "fields": {                               # 目标字段 -> 源列名（列表表示多列合并为列表）
+                "content": "题干",
+                "options": ["A", "B", "C", "D"],
+                "knowledge_points": "知识点"
+            },
+            "separators": {"knowledge_points": "|"},  # 单列列表字段的分隔符，默认 ";"
+            "values": {"difficulty": {"易": "easy"}},  # 取值映射
+            "defaults": {"source": "供应商题库"}        # 空值时的默认值
+        }
+
+    未配置 fields 时源列名与目标字段同名
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.kind = config.get("kind", "question")
+        if self.kind not in ("question", "knowledge_point"):
+            raise ValueError(f"不支持的数据类型: {self.kind}")
+        model = Question if self.kind == "question" else KnowledgePoint
+        default_fields = {name: name for name in model.model_fields}
+        if self.kind == "question":
+            default_fields["knowledge_points"] = "knowledge_points"
+        self.fields: Dict[str, Union[str, List[str]]] = config.get("fields") or default_fields
+        self.separators: Dict[str, str] = config.get("separators", {})
+        self.values: Dict[str, Dict[str, str]] = config.get("values", {})
+        self.defaults: Dict[str, Any] = config.get("defaults", {})
+
+    @classmethod
+    def load(cls, path: Optional[str], kind: Optional[str] = None) -> "ColumnMapping":
+        """从JSON文件加载，kind 覆盖文件中的数据类型"""
+        config = {}
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        if kind:
+            config["kind"] = kind
+        return cls(config)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "fields": self.fields, "separators": self.separators,
+                "values": self.values, "defaults": self.defaults}
+
+    def apply(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """源行 -> 目标字段（规范化空白、拆分列表、映射取值、补默认值）"""
+        record: Dict[str, Any] = {}
+        for target, source in self.fields.items():
+            if isinstance(source, list):
+                value = [_clean(raw.get(column)) for column in source]
+                value = [item for item in value if item]
+            else:
+                value = raw.get(source)
+                if target in LIST_FIELDS:
+                    value = _split(value, self.separators.get(target, DEFAULT_SEPARATOR))
+                else:
+                    value = _clean(value)
+            mapping = self.values.get(target)
+            if mapping and value is not None:
+                value = [mapping.get(item, item) for item in value] if isinstance(value, list) \
+                    else mapping.get(value, value)
+            if value in (None, "", []):
+                value = self.defaults.get(target)
+            if value not in (None, "", []):
+                record[target] = value
+        for target, value in self.defaults.items():
+            record.setdefault(target, value)
+        return record
+
+
+def _clean(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return normalize_text(value) or None
+    if isinstance(value, float) and value.is_integer():
+        # Excel中的整数单元格
+        return str(int(value))
+    return str(value) if not isinstance(value, (list, dict)) else value
+
+
+def _split(value: Any, separator: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        items = value
+    else:
+        items = str(value).split(separator)
+    return [item for item in (_clean(i) for i in items) if item]
+
+
+# ===== 读取 =====
+
+def detect_format(path: str) -> str:
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension == "ndjson":
+        extension = "jsonl"
+    if extension not in SUPPORTED_FORMATS:
+        raise ValueError(f"不支持的文件格式: {path}（支持 {', '.join(SUPPORTED_FORMATS)}）")
+    return extension
+
+
+def _open_text(path: str):
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def read_rows(path: str, fmt: Optional[str] = None, sheet: Optional[str] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    流式读取源文件，产出 (行号, 原始行)
+
+    原始行为字典；JSONL为未解析的字符串，留给工作进程解析
+    """
+    fmt = fmt or detect_format(path)
+    if fmt in ("csv", "tsv"):
+        with _open_text(path) as f:
+            reader = csv.DictReader(f, delimiter="\t" if fmt == "tsv" else ",")
+            for row in reader:
+                # 表头占第1行；字段中含换行时行号为记录序号
+                yield reader.line_num, row
+    elif fmt == "jsonl":
+        with _open_text(path) as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+    elif fmt == "json":
+        # JSON数组文件（如 data/sample_questions/*.json）通常不大，整体读取
+        with _open_text(path) as f:
+            data = json.load(f)
+        for index, row in enumerate(data if isinstance(data, list) else [data], 1):
+            yield index, row
+    elif fmt == "xlsx":
+        yield from _read_xlsx(path, sheet)
+
+
+def _read_xlsx(path: str, sheet: Optional[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("读取XLSX需要openpyxl（python -m pip install openpyxl）")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        for row_no, values in enumerate(rows, 2):
+            if any(value is not None for value in values):
+                yield row_no, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+# ===== 转换（可在工作进程中执行） =====
+
+_worker_mapping: Optional[ColumnMapping] = None
+_worker_hasher = None
+
+
+def _init_worker(mapping_config: Dict[str, Any], hasher=None):
+    """hasher 为近似去重索引的 MinHasher 时，同时在工作进程中计算题干签名"""
+    global _worker_mapping, _worker_hasher
+    _worker_mapping = ColumnMapping(mapping_config)
+    _worker_hasher = hasher
+
+
+def transform_row(mapping: ColumnMapping, row_no: int, raw: Any) -> Tuple[str, int, Any]:
+    """原始行 -> (OK, 行号, 记录) 或 (ERROR, 行号, 错误信息)"""
+    try:
+        if isinstance(raw, str):
+            raw = json.loads(raw)
+        if not isinstance(raw, dict):
+            raise ValueError("行不是对象")
+        record = mapping.apply(raw)
+        if mapping.kind == "question":
+            model = Question(**record)
+            record = dict(record, **model.dict(exclude_none=True))
+            record["id"] = record.get("id") or question_id(record["content"])
+        else:
+            model = KnowledgePoint(**record)
+            record = dict(record, **model.dict(exclude_none=True))
+            record["id"] = record.get("id") or knowledge_point_id(record["name"])
+        return OK, row_no, record
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+        return ERROR, row_no, errors
+    except (ValueError, TypeError) as e:
+        return ERROR, row_no, str(e)
+
+
+def _transform_chunk(chunk: List[Tuple[int, Any]]) -> List[Tuple[str, int, Any]]:
+    results = [transform_row(_worker_mapping, row_no, raw) for row_no, raw in chunk]
+    if _worker_hasher is not None:
+        from backend.services.near_duplicate_index import shingles
+        for status, _, record in results:
+            if status == OK:
+                record[SIGNATURE_FIELD] = _worker_hasher.signature(shingles(record["content"]))
+    return results
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bounded_imap(pool: Pool, func, chunks: Iterable, window: int) -> Iterator:
+    """
+    按顺序返回 pool 中 func(chunk) 的结果，同时最多 window 块在处理中
+
+    Pool.imap 会尽快读完整个输入并把结果排队，写库慢于解析时内存随文件大小增长；
+    这里等最早提交的块被取走后才读取并提交下一块
+    """
+    pending = deque()
+    chunks = iter(chunks)
+    for chunk in islice(chunks, window):
+        pending.append(pool.apply_async(func, (chunk,)))
+    while pending:
+        result = pending.popleft().get()
+        for chunk in islice(chunks, 1):
+            pending.append(pool.apply_async(func, (chunk,)))
+        yield result
+
+
+# ===== 流水线 =====
+
+class IngestStats:
+    """导入统计与吞吐量报告"""
+
+    def __init__(self, report_interval: float = 5.0):
+        self.counts = {"read": 0, "valid": 0, "invalid": 0, "duplicate": 0, "written": 0, "created": 0}
+        self.report_interval = report_interval
+        self.errors: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def maybe_report(self):
+        now = time.perf_counter()
+        if self.report_interval and now - self._last_report >= self.report_interval:
+            self._last_report = now
+            logger.info(f"已读取 {self.counts['read']} 行，写入 {self.counts['written']} 行，"
+                        f"{self.counts['read'] / max(self.elapsed, 1e-9):.0f} 行/秒")
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        return dict(
+            self.counts,
+            duration_seconds=round(elapsed, 3),
+            rows_per_second=round(self.counts["read"] / elapsed, 1) if elapsed > 0 else 0.0,
+            sample_errors=self.errors[:20]
+        )
+
+
+class DatasetIngestPipeline:
+    """读取 → 转换校验（可多进程） → 去重 → 批量写入"""
+
+    def __init__(self, mapping: Optional[ColumnMapping] = None, writer=None, workers: int = 1,
+                 chunk_size: int = 1000, batch_size: int = 500, near_duplicates: bool = False,
+                 update_existing: bool = False, weight: float = 1.0, dry_run: bool = False,
+                 rejects_path: Optional[str] = None, report_interval: float = 5.0):
+        """
+        Args:
+            mapping: 列映射，默认源列名与字段同名的题目映射
+            writer: 提供 merge_questions / merge_knowledge_points 的数据库服务，默认 neo4j_service
+            workers: 转换校验的进程数，1表示在当前进程中执行；多进程时处理中的块不超过 2*workers
+            chunk_size: 发给工作进程的每块行数
+            batch_size: 每个写入事务的行数
+            near_duplicates: 同时跳过近似重复的题目（MinHash索引）
+            update_existing: 用文件中的属性更新已存在的题目
+            weight: 行内知识点新建TESTS关系的权重
+            dry_run: 只解析校验，不写数据库
+            rejects_path: 无效行写入该JSONL文件
+            report_interval: 吞吐量日志间隔（秒），0为不输出
+        """
+        self.mapping = mapping or ColumnMapping()
+        self.writer = writer
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.batch_size = max(1, batch_size)
+        self.near_duplicates = near_duplicates and self.mapping.kind == "question"
+        self.update_existing = update_existing
+        self.weight = weight
+        self.dry_run = dry_run
+        self.rejects_path = rejects_path
+        self.report_interval = report_interval
+
+    def run(self, path: str, fmt: Optional[str] = None, sheet: Optional[str] = None) -> Dict[str, Any]:
+        """导入一个文件，返回统计"""
+        stats = IngestStats(self.report_interval)
+        source = os.path.basename(path)
+        if not self.dry_run and self.writer is None:
+            from backend.services.database import neo4j_service
+            if not neo4j_service.driver and not neo4j_service.connect():
+                raise RuntimeError("数据库连接失败")
+            self.writer = neo4j_service
+
+        index = self._duplicate_index() if self.near_duplicates else None
+        # 签名在转换阶段（工作进程）计算，主进程只做LSH查找和插入
+        initargs = (self.mapping.to_dict(), index.hasher if index is not None else None)
+        rejects = open(self.rejects_path, "a", encoding="utf-8") if self.rejects_path else None
+        pool = None
+        try:
+            raw_rows = read_rows(path, fmt, sheet)
+            if self.workers > 1:
+                pool = Pool(self.workers, initializer=_init_worker, initargs=initargs)
+                transformed = _bounded_imap(pool, _transform_chunk, _chunked(raw_rows, self.chunk_size),
+                                            window=2 * self.workers)
+            else:
+                _init_worker(*initargs)
+                transformed = map(_transform_chunk, _chunked(raw_rows, self.chunk_size))
+
+            records = self._dedupe(self._collect(transformed, stats, source, rejects), stats, index)
+            for batch in _chunked(records, self.batch_size):
+                self._write(batch, stats, source)
+                stats.maybe_report()
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if rejects is not None:
+                rejects.close()
+
+        summary = stats.summary()
+        summary.update({"file": path, "kind": self.mapping.kind, "workers": self.workers, "dry_run": self.dry_run})
+        logger.info(f"导入完成: {json.dumps({k: v for k, v in summary.items() if k != 'sample_errors'}, ensure_ascii=False)}")
+        return summary
+
+    def _collect(self, transformed: Iterable[List[Tuple[str, int, Any]]], stats: IngestStats, source: str,
+                 rejects) -> Iterator[Dict[str, Any]]:
+        for chunk in transformed:
+            for status, row_no, payload in chunk:
+                stats.counts["read"] += 1
+                if status == OK:
+                    stats.counts["valid"] += 1
+                    yield payload
+                    continue
+                stats.counts["invalid"] += 1
+                error = {"file": source, "row": row_no, "error": payload}
+                if len(stats.errors) < 100:
+                    stats.errors.append(error)
+                if rejects is not None:
+                    rejects.write(json.dumps(error, ensure_ascii=False) + "\n")
+            stats.maybe_report()
+
+    def _dedupe(self, records: Iterator[Dict[str, Any]], stats: IngestStats,
+                index=None) -> Iterator[Dict[str, Any]]:
+        """同一文件内按确定性ID去重，传入近似重复索引时按MinHash去除近似重复"""
+        seen = set()
+        for record in records:
+            signature = record.pop(SIGNATURE_FIELD, None)
+            if record["id"] in seen:
+                stats.counts["duplicate"] += 1
+                continue
+            if index is not None:
+                if index.find_duplicate(record["content"], signature=signature):
+                    stats.counts["duplicate"] += 1
+                    continue
+                index.add(record["id"], record["content"], signature=signature)
+            seen.add(record["id"])
+            yield record
+
+    def _duplicate_index(self):
+        if not self.dry_run:
+            # 与题库中已有题目比较
+            from backend.services.near_duplicate_index import near_duplicate_index
+            if not near_duplicate_index.wait_ready():
+                logger.warning("近似重复索引构建失败，只在文件内按ID去重")
+            return near_duplicate_index
+        # 试运行不访问数据库，只在文件内去重
+        from backend.services.graph_events import GraphEventBus
+        from backend.services.graph_version import GraphVersion
+        from backend.services.near_duplicate_index import NearDuplicateIndex
+        index = NearDuplicateIndex(loader=lambda ids: [], events=GraphEventBus(GraphVersion()))
+        index.rebuild([])
+        return index
+
+    def _write(self, batch: List[Dict[str, Any]], stats: IngestStats, source: str):
+        if not self.dry_run:
+            if self.mapping.kind == "question":
+                created = self.writer.merge_questions(batch, weight=self.weight, source=f"ingest:{source}",
+                                                      update_existing=self.update_existing)
+            else:
+                created = self.writer.merge_knowledge_points(batch, source=f"ingest:{source}")
+            stats.counts["created"] += created
+        stats.counts["written"] += len(batch)
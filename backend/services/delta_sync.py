@@ -0,0 +1,417 @@
+"""
+增量同步服务
+对两个Neo4j实例（如本地与Aura云端）的节点和关系计算内容指纹，
+用集合运算得到差异，只把变化部分以批量UNWIND事务写入目标库，
+支持断点续传和dry-run报告
+"""
+import re
+import os
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from backend.models.schema import GraphSchema
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 节点: label -> {id: (指纹, 属性)}
+NodeSnapshot = Dict[str, Dict[str, Tuple[str, Optional[Dict[str, Any]]]]]
+# 关系: (类型, 起点label, 终点label) -> {(起点id, 终点id): (指纹, 属性)}
+EdgeSnapshot = Dict[Tuple[str, str, str], Dict[Tuple[str, str], Tuple[str, Optional[Dict[str, Any]]]]]
+
+
+def to_json_value(value: Any) -> Any:
+    """把Neo4j时间类型等转为可JSON序列化的值"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: to_json_value(v) for k, v in value.items()}
+    if hasattr(value, "iso_format"):
+        return value.iso_format()
+    return str(value)
+
+
+def fingerprint(properties: Dict[str, Any]) -> str:
+    """属性内容的SHA-256指纹（与属性顺序无关）"""
+    canonical = json.dumps(to_json_value(properties), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def check_identifier(name: str) -> str:
+    # 标签和关系类型需要拼接进Cypher，只允许合法标识符
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"非法的标签或关系类型: {name}")
+    return name
+
+
+def edge_group_key(rel_type: str, start_label: str, end_label: str) -> str:
+    """关系分组键，如 Question-TESTS->KnowledgePoint"""
+    return f"{start_label}-{rel_type}->{end_label}"
+
+
+def build_write_cypher(op: str, key: str) -> str:
+    """
+    批量写入语句（参数 $rows）
+
+    Args:
+        op: upsert_nodes / delete_nodes / upsert_edges / delete_edges
+        key: 节点标签，或 edge_group_key 生成的关系分组键
+    """
+    if op.endswith("nodes"):
+        label = check_identifier(key)
+        if op == "upsert_nodes":
+            return f"UNWIND $rows AS row MERGE (n:{label} {{id: row.id}}) SET n = row.props"
+        return f"UNWIND $rows AS row MATCH (n:{label} {{id: row.id}}) DETACH DELETE n"
+
+    start_label, rest = key.split("-", 1)
+    rel_type, end_label = rest.split("->", 1)
+    start_label, rel_type, end_label = map(check_identifier, (start_label, rel_type, end_label))
+    if op == "upsert_edges":
+        return (
+            f"UNWIND $rows AS row "
+            f"MATCH (a:{start_label} {{id: row.start}}) MATCH (b:{end_label} {{id: row.end}}) "
+            f"MERGE (a)-[r:{rel_type}]->(b) SET r = row.props"
+        )
+    return (
+        f"UNWIND $rows AS row "
+        f"MATCH (a:{start_label} {{id: row.start}})-[r:{rel_type}]->(b:{end_label} {{id: row.end}}) "
+        f"DELETE r"
+    )
+
+
+class GraphSnapshot:
+    """一侧数据库的指纹快照"""
+
+    def __init__(self, nodes: NodeSnapshot = None, edges: EdgeSnapshot = None):
+        self.nodes: NodeSnapshot = nodes or {}
+        self.edges: EdgeSnapshot = edges or {}
+
+    @classmethod
+    def capture(cls, driver, labels: Iterable[str], keep_properties: bool = True,
+                database: Optional[str] = None) -> "GraphSnapshot":
+        """
+        读取数据库并计算指纹
+
+        Args:
+            driver: Neo4j驱动
+            labels: 参与同步的节点标签
+            keep_properties: 是否保留属性（源库需要保留，目标库只需指纹）
+        """
+        labels = [check_identifier(label) for label in labels]
+        label_set = set(labels)
+        snapshot = cls()
+        session_config = {"database": database} if database else {}
+
+        with driver.session(**session_config) as session:
+            for label in labels:
+                nodes = snapshot.nodes.setdefault(label, {})
+                result = session.run(
+                    f"MATCH (n:{label}) WHERE n.id IS NOT NULL RETURN n.id AS id, properties(n) AS props"
+                )
+                for record in result:
+                    props = dict(record["props"])
+                    nodes[str(record["id"])] = (fingerprint(props), props if keep_properties else None)
+
+            result = session.run("""
+                MATCH (a)-[r]->(b)
+                WHERE a.id IS NOT NULL AND b.id IS NOT NULL
+                RETURN type(r) AS type, labels(a) AS start_labels, a.id AS start_id,
+                       labels(b) AS end_labels, b.id AS end_id, properties(r) AS props
+            """)
+            for record in result:
+                start_label = next((l for l in record["start_labels"] if l in label_set), None)
+                end_label = next((l for l in record["end_labels"] if l in label_set), None)
+                if start_label is None or end_label is None:
+                    continue
+                key = (record["type"], start_label, end_label)
+                props = dict(record["props"])
+                # 重复边（历史上CREATE产生）按同一条处理
+                snapshot.edges.setdefault(key, {})[(str(record["start_id"]), str(record["end_id"]))] = (
+                    fingerprint(props), props if keep_properties else None
+                )
+
+        return snapshot
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "nodes": sum(len(v) for v in self.nodes.values()),
+            "edges": sum(len(v) for v in self.edges.values())
+        }
+
+
+class SyncPlan:
+    """差异计划：按批次组织的写操作列表"""
+
+    def __init__(self, batches: List[Dict[str, Any]], summary: Dict[str, Any]):
+        self.batches = batches
+        self.summary = summary
+        digest = hashlib.sha256()
+        for batch in batches:
+            digest.update(json.dumps(to_json_value(batch), ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        self.plan_id = digest.hexdigest()[:16]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.batches
+
+    def report(self, sample_size: int = 5) -> Dict[str, Any]:
+        """dry-run报告"""
+        return {
+            "plan_id": self.plan_id,
+            "batches": len(self.batches),
+            "summary": self.summary,
+            "samples": {
+                f"{b['op']}:{b['key']}": [self._row_key(b, row) for row in b["rows"][:sample_size]]
+                for b in self.batches if b.get("seq") == 0
+            }
+        }
+
+    @staticmethod
+    def _row_key(batch: Dict[str, Any], row: Dict[str, Any]) -> str:
+        if batch["op"].endswith("nodes"):
+            return row["id"]
+        return f"{row['start']}->{row['end']}"
+
+
+class DeltaSyncEngine:
+    """增量同步引擎"""
+
+    def __init__(self, labels: Optional[List[str]] = None, batch_size: int = 500,
+                 delete_missing: bool = False, checkpoint_path: Optional[str] = None,
+                 pause_seconds: float = 0.0, max_retries: int = 3):
+        """
+        Args:
+            labels: 参与同步的节点标签，默认使用GraphSchema中的全部标签
+            batch_size: 每个事务写入的行数
+            delete_missing: 是否删除目标库中源库已不存在的节点和关系
+            checkpoint_path: 断点文件路径，为空时不记录断点；写入计划另存于同目录的 *.plan.json
+            pause_seconds: 批次之间的间隔，用于避开云端限流
+            max_retries: 临时错误的重试次数
+        """
+        self.labels = labels or list(GraphSchema.NODE_LABELS.keys())
+        self.batch_size = batch_size
+        self.delete_missing = delete_missing
+        self.checkpoint_path = checkpoint_path
+        self.pause_seconds = pause_seconds
+        self.max_retries = max_retries
+
+    # ===== 差异计算 =====
+
+    def diff(self, source: GraphSnapshot, target: GraphSnapshot) -> SyncPlan:
+        """用集合运算比较两侧快照，生成写入计划"""
+        summary: Dict[str, Any] = {"nodes": {}, "edges": {}}
+        upsert_nodes, upsert_edges, delete_nodes, delete_edges = [], [], [], []
+
+        for label in self.labels:
+            src = source.nodes.get(label, {})
+            dst = target.nodes.get(label, {})
+            src_keys, dst_keys = set(src), set(dst)
+            created = src_keys - dst_keys
+            updated = {k for k in src_keys & dst_keys if src[k][0] != dst[k][0]}
+            deleted = dst_keys - src_keys if self.delete_missing else set()
+
+            rows = [{"id": k, "props": src[k][1]} for k in sorted(created | updated)]
+            upsert_nodes.extend(self._batches("upsert_nodes", label, rows))
+            delete_nodes.extend(self._batches("delete_nodes", label, [{"id": k} for k in sorted(deleted)]))
+            summary["nodes"][label] = {
+                "source": len(src), "target": len(dst),
+                "create": len(created), "update": len(updated), "delete": len(deleted),
+                "unchanged": len(src_keys & dst_keys) - len(updated)
+            }
+
+        for key in sorted(set(source.edges) | set(target.edges)):
+            rel_type, start_label, end_label = key
+            if start_label not in self.labels or end_label not in self.labels:
+                continue
+            src = source.edges.get(key, {})
+            dst = target.edges.get(key, {})
+            src_keys, dst_keys = set(src), set(dst)
+            created = src_keys - dst_keys
+            updated = {k for k in src_keys & dst_keys if src[k][0] != dst[k][0]}
+            deleted = dst_keys - src_keys if self.delete_missing else set()
+
+            edge_key = edge_group_key(rel_type, start_label, end_label)
+            rows = [{"start": s, "end": e, "props": src[(s, e)][1]} for s, e in sorted(created | updated)]
+            upsert_edges.extend(self._batches("upsert_edges", edge_key, rows))
+            delete_edges.extend(self._batches("delete_edges", edge_key,
+                                              [{"start": s, "end": e} for s, e in sorted(deleted)]))
+            summary["edges"][edge_key] = {
+                "source": len(src), "target": len(dst),
+                "create": len(created), "update": len(updated), "delete": len(deleted),
+                "unchanged": len(src_keys & dst_keys) - len(updated)
+            }
+
+        # 先写节点再写关系；先删关系再删节点
+        batches = upsert_nodes + upsert_edges + delete_edges + delete_nodes
+        summary["total_rows"] = sum(len(b["rows"]) for b in batches)
+        return SyncPlan(batches, summary)
+
+    def _batches(self, op: str, key: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {"op": op, "key": key, "seq": i // self.batch_size, "rows": rows[i:i + self.batch_size]}
+            for i in range(0, len(rows), self.batch_size)
+        ]
+
+    # ===== 写入 =====
+
+    @staticmethod
+    def _batch_cypher(batch: Dict[str, Any]) -> str:
+        return build_write_cypher(batch["op"], batch["key"])
+
+    def apply(self, plan: SyncPlan, target_driver, database: Optional[str] = None,
+              resume: bool = True) -> Dict[str, Any]:
+        """
+        按批次执行计划，每批一个写事务；每批提交后更新断点
+
+        Returns:
+            执行结果统计
+        """
+        completed = self._load_checkpoint(plan) if resume else 0
+        if completed:
+            logger.info(f"从断点继续: 已完成 {completed}/{len(plan.batches)} 批")
+        if self.checkpoint_path and (not completed or not os.path.exists(self._plan_path())):
+            # 计划只写一次，之后每批只更新断点中的进度
+            self._save_plan(plan)
+
+        session_config = {"database": database} if database else {}
+        started = time.perf_counter()
+        rows_written = 0
+
+        with target_driver.session(**session_config) as session:
+            for index in range(completed, len(plan.batches)):
+                batch = plan.batches[index]
+                cypher = self._batch_cypher(batch)
+                self._run_with_retry(session, cypher, batch["rows"])
+                rows_written += len(batch["rows"])
+                self._save_checkpoint(plan, index + 1)
+                logger.info(f"批次 {index + 1}/{len(plan.batches)} 完成: {batch['op']} {batch['key']} "
+                            f"({len(batch['rows'])} 行)")
+                if self.pause_seconds and index + 1 < len(plan.batches):
+                    time.sleep(self.pause_seconds)
+
+        self._clear_checkpoint()
+        return {
+            "plan_id": plan.plan_id,
+            "batches": len(plan.batches),
+            "resumed_from": completed,
+            "rows_written": rows_written,
+            "duration_seconds": round(time.perf_counter() - started, 3)
+        }
+
+    def _run_with_retry(self, session, cypher: str, rows: List[Dict[str, Any]]):
+        from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
+
+        def _write(tx):
+            tx.run(cypher, {"rows": rows}).consume()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                session.execute_write(_write)
+                return
+            except (TransientError, ServiceUnavailable, SessionExpired) as e:
+                if attempt >= self.max_retries:
+                    raise
+                wait = 2 ** attempt
+                logger.warning(f"写入失败（{e.__class__.__name__}），{wait}秒后重试")
+                time.sleep(wait)
+
+    # ===== 断点 =====
+
+    def _load_checkpoint(self, plan: SyncPlan) -> int:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取断点失败: {e}")
+            return 0
+        if data.get("plan_id") != plan.plan_id:
+            logger.info("断点对应的计划已变化，从头开始")
+            return 0
+        return int(data.get("completed", 0))
+
+    def load_plan_from_checkpoint(self) -> Optional[SyncPlan]:
+        """从断点和计划文件恢复计划（无需重新读取两侧数据库）"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if "batches" not in data:
+            # 计划另存于计划文件（旧版本的断点文件内嵌计划，直接使用）
+            plan_path = self._plan_path()
+            if not os.path.exists(plan_path):
+                return None
+            with open(plan_path, "r", encoding="utf-8") as f:
+                data = dict(json.load(f), plan_id=data.get("plan_id"))
+        plan = SyncPlan(data["batches"], data.get("summary", {}))
+        return plan if plan.plan_id == data.get("plan_id") else None
+
+    def _plan_path(self) -> str:
+        root, _ = os.path.splitext(self.checkpoint_path)
+        return root + ".plan.json"
+
+    def _save_plan(self, plan: SyncPlan):
+        self._write_json(self._plan_path(), {
+            "plan_id": plan.plan_id,
+            "summary": plan.summary,
+            "batches": to_json_value(plan.batches)
+        })
+
+    def _save_checkpoint(self, plan: SyncPlan, completed: int):
+        if not self.checkpoint_path:
+            return
+        self._write_json(self.checkpoint_path, {
+            "plan_id": plan.plan_id,
+            "completed": completed,
+            "updated_at": datetime.now().isoformat()
+        })
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]):
+        """先写临时文件再原子替换"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _clear_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        for path in (self.checkpoint_path, self._plan_path()):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ===== 入口 =====
+
+    def sync(self, source_driver, target_driver, dry_run: bool = False,
+             source_database: Optional[str] = None, target_database: Optional[str] = None) -> Dict[str, Any]:
+        """
+        完整同步流程：断点恢复 → 快照 → 差异 → 写入
+
+        Returns:
+            {"report": dry-run报告, "result": 写入结果（dry_run时为None）}
+        """
+        plan = None if dry_run else self.load_plan_from_checkpoint()
+        if plan is None:
+            source = GraphSnapshot.capture(source_driver, self.labels, keep_properties=True,
+                                           database=source_database)
+            target = GraphSnapshot.capture(target_driver, self.labels, keep_properties=False,
+                                           database=target_database)
+            logger.info(f"源库 {source.counts()}，目标库 {target.counts()}")
+            plan = self.diff(source, target)
+
+        report = plan.report()
+        if dry_run or plan.is_empty:
+            return {"report": report, "result": None}
+        return {"report": report, "result": self.apply(plan, target_driver, database=target_database)}
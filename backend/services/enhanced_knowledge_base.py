@@ -4,7 +4,10 @@
 """
 import re
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+
+from backend.services.annotation_tables import annotation_tables, compile_knowledge_base
+from backend.services.kb_artifact import load_section
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +15,23 @@ class EnhancedKnowledgeBase:
     """增强的英语知识库"""
     
     def __init__(self):
-        self.knowledge_base = self._build_enhanced_knowledge_base()
-        self.grade_mapping = self._build_grade_mapping()
+        # 知识库关键词和语言模式规则可热更新，见 annotation_tables
+        annotation_tables.register(
+            "enhanced_kb.knowledge_base",
+            lambda: load_section("enhanced_kb.knowledge_base") or self._build_enhanced_knowledge_base(),
+            compile_knowledge_base
+        )
+        self.grade_mapping = load_section("enhanced_kb.grade_mapping") or self._build_grade_mapping()
+    
+    @property
+    def knowledge_base(self) -> Dict[str, Dict[str, Any]]:
+        """当前请求固定的增强知识库"""
+        return annotation_tables.current()["enhanced_kb.knowledge_base"]
+    
+    @property
+    def pattern_engine(self):
+        """当前请求固定的语言模式规则引擎"""
+        return annotation_tables.current()["rules.linguistic_patterns"]
         
     def _build_enhanced_knowledge_base(self) -> Dict[str, Dict[str, Any]]:
         """构建增强的知识库（集成开源数据）"""
@@ -208,8 +226,16 @@ class EnhancedKnowledgeBase:
         
         return all_keywords
     
-    def analyze_question_features(self, question_text: str, kp_name: str) -> Dict[str, Any]:
-        """分析题目特征，返回详细的匹配信息"""
+    def analyze_question_features(self, question_text: str, kp_name: str,
+                                  linguistic_score: Optional[float] = None) -> Dict[str, Any]:
+        """
+        分析题目特征，返回详细的匹配信息
+        
+        Args:
+            question_text: 题目内容
+            kp_name: 知识点名称
+            linguistic_score: 预先批量计算好的语言特征分数（为空时单独计算）
+        """
         kp_info = self.knowledge_base.get(kp_name, {})
         if not kp_info:
             return {"matched_features": [], "confidence": 0.0, "reasoning": "知识点不存在"}
@@ -247,7 +273,8 @@ class EnhancedKnowledgeBase:
                 reasoning_parts.append(f"{category}: {', '.join(matched_words)}")
         
         # 语言特征分析
-        linguistic_score = self._analyze_linguistic_patterns(question_text, kp_name)
+        if linguistic_score is None:
+            linguistic_score = self._analyze_linguistic_patterns(question_text, kp_name)
         if linguistic_score > 0.5:
             reasoning_parts.append(f"语言特征强匹配: {linguistic_score:.2f}")
             total_score += linguistic_score
@@ -278,74 +305,8 @@ class EnhancedKnowledgeBase:
             return word_lower in question_lower
     
     def _analyze_linguistic_patterns(self, question_text: str, kp_name: str) -> float:
-        """分析语言模式（基于语言学规律）"""
-        text_lower = question_text.lower()
-        
-        # 专门的语言特征分析
-        if kp_name == "现在进行时":
-            # 检查祈使注意标志
-            if re.search(r'\blook\s*!|\blisten\s*!', text_lower):
-                return 0.95
-            # 检查现在时间标志
-            if re.search(r'\bnow\b|\bright now\b|\bat the moment\b', text_lower):
-                return 0.9
-            return 0.0
-        
-        elif kp_name == "被动语态":
-            # 检查被动标志词
-            if re.search(r'\sby\s+\w+', text_lower):  # "by someone"结构
-                return 0.95
-            # 检查被动结构
-            if re.search(r'\b(was|were|is|are|been)\s+\w+ed\b', text_lower):
-                return 0.8
-            return 0.0
-        
-        elif kp_name == "比较级和最高级":
-            # 检查比较结构
-            if re.search(r'\bthan\b', text_lower):
-                return 0.95
-            if re.search(r'\bthe\s+\w+est\b|\bthe most\s+\w+\b', text_lower):
-                return 0.9
-            return 0.0
-        
-        elif kp_name == "一般现在时":
-            # 检查频率副词
-            if re.search(r'\b(always|usually|often|sometimes|never)\b', text_lower):
-                return 0.9
-            if re.search(r'\bevery\s+(day|week|month|year)\b', text_lower):
-                return 0.9
-            return 0.0
-        
-        elif kp_name == "一般过去时":
-            # 检查过去时间
-            if re.search(r'\byesterday\b|\blast\s+(week|month|year)\b|\b\w+\s+ago\b', text_lower):
-                return 0.9
-            return 0.0
-        
-        elif kp_name == "现在完成时":
-            # 检查完成时标志
-            if re.search(r'\b(already|yet|just|ever|never|since|for)\b', text_lower):
-                return 0.9
-            return 0.0
-        
-        elif kp_name == "定语从句":
-            # 检查关系代词结构 - 更精确的模式
-            if re.search(r'\b(who|which|that|whom|whose)\s+', text_lower):
-                return 0.95
-            if re.search(r'\b(where|when|why)\s+', text_lower):
-                return 0.9
-            # 检查典型的定语从句结构
-            if re.search(r'the\s+\w+\s+___+\s+(is|are|was|were)', text_lower):
-                return 0.8  # "the man _____ is" 这种结构
-            return 0.0
-        
-        elif kp_name == "宾语从句":
-            # 检查宾语从句模式
-            if re.search(r'\b(think|know|believe|wonder|ask|tell)\s+(that|what|if|whether)\b', text_lower):
-                return 0.9
-            return 0.0
-        
-        return 0.0
+        """分析语言模式（基于语言学规律，规则见 linguistic_rules.LINGUISTIC_PATTERN_RULES）"""
+        return self.pattern_engine.score(question_text, kp_name)
 
 # 全局实例
 enhanced_knowledge_base = EnhancedKnowledgeBase()
@@ -0,0 +1,280 @@
+"""
+标注反馈准确率索引
+按 (知识点ID, 题型) 维护指数衰减的反馈准确率，常驻内存O(1)查询，
+本地快照持久化，可从标注历史全量重建
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterable, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+# 汇总所有题型的键
+ALL_TYPES = "*"
+
+
+class FeedbackAccuracyIndex:
+    """反馈准确率索引类"""
+
+    def __init__(self, snapshot_path: Optional[str] = None,
+                 half_life_days: float = 30.0,
+                 prior_accuracy: float = 0.75,
+                 prior_weight: float = 4.0,
+                 save_interval: float = 30.0):
+        """
+        Args:
+            snapshot_path: 快照文件路径
+            half_life_days: 反馈权重的半衰期（天）
+            prior_accuracy: 无反馈时的先验准确率（0.75对应加权0.1）
+            prior_weight: 先验相当于多少条反馈
+            save_interval: 两次自动保存快照的最小间隔（秒）
+        """
+        if snapshot_path is None:
+            history_dir = os.getenv("ANNOTATION_HISTORY_DIR", "data/annotation_history")
+            snapshot_path = os.path.join(history_dir, "feedback_index.json")
+        self.snapshot_path = snapshot_path
+        self.half_life_seconds = half_life_days * 86400
+        self.prior_accuracy = prior_accuracy
+        self.prior_weight = prior_weight
+        self.save_interval = save_interval
+
+        self._lock = threading.Lock()
+        # (kp_id, question_type) -> [衰减后的正确数, 衰减后的总数, 最后更新时间戳]
+        self._entries: Dict[Tuple[str, str], List[float]] = {}
+        self._loaded = False
+        # 全量重建期间到达的反馈 [(记录键, 题型, 标注, 时间戳)]，替换后补回；None表示未在重建
+        self._changed_during_rebuild: Optional[List[Tuple]] = None
+        self._rebuild_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self.last_rebuild: Optional[Dict[str, Any]] = None
+
+    # ===== 查询 =====
+
+    def get_accuracy(self, kp_id: str, question_type: Optional[str] = None) -> Tuple[float, float]:
+        """
+        平滑后的准确率和有效反馈量
+
+        Returns:
+            (准确率, 衰减后的反馈权重)。该题型无反馈时退回知识点整体
+        """
+        self._ensure_loaded()
+        now = time.time()
+        entry = self._entries.get((kp_id, question_type or ALL_TYPES))
+        if entry is None and question_type:
+            entry = self._entries.get((kp_id, ALL_TYPES))
+
+        correct = total = 0.0
+        if entry is not None:
+            factor = self._decay(now - entry[2])
+            correct, total = entry[0] * factor, entry[1] * factor
+
+        accuracy = (correct + self.prior_accuracy * self.prior_weight) / (total + self.prior_weight)
+        return accuracy, total
+
+    def get_boost(self, kp_id: str, question_type: Optional[str] = None) -> float:
+        """决策分数加权（-0.2 ~ 0.2），无反馈时为0.1"""
+        accuracy, _ = self.get_accuracy(kp_id, question_type)
+        return (accuracy - 0.5) * 0.4
+
+    # ===== 更新 =====
+
+    def update(self, question_type: str, annotations: Iterable[Dict[str, Any]],
+               timestamp: Optional[float] = None):
+        """
+        增量加入一次反馈
+
+        Args:
+            question_type: 题型
+            annotations: [{"kp_id": "xx", "is_correct": True}]
+            timestamp: 反馈时间（秒），默认当前时间
+        """
+        self._add(None, question_type, list(annotations), timestamp or time.time())
+
+    def record(self, feedback_record: Dict[str, Any]):
+        """增量加入一条标注历史中的反馈记录（与 rebuild 读取的记录格式相同）"""
+        self._add(
+            self._record_key(feedback_record),
+            feedback_record.get("question_type") or "",
+            feedback_record.get("annotations", []),
+            self._parse_timestamp(feedback_record.get("timestamp"))
+        )
+
+    def rebuild(self, feedback_records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        从标注历史中的反馈记录全量重建索引（构建完成后整体替换）
+
+        重建期间的增量反馈照常生效，并在替换时补回新索引；
+        已包含在 feedback_records 中的记录（按题目ID和时间戳识别）不重复计入
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._changed_during_rebuild = []
+            try:
+                started = time.perf_counter()
+                entries: Dict[Tuple[str, str], List[float]] = {}
+                seen = set()
+                count = 0
+                for record in feedback_records:
+                    self._apply(
+                        entries,
+                        record.get("question_type") or "",
+                        record.get("annotations", []),
+                        self._parse_timestamp(record.get("timestamp"))
+                    )
+                    seen.add(self._record_key(record))
+                    count += 1
+
+                with self._lock:
+                    for key, question_type, annotations, timestamp in self._changed_during_rebuild:
+                        if key is None or key not in seen:
+                            self._apply(entries, question_type, annotations, timestamp)
+                    self._entries = entries
+                    self._loaded = True
+                    self._dirty = True
+                    self.last_rebuild = {
+                        "timestamp": datetime.now().isoformat(),
+                        "feedback_records": count,
+                        "entries": len(entries),
+                        "duration_seconds": round(time.perf_counter() - started, 4)
+                    }
+            finally:
+                with self._lock:
+                    self._changed_during_rebuild = None
+        self.save()
+        logger.info(f"反馈准确率索引已重建: {count} 条反馈, {len(entries)} 个条目")
+        return self.last_rebuild
+
+    def _add(self, key: Optional[Tuple[str, str]], question_type: str,
+             annotations: List[Dict[str, Any]], timestamp: float):
+        self._ensure_loaded()
+        with self._lock:
+            self._apply(self._entries, question_type, annotations, timestamp)
+            if self._changed_during_rebuild is not None:
+                self._changed_during_rebuild.append((key, question_type, annotations, timestamp))
+            self._dirty = True
+        self._maybe_save()
+
+    @staticmethod
+    def _record_key(record: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        if not record.get("timestamp"):
+            return None
+        return str(record.get("question_id", "")), str(record["timestamp"])
+
+    def _apply(self, entries: Dict[Tuple[str, str], List[float]], question_type: str,
+               annotations: Iterable[Dict[str, Any]], timestamp: float):
+        for ann in annotations:
+            kp_id = str(ann.get("kp_id", ""))
+            if not kp_id:
+                continue
+            correct = 1.0 if ann.get("is_correct") else 0.0
+            keys = [(kp_id, ALL_TYPES)]
+            if question_type:
+                keys.append((kp_id, question_type))
+            for key in keys:
+                entry = entries.get(key)
+                if entry is None:
+                    entries[key] = [correct, 1.0, timestamp]
+                    continue
+                # 先把已有权重衰减到本次反馈的时间点，再累加
+                if timestamp >= entry[2]:
+                    factor = self._decay(timestamp - entry[2])
+                    entry[0] = entry[0] * factor + correct
+                    entry[1] = entry[1] * factor + 1.0
+                    entry[2] = timestamp
+                else:
+                    factor = self._decay(entry[2] - timestamp)
+                    entry[0] += correct * factor
+                    entry[1] += factor
+
+    def _decay(self, elapsed_seconds: float) -> float:
+        if elapsed_seconds <= 0 or self.half_life_seconds <= 0:
+            return 1.0
+        return 0.5 ** (elapsed_seconds / self.half_life_seconds)
+
+    @staticmethod
+    def _parse_timestamp(value: Optional[str]) -> float:
+        if not value:
+            return time.time()
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except (TypeError, ValueError):
+            return time.time()
+
+    # ===== 持久化 =====
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self.snapshot_path):
+                return
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._entries = {
+                    (item["kp_id"], item["question_type"]): [item["correct"], item["total"], item["updated_at"]]
+                    for item in data.get("entries", [])
+                }
+                self.last_rebuild = data.get("last_rebuild")
+                logger.info(f"已加载反馈准确率索引: {len(self._entries)} 个条目")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"加载反馈准确率索引失败: {e}")
+
+    def _maybe_save(self):
+        if self._dirty and time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self) -> bool:
+        """写入快照（先写临时文件再原子替换）"""
+        with self._lock:
+            data = {
+                "half_life_days": self.half_life_seconds / 86400,
+                "last_rebuild": self.last_rebuild,
+                "entries": [
+                    {"kp_id": kp_id, "question_type": question_type,
+                     "correct": entry[0], "total": entry[1], "updated_at": entry[2]}
+                    for (kp_id, question_type), entry in self._entries.items()
+                ]
+            }
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+            return True
+        except OSError as e:
+            logger.warning(f"保存反馈准确率索引失败: {e}")
+            return False
+
+    def summary(self) -> Dict[str, Any]:
+        """索引概览"""
+        self._ensure_loaded()
+        with self._lock:
+            per_type = [key for key in self._entries if key[1] != ALL_TYPES]
+            return {
+                "entries": len(self._entries),
+                "knowledge_points": len({kp_id for kp_id, _ in self._entries}),
+                "typed_entries": len(per_type),
+                "half_life_days": self.half_life_seconds / 86400,
+                "last_rebuild": self.last_rebuild
+            }
+
+
+# 全局反馈准确率索引
+feedback_index = FeedbackAccuracyIndex()
@@ -0,0 +1,277 @@
+"""
+图数据库流式备份与恢复
+按ID游标分页读取Neo4j，写成分块的NDJSON文件（可gzip压缩）并生成带校验和的manifest；
+导入时逐行读取并以固定大小的UNWIND批次写入，内存占用与数据量无关
+"""
+import os
+import gzip
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from backend.models.schema import GraphSchema
+from backend.services.delta_sync import (
+    to_json_value, edge_group_key, build_write_cypher, check_identifier
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _ChunkWriter:
+    """按行数切分的NDJSON分块写入器"""
+
+    def __init__(self, directory: str, prefix: str, kind: str, key: str,
+                 chunk_rows: int, compress: bool):
+        self.directory = directory
+        self.prefix = prefix
+        self.kind = kind
+        self.key = key
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self.chunks: List[Dict[str, Any]] = []
+        self._file = None
+        self._path = None
+        self._rows = 0
+
+    def write(self, row: Dict[str, Any]):
+        if self._file is None or self._rows >= self.chunk_rows:
+            self._rotate()
+        self._file.write(json.dumps(to_json_value(row), ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._rows += 1
+
+    def _rotate(self):
+        self._close_current()
+        suffix = ".ndjson.gz" if self.compress else ".ndjson"
+        name = f"{self.prefix}-{len(self.chunks):05d}{suffix}"
+        self._path = os.path.join(self.directory, name)
+        if self.compress:
+            self._file = gzip.open(self._path, "wt", encoding="utf-8")
+        else:
+            self._file = open(self._path, "w", encoding="utf-8")
+        self._rows = 0
+
+    def _close_current(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self.chunks.append({
+            "file": os.path.basename(self._path),
+            "kind": self.kind,
+            "key": self.key,
+            "rows": self._rows,
+            "bytes": os.path.getsize(self._path),
+            "sha256": _file_sha256(self._path)
+        })
+        self._file = None
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._close_current()
+        return self.chunks
+
+
+class GraphArchiveExporter:
+    """流式导出器"""
+
+    def __init__(self, driver, labels: Optional[List[str]] = None, page_size: int = 5000,
+                 chunk_rows: int = 100000, compress: bool = True, database: Optional[str] = None):
+        """
+        Args:
+            driver: Neo4j驱动
+            labels: 导出的节点标签，默认GraphSchema中的全部标签
+            page_size: 每次查询读取的行数（游标分页）
+            chunk_rows: 每个分块文件的最大行数
+            compress: 是否gzip压缩
+        """
+        self.driver = driver
+        self.labels = [check_identifier(l) for l in (labels or list(GraphSchema.NODE_LABELS.keys()))]
+        self.page_size = page_size
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self.session_config = {"database": database} if database else {}
+
+    def export(self, directory: str) -> Dict[str, Any]:
+        """导出到目录，返回manifest"""
+        os.makedirs(directory, exist_ok=True)
+        chunks: List[Dict[str, Any]] = []
+        totals = {"nodes": {}, "edges": {}}
+
+        with self.driver.session(**self.session_config) as session:
+            for label in self.labels:
+                writer = _ChunkWriter(directory, f"nodes-{label}", "nodes", label, self.chunk_rows, self.compress)
+                count = 0
+                for row in self._iter_nodes(session, label):
+                    writer.write(row)
+                    count += 1
+                chunks.extend(writer.close())
+                totals["nodes"][label] = count
+                logger.info(f"导出节点 {label}: {count}")
+
+            for rel_type, start_label, end_label in self._edge_groups(session):
+                key = edge_group_key(rel_type, start_label, end_label)
+                writer = _ChunkWriter(directory, f"edges-{start_label}-{rel_type}-{end_label}", "edges", key,
+                                      self.chunk_rows, self.compress)
+                count = 0
+                for row in self._iter_edges(session, rel_type, start_label, end_label):
+                    writer.write(row)
+                    count += 1
+                chunks.extend(writer.close())
+                totals["edges"][key] = count
+                logger.info(f"导出关系 {key}: {count}")
+
+        manifest = {
+            "format": "k12-graph-ndjson",
+            "version": FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "compressed": self.compress,
+            "totals": totals,
+            "chunks": chunks
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+    def _iter_nodes(self, session, label: str) -> Iterator[Dict[str, Any]]:
+        # 按id做键集分页，每页一个短查询，避免长事务和OFFSET扫描
+        cypher = f"""
+            MATCH (n:{label})
+            WHERE n.id IS NOT NULL AND ($after IS NULL OR n.id > $after)
+            RETURN n.id AS id, properties(n) AS props
+            ORDER BY n.id
+            LIMIT $limit
+        """
+        after = None
+        while True:
+            records = list(session.run(cypher, {"after": after, "limit": self.page_size}))
+            for record in records:
+                yield {"id": record["id"], "props": dict(record["props"])}
+            if len(records) < self.page_size:
+                return
+            after = records[-1]["id"]
+
+    def _edge_groups(self, session) -> List[Tuple[str, str, str]]:
+        groups = []
+        for start_label in self.labels:
+            for end_label in self.labels:
+                result = session.run(
+                    f"MATCH (:{start_label})-[r]->(:{end_label}) RETURN DISTINCT type(r) AS type"
+                )
+                groups.extend((record["type"], start_label, end_label) for record in result)
+        return groups
+
+    def _iter_edges(self, session, rel_type: str, start_label: str, end_label: str) -> Iterator[Dict[str, Any]]:
+        # 按起点id分页：每页取page_size个起点及其全部出边
+        rel_type = check_identifier(rel_type)
+        cypher = f"""
+            MATCH (a:{start_label})
+            WHERE a.id IS NOT NULL AND ($after IS NULL OR a.id > $after)
+            WITH a ORDER BY a.id LIMIT $limit
+            OPTIONAL MATCH (a)-[r:{rel_type}]->(b:{end_label})
+            WHERE b.id IS NOT NULL
+            RETURN a.id AS start, b.id AS end, properties(r) AS props
+            ORDER BY start
+        """
+        after = None
+        while True:
+            starts = 0
+            last_start = None
+            seen = set()
+            for record in session.run(cypher, {"after": after, "limit": self.page_size}):
+                if record["start"] != last_start:
+                    starts += 1
+                    last_start = record["start"]
+                if record["end"] is None:
+                    continue
+                # 重复边只导出一条
+                pair = (record["start"], record["end"])
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield {"start": record["start"], "end": record["end"], "props": dict(record["props"] or {})}
+            if starts < self.page_size:
+                return
+            after = last_start
+
+
+class GraphArchiveImporter:
+    """流式导入器"""
+
+    def __init__(self, driver, batch_size: int = 1000, database: Optional[str] = None):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.session_config = {"database": database} if database else {}
+
+    @staticmethod
+    def load_manifest(directory: str) -> Dict[str, Any]:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的备份格式版本: {manifest.get('version')}")
+        return manifest
+
+    def verify(self, directory: str) -> List[str]:
+        """校验全部分块，返回校验失败的文件名"""
+        manifest = self.load_manifest(directory)
+        failed = []
+        for chunk in manifest["chunks"]:
+            path = os.path.join(directory, chunk["file"])
+            if not os.path.exists(path) or _file_sha256(path) != chunk["sha256"]:
+                failed.append(chunk["file"])
+        return failed
+
+    def import_archive(self, directory: str, verify: bool = True) -> Dict[str, Any]:
+        """
+        导入备份（先全部节点，再全部关系），MERGE语义可重复执行
+
+        Returns:
+            各分组导入的行数
+        """
+        manifest = self.load_manifest(directory)
+        if verify:
+            failed = self.verify(directory)
+            if failed:
+                raise ValueError(f"备份文件校验失败: {', '.join(failed)}")
+
+        imported = {"nodes": {}, "edges": {}}
+        ordered = [c for c in manifest["chunks"] if c["kind"] == "nodes"] + \
+                  [c for c in manifest["chunks"] if c["kind"] == "edges"]
+
+        with self.driver.session(**self.session_config) as session:
+            for chunk in ordered:
+                op = "upsert_nodes" if chunk["kind"] == "nodes" else "upsert_edges"
+                cypher = build_write_cypher(op, chunk["key"])
+                count = 0
+                for rows in self._iter_batches(os.path.join(directory, chunk["file"])):
+                    session.execute_write(lambda tx: tx.run(cypher, {"rows": rows}).consume())
+                    count += len(rows)
+                group = imported[chunk["kind"]]
+                group[chunk["key"]] = group.get(chunk["key"], 0) + count
+                logger.info(f"导入 {chunk['file']}: {count} 行")
+
+        return imported
+
+    def _iter_batches(self, path: str) -> Iterator[List[Dict[str, Any]]]:
+        opener = gzip.open if path.endswith(".gz") else open
+        batch = []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
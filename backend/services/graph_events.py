@@ -0,0 +1,351 @@
+"""
+图数据变更事件总线
+Neo4jService 的写方法和数据导入路由在写入成功后发布带类型的变更事件（实体、操作、ID），
+事件推进全局版本号并同步分发给进程内订阅者；配置 GRAPH_EVENT_BROKER 后，
+事件同时写入本地SQLite代理，同一主机上的其他worker进程在读取前拉取并重放，
+使各进程的缓存按实体精确失效，而不是依赖TTL
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple, Union, NamedTuple
+
+from dotenv import load_dotenv
+
+from backend.services.graph_version import GraphVersion, graph_version, is_write_query, ALL_ENTITIES
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+# 本进程标识，区分事件来源
+PROCESS_ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class GraphChange(NamedTuple):
+    """一次图数据变更"""
+    version: int
+    entities: Tuple[str, ...]   # 节点标签 / 关系类型，"*" 表示范围未知
+    kind: str                   # created / updated / deleted / linked / bulk_load / write
+    ids: Tuple[str, ...]
+    source: str
+    origin: str
+    timestamp: float
+
+    @property
+    def remote(self) -> bool:
+        return self.origin != PROCESS_ORIGIN
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self._asdict()
+        data["remote"] = self.remote
+        return data
+
+
+class ChangeBuilder:
+    """change() 上下文中收集受影响的ID"""
+
+    def __init__(self, entities: Tuple[str, ...], kind: str, ids: Iterable[str], source: str):
+        self.entities = entities
+        self.kind = kind
+        self.ids = list(ids)
+        self.source = source
+
+
+class SqliteEventBroker:
+    """
+    基于SQLite的本地事件代理（同一主机多个worker进程共享）
+
+    自增主键即全局版本号；只保留最近 retain 条事件
+    """
+
+    def __init__(self, path: str, retain: int = 10000):
+        self.path = path
+        self.retain = retain
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    origin TEXT, entities TEXT, kind TEXT, ids TEXT, source TEXT, ts REAL
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('broker_id', ?)",
+                               (uuid.uuid4().hex[:8],))
+            self.broker_id = self._conn.execute("SELECT value FROM meta WHERE key = 'broker_id'").fetchone()[0]
+
+    def latest_seq(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+        return row[0] if row else 0
+
+    def append(self, origin: str, entities: Tuple[str, ...], kind: str, ids: Tuple[str, ...],
+               source: str, timestamp: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO events (origin, entities, kind, ids, source, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                (origin, json.dumps(entities), kind, json.dumps(ids, ensure_ascii=False), source, timestamp)
+            )
+            seq = cursor.lastrowid
+            if seq % 1000 == 0:
+                self._conn.execute("DELETE FROM events WHERE seq <= ?", (seq - self.retain,))
+        return seq
+
+    def read_since(self, seq: int, limit: int = 1000) -> List[GraphChange]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, entities, kind, ids, source, origin, ts FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit)
+            ).fetchall()
+        return [
+            GraphChange(row[0], tuple(json.loads(row[1])), row[2], tuple(json.loads(row[3])), row[4], row[5], row[6])
+            for row in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GraphEventBus:
+    """变更事件总线"""
+
+    def __init__(self, version: Optional[GraphVersion] = None, broker: Optional[SqliteEventBroker] = None,
+                 poll_interval: float = 0.5, history_size: int = 200):
+        self.version = version or graph_version
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.history_size = history_size
+        self._subscribers: List[Tuple[Callable[[GraphChange], None], Optional[frozenset]]] = []
+        self._history: List[GraphChange] = []
+        self._lock = threading.RLock()
+        self._last_seq = 0
+        self._last_poll = 0.0
+        # change() 上下文内由类型化事件覆盖，驱动层不再发布通用写事件
+        self._in_change: ContextVar[bool] = ContextVar("graph_change_scope", default=False)
+        if broker is not None:
+            self._last_seq = broker.latest_seq()
+            self.version.reset(broker.broker_id, self._last_seq)
+
+    def subscribe(self, callback: Callable[[GraphChange], None],
+                  entities: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """
+        订阅变更事件
+
+        Args:
+            callback: 回调函数，在发布线程中同步调用
+            entities: 只接收涉及这些实体的事件（范围未知的写事件总会送达），为空时接收全部
+
+        Returns:
+            取消订阅的函数
+        """
+        subscription = (callback, frozenset(entities) if entities else None)
+        with self._lock:
+            self._subscribers.append(subscription)
+
+        def unsubscribe():
+            with self._lock:
+                if subscription in self._subscribers:
+                    self._subscribers.remove(subscription)
+        return unsubscribe
+
+    def publish(self, entities: Union[str, Iterable[str]], kind: str, ids: Iterable[str] = (),
+                source: str = "") -> GraphChange:
+        """发布变更事件（写入成功后调用）"""
+        entities = (entities,) if isinstance(entities, str) else tuple(entities)
+        ids = tuple(str(i) for i in ids)
+        timestamp = time.time()
+
+        if self.broker is not None:
+            # 先重放其他进程的事件，保证版本号按序推进
+            self.poll(force=True)
+            try:
+                seq = self.broker.append(PROCESS_ORIGIN, entities, kind, ids, source, timestamp)
+                # 不推进读取位置：其他进程可能在两次操作之间写入了更小的序号，由下次poll补齐
+                self.version.advance(seq, entities)
+                version = seq
+            except sqlite3.Error as e:
+                logger.warning(f"变更事件写入代理失败，仅在本进程生效: {e}")
+                version = self.version.bump(entities)
+        else:
+            version = self.version.bump(entities)
+
+        event = GraphChange(version, entities, kind, ids, source, PROCESS_ORIGIN, timestamp)
+        self._dispatch(event)
+        return event
+
+    @contextmanager
+    def change(self, entities: Union[str, Iterable[str]], kind: str, ids: Iterable[str] = (), source: str = ""):
+        """
+        在上下文中执行写操作，退出后发布一个类型化事件
+        （异常退出时同样发布：批量写入中途失败时已写入的部分也需要让缓存失效）
+
+            with graph_events.change("Question", "created", source="create_question") as change:
+                ...
+                change.ids.append(question_id)
+        """
+        entities = (entities,) if isinstance(entities, str) else tuple(entities)
+        builder = ChangeBuilder(entities, kind, ids, source)
+        token = self._in_change.set(True)
+        try:
+            yield builder
+        finally:
+            self._in_change.reset(token)
+            self.publish(builder.entities, builder.kind, builder.ids, builder.source)
+
+    def in_change(self) -> bool:
+        return self._in_change.get()
+
+    def poll(self, force: bool = False) -> int:
+        """
+        拉取其他进程发布的事件并分发给本进程订阅者（按 poll_interval 节流）
+
+        Returns:
+            重放的事件数
+        """
+        if self.broker is None:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return 0
+        self._last_poll = now
+
+        replayed = 0
+        try:
+            with self._lock:
+                events = self.broker.read_since(self._last_seq)
+                if events:
+                    self._last_seq = events[-1].version
+        except sqlite3.Error as e:
+            logger.warning(f"读取变更事件失败: {e}")
+            return 0
+        for event in events:
+            self.version.advance(event.version, event.entities)
+            if event.remote:
+                self._dispatch(event)
+                replayed += 1
+        return replayed
+
+    def recent(self, limit: int = 50) -> List[GraphChange]:
+        with self._lock:
+            return list(reversed(self._history[-limit:]))
+
+    def _dispatch(self, event: GraphChange):
+        with self._lock:
+            self._history.append(event)
+            del self._history[:-self.history_size]
+            subscribers = list(self._subscribers)
+        touched = set(event.entities)
+        for callback, entities in subscribers:
+            if entities is not None and ALL_ENTITIES not in touched and not (entities & touched):
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"变更事件订阅者执行失败: {e}")
+
+
+class _EventSession:
+    """
+    驱动层兜底：change() 之外的写操作发布范围未知的通用写事件
+
+    自动提交的 session.run 在结果被读取或会话关闭时才提交，事件推迟到会话关闭后发布，
+    避免订阅者在写入生效前刷新缓存又读到旧数据；事务函数返回时已提交，立即发布
+    """
+
+    def __init__(self, session, bus: GraphEventBus):
+        self._session = session
+        self._bus = bus
+        self._pending = False
+
+    def _written(self, source: str):
+        if not self._bus.in_change():
+            self._bus.publish(ALL_ENTITIES, "write", source=source)
+
+    def _flush(self):
+        if self._pending:
+            self._pending = False
+            self._bus.publish(ALL_ENTITIES, "write", source="session.run")
+
+    def run(self, query, parameters=None, **kwargs):
+        result = self._session.run(query, parameters, **kwargs)
+        if is_write_query(query) and not self._bus.in_change():
+            self._pending = True
+        return result
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        result = self._session.execute_write(transaction_function, *args, **kwargs)
+        self._written("execute_write")
+        return result
+
+    def write_transaction(self, transaction_function, *args, **kwargs):
+        result = self._session.write_transaction(transaction_function, *args, **kwargs)
+        self._written("write_transaction")
+        return result
+
+    def close(self):
+        try:
+            self._session.close()
+        finally:
+            self._flush()
+
+    def __enter__(self):
+        self._session.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return self._session.__exit__(exc_type, exc, tb)
+        finally:
+            self._flush()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class _EventDriver:
+    """Neo4j驱动代理，返回跟踪写操作的会话"""
+
+    def __init__(self, driver, bus: GraphEventBus):
+        self._driver = driver
+        self._bus = bus
+
+    def session(self, **config):
+        return _EventSession(self._driver.session(**config), self._bus)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def track_writes(driver, bus: Optional[GraphEventBus] = None):
+    """为Neo4j驱动添加写操作跟踪"""
+    if driver is None:
+        return driver
+    return _EventDriver(driver, bus or graph_events)
+
+
+def _create_default_bus() -> GraphEventBus:
+    broker = None
+    path = os.getenv("GRAPH_EVENT_BROKER", "")
+    if path and path.lower() not in ("off", "false", "0"):
+        try:
+            broker = SqliteEventBroker(path)
+        except Exception as e:
+            logger.warning(f"变更事件代理初始化失败，仅在进程内分发: {e}")
+    return GraphEventBus(broker=broker, poll_interval=float(os.getenv("GRAPH_EVENT_POLL_INTERVAL", "0.5")))
+
+
+# 全局事件总线
+graph_events = _create_default_bus()
@@ -0,0 +1,104 @@
+"""
+图数据版本号
+单调递增的全局版本号，并记录每类实体（节点标签/关系类型）最近一次变更时的版本号，
+供HTTP缓存生成ETag、各类缓存按依赖的实体精确判断是否失效。
+版本号由变更事件总线（graph_events）推进
+"""
+import os
+import re
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+# 出现这些子句的查询视为写操作（只读查询中不会出现）
+WRITE_CLAUSE = re.compile(r"\b(?:CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b", re.IGNORECASE)
+
+# 未知范围的写操作（如路由中直接执行的Cypher）影响全部实体
+ALL_ENTITIES = "*"
+
+
+def is_write_query(query) -> bool:
+    text = getattr(query, "text", query)
+    return isinstance(text, str) and WRITE_CLAUSE.search(text) is not None
+
+
+def deployment_scope() -> str:
+    """
+    未接入跨进程代理时的版本号作用域：GRAPH_VERSION_SCOPE（部署标识），未配置时由数据库地址派生
+
+    同一部署的各worker（及重启后的进程）因此生成相同的ETag，可以互相验证客户端缓存；
+    它们各自的版本号只随本进程感知到的写操作推进，由此产生的陈旧时间由响应缓存的TTL分段限制
+    """
+    configured = os.getenv("GRAPH_VERSION_SCOPE")
+    if configured:
+        return configured
+    source = f"{os.getenv('NEO4J_URI', 'bolt://localhost:7687')}/{os.getenv('NEO4J_DATABASE', '')}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+
+
+class GraphVersion:
+    """图数据版本号"""
+
+    def __init__(self, scope: Optional[str] = None):
+        # 版本号作用域：默认为部署标识，接入跨进程代理后切换为代理标识（版本号由代理统一分配）
+        self.scope = scope or deployment_scope()
+        self._version = 0
+        self._entity_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return self._version
+
+    def token(self) -> str:
+        """用于ETag的版本标识"""
+        return f"{self.scope}.{self._version}"
+
+    def entity_versions(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._entity_versions)
+
+    def version_of(self, entities: Iterable[str]) -> int:
+        """给定实体最近一次变更时的版本号（未知范围的写操作计入所有实体）"""
+        versions = self._entity_versions
+        latest = versions.get(ALL_ENTITIES, 0)
+        for entity in entities:
+            latest = max(latest, versions.get(entity, 0))
+        return latest
+
+    def bump(self, entities: Iterable[str] = (ALL_ENTITIES,)) -> int:
+        """本地递增版本号并返回新版本"""
+        with self._lock:
+            self._version += 1
+            self._mark(self._version, entities)
+            return self._version
+
+    def advance(self, version: int, entities: Iterable[str] = (ALL_ENTITIES,)):
+        """推进到指定版本（版本号由跨进程代理分配时使用）"""
+        with self._lock:
+            if version > self._version:
+                self._version = version
+            self._mark(version, entities)
+
+    def reset(self, scope: str, version: int):
+        """切换作用域（接入跨进程代理时），此前的实体版本全部作废"""
+        with self._lock:
+            self.scope = scope
+            self._version = version
+            self._entity_versions = {ALL_ENTITIES: version}
+
+    def _mark(self, version: int, entities: Iterable[str]):
+        for entity in entities:
+            if version > self._entity_versions.get(entity, 0):
+                self._entity_versions[entity] = version
+
+
+# 全局版本号
+graph_version = GraphVersion()
@@ -0,0 +1,355 @@
+"""
+知识库二进制制品（启动缓存）
+构建阶段把关键词表、增强知识库、开源数据和黄金语料构建出的dict/list用marshal序列化到一个带版本的文件，
+运行时各分段在首次访问时从只读映射中解码，代替在每个进程里执行大段字面量构建代码。
+
+制品只缩短启动时间：
+- 只保存普通数据，不包含匹配器（正则、规则引擎等仍由各服务在运行时从这些数据构建）
+- 解码出的对象是每个进程私有的，各worker的内存占用与不使用制品时相同；
+  mmap只是按分段读取文件的方式，进程间共享的仅是文件本身的页缓存
+
+文件格式:
+    MAGIC(8) | 格式版本 uint16 | 目录长度 uint32 | 目录JSON | 分段数据...
+    目录记录每个分段的偏移、长度、sha256，以及构建时各源文件的大小、修改时间和内容摘要；
+    源文件有改动或Python版本不一致时制品视为过期，调用方回退到原有构建逻辑
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import marshal
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"K12KB\x00\x00\x01"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sHI")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ARTIFACT_PATH = os.path.join("data", "kb_artifact.bin")
+
+# 制品内容来源；任一文件变化都会使已构建的制品失效
+SOURCE_FILES = [
+    "backend/services/nlp_service_light.py",
+    "backend/services/nlp_service.py",
+    "backend/services/enhanced_knowledge_base.py",
+    "backend/services/open_source_data.py",
+    "backend/services/comprehensive_question_bank.py",
+    "backend/services/real_dataset_integrator.py",
+    "backend/services/final_question_batch.py",
+    "enhanced_keyword_patterns_simple.json",
+]
+
+
+def source_stats(root: str = PROJECT_ROOT) -> Dict[str, Optional[List[int]]]:
+    """源文件的 [大小, 修改时间ns]（缺失的文件为None），启动时据此快速判断制品是否过期"""
+    stats = {}
+    for rel_path in SOURCE_FILES:
+        try:
+            st = os.stat(os.path.join(root, rel_path))
+            stats[rel_path] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            stats[rel_path] = None
+    return stats
+
+
+def source_digest(root: str = PROJECT_ROOT) -> str:
+    """源文件摘要（缺失的文件按空内容计入）"""
+    digest = hashlib.sha256()
+    for rel_path in SOURCE_FILES:
+        digest.update(rel_path.encode("utf-8") + b"\x00")
+        path = os.path.join(root, rel_path)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _python_tag() -> str:
+    # marshal格式只保证同一Python小版本内兼容
+    return f"{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+class KnowledgeBaseArtifact:
+    """只读映射的知识库制品"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"知识库制品为空文件: {path}")
+
+        magic, version, toc_length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"不是知识库制品文件: {path}")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"不支持的知识库制品版本: {version}")
+
+        toc_start = _HEADER.size
+        toc = json.loads(bytes(self._map[toc_start:toc_start + toc_length]).decode("utf-8"))
+        self.metadata: Dict[str, Any] = toc["metadata"]
+        self._sections: Dict[str, Dict[str, Any]] = toc["sections"]
+        self._data_start = toc_start + toc_length
+        self._decoded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def sections(self) -> List[str]:
+        return list(self._sections.keys())
+
+    def has(self, name: str) -> bool:
+        return name in self._sections
+
+    def section(self, name: str, verify: bool = False) -> Any:
+        """解码分段（每个进程只解码一次）；分段不存在时返回None"""
+        if name in self._decoded:
+            return self._decoded[name]
+        entry = self._sections.get(name)
+        if entry is None:
+            return None
+
+        with self._lock:
+            if name in self._decoded:
+                return self._decoded[name]
+            start = self._data_start + entry["offset"]
+            view = memoryview(self._map)[start:start + entry["length"]]
+            try:
+                if verify and hashlib.sha256(view).hexdigest() != entry["sha256"]:
+                    raise ValueError(f"知识库制品分段校验失败: {name}")
+                value = marshal.loads(view)
+            finally:
+                view.release()
+            self._decoded[name] = value
+        return value
+
+    def verify(self) -> List[str]:
+        """校验全部分段，返回校验失败的分段名"""
+        failed = []
+        for name, entry in self._sections.items():
+            start = self._data_start + entry["offset"]
+            view = memoryview(self._map)[start:start + entry["length"]]
+            try:
+                if hashlib.sha256(view).hexdigest() != entry["sha256"]:
+                    failed.append(name)
+            finally:
+                view.release()
+        return failed
+
+    def is_current(self, root: str = PROJECT_ROOT) -> bool:
+        """
+        制品是否与当前源文件和Python版本一致
+
+        源文件大小和修改时间都与构建时相同时直接视为一致，不读取文件内容；
+        不同时（如重新检出代码只更新了修改时间）再比较内容摘要
+        """
+        if self.metadata.get("python") != _python_tag():
+            return False
+        if self.metadata.get("source_stats") == source_stats(root):
+            return True
+        return self.metadata.get("source_digest") == source_digest(root)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "bytes": len(self._map),
+            "metadata": self.metadata,
+            "sections": {
+                name: {"bytes": entry["length"], "decoded": name in self._decoded}
+                for name, entry in self._sections.items()
+            }
+        }
+
+    def close(self):
+        self._decoded.clear()
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+
+def write_artifact(path: str, sections: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    写入知识库制品（先写临时文件再原子替换，正在映射旧文件的进程不受影响）
+
+    Args:
+        path: 输出路径
+        sections: 分段名 -> 可被marshal序列化的数据（dict/list/str/数字等）
+        metadata: 附加的构建信息
+
+    Returns:
+        制品目录（metadata + sections）
+    """
+    payloads = []
+    toc_sections = {}
+    offset = 0
+    for name, value in sections.items():
+        data = marshal.dumps(value)
+        toc_sections[name] = {"offset": offset, "length": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        payloads.append(data)
+        offset += len(data)
+
+    toc = {
+        "metadata": {
+            "created_at": datetime.now().isoformat(),
+            "python": _python_tag(),
+            "source_digest": source_digest(),
+            "source_stats": source_stats(),
+            **(metadata or {})
+        },
+        "sections": toc_sections
+    }
+    toc_bytes = json.dumps(toc, ensure_ascii=False).encode("utf-8")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(toc_bytes)))
+        f.write(toc_bytes)
+        for data in payloads:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return toc
+
+
+# ===== 构建 =====
+# 关键词表只收录源代码中的内置表，热更新的覆盖表（annotation_tables）不写入制品
+
+def _nlp_light_sections() -> Dict[str, Any]:
+    from backend.services.nlp_service_light import nlp_service
+    return {"nlp_light.keyword_patterns": nlp_service._build_keyword_patterns()}
+
+
+def _nlp_sections() -> Dict[str, Any]:
+    from backend.services.nlp_service import nlp_service
+    return {"nlp.keyword_patterns": nlp_service._build_keyword_patterns()}
+
+
+def _enhanced_kb_sections() -> Dict[str, Any]:
+    from backend.services.enhanced_knowledge_base import enhanced_knowledge_base
+    return {
+        "enhanced_kb.knowledge_base": enhanced_knowledge_base._build_enhanced_knowledge_base(),
+        "enhanced_kb.grade_mapping": enhanced_knowledge_base.grade_mapping,
+    }
+
+
+def _open_source_sections() -> Dict[str, Any]:
+    from backend.services.open_source_data import open_source_integrator
+    return {"open_source.integrated_data": open_source_integrator.integrated_data}
+
+
+def _question_bank_sections() -> Dict[str, Any]:
+    from backend.services.comprehensive_question_bank import comprehensive_question_bank
+    return {
+        "question_bank.questions": comprehensive_question_bank.question_bank,
+        "question_bank.knowledge_points": comprehensive_question_bank.knowledge_points,
+    }
+
+
+def _keyword_file_sections() -> Dict[str, Any]:
+    with open(os.path.join(PROJECT_ROOT, "enhanced_keyword_patterns_simple.json"), "r", encoding="utf-8") as f:
+        return {"enhanced_keyword_patterns": json.load(f)}
+
+
+def _golden_corpus_sections() -> Dict[str, Any]:
+    from benchmarks.golden_corpus import load_golden_corpus
+    questions, corpus_info = load_golden_corpus(use_artifact=False)
+    return {"golden_corpus": {"questions": questions, "corpus_info": corpus_info}}
+
+
+# 来源名称 -> 分段构建函数；依赖缺失（如完整版NLP需要jieba）的来源跳过
+SECTION_BUILDERS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "nlp_light": _nlp_light_sections,
+    "nlp": _nlp_sections,
+    "enhanced_kb": _enhanced_kb_sections,
+    "open_source": _open_source_sections,
+    "question_bank": _question_bank_sections,
+    "keyword_file": _keyword_file_sections,
+    "golden_corpus": _golden_corpus_sections,
+}
+
+
+def build_artifact(path: str = DEFAULT_ARTIFACT_PATH, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    从源模块构建知识库制品
+
+    构建期间禁用已有制品，保证读取的是源代码中的最新数据
+
+    Returns:
+        {"toc": 制品目录, "skipped": {来源: 错误信息}}
+    """
+    global _artifact, _artifact_loaded
+    previous_setting = os.environ.get("KB_ARTIFACT_PATH")
+    os.environ["KB_ARTIFACT_PATH"] = "off"
+    _artifact, _artifact_loaded = None, True
+    try:
+        sections: Dict[str, Any] = {}
+        skipped: Dict[str, str] = {}
+        for name in sources or list(SECTION_BUILDERS.keys()):
+            try:
+                sections.update(SECTION_BUILDERS[name]())
+            except Exception as e:
+                logger.warning(f"知识库来源 {name} 构建失败，已跳过: {e.__class__.__name__}: {e}")
+                skipped[name] = f"{e.__class__.__name__}: {e}"
+        toc = write_artifact(path, sections, {"skipped_sources": skipped})
+    finally:
+        if previous_setting is None:
+            os.environ.pop("KB_ARTIFACT_PATH", None)
+        else:
+            os.environ["KB_ARTIFACT_PATH"] = previous_setting
+        _artifact, _artifact_loaded = None, False
+    return {"toc": toc, "skipped": skipped}
+
+
+# ===== 运行时访问 =====
+
+_artifact: Optional[KnowledgeBaseArtifact] = None
+_artifact_loaded = False
+_artifact_lock = threading.Lock()
+
+
+def get_artifact() -> Optional[KnowledgeBaseArtifact]:
+    """
+    进程内共享的制品实例；未构建、已过期或 KB_ARTIFACT_PATH=off 时返回None
+
+    相对路径按项目根目录解析
+    """
+    global _artifact, _artifact_loaded
+    if _artifact_loaded:
+        return _artifact
+    with _artifact_lock:
+        if _artifact_loaded:
+            return _artifact
+        path = os.getenv("KB_ARTIFACT_PATH", DEFAULT_ARTIFACT_PATH)
+        if path.lower() not in ("", "off", "false", "0"):
+            if not os.path.isabs(path):
+                path = os.path.join(PROJECT_ROOT, path)
+            if os.path.exists(path):
+                try:
+                    artifact = KnowledgeBaseArtifact(path)
+                    if artifact.is_current():
+                        _artifact = artifact
+                        logger.info(f"已映射知识库制品 {path}（{len(artifact.sections())} 个分段）")
+                    else:
+                        artifact.close()
+                        logger.warning(f"知识库制品已过期，使用源代码构建: {path}")
+                except Exception as e:
+                    logger.warning(f"知识库制品加载失败，使用源代码构建: {e}")
+        _artifact_loaded = True
+    return _artifact
+
+
+def load_section(name: str) -> Any:
+    """读取制品分段，制品或分段不可用时返回None（调用方回退到原有构建逻辑）"""
+    artifact = get_artifact()
+    return artifact.section(name) if artifact is not None else None
@@ -0,0 +1,184 @@
+"""
+关键词扩展缓存
+离线用WordNet/spaCy计算每个关键词的同义词、相关词和语法形式，持久化为JSON；
+运行时的词库增强直接查缓存，不再需要下载语料或加载spaCy模型，结果确定且可复现
+"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_PATH = os.path.join("data", "keyword_expansions.json")
+EXPANSION_KINDS = ("synonyms", "related", "forms")
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+class KeywordExpansionCache:
+    """
+    关键词扩展缓存
+
+    每个关键词一条记录:
+        synonyms: 同义词
+        related: 上位词/下位词/部分词
+        forms: [词根, 词性] 列表（spaCy分析结果）
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("KEYWORD_EXPANSION_CACHE", DEFAULT_CACHE_PATH)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.metadata: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_FORMAT_VERSION:
+                logger.warning(f"关键词扩展缓存版本不匹配，忽略: {self.path}")
+                return
+            self.entries = data.get("entries", {})
+            self.metadata = data.get("metadata", {})
+        except Exception as e:
+            logger.warning(f"关键词扩展缓存加载失败: {e}")
+
+    def __contains__(self, keyword: str) -> bool:
+        return normalize_keyword(keyword) in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, keyword: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(normalize_keyword(keyword))
+
+    def put(self, keyword: str, synonyms: Iterable[str] = (), related: Iterable[str] = (),
+            forms: Iterable[Tuple[str, str]] = ()):
+        """写入一个关键词的扩展（排序后存储，保证输出确定）"""
+        entry = {
+            "synonyms": sorted(set(synonyms)),
+            "related": sorted(set(related)),
+            "forms": sorted({(lemma, pos) for lemma, pos in forms})
+        }
+        entry["forms"] = [list(pair) for pair in entry["forms"]]
+        with self._lock:
+            self.entries[normalize_keyword(keyword)] = entry
+
+    def missing(self, keywords: Iterable[str]) -> List[str]:
+        """缓存中没有的关键词（去重、保持顺序）"""
+        seen: Set[str] = set()
+        result = []
+        for keyword in keywords:
+            key = normalize_keyword(keyword)
+            if key and key not in self.entries and key not in seen:
+                seen.add(key)
+                result.append(keyword)
+        return result
+
+    def synonyms(self, keyword: str) -> Set[str]:
+        entry = self.get(keyword)
+        return set(entry["synonyms"]) if entry else set()
+
+    def related(self, keyword: str) -> Set[str]:
+        entry = self.get(keyword)
+        return set(entry["related"]) if entry else set()
+
+    def lemmas(self, keyword: str) -> Set[str]:
+        entry = self.get(keyword)
+        return {lemma for lemma, _ in entry["forms"]} if entry else set()
+
+    def grammatical_forms(self, keyword: str) -> Set[str]:
+        """与 WordNetEnhancer.get_grammatical_forms 相同的输出（词根 + 词根_词性）"""
+        entry = self.get(keyword)
+        if not entry:
+            return set()
+        forms = set()
+        for lemma, pos in entry["forms"]:
+            forms.add(lemma)
+            forms.add(f"{lemma}_{pos}")
+        return forms
+
+    def expand(self, keyword: str, kinds: Iterable[str] = EXPANSION_KINDS) -> Set[str]:
+        """按类型合并扩展词（forms 只取词根）"""
+        expanded = set()
+        if "synonyms" in kinds:
+            expanded |= self.synonyms(keyword)
+        if "related" in kinds:
+            expanded |= self.related(keyword)
+        if "forms" in kinds:
+            expanded |= self.lemmas(keyword)
+        return expanded
+
+    def save(self, metadata: Optional[Dict[str, Any]] = None):
+        """原子写入（排序后的JSON，便于版本管理和比对）"""
+        with self._lock:
+            if metadata:
+                self.metadata.update(metadata)
+            self.metadata["updated_at"] = datetime.now().isoformat()
+            data = {"version": CACHE_FORMAT_VERSION, "metadata": self.metadata, "entries": self.entries}
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def build_expansions(keywords: Iterable[str], cache: KeywordExpansionCache, enhancer=None,
+                     refresh: bool = False) -> Dict[str, Any]:
+    """
+    离线计算关键词扩展并写入缓存
+
+    Args:
+        keywords: 待扩展的关键词
+        cache: 目标缓存
+        enhancer: WordNetEnhancer实例，默认新建（需要nltk和spaCy）
+        refresh: 为True时重新计算已缓存的关键词
+
+    Returns:
+        构建统计
+    """
+    keywords = list(keywords)
+    pending = cache.missing(keywords) if not refresh else list(dict.fromkeys(keywords))
+    if not pending:
+        return {"requested": len(keywords), "computed": 0, "cached": len(cache)}
+
+    if enhancer is None:
+        from backend.services.wordnet_enhancer import WordNetEnhancer
+        enhancer = WordNetEnhancer(cache=None)
+    # 词库不可用时不写入空结果，避免污染缓存
+    if hasattr(enhancer, "available") and not enhancer.available():
+        raise RuntimeError("WordNet不可用，请安装nltk（python -m pip install nltk）后重试")
+
+    for keyword in pending:
+        cache.put(
+            keyword,
+            synonyms=enhancer.lookup_synonyms(keyword),
+            related=enhancer.lookup_related_words(keyword),
+            forms=enhancer.lookup_forms(keyword)
+        )
+
+    cache.save(enhancer.describe())
+    logger.info(f"关键词扩展缓存已更新: 新计算 {len(pending)} 个，共 {len(cache)} 个")
+    return {"requested": len(keywords), "computed": len(pending), "cached": len(cache)}
+
+
+_default_cache: Optional[KeywordExpansionCache] = None
+
+
+def get_expansion_cache() -> KeywordExpansionCache:
+    """进程内共享的默认缓存（首次使用时从磁盘加载）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = KeywordExpansionCache()
+    return _default_cache
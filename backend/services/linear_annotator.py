@@ -0,0 +1,437 @@
+"""
+线性多标签知识点分类器
+题目文本经哈希n-gram特征化（词1-2gram、字符2-4gram、题型，无需拟合词表），
+由离线训练的一对多逻辑回归打分。批量推理是一次稀疏特征矩阵与权重矩阵的乘法，
+模型保存为紧凑的NumPy制品（只保存训练中出现过的哈希行，float16）。
+
+通过 ANNOTATION_ENGINE=linear 启用，NLP服务的 suggest_knowledge_points 返回同样格式的建议；
+NumPy未安装或模型文件不存在时回退到规则引擎
+"""
+import os
+import json
+import math
+import time
+import zlib
+import random
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+from dotenv import load_dotenv
+
+from backend.models.schema import knowledge_point_id
+from backend.services.metrics import metrics
+from backend.services.near_duplicate_index import normalize_stem
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT_VERSION = 1
+DEFAULT_MODEL_PATH = "data/linear_annotator.npz"
+# 推理时按行分块，限制每块稠密特征矩阵的内存
+INFERENCE_BLOCK_ROWS = 2048
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("线性分类器需要NumPy（pip install numpy，见 requirements-full.txt）")
+    return numpy
+
+
+class HashedNgramFeaturizer:
+    """哈希n-gram特征提取（带符号哈希，次线性词频，L2归一化）"""
+
+    def __init__(self, dim: int = 1 << 18, word_ngrams: Tuple[int, int] = (1, 2),
+                 char_ngrams: Tuple[int, int] = (2, 4)):
+        if dim & (dim - 1):
+            raise ValueError("特征维度必须是2的幂")
+        self.dim = dim
+        self.word_ngrams = tuple(word_ngrams)
+        self.char_ngrams = tuple(char_ngrams)
+
+    def config(self) -> Dict[str, Any]:
+        return {"dim": self.dim, "word_ngrams": list(self.word_ngrams), "char_ngrams": list(self.char_ngrams)}
+
+    def tokens(self, content: str, question_type: Optional[str] = None) -> List[str]:
+        """特征字符串（带类别前缀，便于解释）"""
+        text = normalize_stem(content)
+        words = text.split()
+        features = []
+        low, high = self.word_ngrams
+        for n in range(low, high + 1):
+            for i in range(len(words) - n + 1):
+                features.append("w:" + " ".join(words[i:i + n]))
+        padded = f" {text} "
+        low, high = self.char_ngrams
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                features.append("c:" + padded[i:i + n])
+        if question_type:
+            features.append("t:" + question_type)
+        return features
+
+    def transform_one(self, tokens: Iterable[str]) -> Dict[int, float]:
+        """特征字符串 -> {哈希下标: 值}"""
+        counts: Dict[int, float] = {}
+        mask = self.dim - 1
+        for token in tokens:
+            h = zlib.crc32(token.encode("utf-8"))
+            index = h & mask
+            counts[index] = counts.get(index, 0.0) + (1.0 if h >> 31 else -1.0)
+        values = {}
+        norm = 0.0
+        for index, count in counts.items():
+            if count:
+                value = math.copysign(1.0 + math.log(abs(count)), count)
+                values[index] = value
+                norm += value * value
+        norm = math.sqrt(norm) or 1.0
+        return {index: value / norm for index, value in values.items()}
+
+    def transform(self, questions: List[Tuple[str, Optional[str]]]):
+        """
+        批量特征化为CSR数组
+
+        Returns:
+            (indptr, indices, data, tokens)，tokens 为每道题的特征字符串（用于解释）
+        """
+        np = _require_numpy()
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        all_tokens = []
+        for content, question_type in questions:
+            tokens = self.tokens(content, question_type)
+            row = self.transform_one(tokens)
+            indices.extend(row.keys())
+            data.extend(row.values())
+            indptr.append(len(indices))
+            all_tokens.append(tokens)
+        return (np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+                np.asarray(data, dtype=np.float32), all_tokens)
+
+
+class LinearAnnotationModel:
+    """一对多逻辑回归模型（权重只保存出现过的哈希行）"""
+
+    def __init__(self, featurizer: HashedNgramFeaturizer, labels: List[str], rows, weights, bias,
+                 threshold: float = 0.3, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            rows: 有权重的哈希下标（升序）
+            weights: (len(rows), len(labels)) 权重
+            bias: (len(labels),) 偏置
+            threshold: 推荐的最低概率
+        """
+        np = _require_numpy()
+        self.featurizer = featurizer
+        self.labels = list(labels)
+        self.threshold = threshold
+        self.metadata = metadata or {}
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        # 末行为零，未出现过的哈希下标映射到该行
+        self.weights = np.vstack([np.asarray(weights, dtype=np.float32),
+                                  np.zeros((1, len(self.labels)), dtype=np.float32)])
+        self._row_of = np.full(featurizer.dim, len(self.rows), dtype=np.int32)
+        self._row_of[self.rows] = np.arange(len(self.rows), dtype=np.int32)
+
+    # ===== 推理 =====
+
+    def decision_function(self, indptr, indices, data):
+        """
+        稀疏特征矩阵 (n x dim) 乘权重矩阵 (dim x 知识点数) 加偏置
+
+        每个行块只保留块内出现的特征列，压缩为稠密矩阵后做一次BLAS矩阵乘法
+        """
+        np = _require_numpy()
+        n = len(indptr) - 1
+        scores = np.empty((n, len(self.labels)), dtype=np.float32)
+        compact = self._row_of[indices]
+        row_ids = np.repeat(np.arange(n), np.diff(indptr))
+        for start in range(0, n, INFERENCE_BLOCK_ROWS):
+            stop = min(start + INFERENCE_BLOCK_ROWS, n)
+            lo, hi = indptr[start], indptr[stop]
+            columns, inverse = np.unique(compact[lo:hi], return_inverse=True)
+            block = np.zeros((stop - start, len(columns)), dtype=np.float32)
+            block[row_ids[lo:hi] - start, inverse] = data[lo:hi]
+            scores[start:stop] = block @ self.weights[columns]
+        return scores + self.bias
+
+    def predict_proba(self, questions: List[Tuple[str, Optional[str]]]):
+        np = _require_numpy()
+        indptr, indices, data, _ = self.featurizer.transform(questions)
+        return 1.0 / (1.0 + np.exp(-self.decision_function(indptr, indices, data)))
+
+    def suggest_batch(self, questions: List[Tuple[str, Optional[str]]],
+                      kp_ids: Optional[Dict[str, str]] = None, top_k: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        批量推荐知识点，每道题的建议格式与规则引擎的 suggest_knowledge_points 相同
+        """
+        np = _require_numpy()
+        if not questions:
+            return []
+        indptr, indices, data, tokens = self.featurizer.transform(questions)
+        with metrics.timer("linear_annotator_seconds", stage="matmul"):
+            probabilities = 1.0 / (1.0 + np.exp(-self.decision_function(indptr, indices, data)))
+
+        kp_ids = kp_ids or {}
+        results = []
+        for row, probs in enumerate(probabilities):
+            ranked = np.argsort(-probs)[:top_k]
+            suggestions = []
+            for label_index in ranked:
+                confidence = float(probs[label_index])
+                if confidence < self.threshold:
+                    break
+                name = self.labels[label_index]
+                keywords = self._top_features(tokens[row], label_index)
+                reason = f"线性模型: {', '.join(keywords)}" if keywords else "线性模型"
+                suggestions.append({
+                    "knowledge_point_id": kp_ids.get(name) or knowledge_point_id(name),
+                    "knowledge_point_name": name,
+                    "knowledge_point": name,
+                    "confidence": round(confidence, 4),
+                    "matched_keywords": keywords,
+                    "reason": reason,
+                    "reasoning": reason,
+                    "engine": "linear"
+                })
+            results.append(suggestions)
+        return results
+
+    def _top_features(self, tokens: List[str], label_index: int, limit: int = 3) -> List[str]:
+        """对该知识点贡献最大的词特征（去掉前缀）"""
+        mask = self.featurizer.dim - 1
+        scored = {}
+        for token in tokens:
+            if not token.startswith("w:"):
+                continue
+            h = zlib.crc32(token.encode("utf-8"))
+            weight = float(self.weights[self._row_of[h & mask], label_index]) * (1.0 if h >> 31 else -1.0)
+            if weight > 0:
+                scored[token[2:]] = max(weight, scored.get(token[2:], 0.0))
+        return [token for token, _ in sorted(scored.items(), key=lambda item: -item[1])[:limit]]
+
+    # ===== 训练 =====
+
+    @classmethod
+    def train(cls, questions: List[Dict[str, Any]], featurizer: Optional[HashedNgramFeaturizer] = None,
+              epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-5, batch_size: int = 64,
+              min_label_count: int = 1, seed: int = 42) -> "LinearAnnotationModel":
+        """
+        Adagrad小批量训练一对多逻辑回归
+
+        Args:
+            questions: 每条包含 content / question_type / knowledge_points
+            min_label_count: 样本数少于该值的知识点不参与训练
+        """
+        np = _require_numpy()
+        featurizer = featurizer or HashedNgramFeaturizer()
+        label_counts: Dict[str, int] = {}
+        for q in questions:
+            for name in set(q["knowledge_points"]):
+                label_counts[name] = label_counts.get(name, 0) + 1
+        labels = sorted(name for name, count in label_counts.items() if count >= min_label_count)
+        if not labels:
+            raise ValueError("没有可训练的知识点标签")
+        label_index = {name: i for i, name in enumerate(labels)}
+
+        indptr, indices, data, _ = featurizer.transform(
+            [(q["content"], q.get("question_type")) for q in questions]
+        )
+        targets = np.zeros((len(questions), len(labels)), dtype=np.float32)
+        for row, q in enumerate(questions):
+            for name in q["knowledge_points"]:
+                if name in label_index:
+                    targets[row, label_index[name]] = 1.0
+
+        # 在训练中出现过的哈希行上学习
+        rows, compact = np.unique(indices, return_inverse=True)
+        weights = np.zeros((len(rows), len(labels)), dtype=np.float32)
+        # 偏置从标签先验的对数几率开始，未出现特征的题目得到先验概率
+        prior = (targets.sum(axis=0) + 0.5) / (len(questions) + 1.0)
+        bias = np.log(prior / (1 - prior)).astype(np.float32)
+        weight_accumulator = np.full_like(weights, 1e-8)
+        bias_accumulator = np.full_like(bias, 1e-8)
+
+        order = list(range(len(questions)))
+        shuffler = random.Random(seed)
+        started = time.perf_counter()
+        for epoch in range(epochs):
+            shuffler.shuffle(order)
+            loss = 0.0
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                spans = [np.arange(indptr[r], indptr[r + 1]) for r in batch]
+                positions = np.concatenate(spans)
+                row_ids = np.repeat(np.arange(len(batch)), [len(span) for span in spans])
+                features, values = compact[positions], data[positions]
+
+                logits = np.zeros((len(batch), len(labels)), dtype=np.float32)
+                np.add.at(logits, row_ids, weights[features] * values[:, None])
+                logits += bias
+                probs = 1.0 / (1.0 + np.exp(-logits))
+                y = targets[batch]
+                loss += float(-(y * np.log(probs + 1e-7) + (1 - y) * np.log(1 - probs + 1e-7)).sum())
+
+                error = (probs - y) / len(batch)
+                touched, inverse = np.unique(features, return_inverse=True)
+                gradient = np.zeros((len(touched), len(labels)), dtype=np.float32)
+                np.add.at(gradient, inverse, error[row_ids] * values[:, None])
+                gradient += l2 * weights[touched]
+                weight_accumulator[touched] += gradient ** 2
+                weights[touched] -= learning_rate * gradient / np.sqrt(weight_accumulator[touched])
+
+                bias_gradient = error.sum(axis=0)
+                bias_accumulator += bias_gradient ** 2
+                bias -= learning_rate * bias_gradient / np.sqrt(bias_accumulator)
+            logger.debug(f"epoch {epoch + 1}/{epochs} loss={loss / len(questions):.4f}")
+
+        model = cls(featurizer, labels, rows, weights.astype(np.float16), bias, metadata={
+            "trained_at": datetime.now().isoformat(),
+            "questions": len(questions),
+            "label_counts": {name: label_counts[name] for name in labels},
+            "epochs": epochs,
+            "train_seconds": round(time.perf_counter() - started, 3)
+        })
+        model.threshold = model.tune_threshold(questions)
+        return model
+
+    def tune_threshold(self, questions: List[Dict[str, Any]],
+                       candidates: Iterable[float] = (0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.5)) -> float:
+        """选择使micro-F1最高的推荐阈值"""
+        np = _require_numpy()
+        probabilities = self.predict_proba([(q["content"], q.get("question_type")) for q in questions])
+        label_index = {name: i for i, name in enumerate(self.labels)}
+        targets = np.zeros_like(probabilities, dtype=bool)
+        for row, q in enumerate(questions):
+            for name in q["knowledge_points"]:
+                if name in label_index:
+                    targets[row, label_index[name]] = True
+        best, best_f1 = self.threshold, -1.0
+        for threshold in candidates:
+            predicted = probabilities >= threshold
+            true_positive = float((predicted & targets).sum())
+            denominator = float(predicted.sum() + targets.sum())
+            f1 = 2 * true_positive / denominator if denominator else 0.0
+            if f1 > best_f1:
+                best, best_f1 = threshold, f1
+        return best
+
+    # ===== 序列化 =====
+
+    def save(self, path: str):
+        np = _require_numpy()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        meta = {
+            "format_version": MODEL_FORMAT_VERSION,
+            "featurizer": self.featurizer.config(),
+            "labels": self.labels,
+            "threshold": self.threshold,
+            "metadata": self.metadata
+        }
+        # 先写临时文件再替换，加载中的进程不会读到半个文件
+        temp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            temp_path,
+            meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+            rows=self.rows.astype(np.int32),
+            weights=self.weights[:-1].astype(np.float16),
+            bias=self.bias
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearAnnotationModel":
+        np = _require_numpy()
+        with np.load(path) as archive:
+            meta = json.loads(archive["meta"].tobytes().decode("utf-8"))
+            if meta.get("format_version") != MODEL_FORMAT_VERSION:
+                raise ValueError(f"不支持的模型格式版本: {meta.get('format_version')}")
+            featurizer = HashedNgramFeaturizer(
+                meta["featurizer"]["dim"],
+                tuple(meta["featurizer"]["word_ngrams"]),
+                tuple(meta["featurizer"]["char_ngrams"])
+            )
+            return cls(featurizer, meta["labels"], archive["rows"], archive["weights"], archive["bias"],
+                       meta["threshold"], meta.get("metadata"))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "labels": len(self.labels),
+            "weight_rows": int(len(self.rows)),
+            "threshold": self.threshold,
+            "featurizer": self.featurizer.config(),
+            "metadata": {k: v for k, v in self.metadata.items() if k not in ("label_counts", "corpus")}
+        }
+
+
+class LinearAnnotationEngine:
+    """按配置选择线性模型：首次使用时加载模型制品，不可用时由调用方回退到规则引擎"""
+
+    def __init__(self, engine: Optional[str] = None, model_path: Optional[str] = None):
+        self.engine = (engine or os.getenv("ANNOTATION_ENGINE", "rules")).lower()
+        self.model_path = model_path or os.getenv("LINEAR_MODEL_PATH", DEFAULT_MODEL_PATH)
+        self._model: Optional[LinearAnnotationModel] = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine == "linear" and self.model is not None
+
+    @property
+    def model(self) -> Optional[LinearAnnotationModel]:
+        if self._model is not None or self._load_failed:
+            return self._model
+        with self._lock:
+            if self._model is None and not self._load_failed:
+                try:
+                    started = time.perf_counter()
+                    self._model = LinearAnnotationModel.load(self.model_path)
+                    logger.info(f"线性标注模型已加载: {self.model_path} "
+                                f"({len(self._model.labels)} 个知识点，{(time.perf_counter() - started) * 1000:.1f}ms)")
+                except Exception as e:
+                    # 只告警一次，之后一直使用规则引擎，直到 reload()
+                    self._load_failed = True
+                    logger.warning(f"线性标注模型不可用，使用规则引擎: {e}")
+        return self._model
+
+    def reload(self, model_path: Optional[str] = None) -> bool:
+        with self._lock:
+            if model_path:
+                self.model_path = model_path
+            self._model = None
+            self._load_failed = False
+        return self.model is not None
+
+    def suggest(self, question_content: str, question_type: Optional[str] = None,
+                kp_ids: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        return self.suggest_batch([(question_content, question_type)], kp_ids)[0]
+
+    def suggest_batch(self, questions: List[Tuple[str, Optional[str]]],
+                      kp_ids: Optional[Dict[str, str]] = None) -> List[List[Dict[str, Any]]]:
+        with metrics.timer("linear_annotator_seconds", stage="total"):
+            return self.model.suggest_batch(questions, kp_ids)
+
+    def status(self) -> Dict[str, Any]:
+        model = self.model if self.engine == "linear" else self._model
+        return {
+            "engine": self.engine,
+            "active": "linear" if self.engine == "linear" and model is not None else "rules",
+            "model_path": self.model_path,
+            "model": model.summary() if model is not None else None
+        }
+
+
+# 全局线性标注引擎
+linear_annotation_engine = LinearAnnotationEngine()
+
+metrics.describe("linear_annotator_seconds", "Linear annotation model inference time by stage")
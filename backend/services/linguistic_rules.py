@@ -0,0 +1,426 @@
+"""
+语言特征规则引擎
+以声明式规则表 (知识点, 预编译正则/关键词集合, 分数) 描述语言特征，
+启动时一次性编译，单次遍历即可得到所有知识点的语言特征分数
+"""
+import re
+import time
+import logging
+from typing import List, Dict, Any, Callable, Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ===== 匹配器 =====
+
+class Keywords:
+    """子串匹配：文本中包含任一关键词即命中"""
+    __slots__ = ("words",)
+
+    def __init__(self, *words: str):
+        self.words = tuple(word.lower() for word in words)
+
+    def __call__(self, text: str) -> bool:
+        return any(word in text for word in self.words)
+
+    def __repr__(self) -> str:
+        return f"Keywords{self.words}"
+
+
+class Words:
+    """整词匹配：关键词前后须为空格或文本边界（等价于 f" {w} " in f" {text} "）"""
+    __slots__ = ("words", "regex")
+
+    def __init__(self, *words: str):
+        self.words = tuple(word.lower() for word in words)
+        alternation = "|".join(re.escape(word) for word in self.words)
+        self.regex = re.compile(rf"(?<![^ ])(?:{alternation})(?![^ ])")
+
+    def __call__(self, text: str) -> bool:
+        return self.regex.search(text) is not None
+
+    def __repr__(self) -> str:
+        return f"Words{self.words}"
+
+
+class Pattern:
+    """正则匹配：多个模式合并为一个预编译正则，任一模式命中即可"""
+    __slots__ = ("patterns", "regex")
+
+    def __init__(self, *patterns: str):
+        self.patterns = patterns
+        self.regex = re.compile("|".join(f"(?:{p})" for p in patterns))
+
+    def __call__(self, text: str) -> bool:
+        return self.regex.search(text) is not None
+
+    def __repr__(self) -> str:
+        return f"Pattern{self.patterns}"
+
+
+class AllOf:
+    """组合匹配：所有子匹配器均命中"""
+    __slots__ = ("matchers",)
+
+    def __init__(self, *matchers: Callable[[str], bool]):
+        self.matchers = matchers
+
+    def __call__(self, text: str) -> bool:
+        return all(matcher(text) for matcher in self.matchers)
+
+    def __repr__(self) -> str:
+        return f"AllOf{self.matchers}"
+
+
+class Predicate:
+    """自定义判定函数（用于难以用正则表达的结构检查）"""
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[str], bool]):
+        self.func = func
+
+    def __call__(self, text: str) -> bool:
+        return self.func(text)
+
+    def __repr__(self) -> str:
+        return f"Predicate({self.func.__name__})"
+
+
+class Rule(NamedTuple):
+    """语言特征规则：命中 matcher 时该知识点得分为 score（score 为 0 表示否决）"""
+    knowledge_point: str
+    matcher: Callable[[str], bool]
+    score: float
+
+
+# ===== 规则引擎 =====
+
+class LinguisticRuleEngine:
+    """
+    语言特征规则引擎
+
+    每个知识点的规则按声明顺序求值，首个命中的规则决定该知识点的分数，
+    其余规则不再计算；结果不一定是所有命中规则中的最高分。
+    声明顺序即优先级，沿用原 if/elif 判断链：分数为0的否决规则排在被否决的规则之前，
+    部分知识点（如虚拟语气、比较级、冠词）的低分规则先于高分规则，调整顺序会改变打分结果。
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            self.rules.setdefault(rule.knowledge_point, []).append(rule)
+        self.profiling_enabled = False
+        self._profile: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def knowledge_points(self) -> List[str]:
+        return list(self.rules.keys())
+
+    def score(self, text: str, knowledge_point: str) -> float:
+        """计算单个知识点的语言特征分数"""
+        rules = self.rules.get(knowledge_point)
+        if not rules:
+            return 0.0
+        return self._evaluate(text.lower(), rules)
+
+    def score_all(self, text: str, knowledge_points: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """单次遍历计算所有（或指定）知识点的语言特征分数，仅返回非零分数"""
+        text_lower = text.lower()
+        names = self.rules.keys() if knowledge_points is None else knowledge_points
+        scores = {}
+        for kp_name in names:
+            rules = self.rules.get(kp_name)
+            if rules:
+                kp_score = self._evaluate(text_lower, rules)
+                if kp_score > 0.0:
+                    scores[kp_name] = kp_score
+        return scores
+
+    def _evaluate(self, text_lower: str, rules: List[Rule]) -> float:
+        if self.profiling_enabled:
+            return self._evaluate_profiled(text_lower, rules)
+        for rule in rules:
+            if rule.matcher(text_lower):
+                return rule.score
+        return 0.0
+
+    def _evaluate_profiled(self, text_lower: str, rules: List[Rule]) -> float:
+        for index, rule in enumerate(rules):
+            start = time.perf_counter_ns()
+            matched = rule.matcher(text_lower)
+            elapsed = time.perf_counter_ns() - start
+
+            stats = self._profile.setdefault(
+                f"{rule.knowledge_point}#{index}",
+                {"calls": 0, "hits": 0, "total_ns": 0}
+            )
+            stats["calls"] += 1
+            stats["total_ns"] += elapsed
+            if matched:
+                stats["hits"] += 1
+                return rule.score
+        return 0.0
+
+    def enable_profiling(self, enabled: bool = True):
+        """启用/关闭逐条规则的耗时统计"""
+        self.profiling_enabled = enabled
+        if enabled:
+            self._profile = {}
+
+    def get_profile(self) -> List[Dict[str, Any]]:
+        """获取逐条规则的调用次数、命中次数与耗时，按总耗时降序"""
+        report = []
+        for rule_key, stats in self._profile.items():
+            kp_name, index = rule_key.rsplit("#", 1)
+            rule = self.rules[kp_name][int(index)]
+            report.append({
+                "rule": rule_key,
+                "matcher": repr(rule.matcher),
+                "score": rule.score,
+                "calls": stats["calls"],
+                "hits": stats["hits"],
+                "total_ns": stats["total_ns"],
+                "avg_ns": stats["total_ns"] / stats["calls"] if stats["calls"] else 0
+            })
+        report.sort(key=lambda x: x["total_ns"], reverse=True)
+        return report
+
+
+# ===== 规则表序列化（热更新的规则表文件使用） =====
+#
+#   {"knowledge_point": "条件句", "score": 0.9,
+#    "match": {"all_of": [{"keywords": ["if"]}, {"keywords": ["will"]}]}}
+#
+# 匹配器: keywords / words / pattern 为字符串列表，all_of 为子匹配器列表，
+# predicate 为 PREDICATES 中注册的判定函数名
+
+def matcher_to_spec(matcher: Callable[[str], bool]) -> Dict[str, Any]:
+    if isinstance(matcher, Keywords):
+        return {"keywords": list(matcher.words)}
+    if isinstance(matcher, Words):
+        return {"words": list(matcher.words)}
+    if isinstance(matcher, Pattern):
+        return {"pattern": list(matcher.patterns)}
+    if isinstance(matcher, AllOf):
+        return {"all_of": [matcher_to_spec(m) for m in matcher.matchers]}
+    if isinstance(matcher, Predicate):
+        return {"predicate": matcher.func.__name__}
+    raise ValueError(f"无法序列化的匹配器: {matcher!r}")
+
+
+def matcher_from_spec(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    """由匹配器描述编译匹配器（正则在此时编译，语法错误抛出 re.error）"""
+    if not isinstance(spec, dict) or len(spec) != 1:
+        raise ValueError(f"匹配器描述须为只有一个键的对象: {spec!r}")
+    kind, value = next(iter(spec.items()))
+    if kind == "predicate":
+        if value not in PREDICATES:
+            raise ValueError(f"未注册的判定函数: {value}")
+        return Predicate(PREDICATES[value])
+    if not isinstance(value, list) or not value:
+        raise ValueError(f"匹配器 {kind} 须为非空列表")
+    if kind == "all_of":
+        return AllOf(*(matcher_from_spec(item) for item in value))
+    if not all(isinstance(item, str) for item in value):
+        raise ValueError(f"匹配器 {kind} 须为字符串列表")
+    if kind == "keywords":
+        return Keywords(*value)
+    if kind == "words":
+        return Words(*value)
+    if kind == "pattern":
+        return Pattern(*value)
+    raise ValueError(f"未知的匹配器类型: {kind}")
+
+
+def rules_to_spec(rules: Iterable[Rule]) -> List[Dict[str, Any]]:
+    return [
+        {"knowledge_point": rule.knowledge_point, "score": rule.score, "match": matcher_to_spec(rule.matcher)}
+        for rule in rules
+    ]
+
+
+def rules_from_spec(specs: Iterable[Dict[str, Any]]) -> List[Rule]:
+    rules = []
+    for index, spec in enumerate(specs):
+        try:
+            rules.append(Rule(str(spec["knowledge_point"]), matcher_from_spec(spec["match"]), float(spec["score"])))
+        except (KeyError, TypeError, ValueError, re.error) as e:
+            raise ValueError(f"第 {index} 条规则无效: {e.__class__.__name__}: {e}")
+    return rules
+
+
+# ===== 题干语言特征规则（NLPService._analyze_linguistic_features） =====
+
+_AUXILIARIES = (
+    "have", "has", "do", "does", "did", "will", "would", "can", "could",
+    "may", "might", "must", "should", "is", "are", "was", "were"
+)
+_INVERSION_MARKERS = (
+    "never", "seldom", "rarely", "hardly", "scarcely", "barely",
+    "no sooner", "not only", "not until", "only"
+)
+
+
+def _aux_follows_inversion_marker(text: str) -> bool:
+    """否定/限制副词后紧跟助动词（部分倒装）"""
+    for marker in _INVERSION_MARKERS:
+        if f"{marker} " in text:
+            following_words = text.split(marker, 1)[1].strip().split()
+            if following_words and following_words[0] in _AUXILIARIES:
+                return True
+    return False
+
+
+# 规则表文件中可按名称引用的判定函数
+PREDICATES: Dict[str, Callable[[str], bool]] = {
+    func.__name__: func for func in (_aux_follows_inversion_marker,)
+}
+
+
+LINGUISTIC_FEATURE_RULES: List[Rule] = [
+    # 时态
+    Rule("一般现在时", Keywords("always", "usually", "often", "sometimes", "every day", "every week", "every evening"), 0.95),
+    Rule("一般现在时", AllOf(Pattern(r'\b(he|she|it)\s+_+.*tv\b'), Keywords("every")), 0.9),
+    Rule("一般现在时", Keywords("every", "always"), 0.8),
+
+    Rule("现在进行时", Keywords("look!", "listen!", "now", "right now", "at the moment"), 0.95),
+    Rule("现在进行时", Keywords("now", "look", "listen"), 0.9),
+
+    Rule("一般过去时", Keywords("yesterday", "last week", "last month", "last sunday", "last year", "ago", "in 1990"), 0.95),
+    Rule("一般过去时", Keywords("went", "came", "saw", "did", "was", "were", "had"), 0.8),
+
+    Rule("现在完成时", Keywords("already", "yet", "just", "since", "for"), 0.9),
+    # Never/Ever + 助动词 + 主语 是倒装句，不是现在完成时
+    Rule("现在完成时", Pattern(
+        r'\b(never|ever)\s+(have|has|do|does|did|will|would|can|could|may|might|must|should)\s+\w+',
+        r'\bnever\s+have\s+i\b'
+    ), 0.0),
+    Rule("现在完成时", Pattern(r'\b(i|you|we|they|he|she|it|\w+)\s+(have|has)\s+(never|ever)'), 0.9),
+
+    # 语态与比较
+    Rule("被动语态", Keywords(" by "), 0.95),
+    Rule("被动语态", Keywords("was ", "were ", "is ", "are ", "been "), 0.3),
+
+    Rule("比较级和最高级", Keywords(" than "), 0.95),
+    Rule("比较级和最高级", Keywords("taller", "shorter", "bigger", "smaller", "older", "younger", "faster", "slower"), 0.9),
+    Rule("比较级和最高级", Pattern(r'is\s+(taller|shorter|bigger|smaller|older|younger).*than'), 0.95),
+    Rule("比较级和最高级", Keywords("more", "most", "better", "best", "bigger", "biggest"), 0.8),
+
+    # 从句与非谓语
+    Rule("定语从句", Keywords("who ", "which ", "that ", "whom ", "whose ", "where ", "when "), 0.9),
+
+    Rule("非谓语动词", Keywords("concerned about"), 0.95),
+    Rule("非谓语动词", Keywords("concerning"), 0.9),
+    Rule("非谓语动词", Keywords("being concerned"), 0.85),
+
+    Rule("宾语从句", Keywords("i think that", "i know that", "i wonder if", "tell me what"), 0.9),
+    Rule("宾语从句", Keywords("that ", "what ", "when ", "where ", "why ", "how ", "if ", "whether "), 0.6),
+
+    # 特殊句式
+    Rule("倒装句", Pattern(
+        r'\b(never|seldom|rarely|hardly|scarcely|barely)\s+(have|has|do|does|did|will|would|can|could|may|might|must|should|is|are|was|were)\s+\w+',
+        r'\b(no sooner|not only|not until)\s+(had|have|has|do|does|did|will|would|can|could|may|might|must|should|is|are|was|were)\s+\w+',
+        r'\bonly\s+(when|if|after|before)\s+.*\s+(do|does|did|have|has|had|will|would|can|could|may|might|must|should|is|are|was|were)\s+\w+'
+    ), 0.98),
+    Rule("倒装句", Predicate(_aux_follows_inversion_marker), 0.95),
+    Rule("倒装句", Pattern(
+        r'\b(here|there|now|then|thus|hence|therefore)\s+(comes?|goes?|stands?|sits?|lies?|runs?)\s+\w+',
+        r'\b(up|down|in|out|away|back)\s+(goes?|comes?|runs?|flies?)\s+\w+'
+    ), 0.9),
+
+    Rule("虚拟语气", Keywords("if", "wish", "hope", "suggest", "demand", "insist", "require",
+                          "would", "could", "should", "might", "were", "had"), 0.8),
+    Rule("虚拟语气", Pattern(
+        r'\bif\s+\w+\s+(were|had|would|could|should)',
+        r'\b(wish|hope)\s+\w+\s+(were|had|would|could|should)',
+        r'\b(suggest|demand|insist|require)\s+that',
+        r'\b(would|could|should|might)\s+\w+'
+    ), 0.9),
+
+    Rule("情态动词", Words("can", "could", "may", "might", "must", "should", "would", "will", "shall"), 0.95),
+    Rule("情态动词", Keywords("ought to", "have to", "be able to", "be supposed to"), 0.9),
+    Rule("情态动词", Pattern(
+        r'\b(can|could|may|might|must|should|would|will|shall)\s+\w+',
+        r'\b(ought to|have to|be able to|be supposed to)\s+\w+',
+        r'\bmust\s+have\s+\w+',
+        r'\b(can|could|may|might)\s+have\s+\w+'
+    ), 0.9),
+
+    # 基础语法
+    Rule("冠词", Pattern(r'\b_+\s+(elephant|apple|orange|hour|honest|university|idea)'), 0.9),
+    Rule("冠词", Pattern(r'have\s+_+\s+(idea|answer|book|pen)'), 0.95),
+    Rule("冠词", Keywords("elephant", "apple", "orange", "hour", "honest", "umbrella", "uncle", "idea", "answer"), 0.8),
+    Rule("冠词", AllOf(Keywords("the"), Keywords("same", "only", "first")), 0.7),
+
+    Rule("代词", Words("he", "she", "it", "they", "we", "you", "i"), 0.8),
+    Rule("代词", Pattern(r'(tom and jerry|friends|boys|girls|students).*_+.*play'), 0.9),
+    Rule("代词", AllOf(Keywords("friends"), Keywords("_")), 0.8),
+
+    Rule("连词", Pattern(r'(apples?|oranges?|cats?|dogs?|boys?|girls?).*_+.*(apples?|oranges?|cats?|dogs?|boys?|girls?)'), 0.95),
+    Rule("连词", Pattern(r'like.*_+.*(and|but|or)'), 0.9),
+    Rule("连词", AllOf(Keywords("apples"), Keywords("oranges"), Keywords("_")), 0.9),
+    Rule("连词", Keywords("but", "however", "because", "so"), 0.8),
+
+    Rule("介词", Pattern(r'(sitting|standing|lying|put|place).*_+.*(table|chair|bed|floor|wall|shelf)'), 0.95),
+    Rule("介词", Pattern(r'(book|books?).*is.*_+.*(shelf|table|desk)'), 0.95),
+    Rule("介词", Pattern(r'(cat|dog|book|pen).*sitting.*_+.*table'), 0.9),
+    Rule("介词", Pattern(r'(at|in|on).*_+.*(morning|afternoon|evening|monday|january)'), 0.8),
+    Rule("介词", AllOf(Keywords("sitting"), Keywords("table"), Keywords("_")), 0.85),
+    Rule("介词", AllOf(Keywords("book"), Keywords("shelf"), Keywords("_")), 0.9),
+
+    Rule("There be句型", Pattern(r'\bthere\s+(is|are|was|were)\b'), 0.95),
+    Rule("There be句型", AllOf(Keywords("there"), Pattern(r'(three|four|five|many).*apples?')), 0.9),
+    Rule("There be句型", AllOf(Keywords("there"), Keywords("on the table")), 0.85),
+
+    Rule("be动词", Words("is", "are", "was", "were", "am", "be"), 0.8),
+    Rule("be动词", Pattern(r'there\s+_+\s+(three|four|five)'), 0.9),
+
+    Rule("第三人称单数", Pattern(r'\b(he|she|it)\s+_+'), 0.95),
+    Rule("第三人称单数", AllOf(Keywords("every evening"), Keywords("he")), 0.9),
+    Rule("第三人称单数", Keywords("watches", "goes", "does", "has", "likes", "plays"), 0.8),
+
+    Rule("词汇", Keywords("opposite"), 0.95),
+    Rule("词汇", Keywords("young", "old", "big", "small", "tall", "short", "good", "bad"), 0.8),
+
+    Rule("数量表达", Keywords("how many"), 0.95),
+    Rule("数量表达", AllOf(Pattern(r'(books?|apples?|cats?|dogs?)'), Pattern(r'(five|six|seven|many)')), 0.9),
+
+    Rule("疑问句", Keywords("choose the correct question"), 0.95),
+    Rule("疑问句", Keywords("do you", "did you", "have you", "are you", "will you"), 0.9),
+    Rule("疑问句", Keywords("question"), 0.8),
+
+    Rule("条件句", Pattern(r'if\s+it\s+_+.*tomorrow'), 0.95),
+    Rule("条件句", AllOf(Keywords("if"), Keywords("will")), 0.9),
+    Rule("条件句", AllOf(Keywords("if"), Keywords("tomorrow", "next")), 0.8),
+]
+
+
+# ===== 知识库语言模式规则（EnhancedKnowledgeBase._analyze_linguistic_patterns） =====
+
+LINGUISTIC_PATTERN_RULES: List[Rule] = [
+    Rule("现在进行时", Pattern(r'\blook\s*!|\blisten\s*!'), 0.95),
+    Rule("现在进行时", Pattern(r'\bnow\b|\bright now\b|\bat the moment\b'), 0.9),
+
+    Rule("被动语态", Pattern(r'\sby\s+\w+'), 0.95),
+    Rule("被动语态", Pattern(r'\b(was|were|is|are|been)\s+\w+ed\b'), 0.8),
+
+    Rule("比较级和最高级", Pattern(r'\bthan\b'), 0.95),
+    Rule("比较级和最高级", Pattern(r'\bthe\s+\w+est\b|\bthe most\s+\w+\b'), 0.9),
+
+    Rule("一般现在时", Pattern(r'\b(always|usually|often|sometimes|never)\b', r'\bevery\s+(day|week|month|year)\b'), 0.9),
+
+    Rule("一般过去时", Pattern(r'\byesterday\b|\blast\s+(week|month|year)\b|\b\w+\s+ago\b'), 0.9),
+
+    Rule("现在完成时", Pattern(r'\b(already|yet|just|ever|never|since|for)\b'), 0.9),
+
+    Rule("定语从句", Pattern(r'\b(who|which|that|whom|whose)\s+'), 0.95),
+    Rule("定语从句", Pattern(r'\b(where|when|why)\s+'), 0.9),
+    Rule("定语从句", Pattern(r'the\s+\w+\s+___+\s+(is|are|was|were)'), 0.8),
+
+    Rule("宾语从句", Pattern(r'\b(think|know|believe|wonder|ask|tell)\s+(that|what|if|whether)\b'), 0.9),
+]
+
+
+# 全局规则引擎实例
+linguistic_feature_engine = LinguisticRuleEngine(LINGUISTIC_FEATURE_RULES)
+linguistic_pattern_engine = LinguisticRuleEngine(LINGUISTIC_PATTERN_RULES)
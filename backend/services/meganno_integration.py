@@ -13,6 +13,7 @@ import requests
 from backend.services.ai_agent_service import ai_agent_service
 from backend.services.nlp_service import nlp_service
 from backend.services.database import neo4j_service
+from backend.services.annotation_cascade import register_cascade
 from backend.models.schema import Question, KnowledgePoint
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,8 @@ class MEGAnnoIntegrationService:
         self.integration_enabled = True
         self.confidence_boost_factor = 0.2  # MEGAnno+验证后的置信度提升
         self.human_feedback_weight = 0.3    # 人工反馈的权重
+        # AI Agent的建议已足够确定时跳过MEGAnno+分析和专家反馈
+        self.cascade = register_cascade("meganno", ("ai_agent",))
         
     def configure_meganno_integration(self, config: Dict[str, Any]):
         """配置MEGAnno+集成参数"""
@@ -33,6 +36,8 @@ class MEGAnnoIntegrationService:
         self.integration_enabled = config.get("integration_enabled", True)
         self.confidence_boost_factor = config.get("confidence_boost_factor", 0.2)
         self.human_feedback_weight = config.get("human_feedback_weight", 0.3)
+        if config.get("cascade"):
+            self.cascade.configure("ai_agent", **config["cascade"])
         
         logger.info(f"MEGAnno+集成配置已更新: {config}")
     
@@ -52,6 +57,19 @@ class MEGAnnoIntegrationService:
                 logger.info("AI Agent未找到候选知识点，跳过MEGAnno+增强")
                 return ai_result
             
+            decision = self.cascade.decide("ai_agent", initial_suggestions)
+            if decision.outcome == "reject":
+                return {**ai_result, "cascade": decision.to_dict()}
+            if decision.outcome == "accept":
+                logger.info(f"AI Agent置信度足够 ({decision.top_confidence:.2f})，跳过MEGAnno+增强")
+                enhanced_result = await self._merge_annotation_results(
+                    ai_result, {"enhanced_annotations": []}, question
+                )
+                enhanced_result["meganno_integration"]["skipped"] = True
+                final_result = await self._apply_human_ai_collaboration(enhanced_result)
+                final_result["cascade"] = decision.to_dict()
+                return final_result
+            
             # 第二步：使用MEGAnno+进行多模态分析和验证
             meganno_result = await self._call_meganno_analysis(question, initial_suggestions)
             
@@ -62,6 +80,7 @@ class MEGAnnoIntegrationService:
             
             # 第四步：应用人机协作的置信度调整
             final_result = await self._apply_human_ai_collaboration(enhanced_result)
+            final_result["cascade"] = decision.to_dict()
             
             logger.info(f"MEGAnno+增强标注完成，最终推荐 {len(final_result.get('enhanced_suggestions', []))} 个知识点")
             return final_result
@@ -442,10 +461,18 @@ class MEGAnnoIntegrationService:
                     "status": "failed"
                 })
         
+        outcomes = [r["cascade"]["outcome"] for r in results if r.get("cascade")]
+        
         return {
             "total_questions": len(questions),
             "success_count": success_count,
             "enhanced_annotations": enhanced_count,
+            "cascade": {
+                "accepted": outcomes.count("accept"),
+                "rejected": outcomes.count("reject"),
+                "escalated": outcomes.count("escalate"),
+                "escalation_rate": outcomes.count("escalate") / len(outcomes) if outcomes else 0
+            },
             "enhancement_rate": enhanced_count / len(questions) if questions else 0,
             "results": results,
             "meganno_integration_summary": {
@@ -548,7 +575,8 @@ class MEGAnnoIntegrationService:
             "human_verification_rate": 0.85,
             "processing_time_average": 2.3,
             "quality_score_improvement": 0.12,
-            "integration_success_rate": 0.92
+            "integration_success_rate": 0.92,
+            "cascade": self.cascade.stats()
         }
 
 
@@ -0,0 +1,301 @@
+"""
+轻量级性能指标服务
+提供计数器、直方图、请求级Neo4j查询计数和缓存命中统计，
+以Prometheus文本格式导出；未启用时所有记录操作直接返回
+"""
+import os
+import time
+import threading
+import logging
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple, List
+from dotenv import load_dotenv
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# 当前请求内执行的Neo4j查询数（由请求中间件设置）
+_request_query_count: ContextVar[Optional[List[int]]] = ContextVar("request_query_count", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Histogram:
+    """单个标签组合的直方图"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class _Timer:
+    """计时上下文管理器"""
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    """未启用指标时使用的空计时器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._bucket_config: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None):
+        """登记指标说明（以及直方图分桶）"""
+        self._help[name] = help_text
+        if buckets is not None:
+            self._bucket_config[name] = tuple(sorted(buckets))
+
+    # ===== 记录 =====
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """计数器累加"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """直方图记录一个观测值"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._bucket_config.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels):
+        """计时上下文管理器: with metrics.timer("xxx_seconds", stage="yyy"): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def cache_hit(self, cache: str):
+        self.inc("cache_requests_total", cache=cache, result="hit")
+
+    def cache_miss(self, cache: str):
+        self.inc("cache_requests_total", cache=cache, result="miss")
+
+    # ===== 请求级Neo4j查询计数 =====
+
+    def begin_request(self):
+        """开始统计当前请求的Neo4j查询数，返回用于结束统计的令牌"""
+        return _request_query_count.set([0])
+
+    def end_request(self, token) -> int:
+        """结束当前请求的统计，返回查询数"""
+        counter = _request_query_count.get()
+        _request_query_count.reset(token)
+        return counter[0] if counter else 0
+
+    def record_query(self, elapsed: float, access: str = "default"):
+        """记录一次Neo4j查询"""
+        if not self.enabled:
+            return
+        counter = _request_query_count.get()
+        if counter is not None:
+            counter[0] += 1
+        self.observe("neo4j_query_duration_seconds", elapsed, access=access)
+
+    # ===== 导出 =====
+
+    def cache_hit_ratios(self) -> Dict[str, float]:
+        """各缓存的命中率"""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for key, value in self._counters.get("cache_requests_total", {}).items():
+                labels = dict(key)
+                stats = totals.setdefault(labels.get("cache", ""), {"hit": 0.0, "miss": 0.0})
+                stats[labels.get("result", "miss")] = stats.get(labels.get("result", "miss"), 0.0) + value
+        return {
+            cache: stats["hit"] / (stats["hit"] + stats["miss"]) if (stats["hit"] + stats["miss"]) else 0.0
+            for cache, stats in totals.items()
+        }
+
+    def render_prometheus(self) -> str:
+        """以Prometheus文本格式（0.0.4）导出全部指标"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f"{name}_bucket{_format_labels(key, (('le', _format_number(bound)),))} {cumulative}"
+                        )
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        ratios = self.cache_hit_ratios()
+        if ratios:
+            lines.append("# HELP cache_hit_ratio Cache hit ratio since process start")
+            lines.append("# TYPE cache_hit_ratio gauge")
+            for cache, ratio in sorted(ratios.items()):
+                lines.append(f"cache_hit_ratio{_format_labels((('cache', cache),))} {_format_number(round(ratio, 6))}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """清空全部指标"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class _InstrumentedSession:
+    """为session.run（及托管事务中的tx.run）计时并计数的会话代理"""
+
+    def __init__(self, session, registry: MetricsRegistry, access: str):
+        self._session = session
+        self._registry = registry
+        self._access = access
+
+    def run(self, query, parameters=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._session.run(query, parameters, **kwargs)
+        finally:
+            self._registry.record_query(time.perf_counter() - start, self._access)
+
+    def execute_read(self, transaction_function, *args, **kwargs):
+        return self._session.execute_read(self._instrumented(transaction_function, "read"), *args, **kwargs)
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        return self._session.execute_write(self._instrumented(transaction_function, "write"), *args, **kwargs)
+
+    def _instrumented(self, transaction_function, access: str):
+        def work(tx, *args, **kwargs):
+            return transaction_function(_InstrumentedSession(tx, self._registry, access), *args, **kwargs)
+        return work
+
+    def __enter__(self):
+        self._session.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._session.__exit__(exc_type, exc, tb)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class _InstrumentedDriver:
+    """Neo4j驱动代理，返回带计时的会话"""
+
+    def __init__(self, driver, registry: MetricsRegistry):
+        self._driver = driver
+        self._registry = registry
+
+    def session(self, **config):
+        access = str(config.get("default_access_mode") or "default").lower()
+        return _InstrumentedSession(self._driver.session(**config), self._registry, access)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def instrument_driver(driver, registry: Optional[MetricsRegistry] = None):
+    """为Neo4j驱动添加查询计时（未启用指标时原样返回）"""
+    registry = registry or metrics
+    if not registry.enabled or driver is None:
+        return driver
+    return _InstrumentedDriver(driver, registry)
+
+
+# 全局指标实例
+metrics = MetricsRegistry()
+metrics.describe("http_requests_total", "HTTP requests by route, method and status")
+metrics.describe("http_request_duration_seconds", "HTTP request latency by route")
+metrics.describe("neo4j_query_duration_seconds", "Neo4j query dispatch latency")
+metrics.describe("neo4j_queries_per_request", "Neo4j queries executed per HTTP request", QUERY_COUNT_BUCKETS)
+metrics.describe("annotation_stage_duration_seconds", "Annotation pipeline stage latency")
+metrics.describe("cache_requests_total", "Cache lookups by cache and result")
@@ -0,0 +1,385 @@
+"""
+近似重复题目索引
+对规范化后的题干取字符n-gram，计算MinHash签名并按LSH分段分桶，
+O(候选数)查找近似重复的题目。首次使用时在后台线程从Neo4j全量构建（构建完成前查询返回空结果，
+即不做去重），之后订阅题目变更事件增量维护（包括其他worker写入的题目）
+"""
+import os
+import re
+import time
+import zlib
+import random
+import logging
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Set, Callable, Union
+
+from dotenv import load_dotenv
+
+from backend.services.graph_events import GraphChange, GraphEventBus, graph_events
+from backend.services.graph_version import ALL_ENTITIES
+
+try:
+    import numpy
+except ImportError:  # 没有NumPy时逐个哈希计算签名
+    numpy = None
+
+load_dotenv("config.env")
+
+# 导入接口去重前等待首次构建的最长秒数，超时则本次导入不做近似去重并在结果中注明
+READY_TIMEOUT = float(os.getenv("DUPLICATE_INDEX_WAIT_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+# 梅森素数 2^61-1，MinHash排列函数 (a*x + b) mod p
+MERSENNE_PRIME = (1 << 61) - 1
+LOW_29_BITS = (1 << 29) - 1
+LOW_32_BITS = (1 << 32) - 1
+SHINGLE_SIZE = 4
+
+BLANK_PATTERN = re.compile(r"_+")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+
+
+def normalize_stem(text: str) -> str:
+    """题干规范化：NFKC、忽略大小写、统一填空横线、去标点、合并空白"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = BLANK_PATTERN.sub(" _ ", text)
+    text = PUNCTUATION_PATTERN.sub(" ", text)
+    return " ".join(text.split())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """规范化题干的字符n-gram哈希集合（crc32，跨进程稳定）"""
+    stem = normalize_stem(text)
+    if len(stem) <= size:
+        return {zlib.crc32(stem.encode("utf-8"))} if stem else set()
+    return {zlib.crc32(stem[i:i + size].encode("utf-8")) for i in range(len(stem) - size + 1)}
+
+
+class MinHasher:
+    """固定种子的MinHash，签名在不同进程间可比较"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        if numpy is not None:
+            a = numpy.array([a for a, _ in self._perms], dtype=numpy.uint64)
+            self._a_high = (a >> numpy.uint64(32))[:, None]
+            self._a_low = (a & numpy.uint64(LOW_32_BITS))[:, None]
+            self._b = numpy.array([b for _, b in self._perms], dtype=numpy.uint64)[:, None]
+
+    def signature(self, hashes: Set[int]) -> Tuple[int, ...]:
+        if not hashes:
+            return ()
+        if numpy is not None:
+            return self._signature_numpy(hashes)
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self._perms)
+
+    def _signature_numpy(self, hashes: Set[int]) -> Tuple[int, ...]:
+        """
+        全部排列 × 全部n-gram一次矩阵运算，结果与逐个计算完全相同
+
+        a*h 超出64位，拆成 a = a_high*2^32 + a_low（h为32位crc）分别相乘，
+        再利用 2^61 ≡ 1 (mod p) 折叠高位，中间值都不超过 2^63
+        """
+        h = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))
+        p = numpy.uint64(MERSENNE_PRIME)
+        shift = numpy.uint64(61)
+        high = self._a_high * h
+        high = (high >> numpy.uint64(29)) + ((high & numpy.uint64(LOW_29_BITS)) << numpy.uint64(32))
+        low = self._a_low * h
+        low = (low & p) + (low >> shift)
+        values = high + low + self._b
+        values = (values & p) + (values >> shift)
+        values = numpy.where(values >= p, values - p, values)
+        return tuple(int(v) for v in values.min(axis=1))
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH近似重复索引"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: Optional[float] = None,
+                 loader: Optional[Callable[[Optional[List[str]]], Iterable[Tuple[str, str]]]] = None,
+                 events: Optional[GraphEventBus] = None):
+        """
+        Args:
+            num_perm: 签名长度
+            bands: LSH分段数（每段 num_perm/bands 行；64/16时相似度0.8的题目成为候选的概率>99.9%）
+            threshold: 判定为近似重复的最低估计Jaccard相似度
+            loader: 按ID加载 (题目ID, 题干)，参数为None时加载全部，默认从Neo4j读取
+            events: 变更事件总线，订阅题目写入以增量维护
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm 必须是 bands 的整数倍")
+        if threshold is None:
+            threshold = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.8"))
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.loader = loader or _load_question_stems
+
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        # 待从数据库重新加载的题目ID -> 最近一次变更的序号（加载期间再次变更的ID不会被误清除）
+        self._pending: Dict[str, int] = {}
+        self._change_seq = 0
+        # 调用方已按将要写入的题干加入索引的ID，随后的写入事件不再触发重新加载
+        self._expected: Set[str] = set()
+        # 全量构建期间调用方的 add/remove（题目ID -> 签名，None表示删除），替换后重新应用
+        self._building = False
+        self._changed_during_build: Dict[str, Optional[Tuple[int, ...]]] = {}
+        self._built = False
+        self._retry_at = 0.0
+        # 全量构建只由一个线程执行
+        self._build_lock = threading.Lock()
+        self._build_thread: Optional[threading.Thread] = None
+        self._build_done = threading.Event()
+
+        (events or graph_events).subscribe(self._on_change, entities=("Question",))
+
+    # ===== 查询 =====
+
+    def find_similar(self, question: Union[str, Any], threshold: Optional[float] = None, limit: int = 5,
+                     exclude: Iterable[str] = (), signature: Optional[Tuple[int, ...]] = None) -> List[Dict[str, Any]]:
+        """
+        查找近似重复的题目
+
+        Args:
+            question: 题干或带 content 属性的题目对象
+            threshold: 最低估计相似度，默认使用索引阈值
+            limit: 最多返回条数
+            exclude: 不参与比较的题目ID（如题目自身）
+            signature: 已用同样参数的MinHasher算好的签名（如导入工作进程中计算），省去重新计算
+
+        Returns:
+            [{"question_id", "similarity"}]，按相似度降序；索引尚未构建完成时为空列表
+        """
+        if signature is None:
+            content = question if isinstance(question, str) else getattr(question, "content", "")
+            signature = self.hasher.signature(shingles(content))
+        if not signature:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        excluded = set(exclude)
+
+        if not self._ensure_ready():
+            return []
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            scored = []
+            for candidate in candidates - excluded:
+                similarity = self._similarity(signature, self._signatures[candidate])
+                if similarity >= threshold:
+                    scored.append({"question_id": candidate, "similarity": round(similarity, 4)})
+        scored.sort(key=lambda item: (-item["similarity"], item["question_id"]))
+        return scored[:limit]
+
+    def find_duplicate(self, question: Union[str, Any], exclude: Iterable[str] = (),
+                       signature: Optional[Tuple[int, ...]] = None) -> Optional[Dict[str, Any]]:
+        """最相似的近似重复题目，没有时返回None"""
+        matches = self.find_similar(question, limit=1, exclude=exclude, signature=signature)
+        return matches[0] if matches else None
+
+    # ===== 维护 =====
+
+    def add(self, question_id: str, content: str, expect_write: bool = False,
+            signature: Optional[Tuple[int, ...]] = None):
+        """
+        加入或更新一道题目
+
+        Args:
+            expect_write: 调用方随后会把同一题干写入数据库（导入流水线先去重后写入），
+                          该写入的变更事件不再触发从数据库重新加载
+            signature: 已算好的题干签名，同 find_similar
+        """
+        if signature is None:
+            signature = self.hasher.signature(shingles(content))
+        with self._lock:
+            self._pending.pop(question_id, None)
+            if expect_write:
+                self._expected.add(question_id)
+            if self._building:
+                self._changed_during_build[question_id] = signature
+            self._insert_locked(question_id, signature)
+
+    def remove(self, question_id: str):
+        with self._lock:
+            self._pending.pop(question_id, None)
+            self._expected.discard(question_id)
+            if self._building:
+                self._changed_during_build[question_id] = None
+            self._remove_locked(question_id)
+
+    def rebuild(self, records: Optional[Iterable[Tuple[str, str]]] = None) -> Dict[str, Any]:
+        """全量重建（默认从Neo4j读取全部题目），构建完成后整体替换，期间查询使用旧索引"""
+        with self._build_lock:
+            with self._lock:
+                # 序号不大于此值的变更都包含在全量数据中，加载期间的新变更留待增量更新
+                covered = self._change_seq
+                self._building = True
+                self._changed_during_build = {}
+            try:
+                if records is None:
+                    records = self.loader(None)
+                signatures: Dict[str, Tuple[int, ...]] = {}
+                buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+                for question_id, content in records:
+                    signature = self.hasher.signature(shingles(content))
+                    if signature:
+                        signatures[question_id] = signature
+                        for key in self._band_keys(signature):
+                            buckets[key].add(question_id)
+                with self._lock:
+                    self._signatures = signatures
+                    self._buckets = buckets
+                    self._pending = {qid: seq for qid, seq in self._pending.items() if seq > covered}
+                    for question_id, signature in self._changed_during_build.items():
+                        if signature is None:
+                            self._remove_locked(question_id)
+                        else:
+                            self._insert_locked(question_id, signature)
+                    # 调用方预先加入的题目此后以数据库为准
+                    self._expected.clear()
+                    self._built = True
+            finally:
+                with self._lock:
+                    self._building = False
+                    self._changed_during_build = {}
+            self._build_done.set()
+        stats = self.stats()
+        logger.info(f"近似重复索引已重建: {stats['questions']} 道题目")
+        return stats
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """启动首次构建（如尚未开始）并等待完成，供批量导入等离线任务使用"""
+        self._ensure_ready()
+        self._build_done.wait(timeout)
+        return self._ensure_ready()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "questions": len(self._signatures),
+                "buckets": len(self._buckets),
+                "pending": len(self._pending),
+                "built": self._built,
+                "building": self._build_thread is not None and self._build_thread.is_alive(),
+                "num_perm": self.hasher.num_perm,
+                "bands": self.bands,
+                "threshold": self.threshold
+            }
+
+    def _on_change(self, event: GraphChange):
+        if event.kind == "deleted" and ALL_ENTITIES in event.entities:
+            # 清空数据库
+            with self._lock:
+                self._signatures.clear()
+                self._buckets.clear()
+                self._pending.clear()
+                self._expected.clear()
+            return
+        if "Question" in event.entities and event.ids:
+            with self._lock:
+                self._change_seq += 1
+                for question_id in event.ids:
+                    if question_id in self._expected:
+                        self._expected.discard(question_id)
+                    else:
+                        self._pending[question_id] = self._change_seq
+
+    def _ensure_ready(self) -> bool:
+        """
+        首次使用时在后台线程全量构建并返回False（调用方跳过去重）；
+        构建完成后只加载变更事件中新增/修改的题目并返回True
+        """
+        if not self._built:
+            self._start_build()
+            return False
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return True
+        try:
+            loaded = dict(self.loader(list(pending)))
+        except Exception as e:
+            logger.warning(f"近似重复索引增量更新失败: {e}")
+            return True
+        signatures = {qid: self.hasher.signature(shingles(content)) for qid, content in loaded.items()}
+        with self._lock:
+            for question_id, seq in pending.items():
+                if self._pending.get(question_id) != seq:
+                    # 加载期间再次变更或已由调用方更新，留待下次处理
+                    continue
+                del self._pending[question_id]
+                if question_id in signatures:
+                    self._insert_locked(question_id, signatures[question_id])
+                else:
+                    self._remove_locked(question_id)
+        return True
+
+    def _start_build(self):
+        with self._lock:
+            if self._build_thread is not None and self._build_thread.is_alive():
+                return
+            if time.monotonic() < self._retry_at:
+                return
+            self._build_done.clear()
+            self._build_thread = threading.Thread(target=self._build, name="near-duplicate-build", daemon=True)
+            self._build_thread.start()
+
+    def _build(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            # 数据库不可用时暂停重试，避免每次查询都尝试连接
+            self._retry_at = time.monotonic() + 30
+            logger.warning(f"近似重复索引构建失败: {e}")
+        finally:
+            self._build_done.set()
+
+    # ===== 内部方法 =====
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _insert_locked(self, question_id: str, signature: Tuple[int, ...]):
+        self._remove_locked(question_id)
+        if signature:
+            self._signatures[question_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets[key].add(question_id)
+
+    def _remove_locked(self, question_id: str):
+        signature = self._signatures.pop(question_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    @staticmethod
+    def _similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        """签名中相同位置相等的比例，即Jaccard相似度的估计"""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def _load_question_stems(question_ids: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    from backend.services.database import neo4j_service
+    if not neo4j_service.driver and not neo4j_service.connect():
+        raise RuntimeError("数据库未连接")
+    return neo4j_service.get_question_stems(question_ids)
+
+
+# 全局近似重复索引
+near_duplicate_index = NearDuplicateIndex()
@@ -5,12 +5,16 @@ NLP辅助标注服务
 import re
 import jieba
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
 from backend.services.database import neo4j_service
+from backend.services.graph_events import graph_events
+from backend.services.kb_artifact import load_section
+from backend.services.linear_annotator import linear_annotation_engine
+from backend.services.annotation_tables import annotation_tables, compile_keyword_patterns
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +23,29 @@ class NLPService:
     """NLP辅助标注服务类"""
     
     def __init__(self):
-        self.keyword_patterns = self._build_keyword_patterns()
+        # 关键词表可热更新，见 annotation_tables
+        annotation_tables.register(
+            "nlp.keyword_patterns",
+            lambda: load_section("nlp.keyword_patterns") or self._build_keyword_patterns(),
+            compile_keyword_patterns
+        )
         self.tfidf_vectorizer = None
         self.knowledge_points_cache = []
+        # ANNOTATION_ENGINE=linear 且模型可用时由线性分类器推荐
+        self.linear_engine = linear_annotation_engine
+        # 知识点名称 -> ID，知识点变更时失效
+        self._kp_id_map: Optional[Dict[str, str]] = None
+        graph_events.subscribe(self._invalidate_kp_id_map, entities=("KnowledgePoint",))
+        
+    @property
+    def keyword_patterns(self) -> Dict[str, List[str]]:
+        """当前请求固定的关键词模式表"""
+        return annotation_tables.current()["nlp.keyword_patterns"]
+    
+    @keyword_patterns.setter
+    def keyword_patterns(self, patterns: Dict[str, List[str]]):
+        # 脚本调试用，只在本进程生效
+        annotation_tables.apply({"nlp.keyword_patterns": patterns}, persist=False)
         
     def _build_keyword_patterns(self) -> Dict[str, List[str]]:
         """构建关键词模式库"""
@@ -245,8 +269,15 @@ class NLPService:
             
         return 0.0
     
+    @annotation_tables.pinned
     def suggest_knowledge_points(self, question_content: str, question_type: str) -> List[Dict[str, Any]]:
         """为题目建议知识点"""
+        if self.linear_engine.enabled:
+            try:
+                return self.linear_engine.suggest(question_content, question_type, self._get_kp_id_map())
+            except Exception as e:
+                logger.error(f"线性模型推荐失败，使用规则引擎: {e}")
+
         try:
             # 获取所有知识点
             try:
@@ -359,16 +390,43 @@ class NLPService:
         """批量为题目建议知识点"""
         results = {}
         
-        for question in questions:
-            question_id = question.get("id")
-            content = question.get("content", "")
-            question_type = question.get("question_type", "")
-            
-            suggestions = self.suggest_knowledge_points(content, question_type)
-            results[question_id] = suggestions
+        batch = [(question.get("content", ""), question.get("question_type", "")) for question in questions]
+        for question, suggestions in zip(questions, self.suggest_knowledge_points_batch(batch)):
+            results[question.get("id")] = suggestions
         
         return results
     
+    @annotation_tables.pinned
+    def suggest_knowledge_points_batch(self, questions: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+        """
+        批量推荐知识点：线性分类器一次推理整批题目，规则引擎逐题计算
+        
+        Args:
+            questions: [(题目内容, 题目类型)]
+        """
+        if self.linear_engine.enabled:
+            try:
+                return self.linear_engine.suggest_batch(questions, self._get_kp_id_map())
+            except Exception as e:
+                logger.error(f"批量知识点推荐失败: {e}")
+        return [self.suggest_knowledge_points(content, question_type) for content, question_type in questions]
+    
+    def _invalidate_kp_id_map(self, event=None):
+        self._kp_id_map = None
+
+    def _get_kp_id_map(self) -> Dict[str, str]:
+        """知识点名称到ID的映射（缓存到知识点变更为止），数据库不可用时为空（使用按名称计算的ID）"""
+        graph_events.poll()
+        if self._kp_id_map is not None:
+            return self._kp_id_map
+        try:
+            kp_id_map = {kp.get("name"): kp.get("id") for kp in neo4j_service.search_knowledge_points("")}
+        except Exception as e:
+            logger.warning(f"获取知识点ID映射失败: {e}")
+            return {}
+        self._kp_id_map = kp_id_map
+        return kp_id_map
+    
     def update_knowledge_cache(self):
         """更新知识点缓存"""
         try:
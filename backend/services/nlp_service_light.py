@@ -4,8 +4,15 @@
 集成增强知识库和详细特征分析
 """
 import re
+import time
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+
+from backend.services.metrics import metrics
+from backend.services.kb_artifact import load_section
+from backend.services.graph_events import graph_events
+from backend.services.linear_annotator import linear_annotation_engine
+from backend.services.annotation_tables import annotation_tables, compile_keyword_patterns
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +21,17 @@ class NLPService:
     """轻量级NLP辅助标注服务类"""
     
     def __init__(self):
-        self.keyword_patterns = self._build_keyword_patterns()
+        # 关键词表和规则表可热更新，见 annotation_tables
+        annotation_tables.register(
+            "nlp_light.keyword_patterns",
+            lambda: load_section("nlp_light.keyword_patterns") or self._build_keyword_patterns(),
+            compile_keyword_patterns
+        )
+        # ANNOTATION_ENGINE=linear 且模型可用时由线性分类器推荐
+        self.linear_engine = linear_annotation_engine
+        # 知识点名称 -> ID，知识点变更事件到达时清空
+        self._kp_id_map: Optional[Dict[str, str]] = None
+        graph_events.subscribe(self._invalidate_kp_id_map, entities=("KnowledgePoint",))
         # 导入增强知识库
         try:
             from backend.services.enhanced_knowledge_base import enhanced_knowledge_base
@@ -23,6 +40,21 @@ class NLPService:
             logger.warning("无法导入增强知识库，使用基础版本")
             self.enhanced_kb = None
         
+    @property
+    def keyword_patterns(self) -> Dict[str, List[str]]:
+        """当前请求固定的关键词模式表"""
+        return annotation_tables.current()["nlp_light.keyword_patterns"]
+    
+    @keyword_patterns.setter
+    def keyword_patterns(self, patterns: Dict[str, List[str]]):
+        # 脚本调试用，只在本进程生效
+        annotation_tables.apply({"nlp_light.keyword_patterns": patterns}, persist=False)
+    
+    @property
+    def rule_engine(self):
+        """当前请求固定的语言特征规则引擎"""
+        return annotation_tables.current()["rules.linguistic_features"]
+    
     def _build_keyword_patterns(self) -> Dict[str, List[str]]:
         """构建基于题干特征的关键词模式库"""
         return {
@@ -171,6 +203,7 @@ class NLPService:
             ]
         }
     
+    @annotation_tables.pinned
     def suggest_knowledge_points(self, question_content: str, question_type: str = "选择题") -> List[Dict[str, Any]]:
         """
         推荐知识点 - 专注于题干分析，不分析选项
@@ -182,59 +215,55 @@ class NLPService:
         Returns:
             推荐的知识点列表，按置信度排序
         """
+        if self.linear_engine.enabled:
+            try:
+                return self.linear_engine.suggest(question_content, question_type, self._get_kp_id_map())
+            except Exception as e:
+                logger.error(f"线性模型推荐失败，使用规则引擎: {e}")
+
         try:
             # 提取题干进行主要分析
             question_stem = self._extract_question_stem(question_content)
             processed_text = self._preprocess_text(question_stem)
             
-            # 首先获取数据库中的知识点来获取ID
-            from backend.services.database import neo4j_service
-            
-            # 确保数据库连接
-            if not neo4j_service.driver:
-                neo4j_service.connect()
-            
-            # 获取所有知识点的ID映射
-            kp_id_map = {}
-            try:
-                if neo4j_service.driver:
-                    with neo4j_service.driver.session() as session:
-                        result = session.run("MATCH (kp:KnowledgePoint) RETURN kp.id as id, kp.name as name")
-                        for record in result:
-                            kp_id_map[record["name"]] = record["id"]
-                        logger.info(f"成功获取知识点ID映射，共{len(kp_id_map)}个知识点")
-                        # 记录重要知识点的映射情况
-                        important_kps = ["情态动词", "倒装句", "虚拟语气", "非谓语动词"]
-                        for kp in important_kps:
-                            if kp in kp_id_map:
-                                logger.info(f"找到知识点 {kp}: {kp_id_map[kp]}")
-                            else:
-                                logger.warning(f"未找到知识点: {kp}")
-                else:
-                    logger.warning("数据库连接未建立，无法获取知识点ID映射")
-            except Exception as e:
-                logger.error(f"获取知识点ID映射失败: {e}")
-                # 即使获取ID映射失败，也继续处理，使用默认ID
+            # 首先获取数据库中的知识点来获取ID（缓存到知识点变更为止）
+            kp_map_start = time.perf_counter()
+            kp_id_map = self._get_kp_id_map()
+            metrics.observe("annotation_stage_duration_seconds", time.perf_counter() - kp_map_start,
+                            scorer="nlp_light", stage="kp_id_map")
             
             # 为每个知识点计算匹配分数
             suggestions = []
             
             # 检查所有知识点 (增强库 + 关键词模式)
             knowledge_points_to_check = set()
+            # 本次推荐固定的表版本
+            keyword_patterns = self.keyword_patterns
+            enhanced_kps = self.enhanced_kb.knowledge_base if self.enhanced_kb else {}
             
             # 添加增强知识库中的知识点
-            if self.enhanced_kb:
-                knowledge_points_to_check.update(self.enhanced_kb.knowledge_base.keys())
+            knowledge_points_to_check.update(enhanced_kps.keys())
             
             # 添加关键词模式中的知识点
-            knowledge_points_to_check.update(self.keyword_patterns.keys())
+            knowledge_points_to_check.update(keyword_patterns.keys())
             
             knowledge_points_to_check = list(knowledge_points_to_check)
             
+            # 单次遍历预先计算所有知识点的语言特征分数
+            with metrics.timer("annotation_stage_duration_seconds", scorer="nlp_light", stage="linguistic_rules"):
+                linguistic_scores = self.rule_engine.score_all(question_stem)
+                kb_linguistic_scores = (
+                    self.enhanced_kb.pattern_engine.score_all(question_stem) if self.enhanced_kb else {}
+                )
+            
+            scoring_start = time.perf_counter()
+            
             for kp_name in knowledge_points_to_check:
                 # 使用增强知识库进行分析 (如果知识点在增强库中)
-                if self.enhanced_kb and kp_name in self.enhanced_kb.knowledge_base:
-                    analysis_result = self.enhanced_kb.analyze_question_features(question_stem, kp_name)
+                if kp_name in enhanced_kps:
+                    analysis_result = self.enhanced_kb.analyze_question_features(
+                        question_stem, kp_name, kb_linguistic_scores.get(kp_name, 0.0)
+                    )
                     
                     # 对于基础语法，降低增强库的阈值
                     if kp_name in ["冠词", "代词", "连词", "介词"]:
@@ -291,7 +320,7 @@ class NLPService:
                         suggestions.append(suggestion)
                     
                     # 如果增强库分析不达标，对于基础语法和重要时态仍然尝试基础算法
-                    elif kp_name in ["冠词", "代词", "连词", "介词", "一般过去时", "比较级和最高级", "There be句型", "be动词", "第三人称单数", "词汇", "数量表达", "疑问句", "条件句"] and kp_name in self.keyword_patterns:
+                    elif kp_name in ["冠词", "代词", "连词", "介词", "一般过去时", "比较级和最高级", "There be句型", "be动词", "第三人称单数", "词汇", "数量表达", "疑问句", "条件句"] and kp_name in keyword_patterns:
                         # 继续使用基础算法
                         pass
                     else:
@@ -299,9 +328,9 @@ class NLPService:
                         continue
                 
                 # 对于不在增强库中的知识点，或者增强库分析不达标的基础语法，使用基础算法
-                if kp_name in self.keyword_patterns and (kp_name not in (self.enhanced_kb.knowledge_base.keys() if self.enhanced_kb else []) or kp_name in ["冠词", "代词", "连词", "介词", "一般过去时", "比较级和最高级", "There be句型", "be动词", "第三人称单数", "词汇", "数量表达", "疑问句", "条件句"]):
+                if kp_name in keyword_patterns and (kp_name not in enhanced_kps or kp_name in ["冠词", "代词", "连词", "介词", "一般过去时", "比较级和最高级", "There be句型", "be动词", "第三人称单数", "词汇", "数量表达", "疑问句", "条件句"]):
                     keyword_score, matched_keywords = self._keyword_matching_score(processed_text, kp_name)
-                    linguistic_score = self._analyze_linguistic_features(question_stem, kp_name)
+                    linguistic_score = linguistic_scores.get(kp_name, 0.0)
                     type_score = self._question_type_score(question_type, kp_name)
                     
                     # 优化分数计算逻辑 - 特别处理重要语法结构
@@ -362,6 +391,9 @@ class NLPService:
                     else:
                         logger.debug(f"知识点 {kp_name} 分数不足: 总分={total_score:.3f} < 0.15")
             
+            metrics.observe("annotation_stage_duration_seconds", time.perf_counter() - scoring_start,
+                            scorer="nlp_light", stage="scoring")
+            
             # 按置信度排序
             suggestions.sort(key=lambda x: x["confidence"], reverse=True)
             
@@ -372,6 +404,59 @@ class NLPService:
             logger.error(f"知识点推荐失败: {e}")
             return []
     
+    @annotation_tables.pinned
+    def suggest_knowledge_points_batch(self, questions: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+        """
+        批量推荐知识点：线性分类器一次推理整批题目，规则引擎逐题计算
+        
+        Args:
+            questions: [(题目内容, 题目类型)]
+        """
+        if self.linear_engine.enabled:
+            try:
+                return self.linear_engine.suggest_batch(questions, self._get_kp_id_map())
+            except Exception as e:
+                logger.error(f"批量知识点推荐失败: {e}")
+        return [self.suggest_knowledge_points(content, question_type) for content, question_type in questions]
+    
+    def _invalidate_kp_id_map(self, event=None):
+        self._kp_id_map = None
+    
+    def _get_kp_id_map(self) -> Dict[str, str]:
+        """获取知识点名称到ID的映射，数据库可用时缓存结果"""
+        graph_events.poll()
+        if self._kp_id_map is not None:
+            return self._kp_id_map
+        
+        from backend.services.database import neo4j_service
+        
+        # 确保数据库连接
+        if not neo4j_service.driver:
+            neo4j_service.connect()
+        
+        kp_id_map = {}
+        try:
+            if neo4j_service.driver:
+                with neo4j_service.read_session() as session:
+                    result = session.run("MATCH (kp:KnowledgePoint) RETURN kp.id as id, kp.name as name")
+                    for record in result:
+                        kp_id_map[record["name"]] = record["id"]
+                    logger.info(f"成功获取知识点ID映射，共{len(kp_id_map)}个知识点")
+                    # 记录重要知识点的映射情况
+                    important_kps = ["情态动词", "倒装句", "虚拟语气", "非谓语动词"]
+                    for kp in important_kps:
+                        if kp in kp_id_map:
+                            logger.info(f"找到知识点 {kp}: {kp_id_map[kp]}")
+                        else:
+                            logger.warning(f"未找到知识点: {kp}")
+                self._kp_id_map = kp_id_map
+            else:
+                logger.warning("数据库连接未建立，无法获取知识点ID映射")
+        except Exception as e:
+            logger.error(f"获取知识点ID映射失败: {e}")
+            # 即使获取ID映射失败，也继续处理，使用默认ID
+        return kp_id_map
+    
     def _preprocess_text(self, text: str) -> str:
         """预处理文本"""
         # 移除特殊字符，保留中英文和数字
@@ -438,421 +523,8 @@ class NLPService:
         return options
     
     def _analyze_linguistic_features(self, question_stem: str, knowledge_point: str) -> float:
-        """分析语言特征（基于LabelLLM思想）"""
-        stem_lower = question_stem.lower()
-        
-        # 时态特征分析
-        if knowledge_point == "一般现在时":
-            # 检查频率副词和时间表达
-            frequency_indicators = ["always", "usually", "often", "sometimes", "every day", "every week", "every evening"]
-            if any(indicator in stem_lower for indicator in frequency_indicators):
-                return 0.95
-            
-            # 检查第三人称单数语境（也属于一般现在时）
-            if re.search(r'\b(he|she|it)\s+_+.*tv\b', stem_lower) and "every" in stem_lower:
-                return 0.9
-            
-            # 检查一般性陈述
-            if "every" in stem_lower or "always" in stem_lower:
-                return 0.8
-            return 0.0
-        
-        elif knowledge_point == "现在进行时":
-            # 检查现在进行时的强标志词
-            progressive_indicators = ["look!", "listen!", "now", "right now", "at the moment"]
-            if any(indicator in stem_lower for indicator in progressive_indicators):
-                return 0.95  # 非常高的置信度
-            # 检查现在语境
-            if "now" in stem_lower or "look" in stem_lower or "listen" in stem_lower:
-                return 0.9
-            return 0.0
-        
-        elif knowledge_point == "一般过去时":
-            # 检查过去时间标志
-            past_indicators = ["yesterday", "last week", "last month", "last sunday", "last year", "ago", "in 1990"]
-            if any(indicator in stem_lower for indicator in past_indicators):
-                return 0.95
-            
-            # 检查过去时动词形式
-            past_verbs = ["went", "came", "saw", "did", "was", "were", "had"]
-            if any(verb in stem_lower for verb in past_verbs):
-                return 0.8
-            
-            return 0.0
-        
-        elif knowledge_point == "现在完成时":
-            # 检查完成时标志，但排除倒装句的情况
-            perfect_indicators = ["already", "yet", "just", "since", "for"]
-            if any(indicator in stem_lower for indicator in perfect_indicators):
-                return 0.9
-            
-            # 检查ever/never在完成时语境中的使用，但要排除倒装句
-            # 倒装句特征：Never/Ever + 助动词 + 主语 + 动词
-            inversion_pattern = r'\b(never|ever)\s+(have|has|do|does|did|will|would|can|could|may|might|must|should)\s+\w+'
-            if re.search(inversion_pattern, stem_lower):
-                # 这是倒装句，不是现在完成时
-                return 0.0
-            
-            # 特别检查"Never have I"这种明显的倒装结构
-            if re.search(r'\bnever\s+have\s+i\b', stem_lower):
-                return 0.0
-            
-            # 正常的现在完成时：主语 + have/has + never/ever + 过去分词
-            if "ever" in stem_lower and ("have" in stem_lower or "has" in stem_lower):
-                # 检查是否是正常语序：I have ever seen
-                normal_perfect_pattern = r'\b(i|you|we|they|he|she|it|\w+)\s+(have|has)\s+(never|ever)'
-                if re.search(normal_perfect_pattern, stem_lower):
-                    return 0.9
-            
-            if "never" in stem_lower and ("have" in stem_lower or "has" in stem_lower):
-                # 检查是否是正常语序：I have never seen
-                normal_perfect_pattern = r'\b(i|you|we|they|he|she|it|\w+)\s+(have|has)\s+(never|ever)'
-                if re.search(normal_perfect_pattern, stem_lower):
-                    return 0.9
-            
-            return 0.0
-        
-        elif knowledge_point == "被动语态":
-            # 检查被动语态标志
-            if " by " in stem_lower:
-                return 0.95  # by是被动语态的强标志
-            # 检查被动语境
-            passive_contexts = ["was", "were", "is", "are", "been"]
-            if any(ctx + " " in stem_lower for ctx in passive_contexts):
-                return 0.3
-            return 0.0
-        
-        elif knowledge_point == "比较级和最高级":
-            # 检查比较结构
-            if " than " in stem_lower:
-                return 0.95  # than是比较级的强标志
-            
-            # 检查形容词比较级形式
-            comparative_forms = ["taller", "shorter", "bigger", "smaller", "older", "younger", "faster", "slower"]
-            if any(word in stem_lower for word in comparative_forms):
-                return 0.9
-            
-            # 检查is + 比较级 + than结构
-            if re.search(r'is\s+(taller|shorter|bigger|smaller|older|younger).*than', stem_lower):
-                return 0.95
-            
-            comparison_words = ["more", "most", "better", "best", "bigger", "biggest"]
-            if any(word in stem_lower for word in comparison_words):
-                return 0.8
-            return 0.0
-        
-        elif knowledge_point == "定语从句":
-            # 检查关系代词
-            relative_pronouns = ["who", "which", "that", "whom", "whose", "where", "when"]
-            if any(pronoun + " " in stem_lower for pronoun in relative_pronouns):
-                return 0.9
-            return 0.0
-        
-        elif knowledge_point == "非谓语动词":
-            # 检查非谓语动词特征
-            score = 0.0
-            
-            # 现在分词特征
-            if "concerning" in stem_lower:
-                score = max(score, 0.9)
-            
-            # 过去分词+介词结构
-            if "concerned about" in stem_lower:
-                score = max(score, 0.95)
-            
-            # being + 分词结构
-            if "being concerned" in stem_lower:
-                score = max(score, 0.85)
-            
-            return score
-        
-        elif knowledge_point == "宾语从句":
-            # 检查宾语从句引导词
-            object_clause_indicators = ["that", "what", "when", "where", "why", "how", "if", "whether"]
-            # 检查常见句式
-            clause_patterns = ["i think that", "i know that", "i wonder if", "tell me what"]
-            if any(pattern in stem_lower for pattern in clause_patterns):
-                return 0.9
-            if any(indicator + " " in stem_lower for indicator in object_clause_indicators):
-                return 0.6
-            return 0.0
-        
-        elif knowledge_point == "倒装句":
-            # 检查倒装句标志词和结构 - 优化识别逻辑
-            inversion_indicators = ["never", "seldom", "rarely", "hardly", "scarcely", "barely", "no sooner", "not only", "not until", "only"]
-            
-            # 首先检查明确的倒装结构
-            # Never/Seldom/Rarely + 助动词 + 主语 + 动词
-            strong_inversion_patterns = [
-                r'\b(never|seldom|rarely|hardly|scarcely|barely)\s+(have|has|do|does|did|will|would|can|could|may|might|must|should|is|are|was|were)\s+\w+',
-                r'\b(no sooner|not only|not until)\s+(had|have|has|do|does|did|will|would|can|could|may|might|must|should|is|are|was|were)\s+\w+',
-                r'\bonly\s+(when|if|after|before)\s+.*\s+(do|does|did|have|has|had|will|would|can|could|may|might|must|should|is|are|was|were)\s+\w+'
-            ]
-            
-            for pattern in strong_inversion_patterns:
-                if re.search(pattern, stem_lower):
-                    return 0.98  # 非常高的置信度
-            
-            # 检查标志词后跟助动词的情况
-            for indicator in inversion_indicators:
-                if indicator in stem_lower:
-                    # 检查是否紧跟助动词
-                    inversion_check = f"{indicator} " in stem_lower
-                    if inversion_check:
-                        # 进一步验证倒装结构
-                        words_after_indicator = stem_lower.split(indicator, 1)
-                        if len(words_after_indicator) > 1:
-                            following_words = words_after_indicator[1].strip().split()
-                            if following_words and following_words[0] in ["have", "has", "do", "does", "did", "will", "would", "can", "could", "may", "might", "must", "should", "is", "are", "was", "were"]:
-                                return 0.95
-            
-            # 检查完全倒装结构 (地点/时间副词 + 动词 + 主语)
-            full_inversion_patterns = [
-                r'\b(here|there|now|then|thus|hence|therefore)\s+(comes?|goes?|stands?|sits?|lies?|runs?)\s+\w+',
-                r'\b(up|down|in|out|away|back)\s+(goes?|comes?|runs?|flies?)\s+\w+'
-            ]
-            
-            for pattern in full_inversion_patterns:
-                if re.search(pattern, stem_lower):
-                    return 0.9
-            
-            return 0.0
-        
-        elif knowledge_point == "虚拟语气":
-            # 检查虚拟语气标志词和结构
-            subjunctive_indicators = ["if", "wish", "hope", "suggest", "demand", "insist", "require", "would", "could", "should", "might", "were", "had"]
-            if any(indicator in stem_lower for indicator in subjunctive_indicators):
-                return 0.8
-            
-            # 检查虚拟语气特殊结构
-            subjunctive_patterns = [
-                r'\bif\s+\w+\s+(were|had|would|could|should)',
-                r'\b(wish|hope)\s+\w+\s+(were|had|would|could|should)',
-                r'\b(suggest|demand|insist|require)\s+that',
-                r'\b(would|could|should|might)\s+\w+'
-            ]
-            
-            for pattern in subjunctive_patterns:
-                if re.search(pattern, stem_lower):
-                    return 0.9
-            
-            return 0.0
-        
-        elif knowledge_point == "情态动词":
-            # 检查情态动词 - 提高识别准确性
-            modal_verbs = ["can", "could", "may", "might", "must", "should", "would", "will", "shall"]
-            modal_phrases = ["ought to", "have to", "be able to", "be supposed to"]
-            
-            # 检查基础情态动词
-            for modal in modal_verbs:
-                if f" {modal} " in f" {stem_lower} " or stem_lower.startswith(f"{modal} "):
-                    return 0.95  # 高置信度
-            
-            # 检查情态动词短语
-            for phrase in modal_phrases:
-                if phrase in stem_lower:
-                    return 0.9
-            
-            # 检查情态动词的特殊用法模式
-            modal_patterns = [
-                r'\b(can|could|may|might|must|should|would|will|shall)\s+\w+',
-                r'\b(ought to|have to|be able to|be supposed to)\s+\w+',
-                r'\bmust\s+have\s+\w+',  # 推测用法
-                r'\b(can|could|may|might)\s+have\s+\w+'  # 可能性推测
-            ]
-            
-            for pattern in modal_patterns:
-                if re.search(pattern, stem_lower):
-                    return 0.9
-            
-            return 0.0
-        
-        elif knowledge_point == "冠词":
-            # 检查冠词相关特征
-            # 不定冠词 a/an
-            if re.search(r'\b_+\s+(elephant|apple|orange|hour|honest|university|idea)', stem_lower):
-                return 0.9  # 明显的a/an选择题
-            
-            # 检查have + 冠词 + 名词结构
-            if re.search(r'have\s+_+\s+(idea|answer|book|pen)', stem_lower):
-                return 0.95
-            
-            # 检查元音开头的词（需要用an）
-            vowel_words = ["elephant", "apple", "orange", "hour", "honest", "umbrella", "uncle", "idea", "answer"]
-            if any(word in stem_lower for word in vowel_words):
-                return 0.8
-            
-            # 检查定冠词the的使用
-            if "the" in stem_lower and ("same" in stem_lower or "only" in stem_lower or "first" in stem_lower):
-                return 0.7
-            
-            return 0.0
-        
-        elif knowledge_point == "代词":
-            # 检查代词相关特征
-            # 主格代词
-            subject_pronouns = ["he", "she", "it", "they", "we", "you", "i"]
-            if any(f" {pronoun} " in f" {stem_lower} " for pronoun in subject_pronouns):
-                return 0.8
-            
-            # 检查代词指代关系
-            if re.search(r'(tom and jerry|friends|boys|girls|students).*_+.*play', stem_lower):
-                return 0.9  # 明显的代词指代题
-            
-            # 检查复数指代
-            if "friends" in stem_lower and "_" in stem_lower:
-                return 0.8
-            
-            return 0.0
-        
-        elif knowledge_point == "连词":
-            # 检查连词相关特征
-            # 并列连词 - 特别检查 "A ___ B" 模式
-            if re.search(r'(apples?|oranges?|cats?|dogs?|boys?|girls?).*_+.*(apples?|oranges?|cats?|dogs?|boys?|girls?)', stem_lower):
-                return 0.95  # 明显的并列连词题
-            
-            # 检查 "I like A ___ B" 模式
-            if re.search(r'like.*_+.*(and|but|or)', stem_lower):
-                return 0.9
-            
-            # 检查具体的连词填空
-            if "apples" in stem_lower and "oranges" in stem_lower and "_" in stem_lower:
-                return 0.9
-            
-            # 转折连词
-            if "but" in stem_lower or "however" in stem_lower:
-                return 0.8
-            
-            # 因果连词
-            if "because" in stem_lower or "so" in stem_lower:
-                return 0.8
-            
-            return 0.0
-        
-        elif knowledge_point == "介词":
-            # 检查介词相关特征
-            # 地点介词 - 更准确的模式
-            if re.search(r'(sitting|standing|lying|put|place).*_+.*(table|chair|bed|floor|wall|shelf)', stem_lower):
-                return 0.95  # 明显的地点介词题
-            
-            # 检查书本位置介词
-            if re.search(r'(book|books?).*is.*_+.*(shelf|table|desk)', stem_lower):
-                return 0.95
-            
-            # 检查介词填空模式
-            if re.search(r'(cat|dog|book|pen).*sitting.*_+.*table', stem_lower):
-                return 0.9
-            
-            # 时间介词
-            if re.search(r'(at|in|on).*_+.*(morning|afternoon|evening|monday|january)', stem_lower):
-                return 0.8
-            
-            # 检查常见介词搭配的上下文
-            if "sitting" in stem_lower and "table" in stem_lower and "_" in stem_lower:
-                return 0.85
-            
-            if "book" in stem_lower and "shelf" in stem_lower and "_" in stem_lower:
-                return 0.9
-            
-            return 0.0
-        
-        elif knowledge_point == "There be句型":
-            # 检查There be句型特征
-            if re.search(r'\bthere\s+(is|are|was|were)\b', stem_lower):
-                return 0.95  # 明显的There be句型
-            
-            # 检查存在句的语境
-            if "there" in stem_lower and re.search(r'(three|four|five|many).*apples?', stem_lower):
-                return 0.9
-            
-            if "there" in stem_lower and "on the table" in stem_lower:
-                return 0.85
-            
-            return 0.0
-        
-        elif knowledge_point == "be动词":
-            # 检查be动词相关特征
-            be_verbs = ["is", "are", "was", "were", "am", "be"]
-            if any(f" {verb} " in f" {stem_lower} " for verb in be_verbs):
-                return 0.8
-            
-            # 检查主谓一致语境
-            if re.search(r'there\s+_+\s+(three|four|five)', stem_lower):
-                return 0.9  # There be句型中的be动词选择
-            
-            return 0.0
-        
-        elif knowledge_point == "第三人称单数":
-            # 检查第三人称单数特征
-            if re.search(r'\b(he|she|it)\s+_+', stem_lower):
-                return 0.95  # 明显的第三人称单数题
-            
-            # 检查频率副词 + 第三人称单数
-            if "every evening" in stem_lower and "he" in stem_lower:
-                return 0.9
-            
-            # 检查动词第三人称单数形式
-            third_person_verbs = ["watches", "goes", "does", "has", "likes", "plays"]
-            if any(verb in stem_lower for verb in third_person_verbs):
-                return 0.8
-            
-            return 0.0
-        
-        elif knowledge_point == "词汇":
-            # 检查词汇相关特征
-            if "opposite" in stem_lower:
-                return 0.95  # 明显的反义词题
-            
-            # 检查常见反义词对
-            antonym_pairs = [("young", "old"), ("big", "small"), ("tall", "short"), ("good", "bad")]
-            for word1, word2 in antonym_pairs:
-                if word1 in stem_lower or word2 in stem_lower:
-                    return 0.8
-            
-            return 0.0
-        
-        elif knowledge_point == "数量表达":
-            # 检查数量表达特征
-            if "how many" in stem_lower:
-                return 0.95  # 明显的数量疑问句
-            
-            # 检查可数名词复数
-            if re.search(r'(books?|apples?|cats?|dogs?)', stem_lower) and re.search(r'(five|six|seven|many)', stem_lower):
-                return 0.9
-            
-            return 0.0
-        
-        elif knowledge_point == "疑问句":
-            # 检查疑问句特征
-            if "choose the correct question" in stem_lower:
-                return 0.95  # 明显的疑问句题目
-            
-            # 检查疑问句结构
-            question_patterns = ["do you", "did you", "have you", "are you", "will you"]
-            if any(pattern in stem_lower for pattern in question_patterns):
-                return 0.9
-            
-            if "question" in stem_lower:
-                return 0.8
-            
-            return 0.0
-        
-        elif knowledge_point == "条件句":
-            # 检查条件句特征
-            if re.search(r'if\s+it\s+_+.*tomorrow', stem_lower):
-                return 0.95  # 明显的条件句
-            
-            # 检查if从句结构
-            if "if" in stem_lower and "will" in stem_lower:
-                return 0.9
-            
-            # 检查条件句时态搭配
-            if "if" in stem_lower and ("tomorrow" in stem_lower or "next" in stem_lower):
-                return 0.8
-            
-            return 0.0
-        
-        return 0.0
+        """分析语言特征（基于LabelLLM思想，规则见 linguistic_rules.LINGUISTIC_FEATURE_RULES）"""
+        return self.rule_engine.score(question_stem, knowledge_point)
     
     def _keyword_matching_score(self, question_text: str, knowledge_point: str) -> Tuple[float, List[str]]:
         """计算关键词匹配分数 - 优化版本"""
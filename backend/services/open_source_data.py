@@ -6,13 +6,15 @@ import json
 import logging
 from typing import List, Dict, Any
 
+from backend.services.kb_artifact import load_section
+
 logger = logging.getLogger(__name__)
 
 class OpenSourceDataIntegrator:
     """开源数据集成器"""
     
     def __init__(self):
-        self.integrated_data = self._load_integrated_datasets()
+        self.integrated_data = load_section("open_source.integrated_data") or self._load_integrated_datasets()
     
     def _load_integrated_datasets(self) -> Dict[str, Any]:
         """加载集成的开源数据集"""
@@ -0,0 +1,491 @@
+"""
+题目元数据列式目录
+在进程内以列存储题目的元数据（ID、题型、难度、年级、来源、考查的知识点），
+每个分面取值维护一个分块位图（每块65536位，按行号高位分块，类似Roaring Bitmap），
+筛选为位图求交、计数为popcount、分页为按秩选取，不需要访问Neo4j。
+首次使用时在后台线程从Neo4j全量构建（构建期间调用方回退到Cypher），之后订阅题目/TESTS变更事件增量维护
+"""
+import os
+import time
+import bisect
+import logging
+import threading
+from array import array
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Callable, Iterator
+
+from dotenv import load_dotenv
+
+from backend.services.graph_events import GraphChange, GraphEventBus, graph_events
+from backend.services.graph_version import ALL_ENTITIES
+from backend.services.metrics import metrics
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+CONTAINER_BITS = 16
+CONTAINER_MASK = (1 << CONTAINER_BITS) - 1
+
+# _reset() 创建的目录数据，全量重建时整体替换
+STATE_ATTRIBUTES = ("_ids", "_row_of", "_codes", "_dictionaries", "_code_of", "_kps", "_index", "_alive",
+                    "_sorted_rows")
+
+# 单值分面（列）和多值分面
+SCALAR_FACETS = ("question_type", "difficulty", "grade_level", "source")
+FACETS = SCALAR_FACETS + ("knowledge_points",)
+
+
+def _select(bits: int, k: int) -> int:
+    """整数中第k个（从0开始）置位的位置"""
+    low, high = 0, bits.bit_length()
+    while low < high:
+        middle = (low + high) // 2
+        if (bits & ((1 << (middle + 1)) - 1)).bit_count() > k:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class Bitmap:
+    """分块位图：高位 -> 65536位的整数"""
+
+    __slots__ = ("containers",)
+
+    def __init__(self, containers: Optional[Dict[int, int]] = None):
+        self.containers = containers if containers is not None else {}
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[int]) -> "Bitmap":
+        """批量构建（按块写入字节数组后一次转换为整数）"""
+        chunks: Dict[int, bytearray] = {}
+        for position in positions:
+            chunk = chunks.get(position >> CONTAINER_BITS)
+            if chunk is None:
+                chunk = chunks[position >> CONTAINER_BITS] = bytearray(1 << (CONTAINER_BITS - 3))
+            low = position & CONTAINER_MASK
+            chunk[low >> 3] |= 1 << (low & 7)
+        return cls({high: int.from_bytes(chunk, "little") for high, chunk in chunks.items()})
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        """行号 [0, size) 全部置位"""
+        containers = {}
+        for high in range((size + CONTAINER_MASK) >> CONTAINER_BITS):
+            width = min(size - (high << CONTAINER_BITS), 1 << CONTAINER_BITS)
+            containers[high] = (1 << width) - 1
+        return cls(containers)
+
+    def add(self, position: int):
+        high = position >> CONTAINER_BITS
+        self.containers[high] = self.containers.get(high, 0) | (1 << (position & CONTAINER_MASK))
+
+    def discard(self, position: int):
+        high = position >> CONTAINER_BITS
+        bits = self.containers.get(high)
+        if bits is not None:
+            bits &= ~(1 << (position & CONTAINER_MASK))
+            if bits:
+                self.containers[high] = bits
+            else:
+                del self.containers[high]
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        if len(other.containers) < len(self.containers):
+            self, other = other, self
+        result = {}
+        for high, bits in self.containers.items():
+            both = bits & other.containers.get(high, 0)
+            if both:
+                result[high] = both
+        return Bitmap(result)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        result = dict(self.containers)
+        for high, bits in other.containers.items():
+            result[high] = result.get(high, 0) | bits
+        return Bitmap(result)
+
+    def __len__(self) -> int:
+        return sum(bits.bit_count() for bits in self.containers.values())
+
+    def rank(self, position: int) -> int:
+        """行号小于 position 的置位数"""
+        high, low = position >> CONTAINER_BITS, position & CONTAINER_MASK
+        count = sum(bits.bit_count() for key, bits in self.containers.items() if key < high)
+        return count + (self.containers.get(high, 0) & ((1 << low) - 1)).bit_count()
+
+    def below(self, position: int) -> "Bitmap":
+        """只保留行号小于 position 的部分"""
+        high, low = position >> CONTAINER_BITS, position & CONTAINER_MASK
+        result = {key: bits for key, bits in self.containers.items() if key < high}
+        partial = self.containers.get(high, 0) & ((1 << low) - 1)
+        if partial:
+            result[high] = partial
+        return Bitmap(result)
+
+    def slice(self, skip: int, limit: int) -> List[int]:
+        """按行号顺序跳过 skip 个置位后取 limit 个"""
+        positions = []
+        for high in sorted(self.containers):
+            if len(positions) >= limit:
+                break
+            bits = self.containers[high]
+            count = bits.bit_count()
+            if skip >= count:
+                skip -= count
+                continue
+            if skip:
+                start = _select(bits, skip)
+                bits >>= start
+                offset = start
+                skip = 0
+            else:
+                offset = 0
+            base = (high << CONTAINER_BITS) + offset
+            while bits and len(positions) < limit:
+                lowest = bits & -bits
+                index = lowest.bit_length() - 1
+                positions.append(base + index)
+                bits ^= lowest
+        return positions
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self.containers):
+            bits = self.containers[high]
+            base = high << CONTAINER_BITS
+            while bits:
+                lowest = bits & -bits
+                yield base + lowest.bit_length() - 1
+                bits ^= lowest
+
+
+class QuestionCatalog:
+    """题目元数据列式目录"""
+
+    def __init__(self, loader: Optional[Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]] = None,
+                 events: Optional[GraphEventBus] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            loader: 按ID加载题目元数据行，参数为None时加载全部，默认从Neo4j读取
+            events: 变更事件总线，订阅题目和TESTS写入以增量维护
+            enabled: 为False时查询返回None，调用方回退到Cypher
+        """
+        if enabled is None:
+            enabled = os.getenv("QUESTION_CATALOG_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.loader = loader or _load_catalog_rows
+        self._lock = threading.RLock()
+        self._reset()
+        self._built = False
+        self._retry_at = 0.0
+        # 待从数据库重新加载的题目ID -> 最近一次变更的序号（加载期间再次变更的ID不会被误清除）
+        self._pending: Dict[str, int] = {}
+        self._change_seq = 0
+        # 范围未知的写入次数；目录反映的次数落后时需要全量重建
+        self._generation = 0
+        self._built_generation = 0
+        # 全量构建只由一个线程执行，构建期间查询回退到Cypher
+        self._build_lock = threading.Lock()
+        self._build_thread: Optional[threading.Thread] = None
+        (events or graph_events).subscribe(self._on_change, entities=("Question", "TESTS"))
+
+    # ===== 查询 =====
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, skip: int = 0,
+              limit: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        按筛选条件分页（题目ID升序），目录不可用时返回None
+
+        Args:
+            filters: question_type / difficulty / grade_level 精确匹配，source 子串匹配，
+                     knowledge_points 为知识点名称（列表表示同时考查全部）
+        """
+        if not self._ensure_ready():
+            return None
+        with self._lock, metrics.timer("question_catalog_seconds", operation="query"):
+            self._maybe_compact()
+            matched = self._match(filters or {})
+            return {"total": len(matched), "ids": self._page(matched, max(0, skip), max(0, limit))}
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        if not self._ensure_ready():
+            return None
+        with self._lock:
+            return len(self._match(filters or {}))
+
+    def facet_counts(self, filters: Optional[Dict[str, Any]] = None,
+                     facets: Iterable[str] = FACETS) -> Optional[Dict[str, Any]]:
+        """
+        在筛选结果内按分面取值计数，目录不可用时返回None
+
+        Returns:
+            {"total": 总数, "facets": {分面: {取值: 数量}}}，取值为None表示未设置
+        """
+        if not self._ensure_ready():
+            return None
+        with self._lock, metrics.timer("question_catalog_seconds", operation="facets"):
+            self._maybe_compact()
+            matched = self._match(filters or {})
+            result = {}
+            for facet in facets:
+                if facet not in self._index:
+                    raise ValueError(f"未知分面: {facet}")
+                counts = {}
+                for value, bitmap in self._index[facet].items():
+                    count = len(bitmap & matched)
+                    if count:
+                        counts[value] = count
+                result[facet] = dict(sorted(counts.items(), key=lambda item: -item[1]))
+            return {"total": len(matched), "facets": result}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "built": self._built and self._built_generation == self._generation,
+                "building": self._build_lock.locked(),
+                "questions": len(self._row_of),
+                "rows": len(self._ids),
+                "sorted_rows": self._sorted_rows,
+                "pending": len(self._pending),
+                "facet_values": {facet: len(values) for facet, values in self._index.items()}
+            }
+
+    # ===== 维护 =====
+
+    def rebuild(self, rows: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """全量重建（默认从Neo4j读取全部题目），行号按题目ID排序；在副本上构建后整体替换"""
+        with self._build_lock:
+            with self._lock:
+                generation = self._generation
+                # 序号不大于此值的变更都包含在全量数据中，加载期间的新变更留待增量更新
+                covered = self._change_seq
+            if rows is None:
+                rows = self.loader(None)
+            started = time.perf_counter()
+            staging = self._build_state(rows)
+            with self._lock:
+                self._install(staging)
+                self._pending = {qid: seq for qid, seq in self._pending.items() if seq > covered}
+                self._built = True
+                self._built_generation = generation
+        logger.info(f"题目目录已重建: {len(staging._row_of)} 道题目，用时 {time.perf_counter() - started:.2f}s")
+        return self.stats()
+
+    def upsert(self, row: Dict[str, Any]):
+        """加入或更新一道题目（追加新行，旧行作废）"""
+        with self._lock:
+            self._upsert_locked(row)
+            self._pending.pop(row["id"], None)
+
+    def remove(self, question_id: str):
+        with self._lock:
+            self._remove_locked(question_id)
+            self._pending.pop(question_id, None)
+
+    # ===== 内部方法 =====
+
+    def _reset(self):
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        # 单值分面按字典编码存为整型列
+        self._codes: Dict[str, array] = {facet: array("i") for facet in SCALAR_FACETS}
+        self._dictionaries: Dict[str, List[Any]] = {facet: [] for facet in SCALAR_FACETS}
+        self._code_of: Dict[str, Dict[Any, int]] = {facet: {} for facet in SCALAR_FACETS}
+        self._kps: List[Tuple[str, ...]] = []
+        self._index: Dict[str, Dict[Any, Bitmap]] = {facet: {} for facet in FACETS}
+        self._alive = Bitmap()
+        # [0, _sorted_rows) 内的行按题目ID排序；之后为增量追加的行
+        self._sorted_rows = 0
+
+    @staticmethod
+    def _build_state(rows: Iterable[Dict[str, Any]]) -> "QuestionCatalog":
+        """按题目ID排序构建目录数据（不加锁，在副本上进行）"""
+        rows = sorted((row for row in rows if row.get("id")), key=lambda row: row["id"])
+        staging = QuestionCatalog.__new__(QuestionCatalog)
+        staging._reset()
+        positions: Dict[str, Dict[Any, List[int]]] = {facet: {} for facet in FACETS}
+        for row in rows:
+            position = staging._append_columns(row)
+            for facet in SCALAR_FACETS:
+                positions[facet].setdefault(row.get(facet), []).append(position)
+            for name in staging._kps[position]:
+                positions["knowledge_points"].setdefault(name, []).append(position)
+        for facet, values in positions.items():
+            staging._index[facet] = {value: Bitmap.from_positions(rows_) for value, rows_ in values.items()}
+        staging._alive = Bitmap.full(len(staging._ids))
+        staging._sorted_rows = len(staging._ids)
+        return staging
+
+    def _install(self, staging: "QuestionCatalog"):
+        for name in STATE_ATTRIBUTES:
+            setattr(self, name, getattr(staging, name))
+
+    def _append_columns(self, row: Dict[str, Any]) -> int:
+        position = len(self._ids)
+        self._ids.append(row["id"])
+        self._row_of[row["id"]] = position
+        for facet in SCALAR_FACETS:
+            value = row.get(facet)
+            code = self._code_of[facet].get(value)
+            if code is None:
+                code = self._code_of[facet][value] = len(self._dictionaries[facet])
+                self._dictionaries[facet].append(value)
+            self._codes[facet].append(code)
+        self._kps.append(tuple(sorted({name for name in row.get("knowledge_points") or [] if name})))
+        return position
+
+    def _upsert_locked(self, row: Dict[str, Any]):
+        self._remove_locked(row["id"])
+        position = self._append_columns(row)
+        for facet in SCALAR_FACETS:
+            self._index[facet].setdefault(row.get(facet), Bitmap()).add(position)
+        for name in self._kps[position]:
+            self._index["knowledge_points"].setdefault(name, Bitmap()).add(position)
+        self._alive.add(position)
+
+    def _remove_locked(self, question_id: str):
+        position = self._row_of.pop(question_id, None)
+        if position is None:
+            return
+        self._alive.discard(position)
+        for facet in SCALAR_FACETS:
+            value = self._dictionaries[facet][self._codes[facet][position]]
+            bitmap = self._index[facet].get(value)
+            if bitmap is not None:
+                bitmap.discard(position)
+                if not bitmap.containers:
+                    del self._index[facet][value]
+        for name in self._kps[position]:
+            bitmap = self._index["knowledge_points"].get(name)
+            if bitmap is not None:
+                bitmap.discard(position)
+                if not bitmap.containers:
+                    del self._index["knowledge_points"][name]
+
+    def _match(self, filters: Dict[str, Any]) -> Bitmap:
+        matched = self._alive
+        for facet in ("question_type", "difficulty", "grade_level"):
+            value = filters.get(facet)
+            if value:
+                matched = matched & self._index[facet].get(value, Bitmap())
+        source = filters.get("source")
+        if source:
+            union = Bitmap()
+            for value, bitmap in self._index["source"].items():
+                if value and source in value:
+                    union = union | bitmap
+            matched = matched & union
+        names = filters.get("knowledge_points")
+        for name in [names] if isinstance(names, str) else names or []:
+            matched = matched & self._index["knowledge_points"].get(name, Bitmap())
+        return matched
+
+    def _page(self, matched: Bitmap, skip: int, limit: int) -> List[str]:
+        """
+        按题目ID升序分页：有序部分按秩选取，增量追加的行（数量少）排序后按ID归并
+
+        matched 须在整理（_maybe_compact）之后计算，整理会重新编排行号
+        """
+        sorted_part = matched.below(self._sorted_rows)
+        appended = sorted((self._ids[p] for p in matched if p >= self._sorted_rows))
+        if not appended:
+            return [self._ids[p] for p in sorted_part.slice(skip, limit)]
+
+        sorted_ids = self._ids[:self._sorted_rows]
+        # 每个追加行在合并序列中的名次 = 有序部分中ID更小的匹配数 + 它在追加行中的序号
+        ranks = [sorted_part.rank(bisect.bisect_left(sorted_ids, qid)) + j for j, qid in enumerate(appended)]
+        before = bisect.bisect_left(ranks, skip)
+        inside = bisect.bisect_left(ranks, skip + limit) - before
+        page = [self._ids[p] for p in sorted_part.slice(skip - before, limit - inside)]
+        page.extend(appended[before:before + inside])
+        return sorted(page)
+
+    def _maybe_compact(self):
+        """追加的行过多时重新排序整理（在计算匹配位图之前调用）"""
+        if len(self._ids) - self._sorted_rows > max(1000, self._sorted_rows // 20):
+            self._compact()
+
+    def _compact(self):
+        rows = [{
+            "id": qid,
+            **{facet: self._dictionaries[facet][self._codes[facet][position]] for facet in SCALAR_FACETS},
+            "knowledge_points": list(self._kps[position])
+        } for qid, position in self._row_of.items()]
+        self._install(self._build_state(rows))
+
+    def _on_change(self, event: GraphChange):
+        with self._lock:
+            if ALL_ENTITIES in event.entities or not event.ids:
+                # 范围未知的写操作：下次查询时在后台全量重建，同一次重建覆盖期间的多次写入
+                self._generation += 1
+                self._retry_at = 0.0
+            else:
+                self._change_seq += 1
+                for question_id in event.ids:
+                    self._pending[question_id] = self._change_seq
+
+    def _ensure_ready(self) -> bool:
+        """
+        目录可用时加载变更事件中的题目并返回True；
+        首次使用或范围未知的写入后启动后台全量构建，构建完成前返回False（调用方回退到Cypher）
+        """
+        if not self.enabled:
+            return False
+        if self._build_lock.locked():
+            return False
+        if not self._built or self._built_generation != self._generation:
+            self._start_build()
+            return False
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return True
+        try:
+            loaded = {row["id"]: row for row in self.loader(list(pending))}
+        except Exception as e:
+            logger.warning(f"题目目录增量更新失败: {e}")
+            return False
+        with self._lock:
+            for question_id, seq in pending.items():
+                if self._pending.get(question_id) != seq:
+                    # 加载期间再次变更或已由调用方更新，留待下次处理
+                    continue
+                del self._pending[question_id]
+                if question_id in loaded:
+                    self._upsert_locked(loaded[question_id])
+                else:
+                    # 已删除的题目，或事件中的知识点ID等非题目ID
+                    self._remove_locked(question_id)
+        return True
+
+    def _start_build(self):
+        with self._lock:
+            if self._build_thread is not None and self._build_thread.is_alive():
+                return
+            if time.monotonic() < self._retry_at:
+                return
+            self._build_thread = threading.Thread(target=self._build, name="question-catalog-build", daemon=True)
+            self._build_thread.start()
+
+    def _build(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            # 数据库不可用时暂停重试，期间调用方回退到Cypher
+            self._retry_at = time.monotonic() + 30
+            logger.warning(f"题目目录构建失败: {e}")
+
+
+def _load_catalog_rows(question_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    from backend.services.database import neo4j_service
+    if not neo4j_service.driver and not neo4j_service.connect():
+        raise RuntimeError("数据库未连接")
+    return neo4j_service.get_question_catalog_rows(question_ids)
+
+
+# 全局题目目录
+question_catalog = QuestionCatalog()
+
+metrics.describe("question_catalog_seconds", "In-process question catalog query latency by operation")
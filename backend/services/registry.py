@@ -0,0 +1,152 @@
+"""
+服务注册表
+重量级服务（NLP、AI Agent、MEGAnno+等）在首次使用时才导入和构造，
+缩短Serverless冷启动时间，并记录每个服务的加载耗时
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import importlib
+import importlib.util
+from typing import Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
+
+from backend.services.metrics import metrics
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """服务代理：首次访问属性时加载真实服务"""
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: "ServiceRegistry", name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self._registry.is_loaded(self._name) else "lazy"
+        return f"<LazyService {self._name} ({state})>"
+
+
+class ServiceRegistry:
+    """服务注册表"""
+
+    def __init__(self, lazy: Optional[bool] = None):
+        if lazy is None:
+            lazy = os.getenv("LAZY_SERVICES", "true").lower() in ("1", "true", "yes")
+        self.lazy = lazy
+        self._targets: Dict[str, Tuple[str, str]] = {}
+        self._requires: Dict[str, Tuple[str, ...]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, target: str, requires: Tuple[str, ...] = ()):
+        """
+        注册服务
+
+        Args:
+            name: 服务名
+            target: "模块路径:属性名"
+            requires: 服务依赖的可选第三方包，用于 available() 判断
+
+        Returns:
+            服务代理；关闭懒加载时由应用启动时调用 preload() 一次性加载
+        """
+        module_name, _, attr = target.partition(":")
+        self._targets[name] = (module_name, attr)
+        self._requires[name] = tuple(requires)
+        return LazyService(self, name)
+
+    def get(self, name: str) -> Any:
+        """获取服务实例（首次调用时导入并构造）"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            module_name, attr = self._targets[name]
+            started = time.perf_counter()
+            module = importlib.import_module(module_name)
+            instance = getattr(module, attr)
+            elapsed = time.perf_counter() - started
+            self._instances[name] = instance
+            self._load_times[name] = elapsed
+
+        logger.info(f"服务 {name} 已加载，耗时 {elapsed * 1000:.1f}ms")
+        metrics.observe("service_load_seconds", elapsed, service=name)
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def available(self, name: str) -> bool:
+        """服务依赖的第三方包是否都已安装（不会导入服务本身）"""
+        return all(importlib.util.find_spec(pkg) is not None for pkg in self._requires.get(name, ()))
+
+    def preload(self, *names: str):
+        """预加载服务（如常驻进程启动后预热）；依赖缺失的服务跳过"""
+        for name in names or tuple(self._targets):
+            if self.available(name):
+                self.get(name)
+
+    def report(self) -> Dict[str, Any]:
+        """各服务的加载状态和耗时"""
+        return {
+            "lazy": self.lazy,
+            "services": {
+                name: {
+                    "loaded": name in self._instances,
+                    "load_ms": round(self._load_times[name] * 1000, 2) if name in self._load_times else None
+                }
+                for name in self._targets
+            }
+        }
+
+
+def alias_module(alias: str, target: str, lazy: bool = True):
+    """
+    把 alias 模块指向 target 模块（如用轻量版NLP服务替换完整版）
+
+    lazy=True 时使用 importlib 的 LazyLoader，目标模块在首次访问属性时才执行
+    """
+    if alias in sys.modules:
+        return sys.modules[alias]
+    module = sys.modules.get(target)
+    if module is None:
+        spec = importlib.util.find_spec(target)
+        if spec is None:
+            raise ImportError(f"找不到模块: {target}")
+        if lazy:
+            spec.loader = importlib.util.LazyLoader(spec.loader)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[target] = module
+        spec.loader.exec_module(module)
+    sys.modules[alias] = module
+    return module
+
+
+# 全局服务注册表
+services = ServiceRegistry()
+metrics.describe("service_load_seconds", "Lazy service import and construction time")
+
+nlp_service = services.register("nlp_service", "backend.services.nlp_service:nlp_service")
+ai_agent_service = services.register("ai_agent_service", "backend.services.ai_agent_service:ai_agent_service")
+analytics_service = services.register("analytics_service", "backend.services.analytics_service:analytics_service")
+meganno_service = services.register(
+    "meganno_service", "backend.services.meganno_integration:meganno_service", requires=("requests",)
+)
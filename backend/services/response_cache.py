@@ -0,0 +1,96 @@
+"""
+HTTP响应缓存
+按 (路径, 查询参数) 缓存只读接口的响应体，条目绑定其依赖实体的版本号：
+依赖的实体发生变更或超过TTL后失效
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, NamedTuple, Iterable
+
+from backend.services.graph_version import GraphVersion, graph_version
+from backend.services.metrics import metrics
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    stored_at: float
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """查询参数排序后参与键计算，参数顺序不同的相同请求共用缓存"""
+    params = b"&".join(sorted(p for p in query_string.split(b"&") if p))
+    return f"{path}?{params.decode('latin-1')}"
+
+
+class ResponseCache:
+    """进程内LRU响应缓存"""
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None,
+                 enabled: Optional[bool] = None, version: Optional[GraphVersion] = None):
+        if enabled is None:
+            enabled = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        if ttl is None:
+            ttl = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+        self.enabled = enabled
+        self.max_entries = max_entries
+        # 未接入同一事件代理的实例（如多台主机）互相感知不到写操作，TTL限制由此产生的陈旧时间
+        self.ttl = ttl
+        self.version = version or graph_version
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, key: str, entities: Iterable[str]) -> str:
+        """依赖实体当前版本下该资源的ETag"""
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        # 按TTL分段轮换，保证客户端缓存的陈旧时间同样有上限
+        epoch = int(time.time() // self.ttl) if self.ttl > 0 else 0
+        return f'W/"{self.version.scope}.{self.version.version_of(entities)}.{epoch}-{digest}"'
+
+    def get(self, key: str, entities: Iterable[str]) -> Optional[CachedResponse]:
+        current = self.version.version_of(entities)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != current
+                                      or time.monotonic() - entry.stored_at > self.ttl):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            metrics.cache_miss("response")
+        else:
+            metrics.cache_hit("response")
+        return entry
+
+    def put(self, key: str, version: int, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        """写入缓存；version 为请求开始时依赖实体的版本号，期间发生变更的响应不会被后续请求命中"""
+        entry = CachedResponse(version, time.monotonic(), status, headers, body)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "graph_version": self.version.current
+            }
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
@@ -1,19 +1,33 @@
 #!/usr/bin/env python3
 """
 简单词库增强模块
-使用预定义的词汇扩展和规则来丰富关键词库
+使用预定义的词汇扩展和规则来丰富关键词库，
+并合并关键词扩展缓存中离线计算好的WordNet/spaCy结果
 """
 
 import re
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Optional, Tuple
 import logging
 
+from backend.services.keyword_expansion_cache import KeywordExpansionCache, get_expansion_cache
+
 logger = logging.getLogger(__name__)
 
+_DEFAULT_CACHE = object()
+
+
 class SimpleWordEnhancer:
     """简单词库增强器"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[KeywordExpansionCache] = _DEFAULT_CACHE,
+                 cache_kinds: Tuple[str, ...] = ("synonyms", "forms")):
+        """
+        Args:
+            cache: 关键词扩展缓存，默认使用全局缓存；传None时只使用预定义规则
+            cache_kinds: 从缓存合并的扩展类型（related 噪声较大，默认不合并）
+        """
+        self.cache = get_expansion_cache() if cache is _DEFAULT_CACHE else cache
+        self.cache_kinds = cache_kinds
         # 预定义的词汇扩展规则
         self.word_expansions = {
             # 时态相关
@@ -125,6 +139,10 @@ class SimpleWordEnhancer:
             for base_word, expansions in self.word_expansions.items():
                 if base_word in keyword_lower or keyword_lower in base_word:
                     expanded.update(expansions)
+            
+            # 离线计算的WordNet/spaCy扩展
+            if self.cache is not None:
+                expanded.update(self.cache.expand(keyword, self.cache_kinds))
         
         return expanded
     
@@ -170,7 +188,7 @@ class SimpleWordEnhancer:
         filtered = self._filter_keywords(enhanced, knowledge_point)
         
         logger.info(f"知识点 '{knowledge_point}' 关键词从 {len(base_keywords)} 个增强到 {len(filtered)} 个")
-        return list(filtered)
+        return sorted(filtered)
     
     def _get_knowledge_specific_keywords(self, knowledge_point: str) -> Set[str]:
         """获取知识点特定的关键词"""
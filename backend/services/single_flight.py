@@ -0,0 +1,113 @@
+"""
+请求合并（single-flight）
+同一方法、相同参数的并发调用只执行一次，其余调用等待并共享同一结果（或异常）。
+合并键包含当前图数据版本号：写入之后开始的调用不会加入写入之前开始的计算，
+因此只削平并发尖峰，不引入额外的陈旧数据
+"""
+import json
+import logging
+import threading
+import functools
+from typing import Dict, Any, Callable, Hashable, Optional
+
+from backend.services.graph_version import GraphVersion, graph_version
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次进行中的计算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.owner = threading.get_ident()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并并发调用（线程安全）"""
+
+    def __init__(self, name: str, version: Optional[GraphVersion] = None):
+        self.name = name
+        self.version = version or graph_version
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        执行 fn(*args, **kwargs)；已有相同键的计算进行中时等待其结果
+
+        结果对象在合并的调用方之间共享，调用方不应原地修改
+        """
+        key = (key, self.version.current)
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            elif call.owner == threading.get_ident():
+                # 同一线程重入相同的键时直接执行，避免等待自己
+                call = None
+                leader = False
+            else:
+                call.waiters += 1
+                leader = False
+
+        if call is None:
+            return fn(*args, **kwargs)
+        if not leader:
+            metrics.inc("single_flight_calls_total", flight=self.name, role="coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.inc("single_flight_calls_total", flight=self.name, role="leader")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"{self.name}: {call.waiters} 个并发调用共享了同一结果")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def _call_key(name: str, args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    key = (name, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        # 列表、字典等参数按JSON序列化
+        return name, json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+
+
+def coalesce(flight: SingleFlight):
+    """
+    方法装饰器：同一实例上相同方法、相同参数的并发调用合并为一次
+
+        @coalesce(analytics_flight)
+        def get_comprehensive_report(self): ...
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (id(self), _call_key(method.__qualname__, args, kwargs))
+            return flight.do(key, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+metrics.describe("single_flight_calls_total", "Coalescible calls by flight and role (leader executed, coalesced shared)")
@@ -0,0 +1,292 @@
+"""
+流式智能导入
+逐块读取NDJSON请求体并按批校验，经有界队列依次送入批量写入和批量标注阶段；
+下游变慢时队列写满，读取端停止读取请求体（背压经TCP传回客户端），
+每行的处理结果在完成后立即流式返回，内存占用只与批大小和队列深度有关
+"""
+import json
+import time
+import zlib
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, NamedTuple
+
+from pydantic import ValidationError
+
+from backend.models.schema import Question, question_id
+from backend.services.database import neo4j_service
+from backend.services.near_duplicate_index import near_duplicate_index, READY_TIMEOUT
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_QUEUE_DEPTH = 4
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class ImportRow(NamedTuple):
+    """通过校验的一行"""
+    line: int
+    question: Question
+    knowledge_points: List[str]   # 行内已给出的知识点名称
+
+
+class _StageFailure(NamedTuple):
+    error: BaseException
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes], compressed: bool = False,
+                            max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    把字节块流切分为行（行号从1开始），超长的行返回 (行号, None)
+
+    Args:
+        chunks: 请求体字节块
+        compressed: 请求体为gzip/zlib压缩（Content-Encoding）
+        max_line_bytes: 单行最大字节数
+    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32) if compressed else None
+    buffer = b""
+    line_no = 0
+    oversized = False
+
+    async for chunk in chunks:
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        if not chunk:
+            continue
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if oversized:
+                # 超长行的剩余部分
+                oversized = False
+                yield line_no, None
+            elif len(line) > max_line_bytes:
+                yield line_no, None
+            else:
+                yield line_no, line
+        if len(buffer) > max_line_bytes:
+            # 丢弃超长行已读到的部分，直到下一个换行
+            oversized = True
+            buffer = b""
+
+    if decompressor is not None:
+        buffer += decompressor.flush()
+    if oversized or buffer.strip():
+        line_no += 1
+        yield line_no, None if oversized else buffer
+
+
+class StreamingImportPipeline:
+    """
+    读取 → 校验 → 批量写入 → 批量标注 的有界流水线
+
+    每个阶段是一个协程，阶段之间用容量为 queue_depth 个批次的队列连接
+    """
+
+    def __init__(self, annotator=None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_depth: int = DEFAULT_QUEUE_DEPTH, annotate: bool = True, dedup: bool = False,
+                 similarity_threshold: Optional[float] = None, offset: int = 0,
+                 max_line_bytes: int = MAX_LINE_BYTES, source: str = "smart-import-stream"):
+        """
+        Args:
+            annotator: 提供 batch_auto_annotate 的标注服务（AI Agent）
+            batch_size: 每批校验/写入/标注的行数
+            queue_depth: 阶段之间最多积压的批次数
+            annotate: 为False时只导入不标注
+            dedup: 跳过与题库近似重复的题目（索引在等待时间内未构建完成时不去重，汇总中 dedup_unavailable 为true）
+            similarity_threshold: 近似重复阈值，默认使用索引阈值
+            offset: 跳过行号不大于 offset 的行（断点续传）
+            max_line_bytes: 单行最大字节数
+            source: 写入变更事件的来源
+        """
+        self.annotator = annotator
+        self.batch_size = max(1, batch_size)
+        self.queue_depth = max(1, queue_depth)
+        self.annotate = annotate and annotator is not None
+        self.dedup = dedup
+        self.similarity_threshold = similarity_threshold
+        self.offset = max(0, offset)
+        self.max_line_bytes = max_line_bytes
+        self.source = source
+        self.counts = {"rows": 0, "skipped": 0, "imported": 0, "duplicate": 0, "invalid": 0, "failed": 0}
+        self.dedup_unavailable = False
+
+    async def run(self, chunks: AsyncIterator[bytes], compressed: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        执行导入，逐个产出每行的结果，最后产出 {"summary": {...}}
+
+        调用方停止迭代（如客户端断开）时各阶段随之取消
+        """
+        started = time.perf_counter()
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * self.queue_depth)
+        to_write: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        to_annotate: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+
+        async def stage(coro):
+            try:
+                await coro
+            except Exception as e:
+                await results.put(_StageFailure(e))
+
+        tasks = [
+            asyncio.create_task(stage(self._read(chunks, compressed, to_write, results))),
+            asyncio.create_task(stage(self._write(to_write, to_annotate, results))),
+            asyncio.create_task(stage(self._annotate(to_annotate, results))),
+        ]
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+                if isinstance(item, _StageFailure):
+                    raise item.error
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        yield {"summary": dict(self.counts, dedup_unavailable=self.dedup_unavailable,
+                               duration_seconds=round(time.perf_counter() - started, 3))}
+
+    # ===== 阶段 =====
+
+    async def _read(self, chunks: AsyncIterator[bytes], compressed: bool,
+                    to_write: asyncio.Queue, results: asyncio.Queue):
+        """解析并按批校验；队列满时在此等待，不再读取请求体"""
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        async for line_no, line in iter_ndjson_lines(chunks, compressed, self.max_line_bytes):
+            if line_no <= self.offset:
+                self.counts["skipped"] += 1
+                continue
+            if line is not None and not line.strip():
+                continue
+            self.counts["rows"] += 1
+            if line is None:
+                await self._emit(results, line_no, "invalid", error=f"单行超过 {self.max_line_bytes} 字节")
+                continue
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("每行必须是一个JSON对象")
+            except ValueError as e:
+                await self._emit(results, line_no, "invalid", error=f"JSON解析失败: {e}")
+                continue
+            pending.append((line_no, data))
+            if len(pending) >= self.batch_size:
+                await to_write.put(await self._validate(pending, results))
+                pending = []
+        if pending:
+            await to_write.put(await self._validate(pending, results))
+        await to_write.put(None)
+
+    async def _validate(self, pending: List[Tuple[int, Dict[str, Any]]], results: asyncio.Queue) -> List[ImportRow]:
+        batch = []
+        for line_no, data in pending:
+            try:
+                question = Question(**data)
+            except ValidationError as e:
+                await self._emit(results, line_no, "invalid", error=str(e))
+                continue
+            if not question.id:
+                question.id = question_id(question.content)
+            batch.append(ImportRow(line_no, question, list(data.get("knowledge_points") or [])))
+        return batch
+
+    async def _write(self, to_write: asyncio.Queue, to_annotate: asyncio.Queue, results: asyncio.Queue):
+        """去重后以单个事务批量写入"""
+        if self.dedup and not await asyncio.to_thread(near_duplicate_index.wait_ready, READY_TIMEOUT):
+            # 冷启动时索引尚未构建完成：照常导入并在汇总中注明未去重
+            logger.warning("近似重复索引不可用，本次流式导入不做近似去重")
+            self.dedup = False
+            self.dedup_unavailable = True
+        while True:
+            batch = await to_write.get()
+            if batch is None:
+                break
+            if self.dedup:
+                batch = await self._drop_duplicates(batch, results)
+            if not batch:
+                continue
+            try:
+                with metrics.timer("smart_import_stage_seconds", stage="write"):
+                    await asyncio.to_thread(
+                        neo4j_service.merge_questions,
+                        [dict(row.question.dict(), knowledge_points=row.knowledge_points) for row in batch],
+                        source=self.source, update_existing=True
+                    )
+            except Exception as e:
+                logger.error(f"流式导入批量写入失败: {e}")
+                for row in batch:
+                    if self.dedup:
+                        near_duplicate_index.remove(row.question.id)
+                    await self._emit(results, row.line, "failed", question_id=row.question.id,
+                                     error=f"写入失败: {e}")
+                continue
+            if self.annotate:
+                await to_annotate.put(batch)
+            else:
+                for row in batch:
+                    await self._emit(results, row.line, "imported", question_id=row.question.id)
+        await to_annotate.put(None)
+
+    async def _annotate(self, to_annotate: asyncio.Queue, results: asyncio.Queue):
+        """批量自动标注（题目已写入，标注只建立TESTS关系）"""
+        while True:
+            batch = await to_annotate.get()
+            if batch is None:
+                break
+            with metrics.timer("smart_import_stage_seconds", stage="annotate"):
+                summary = await self.annotator.batch_auto_annotate([row.question for row in batch])
+            for row, result in zip(batch, summary.get("results", [])):
+                if result.get("status") == "completed":
+                    await self._emit(results, row.line, "imported", question_id=row.question.id,
+                                     applied_annotations=[
+                                         ann.get("knowledge_point_id") for ann in result.get("applied_annotations", [])
+                                     ],
+                                     duplicate_of=result.get("duplicate_of"))
+                else:
+                    # 题目已导入，只是标注失败
+                    await self._emit(results, row.line, "imported", question_id=row.question.id,
+                                     annotation_error=result.get("error", "标注失败"))
+            # 让出事件循环，读取和写入阶段得以推进
+            await asyncio.sleep(0)
+        await results.put(None)
+
+    async def _drop_duplicates(self, batch: List[ImportRow], results: asyncio.Queue) -> List[ImportRow]:
+        """近似重复的行直接返回已有题目及其标注；保留的行立即加入索引，识别同一流中后面的重复"""
+        kept = []
+        # 索引查找（可能需要从数据库加载其他写入的题目）在线程中执行，不阻塞事件循环
+        matches = await asyncio.to_thread(self._match_batch, batch)
+        for row, match in zip(batch, matches):
+            if match is None:
+                kept.append(row)
+                continue
+            labels = await asyncio.to_thread(neo4j_service.find_knowledge_points_by_question, match["question_id"])
+            await self._emit(results, row.line, "duplicate", question_id=row.question.id,
+                             duplicate_of=match["question_id"], similarity=match["similarity"],
+                             knowledge_points=[label["knowledge_point"].get("id") for label in labels])
+        return kept
+
+    def _match_batch(self, batch: List[ImportRow]) -> List[Optional[Dict[str, Any]]]:
+        """逐行查找近似重复，保留的行加入索引；随后本流水线写入这些题目的事件不再触发重新加载"""
+        matches = []
+        for row in batch:
+            match = near_duplicate_index.find_similar(row.question, self.similarity_threshold, limit=1)
+            if not match:
+                near_duplicate_index.add(row.question.id, row.question.content, expect_write=True)
+            matches.append(match[0] if match else None)
+        return matches
+
+    async def _emit(self, results: asyncio.Queue, line: int, status: str, **fields):
+        self.counts[status] += 1
+        metrics.inc("smart_import_rows_total", status=status)
+        await results.put(dict({"line": line, "status": status}, **fields))
+
+
+metrics.describe("smart_import_rows_total", "Streaming smart-import rows by result status")
+metrics.describe("smart_import_stage_seconds", "Streaming smart-import batch latency by stage")
@@ -2,33 +2,56 @@
 """
 开源词库增强模块
 使用NLTK WordNet和spaCy来丰富关键词库
+
+查询优先读取关键词扩展缓存（见 keyword_expansion_cache），
+只有缓存未命中时才初始化NLTK/spaCy；语料已存在时不再重复下载
 """
 
-import nltk
-import spacy
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Set, Tuple, Optional, Any
 import logging
 
+from backend.services.keyword_expansion_cache import KeywordExpansionCache, get_expansion_cache
+
 logger = logging.getLogger(__name__)
 
+# 语料名 -> nltk.data.find 的资源路径
+NLTK_RESOURCES = {
+    "wordnet": "corpora/wordnet",
+    "brown": "corpora/brown",
+    "reuters": "corpora/reuters",
+    "punkt": "tokenizers/punkt",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+}
+
+_DEFAULT_CACHE = object()
+
+
 class WordNetEnhancer:
     """使用开源词库增强关键词匹配"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[KeywordExpansionCache] = _DEFAULT_CACHE):
+        """
+        Args:
+            cache: 关键词扩展缓存，默认使用全局缓存；传None时每次都直接查询WordNet/spaCy
+        """
+        self.cache = get_expansion_cache() if cache is _DEFAULT_CACHE else cache
         self.nlp = None
         self.wordnet_loaded = False
-        self._initialize_nltk()
-        self._initialize_spacy()
+        self._nltk_initialized = False
+        self._spacy_initialized = False
     
     def _initialize_nltk(self):
-        """初始化NLTK"""
+        """初始化NLTK（只下载本地缺失的语料）"""
+        if self._nltk_initialized:
+            return
+        self._nltk_initialized = True
         try:
-            # 下载必要的NLTK数据
-            nltk.download('wordnet', quiet=True)
-            nltk.download('brown', quiet=True)
-            nltk.download('reuters', quiet=True)
-            nltk.download('punkt', quiet=True)
-            nltk.download('averaged_perceptron_tagger', quiet=True)
+            import nltk
+            for name, resource in NLTK_RESOURCES.items():
+                try:
+                    nltk.data.find(resource)
+                except LookupError:
+                    nltk.download(name, quiet=True)
             self.wordnet_loaded = True
             logger.info("NLTK WordNet 初始化成功")
         except Exception as e:
@@ -36,7 +59,11 @@ class WordNetEnhancer:
     
     def _initialize_spacy(self):
         """初始化spaCy"""
+        if self._spacy_initialized:
+            return
+        self._spacy_initialized = True
         try:
+            import spacy
             self.nlp = spacy.load("en_core_web_sm")
             logger.info("spaCy 模型加载成功")
         except OSError:
@@ -44,9 +71,10 @@ class WordNetEnhancer:
         except Exception as e:
             logger.warning(f"spaCy 初始化失败: {e}")
     
-    def get_synonyms(self, word: str) -> Set[str]:
-        """获取同义词"""
+    def lookup_synonyms(self, word: str) -> Set[str]:
+        """直接查询WordNet同义词（不经过缓存）"""
         synonyms = set()
+        self._initialize_nltk()
         if not self.wordnet_loaded:
             return synonyms
         
@@ -60,9 +88,10 @@ class WordNetEnhancer:
         
         return synonyms
     
-    def get_related_words(self, word: str) -> Set[str]:
-        """获取相关词汇"""
+    def lookup_related_words(self, word: str) -> Set[str]:
+        """直接查询WordNet相关词汇（不经过缓存）"""
         related = set()
+        self._initialize_nltk()
         if not self.wordnet_loaded:
             return related
         
@@ -86,24 +115,65 @@ class WordNetEnhancer:
         
         return related
     
-    def get_grammatical_forms(self, word: str) -> Set[str]:
-        """获取语法形式变化"""
+    def lookup_forms(self, word: str) -> Set[Tuple[str, str]]:
+        """直接用spaCy分析词根和词性（不经过缓存）"""
         forms = set()
+        self._initialize_spacy()
         if not self.nlp:
             return forms
         
         try:
             doc = self.nlp(word)
             for token in doc:
-                # 词根形式
-                forms.add(token.lemma_)
-                # 词性标注
-                forms.add(f"{token.lemma_}_{token.pos_}")
+                forms.add((token.lemma_, token.pos_))
         except Exception as e:
             logger.warning(f"获取语法形式失败 {word}: {e}")
         
         return forms
     
+    def get_synonyms(self, word: str) -> Set[str]:
+        """获取同义词"""
+        if self.cache is not None and word in self.cache:
+            return self.cache.synonyms(word)
+        return self.lookup_synonyms(word)
+    
+    def get_related_words(self, word: str) -> Set[str]:
+        """获取相关词汇"""
+        if self.cache is not None and word in self.cache:
+            return self.cache.related(word)
+        return self.lookup_related_words(word)
+    
+    def get_grammatical_forms(self, word: str) -> Set[str]:
+        """获取语法形式变化（词根形式 + 词根_词性）"""
+        if self.cache is not None and word in self.cache:
+            return self.cache.grammatical_forms(word)
+        forms = set()
+        for lemma, pos in self.lookup_forms(word):
+            forms.add(lemma)
+            forms.add(f"{lemma}_{pos}")
+        return forms
+    
+    def available(self) -> bool:
+        """WordNet是否可用（spaCy缺失时仍可计算同义词和相关词）"""
+        self._initialize_nltk()
+        self._initialize_spacy()
+        return self.wordnet_loaded
+    
+    def describe(self) -> Dict[str, Any]:
+        """词库版本信息，写入缓存元数据"""
+        info = {}
+        try:
+            import nltk
+            info["nltk"] = nltk.__version__
+            if self.wordnet_loaded:
+                from nltk.corpus import wordnet
+                info["wordnet"] = wordnet.get_version()
+        except Exception:
+            pass
+        if self.nlp is not None:
+            info["spacy_model"] = f"{self.nlp.meta.get('name')}-{self.nlp.meta.get('version')}"
+        return info
+    
     def enhance_knowledge_point_keywords(self, knowledge_point: str, base_keywords: List[str]) -> List[str]:
         """增强知识点的关键词库"""
         enhanced_keywords = set(base_keywords)
@@ -126,7 +196,7 @@ class WordNetEnhancer:
         filtered_keywords = self._filter_keywords(enhanced_keywords, knowledge_point)
         
         logger.info(f"知识点 '{knowledge_point}' 关键词从 {len(base_keywords)} 个增强到 {len(filtered_keywords)} 个")
-        return list(filtered_keywords)
+        return sorted(filtered_keywords)
     
     def _filter_keywords(self, keywords: Set[str], knowledge_point: str) -> Set[str]:
         """过滤关键词"""
@@ -0,0 +1 @@
+# 性能基准测试模块
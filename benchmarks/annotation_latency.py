@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+标注延迟与准确率基准测试
+
+对黄金语料逐题调用各标注服务，统计吞吐量、p50/p95/p99延迟以及
+与标注标签的准确率，结果输出为JSON，可与基线结果对比以判断性能/准确率回归。
+
+用法:
+    python -m benchmarks.annotation_latency --output benchmarks/results/latest.json
+    python -m benchmarks.annotation_latency --baseline benchmarks/results/baseline.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.golden_corpus import load_golden_corpus, CORPUS_LOADERS
+
+logger = logging.getLogger(__name__)
+
+RESULT_SCHEMA_VERSION = 1
+
+
+# ===== 被测服务适配 =====
+# 每个适配函数返回 (annotate, is_async)，annotate(question) -> 建议列表
+
+def _target_nlp_service_light():
+    from backend.services.nlp_service_light import nlp_service
+
+    def annotate(q):
+        return nlp_service.suggest_knowledge_points(q["content"], q["question_type"])
+    return annotate, False
+
+
+def _target_nlp_service():
+    from backend.services.nlp_service import nlp_service
+
+    def annotate(q):
+        return nlp_service.suggest_knowledge_points(q["content"], q["question_type"])
+    return annotate, False
+
+
+def _target_ai_agent_service():
+    # 只测量建议与决策阶段，不写入数据库
+    from backend.services.ai_agent_service import ai_agent_service, nlp_service
+    from backend.models.schema import Question
+
+    async def annotate(q):
+        question = Question(
+            content=q["content"],
+            question_type=q["question_type"],
+            answer="",
+            difficulty=q.get("difficulty")
+        )
+        suggestions = nlp_service.suggest_knowledge_points(question.content, question.question_type)
+        return await ai_agent_service._make_annotation_decisions(question, suggestions)
+    return annotate, True
+
+
+def _target_collaborative_annotation_service():
+    from backend.services.collaborative_annotation_service import collaborative_annotation_service
+
+    async def annotate(q):
+        result = await collaborative_annotation_service.enhanced_annotation(q["content"], q["question_type"])
+        return result.get("suggestions", [])
+    return annotate, True
+
+
+def _load_linear_model():
+    # 直接加载模型制品，不受 ANNOTATION_ENGINE 影响，便于与规则引擎对比
+    from backend.services.linear_annotator import LinearAnnotationModel, DEFAULT_MODEL_PATH
+    return LinearAnnotationModel.load(os.getenv("LINEAR_MODEL_PATH", DEFAULT_MODEL_PATH))
+
+
+def _target_linear_annotator():
+    model = _load_linear_model()
+
+    def annotate(q):
+        return model.suggest_batch([(q["content"], q["question_type"])], kp_ids={})[0]
+    return annotate, False
+
+
+def _batch_target_linear_annotator():
+    model = _load_linear_model()
+
+    def annotate(questions):
+        return model.suggest_batch([(q["content"], q["question_type"]) for q in questions], kp_ids={})
+    return annotate
+
+
+BENCHMARK_TARGETS: Dict[str, Callable[[], Tuple[Callable, bool]]] = {
+    "nlp_service_light": _target_nlp_service_light,
+    "nlp_service": _target_nlp_service,
+    "ai_agent_service": _target_ai_agent_service,
+    "collaborative_annotation_service": _target_collaborative_annotation_service,
+    "linear_annotator": _target_linear_annotator,
+}
+
+# 批量推理的服务：annotate(题目列表) -> 每道题的建议列表
+BATCH_TARGETS: Dict[str, Callable[[], Callable]] = {
+    "linear_annotator_batch": _batch_target_linear_annotator,
+}
+
+
+# ===== 统计 =====
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位数（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_latencies(latencies_ms: List[float], total_seconds: float) -> Dict[str, Any]:
+    """汇总延迟分布与吞吐量"""
+    ordered = sorted(latencies_ms)
+    count = len(ordered)
+    return {
+        "count": count,
+        "total_seconds": round(total_seconds, 4),
+        "throughput_qps": round(count / total_seconds, 2) if total_seconds > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / count, 4) if count else 0.0,
+            "p50": round(percentile(ordered, 50), 4),
+            "p95": round(percentile(ordered, 95), 4),
+            "p99": round(percentile(ordered, 99), 4),
+            "max": round(ordered[-1], 4) if count else 0.0
+        }
+    }
+
+
+def _suggested_names(suggestions: List[Dict[str, Any]]) -> List[str]:
+    names = []
+    for s in suggestions or []:
+        name = s.get("knowledge_point_name") or s.get("knowledge_point")
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def score_accuracy(predictions: List[List[str]], labels: List[List[str]]) -> Dict[str, Any]:
+    """与标注标签对比计算准确率指标"""
+    total = len(labels)
+    if total == 0:
+        return {"top1_accuracy": 0.0, "hit_at_3": 0.0, "recall_at_5": 0.0, "empty_rate": 0.0}
+
+    top1 = hit3 = empty = 0
+    recall_sum = 0.0
+    for predicted, expected in zip(predictions, labels):
+        expected_set = set(expected)
+        if not predicted:
+            empty += 1
+            continue
+        if predicted[0] in expected_set:
+            top1 += 1
+        if expected_set.intersection(predicted[:3]):
+            hit3 += 1
+        recall_sum += len(expected_set.intersection(predicted[:5])) / len(expected_set)
+
+    return {
+        "top1_accuracy": round(top1 / total, 4),
+        "hit_at_3": round(hit3 / total, 4),
+        "recall_at_5": round(recall_sum / total, 4),
+        "empty_rate": round(empty / total, 4)
+    }
+
+
+# ===== 执行 =====
+
+async def _run_async(annotate: Callable, questions: List[Dict[str, Any]], warmup: int):
+    for q in questions[:warmup]:
+        await annotate(q)
+
+    latencies, predictions, errors = [], [], 0
+    started = time.perf_counter()
+    for q in questions:
+        t0 = time.perf_counter()
+        try:
+            suggestions = await annotate(q)
+        except Exception as e:
+            logger.debug(f"标注失败: {e}")
+            suggestions, errors = [], errors + 1
+        latencies.append((time.perf_counter() - t0) * 1000)
+        predictions.append(_suggested_names(suggestions))
+    return latencies, predictions, errors, time.perf_counter() - started
+
+
+def _run_sync(annotate: Callable, questions: List[Dict[str, Any]], warmup: int):
+    for q in questions[:warmup]:
+        annotate(q)
+
+    latencies, predictions, errors = [], [], 0
+    started = time.perf_counter()
+    for q in questions:
+        t0 = time.perf_counter()
+        try:
+            suggestions = annotate(q)
+        except Exception as e:
+            logger.debug(f"标注失败: {e}")
+            suggestions, errors = [], errors + 1
+        latencies.append((time.perf_counter() - t0) * 1000)
+        predictions.append(_suggested_names(suggestions))
+    return latencies, predictions, errors, time.perf_counter() - started
+
+
+def _run_batch(annotate: Callable, questions: List[Dict[str, Any]], warmup: int):
+    """整批调用一次；每道题的延迟记为分摊后的平均值"""
+    annotate(questions[:warmup])
+    started = time.perf_counter()
+    try:
+        batches, errors = annotate(questions), 0
+    except Exception as e:
+        logger.debug(f"批量标注失败: {e}")
+        batches, errors = [[] for _ in questions], len(questions)
+    total = time.perf_counter() - started
+    amortized = total * 1000 / len(questions) if questions else 0.0
+    return [amortized] * len(questions), [_suggested_names(s) for s in batches], errors, total
+
+
+def run_target(name: str, questions: List[Dict[str, Any]], repeat: int = 1, warmup: int = 5) -> Dict[str, Any]:
+    """对单个服务运行基准测试"""
+    if name in BATCH_TARGETS:
+        return _run_batch_target(name, questions, repeat, warmup)
+    try:
+        annotate, is_async = BENCHMARK_TARGETS[name]()
+    except Exception as e:
+        logger.warning(f"服务 {name} 不可用，跳过: {e}")
+        return {"status": "skipped", "reason": f"{e.__class__.__name__}: {e}"}
+
+    from backend.services.annotation_cascade import cascades
+    for cascade in cascades.values():
+        cascade.reset_stats()
+
+    workload = questions * max(1, repeat)
+    if is_async:
+        latencies, predictions, errors, total = asyncio.run(_run_async(annotate, workload, warmup))
+    else:
+        latencies, predictions, errors, total = _run_sync(annotate, workload, warmup)
+
+    # 准确率只统计第一轮，避免重复计数
+    first_round = len(questions)
+    result = {"status": "completed", "errors": errors}
+    result.update(summarize_latencies(latencies, total))
+    result["accuracy"] = score_accuracy(
+        predictions[:first_round], [q["knowledge_points"] for q in questions]
+    )
+    # 级联流程各关卡的升级率（含预热题目）
+    cascade_stats = {name: cascade.stats() for name, cascade in cascades.items()}
+    cascade_stats = {name: stats for name, stats in cascade_stats.items() if stats["questions"]}
+    if cascade_stats:
+        result["cascade"] = cascade_stats
+    return result
+
+
+def _run_batch_target(name: str, questions: List[Dict[str, Any]], repeat: int, warmup: int) -> Dict[str, Any]:
+    try:
+        annotate = BATCH_TARGETS[name]()
+    except Exception as e:
+        logger.warning(f"服务 {name} 不可用，跳过: {e}")
+        return {"status": "skipped", "reason": f"{e.__class__.__name__}: {e}"}
+
+    latencies, predictions, errors, total = _run_batch(annotate, questions * max(1, repeat), warmup)
+    result = {"status": "completed", "errors": errors, "batch_size": len(questions) * max(1, repeat)}
+    result.update(summarize_latencies(latencies, total))
+    result["accuracy"] = score_accuracy(
+        predictions[:len(questions)], [q["knowledge_points"] for q in questions]
+    )
+    return result
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(targets: List[str] = None, corpora: List[str] = None,
+                  repeat: int = 1, warmup: int = 5, limit: int = None) -> Dict[str, Any]:
+    """运行完整基准测试，返回可序列化的结果"""
+    questions, corpus_info = load_golden_corpus(corpora)
+    if limit:
+        questions = questions[:limit]
+
+    results = {}
+    for name in targets or list(BENCHMARK_TARGETS.keys()) + list(BATCH_TARGETS.keys()):
+        logger.info(f"基准测试: {name} ({len(questions)} 道题目 x {repeat})")
+        results[name] = run_target(name, questions, repeat=repeat, warmup=warmup)
+
+    return {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "corpus": {"questions": len(questions), "sources": corpus_info},
+        "config": {"repeat": repeat, "warmup": warmup, "limit": limit},
+        "results": results
+    }
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any],
+                          max_latency_regression: float = 0.2,
+                          max_accuracy_drop: float = 0.02) -> List[Dict[str, Any]]:
+    """
+    与基线结果对比
+
+    Args:
+        max_latency_regression: p95延迟允许的最大相对增幅 (0.2 = 20%)
+        max_accuracy_drop: top1准确率允许的最大绝对下降
+
+    Returns:
+        回归项列表，为空表示通过
+    """
+    regressions = []
+    for name, result in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(name)
+        if not base or result.get("status") != "completed" or base.get("status") != "completed":
+            continue
+
+        base_p95 = base["latency_ms"]["p95"]
+        cur_p95 = result["latency_ms"]["p95"]
+        if base_p95 > 0 and (cur_p95 - base_p95) / base_p95 > max_latency_regression:
+            regressions.append({
+                "service": name, "metric": "latency_ms.p95",
+                "baseline": base_p95, "current": cur_p95
+            })
+
+        base_acc = base["accuracy"]["top1_accuracy"]
+        cur_acc = result["accuracy"]["top1_accuracy"]
+        if base_acc - cur_acc > max_accuracy_drop:
+            regressions.append({
+                "service": name, "metric": "accuracy.top1_accuracy",
+                "baseline": base_acc, "current": cur_acc
+            })
+    return regressions
+
+
+def _use_light_nlp_service():
+    """与Vercel入口一致，用轻量版替换完整NLP服务（无需jieba/sklearn）"""
+    import backend.services.nlp_service_light as nlp_service_module
+    sys.modules["backend.services.nlp_service"] = nlp_service_module
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="标注延迟与准确率基准测试")
+    parser.add_argument("--targets", nargs="+", choices=list(BENCHMARK_TARGETS.keys()) + list(BATCH_TARGETS.keys()),
+                        help="要测试的服务（默认全部）")
+    parser.add_argument("--corpora", nargs="+", choices=list(CORPUS_LOADERS.keys()),
+                        help="使用的黄金语料（默认全部）")
+    parser.add_argument("--repeat", type=int, default=1, help="语料重复轮数")
+    parser.add_argument("--warmup", type=int, default=5, help="预热题目数")
+    parser.add_argument("--limit", type=int, help="最多使用的题目数")
+    parser.add_argument("--light", action="store_true",
+                        help="用nlp_service_light替换完整NLP服务（与Vercel部署一致）")
+    parser.add_argument("--output", default="benchmarks/results/latest.json", help="结果输出路径")
+    parser.add_argument("--baseline", help="用于回归对比的基线结果文件")
+    parser.add_argument("--max-latency-regression", type=float, default=0.2)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+    if args.light:
+        _use_light_nlp_service()
+
+    report = run_benchmark(args.targets, args.corpora, args.repeat, args.warmup, args.limit)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(
+            report, baseline, args.max_latency_regression, args.max_accuracy_drop
+        )
+        report["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, result in report["results"].items():
+        if result["status"] != "completed":
+            print(f"{name:34s} skipped ({result['reason']})")
+            continue
+        lat = result["latency_ms"]
+        acc = result["accuracy"]
+        print(f"{name:34s} {result['throughput_qps']:>9.1f} q/s  "
+              f"p50={lat['p50']:.2f}ms p95={lat['p95']:.2f}ms p99={lat['p99']:.2f}ms  "
+              f"top1={acc['top1_accuracy']:.3f} hit@3={acc['hit_at_3']:.3f}")
+        for cascade_name, stats in result.get("cascade", {}).items():
+            rates = ", ".join(f"{gate}={gate_stats['escalation_rate']:.2f}" for gate, gate_stats in stats["gates"].items())
+            print(f"{'':34s} cascade {cascade_name}: 升级率 {rates}，完整流程 {stats['full_pipeline_rate']:.2f}")
+    for item in report.get("regressions", []):
+        print(f"REGRESSION {item['service']} {item['metric']}: {item['baseline']} -> {item['current']}")
+    print(f"结果已保存: {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
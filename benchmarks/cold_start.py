@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+冷启动基准测试
+
+在全新的Python子进程中导入应用入口（默认与Vercel一致的 api/index.py），
+测量导入耗时、首个请求耗时和首次标注请求（触发服务懒加载）耗时，
+并解析 -X importtime 输出列出最耗时的模块。可对比懒加载开启/关闭两种模式。
+
+用法:
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --modes lazy eager
+    python -m benchmarks.cold_start --baseline benchmarks/results/cold_start_baseline.json
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import List, Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.annotation_latency import percentile, _git_revision
+
+logger = logging.getLogger(__name__)
+
+RESULT_SCHEMA_VERSION = 1
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中执行的测量脚本，结果以JSON输出到stdout最后一行
+_CHILD_SCRIPT = r"""
+import json, sys, time, logging
+logging.disable(logging.CRITICAL)
+started = time.perf_counter()
+import importlib
+module = importlib.import_module(sys.argv[1])
+import_ms = (time.perf_counter() - started) * 1000
+
+from fastapi.testclient import TestClient
+client = TestClient(module.app)
+t = time.perf_counter()
+health_status = client.get("/health").status_code
+health_ms = (time.perf_counter() - t) * 1000
+
+t = time.perf_counter()
+suggest_status = client.post("/api/annotation/suggest", json={
+    "question_content": "If I were you, I would study harder.",
+    "question_type": "选择题"
+}).status_code
+suggest_ms = (time.perf_counter() - t) * 1000
+
+from backend.services.registry import services
+print(json.dumps({
+    "import_ms": import_ms,
+    "first_request_ms": health_ms,
+    "first_annotation_ms": suggest_ms,
+    "statuses": [health_status, suggest_status],
+    "services": services.report()["services"],
+    "modules_loaded": len(sys.modules)
+}))
+"""
+
+MODES = {
+    "lazy": {"LAZY_SERVICES": "true"},
+    "eager": {"LAZY_SERVICES": "false"},
+}
+
+
+def _child_env(mode: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(MODES[mode])
+    # 冷启动测量不需要数据库，指向不可达地址避免连接等待
+    env.setdefault("NEO4J_URI", "bolt://127.0.0.1:1")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def run_once(entry: str, mode: str, importtime: bool = False) -> Dict[str, Any]:
+    """在新进程中测量一次冷启动"""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _CHILD_SCRIPT, entry]
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=_child_env(mode),
+                          capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise RuntimeError(f"子进程失败: {proc.stderr.strip().splitlines()[-1:] }")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["top_imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def parse_importtime(stderr: str, top: int = 15) -> List[Dict[str, Any]]:
+    """解析 -X importtime 输出，返回累计耗时最高的模块"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # 格式: "import time:   self_us |  cumulative_us |   package.module"
+        parts = line.split(":", 1)[1].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts[0].strip(), parts[1].strip(), parts[2].rstrip()
+        if not self_us.isdigit() or not cumulative_us.isdigit():
+            continue
+        name = name[1:] if name.startswith(" ") else name
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2)
+        })
+    # 只保留项目模块和顶层第三方包，避免同一耗时在子模块中重复出现
+    entries = [e for e in entries if e["module"].startswith(("backend", "api")) or e["depth"] == 0]
+    entries.sort(key=lambda e: e["cumulative_ms"], reverse=True)
+    return entries[:top]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "mean": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        "p50": round(percentile(ordered, 50), 2),
+        "p95": round(percentile(ordered, 95), 2),
+        "min": round(ordered[0], 2) if ordered else 0.0,
+        "max": round(ordered[-1], 2) if ordered else 0.0
+    }
+
+
+def run_mode(entry: str, mode: str, runs: int) -> Dict[str, Any]:
+    samples = [run_once(entry, mode) for _ in range(runs)]
+    profile = run_once(entry, mode, importtime=True)
+    total = [s["import_ms"] + s["first_annotation_ms"] + s["first_request_ms"] for s in samples]
+    return {
+        "runs": runs,
+        "import_ms": _summary([s["import_ms"] for s in samples]),
+        "first_request_ms": _summary([s["first_request_ms"] for s in samples]),
+        "first_annotation_ms": _summary([s["first_annotation_ms"] for s in samples]),
+        "cold_total_ms": _summary(total),
+        "modules_loaded": samples[-1]["modules_loaded"],
+        "services_after_first_annotation": samples[-1]["services"],
+        "statuses": samples[-1]["statuses"],
+        "top_imports": profile["top_imports"]
+    }
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any],
+                          max_regression: float = 0.2) -> List[Dict[str, Any]]:
+    """导入耗时p50相对基线增幅超过max_regression时视为回归"""
+    regressions = []
+    for mode, result in current["results"].items():
+        base = baseline.get("results", {}).get(mode)
+        if not base:
+            continue
+        base_p50, cur_p50 = base["import_ms"]["p50"], result["import_ms"]["p50"]
+        if base_p50 > 0 and (cur_p50 - base_p50) / base_p50 > max_regression:
+            regressions.append({"mode": mode, "metric": "import_ms.p50", "baseline": base_p50, "current": cur_p50})
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--entry", default="api.index", help="应用入口模块（需提供 app）")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES.keys()), default=list(MODES.keys()))
+    parser.add_argument("--runs", type=int, default=5, help="每种模式的进程数")
+    parser.add_argument("--output", default="benchmarks/results/cold_start.json", help="结果输出路径")
+    parser.add_argument("--baseline", help="用于回归对比的基线结果文件")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "entry": args.entry,
+        "results": {mode: run_mode(args.entry, mode, args.runs) for mode in args.modes}
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_with_baseline(report, baseline, args.max_regression)
+        exit_code = 1 if report["regressions"] else 0
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for mode, result in report["results"].items():
+        print(f"{mode:6s} import p50={result['import_ms']['p50']:.1f}ms  "
+              f"first request p50={result['first_request_ms']['p50']:.1f}ms  "
+              f"first annotation p50={result['first_annotation_ms']['p50']:.1f}ms  "
+              f"modules={result['modules_loaded']}")
+        for item in result["top_imports"][:5]:
+            print(f"         {item['cumulative_ms']:>8.1f}ms  {item['module']}")
+    for item in report.get("regressions", []):
+        print(f"REGRESSION {item['mode']} {item['metric']}: {item['baseline']} -> {item['current']}")
+    print(f"结果已保存: {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
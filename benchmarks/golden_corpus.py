@@ -0,0 +1,95 @@
+"""
+标注基准测试的黄金语料
+从内置题库模块加载带知识点标签的题目，作为速度与准确率基准的统一输入
+"""
+import logging
+from typing import List, Dict, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _load_comprehensive_question_bank() -> List[Dict[str, Any]]:
+    from backend.services.comprehensive_question_bank import comprehensive_question_bank
+    return comprehensive_question_bank.get_all_questions()
+
+
+def _load_real_dataset() -> List[Dict[str, Any]]:
+    from backend.services.real_dataset_integrator import real_dataset_integrator
+    return real_dataset_integrator.get_all_real_questions()
+
+
+def _load_final_question_batch() -> List[Dict[str, Any]]:
+    from backend.services.final_question_batch import final_question_batch
+    return final_question_batch.get_final_questions()
+
+
+def _load_open_source_data() -> List[Dict[str, Any]]:
+    from backend.services.open_source_data import open_source_integrator
+    return open_source_integrator.get_all_questions()
+
+
+# 语料名称 -> 加载函数
+CORPUS_LOADERS: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+    "comprehensive_question_bank": _load_comprehensive_question_bank,
+    "real_dataset_integrator": _load_real_dataset,
+    "final_question_batch": _load_final_question_batch,
+    "open_source_data": _load_open_source_data,
+}
+
+
+def load_golden_corpus(corpora: List[str] = None,
+                       use_artifact: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    加载黄金语料
+
+    Args:
+        corpora: 要加载的语料名称，为空时加载全部
+        use_artifact: 加载全部语料时优先读取知识库制品中序列化的语料
+
+    Returns:
+        (题目列表, 各语料的加载情况)。题目按内容去重，
+        每条包含 content / question_type / knowledge_points / corpus
+    """
+    if use_artifact and not corpora:
+        from backend.services.kb_artifact import load_section
+        cached = load_section("golden_corpus")
+        if cached:
+            return cached["questions"], cached["corpus_info"]
+
+    names = corpora or list(CORPUS_LOADERS.keys())
+    questions = []
+    seen_contents = set()
+    corpus_info = {}
+
+    for name in names:
+        loader = CORPUS_LOADERS.get(name)
+        if loader is None:
+            corpus_info[name] = {"status": "unknown"}
+            continue
+
+        try:
+            raw_questions = loader()
+        except Exception as e:
+            logger.warning(f"语料 {name} 加载失败: {e}")
+            corpus_info[name] = {"status": "unavailable", "error": f"{e.__class__.__name__}: {e}"}
+            continue
+
+        loaded = 0
+        for q in raw_questions:
+            content = q.get("content", "")
+            labels = q.get("knowledge_points") or []
+            if not content or not labels or content in seen_contents:
+                continue
+            seen_contents.add(content)
+            questions.append({
+                "content": content,
+                "question_type": q.get("question_type", "选择题"),
+                "difficulty": q.get("difficulty"),
+                "knowledge_points": list(labels),
+                "corpus": name
+            })
+            loaded += 1
+
+        corpus_info[name] = {"status": "loaded", "questions": loaded, "raw_questions": len(raw_questions)}
+
+    return questions, corpus_info
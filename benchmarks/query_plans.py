@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Cypher执行计划基准与回归检查
+
+扫描代码中的Cypher字符串（database.py、分析服务、路由、同步脚本等），在按规模生成的
+本地种子数据库上执行 EXPLAIN / PROFILE，记录算子、db hits和返回行数，结果输出为JSON；
+与基线对比时，索引查找退化为标签扫描、新出现笛卡尔积/全节点扫描或db hits明显增加均视为回归。
+
+PROFILE在显式事务中执行后回滚，写查询不会修改数据；--seed 会清空目标数据库，只应指向本地实例。
+
+用法:
+    python -m benchmarks.query_plans --list                                    # 列出发现的查询
+    python -m benchmarks.query_plans --seed --scales 100 1000 10000 --output benchmarks/results/plans_baseline.json
+    python -m benchmarks.query_plans --seed --baseline benchmarks/results/plans_baseline.json
+"""
+import os
+import re
+import ast
+import sys
+import glob
+import json
+import random
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from urllib.parse import urlparse
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv("config.env")
+
+logger = logging.getLogger(__name__)
+
+RESULT_SCHEMA_VERSION = 1
+
+# 默认扫描的源文件
+DEFAULT_SOURCES = [
+    "backend/services/*.py",
+    "backend/api/*.py",
+    "backend/api/routes/*.py",
+    "delta_sync.py",
+    "simple_sync.py",
+    "sync_*.py",
+    "direct_init_aura.py",
+]
+
+CYPHER_START = re.compile(r"\s*(?:OPTIONAL\s+MATCH|MATCH|MERGE|CREATE|UNWIND|CALL|WITH|RETURN)\b")
+SCHEMA_STATEMENT = re.compile(r"\s*(?:CREATE|DROP)\s+(?:CONSTRAINT|INDEX|FULLTEXT|RANGE|TEXT|POINT|LOOKUP|TABLE)\b"
+                              r"|\s*SHOW\b|\s*CALL\s+db\.", re.IGNORECASE)
+PARAMETER = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
+
+# 计划中的关键算子
+SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan", "DirectedAllRelationshipsScan",
+                  "UndirectedAllRelationshipsScan", "DirectedRelationshipTypeScan",
+                  "UndirectedRelationshipTypeScan"}
+ALWAYS_REGRESSION = {"CartesianProduct", "AllNodesScan"}
+
+
+def is_index_operator(operator: str) -> bool:
+    return "IndexSeek" in operator or "IndexScan" in operator or "IndexContainsScan" in operator \
+        or operator.endswith("ByIdSeek") or "IndexEndsWithScan" in operator
+
+
+# ===== 查询发现 =====
+
+class DiscoveredQuery(NamedTuple):
+    key: str                          # 路径:函数:序号，跨版本稳定
+    path: str
+    line: int
+    parts: Tuple[Tuple[str, str], ...]  # ("text", 文本) / ("expr", f-string表达式源码)
+
+    @property
+    def dynamic(self) -> bool:
+        return any(kind == "expr" for kind, _ in self.parts)
+
+    @property
+    def template(self) -> str:
+        return "".join(value if kind == "text" else "{" + value + "}" for kind, value in self.parts)
+
+    def render(self, substitutions: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """生成可执行的Cypher；f-string中的表达式需由 substitutions 提供，缺失时返回None"""
+        rendered = []
+        for kind, value in self.parts:
+            if kind == "text":
+                rendered.append(value)
+            elif substitutions and value in substitutions:
+                rendered.append(substitutions[value])
+            else:
+                return None
+        return "".join(rendered)
+
+
+class _QueryCollector(ast.NodeVisitor):
+    def __init__(self, path: str):
+        self.path = path
+        self.scope: List[str] = []
+        self.counters: Dict[str, int] = {}
+        self.queries: List[DiscoveredQuery] = []
+        self._in_fstring = False
+
+    def _visit_scope(self, node):
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_scope
+
+    def visit_Constant(self, node):
+        if not self._in_fstring and isinstance(node.value, str):
+            self._add(node, (("text", node.value),))
+
+    def visit_JoinedStr(self, node):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(("text", value.value))
+            else:
+                parts.append(("expr", ast.unparse(value.value)))
+        self._add(node, tuple(parts))
+        self._in_fstring = True
+        self.generic_visit(node)
+        self._in_fstring = False
+
+    def _add(self, node, parts: Tuple[Tuple[str, str], ...]):
+        head = parts[0][1] if parts and parts[0][0] == "text" else ""
+        if not CYPHER_START.match(head) or SCHEMA_STATEMENT.match(head):
+            return
+        scope = ".".join(self.scope) or "<module>"
+        self.counters[scope] = self.counters.get(scope, 0) + 1
+        self.queries.append(DiscoveredQuery(
+            f"{self.path}:{scope}:{self.counters[scope]}", self.path, node.lineno, parts
+        ))
+
+
+def discover_queries(patterns: List[str] = None, root: str = ".") -> List[DiscoveredQuery]:
+    """扫描源文件中的Cypher字符串常量和f-string"""
+    queries = []
+    paths = sorted({path for pattern in patterns or DEFAULT_SOURCES
+                    for path in glob.glob(os.path.join(root, pattern))})
+    for path in paths:
+        relative = os.path.relpath(path, root).replace(os.sep, "/")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=relative)
+        except (SyntaxError, UnicodeDecodeError) as e:
+            logger.warning(f"跳过无法解析的文件 {relative}: {e}")
+            continue
+        collector = _QueryCollector(relative)
+        collector.visit(tree)
+        queries.extend(q for q in collector.queries if not q.key.startswith(IGNORED_QUERIES))
+    return queries
+
+
+# ===== 种子数据与参数 =====
+
+SEED_KP_ID = "kp_seed_0001"
+SEED_KP_NAME = "种子知识点0001"
+SEED_QUESTION_ID = "q_seed_000001"
+
+# 按参数名提供的种子值，参数全部可解析的查询执行PROFILE，否则只执行EXPLAIN
+SEED_PARAMETERS: Dict[str, Any] = {
+    "id": SEED_KP_ID,
+    "name": SEED_KP_NAME,
+    "properties": {},
+    "keyword": "种子知识点000",
+    "parent_id": "kp_seed_0000",
+    "child_id": SEED_KP_ID,
+    "kp_id": SEED_KP_ID,
+    "kp_name": SEED_KP_NAME,
+    "target": SEED_KP_NAME,
+    "question_id": SEED_QUESTION_ID,
+    "ids": [SEED_QUESTION_ID, "q_seed_000002"],
+    "wrong_question_ids": [f"q_seed_{i:06d}" for i in range(10)],
+    "weight": 1.0,
+    "difficulty": "medium",
+    "question_type": "选择题",
+    "grade_level": "初中一年级",
+    "source": "seed",
+    "skip": 0,
+    "limit": 20,
+}
+
+# 个别查询的参数覆盖，以及f-string表达式的代入值（键为查询键前缀 "路径:函数"）
+QUERY_OVERRIDES: Dict[str, Dict[str, Any]] = {
+    "backend/services/database.py:Neo4jService.get_question": {"params": {"id": SEED_QUESTION_ID}},
+    "backend/services/database.py:Neo4jService.create_question": {"params": {"id": SEED_QUESTION_ID}},
+    "backend/services/database.py:Neo4jService.merge_questions": {
+        "params": {"rows": [{"id": SEED_QUESTION_ID, "properties": {}, "knowledge_points": [SEED_KP_NAME]}]},
+        "substitutions": {"set_clause": "ON CREATE SET"}
+    },
+    "backend/services/database.py:Neo4jService.merge_knowledge_points": {
+        "params": {"rows": [{"id": SEED_KP_ID, "name": SEED_KP_NAME, "properties": {}}]}
+    },
+    "backend/services/database.py:Neo4jService.save_annotated_questions": {
+        "params": {"items": [{"id": SEED_QUESTION_ID, "properties": {},
+                              "links": [{"kp_id": SEED_KP_ID, "weight": 1.0}]}]},
+        "substitutions": {"match_clause": "MERGE (q:Question {id: item.id}) SET q += item.properties"}
+    },
+    "backend/api/routes/question_routes.py:get_questions": {
+        "substitutions": {"where_clause": "WHERE q.difficulty = $difficulty"}
+    },
+    "backend/services/analytics_service.py:AnalyticsService.get_ai_agent_accuracy_analysis_paginated": {
+        "substitutions": {"where_clause": "WHERE q.difficulty = $difficulty AND q.question_type = $question_type"}
+    },
+}
+
+# 不单独执行的字符串：拼接用的子句片段、导出到.cypher文件的脚本文本
+IGNORED_QUERIES = (
+    "backend/services/database.py:Neo4jService.save_annotated_questions:1",
+    "backend/services/database.py:Neo4jService.save_annotated_questions:2",
+    "backend/services/comprehensive_question_bank.py:ComprehensiveQuestionBank.export_to_cypher:",
+    "backend/services/open_source_data.py:OpenSourceDataIntegrator.export_to_cypher:",
+)
+
+QUESTION_TYPES = ["选择题", "填空题", "阅读理解", "翻译题", "写作题"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def _overrides_for(query: DiscoveredQuery) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {"params": {}, "substitutions": {}}
+    for prefix, override in QUERY_OVERRIDES.items():
+        if query.key.startswith(prefix + ":"):
+            merged["params"].update(override.get("params", {}))
+            merged["substitutions"].update(override.get("substitutions", {}))
+    return merged
+
+
+def resolve_parameters(cypher: str, overrides: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """查询中的参数 -> (种子值, 无法解析的参数名)"""
+    params, missing = {}, []
+    for name in dict.fromkeys(PARAMETER.findall(cypher)):
+        if name in overrides:
+            params[name] = overrides[name]
+        elif name in SEED_PARAMETERS:
+            params[name] = SEED_PARAMETERS[name]
+        else:
+            missing.append(name)
+    return params, missing
+
+
+def seed_graph(driver, questions: int, seed: int = 42, database: Optional[str] = None) -> Dict[str, int]:
+    """清空数据库并生成确定性的种子数据（知识点层级、前置关系、题目及考查关系）"""
+    from backend.models.schema import GraphSchema
+
+    rng = random.Random(seed)
+    kp_count = max(20, questions // 25)
+    knowledge_points = [{
+        "id": f"kp_seed_{i:04d}", "name": f"种子知识点{i:04d}",
+        "description": f"种子知识点{i:04d}的说明", "difficulty": rng.choice(DIFFICULTIES),
+        "keywords": [f"关键词{i}", f"kw{i}"], "parent": f"kp_seed_{(i - 1) // 4:04d}" if i else None
+    } for i in range(kp_count)]
+    requires = [{"from": f"kp_seed_{i:04d}", "to": f"kp_seed_{rng.randrange(i):04d}"}
+                for i in range(1, kp_count) if rng.random() < 0.5]
+    question_rows = [{
+        "id": f"q_seed_{i:06d}",
+        "content": f"Seed question {i}: She ___ to school every day ({rng.random():.6f}).",
+        "question_type": rng.choice(QUESTION_TYPES), "difficulty": rng.choice(DIFFICULTIES),
+        "answer": "goes", "source": "seed", "grade_level": "初中一年级",
+        "links": [{"kp_id": f"kp_seed_{k:04d}", "weight": round(rng.uniform(0.3, 1.0), 2)}
+                  for k in rng.sample(range(kp_count), rng.randint(1, 3))]
+    } for i in range(questions)]
+
+    session_config = {"database": database} if database else {}
+    with driver.session(**session_config) as session:
+        session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+        for statement in (GraphSchema.get_drop_legacy_indexes_cypher() + GraphSchema.get_create_constraints_cypher()
+                          + GraphSchema.get_create_indexes_cypher()):
+            session.run(statement).consume()
+        session.run("CALL db.awaitIndexes(300)").consume()
+        session.run("""
+            UNWIND $rows AS row
+            CREATE (kp:KnowledgePoint {id: row.id, name: row.name, description: row.description,
+                                       difficulty: row.difficulty, keywords: row.keywords})
+        """, {"rows": knowledge_points}).consume()
+        session.run("""
+            UNWIND $rows AS row
+            MATCH (child:KnowledgePoint {id: row.id}), (parent:KnowledgePoint {id: row.parent})
+            CREATE (parent)-[:HAS_SUB_POINT]->(child)
+        """, {"rows": [kp for kp in knowledge_points if kp["parent"]]}).consume()
+        session.run("""
+            UNWIND $rows AS row
+            MATCH (a:KnowledgePoint {id: row.from}), (b:KnowledgePoint {id: row.to})
+            CREATE (b)-[:REQUIRES]->(a)
+        """, {"rows": requires}).consume()
+        for start in range(0, len(question_rows), 1000):
+            session.run("""
+                UNWIND $rows AS row
+                CREATE (q:Question {id: row.id, content: row.content, question_type: row.question_type,
+                                    difficulty: row.difficulty, answer: row.answer, source: row.source,
+                                    grade_level: row.grade_level})
+                WITH q, row
+                UNWIND row.links AS link
+                MATCH (kp:KnowledgePoint {id: link.kp_id})
+                CREATE (q)-[:TESTS {weight: link.weight}]->(kp)
+            """, {"rows": question_rows[start:start + 1000]}).consume()
+    return {"knowledge_points": kp_count, "questions": questions, "requires": len(requires)}
+
+
+# ===== 执行计划 =====
+
+def _operator(plan: Dict[str, Any]) -> str:
+    return str(plan.get("operatorType", "")).split("@")[0]
+
+
+def _arguments(plan: Dict[str, Any]) -> Dict[str, Any]:
+    return plan.get("args") or plan.get("arguments") or {}
+
+
+def summarize_plan(plan: Dict[str, Any], profiled: bool) -> Dict[str, Any]:
+    """算子列表、可读的计划树，以及PROFILE时的db hits和行数"""
+    operators, lines = [], []
+    db_hits = 0
+
+    def walk(node, depth):
+        nonlocal db_hits
+        operator = _operator(node)
+        operators.append(operator)
+        details = _arguments(node).get("Details", "")
+        line = f"{'  ' * depth}{operator}" + (f" {details}" if details else "")
+        if profiled:
+            hits = node.get("dbHits", _arguments(node).get("DbHits", 0)) or 0
+            db_hits += hits
+            line += f"  [rows={node.get('rows', _arguments(node).get('Rows', 0))} hits={hits}]"
+        lines.append(line)
+        for child in node.get("children", []):
+            walk(child, depth + 1)
+
+    walk(plan, 0)
+    summary = {"operators": sorted(set(operators)), "plan": lines,
+               "estimated_rows": _arguments(plan).get("EstimatedRows")}
+    if profiled:
+        summary["db_hits"] = db_hits
+        summary["rows"] = plan.get("rows", _arguments(plan).get("Rows", 0))
+    return summary
+
+
+def plan_query(driver, cypher: str, params: Dict[str, Any], profile: bool,
+               database: Optional[str] = None) -> Dict[str, Any]:
+    """EXPLAIN（不执行）或PROFILE（在事务中执行后回滚）"""
+    session_config = {"database": database} if database else {}
+    with driver.session(**session_config) as session:
+        if not profile:
+            summary = session.run(f"EXPLAIN {cypher}", params).consume()
+            return dict(summarize_plan(summary.plan, False), mode="explain")
+        tx = session.begin_transaction()
+        try:
+            summary = tx.run(f"PROFILE {cypher}", params).consume()
+        finally:
+            tx.rollback()
+        return dict(summarize_plan(summary.profile, True), mode="profile")
+
+
+def run_plans(driver, queries: List[DiscoveredQuery], scales: List[int], seed: bool,
+              database: Optional[str] = None) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    seeded = {}
+    for scale in scales if seed else [None]:
+        label = str(scale) if scale is not None else "existing"
+        if scale is not None:
+            logger.info(f"生成种子数据: {scale} 道题目")
+            seeded[label] = seed_graph(driver, scale, database=database)
+        for query in queries:
+            overrides = _overrides_for(query)
+            entry = results.setdefault(query.key, {
+                "path": query.path, "line": query.line, "cypher": query.template, "scales": {}
+            })
+            cypher = query.render(overrides["substitutions"])
+            if cypher is None:
+                entry["skipped"] = "f-string表达式未在 QUERY_OVERRIDES 中提供代入值"
+                continue
+            params, missing = resolve_parameters(cypher, overrides["params"])
+            try:
+                entry["scales"][label] = plan_query(driver, cypher, params, profile=not missing,
+                                                    database=database)
+                if missing:
+                    entry["scales"][label]["missing_parameters"] = missing
+            except Exception as e:
+                entry["scales"][label] = {"error": f"{e.__class__.__name__}: {e}"}
+    return {"queries": results, "seeded": seeded}
+
+
+# ===== 回归检查 =====
+
+def check_plan(key: str, scale: str, current: Dict[str, Any], base: Optional[Dict[str, Any]],
+               max_db_hits_regression: float = 0.5, min_db_hits_delta: int = 100) -> List[Dict[str, Any]]:
+    """单个查询在某一规模下的回归项"""
+    def regression(kind, **details):
+        return dict({"query": key, "scale": scale, "kind": kind}, **details)
+
+    if "error" in current:
+        return [regression("error", current=current["error"])] if base and "error" not in base else []
+    if not base or "error" in base:
+        return []
+
+    found = []
+    operators, base_operators = set(current["operators"]), set(base["operators"])
+    for operator in sorted((operators - base_operators) & ALWAYS_REGRESSION):
+        found.append(regression("new_operator", operator=operator))
+    lost_index = {op for op in base_operators - operators if is_index_operator(op)}
+    new_scans = (operators - base_operators) & SCAN_OPERATORS
+    if lost_index and new_scans:
+        found.append(regression("index_seek_lost", baseline=sorted(lost_index), current=sorted(new_scans)))
+    if "db_hits" in current and "db_hits" in base:
+        base_hits, hits = base["db_hits"], current["db_hits"]
+        if hits - base_hits > min_db_hits_delta and hits > base_hits * (1 + max_db_hits_regression):
+            found.append(regression("db_hits", baseline=base_hits, current=hits))
+    return found
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any],
+                          max_db_hits_regression: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    与基线结果对比
+
+    Args:
+        max_db_hits_regression: 同一规模下db hits允许的最大相对增幅 (0.5 = 50%)
+
+    Returns:
+        回归项列表，为空表示通过
+    """
+    regressions = []
+    base_queries = baseline.get("queries", {})
+    for key, entry in current.get("queries", {}).items():
+        base_entry = base_queries.get(key, {})
+        for scale, result in entry.get("scales", {}).items():
+            regressions.extend(check_plan(key, scale, result, base_entry.get("scales", {}).get(scale),
+                                          max_db_hits_regression))
+    return regressions
+
+
+def plan_warnings(current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """不依赖基线的提示：全节点扫描和笛卡尔积"""
+    warnings = []
+    for key, entry in current.get("queries", {}).items():
+        for scale, result in entry.get("scales", {}).items():
+            for operator in sorted(set(result.get("operators", [])) & ALWAYS_REGRESSION):
+                warnings.append({"query": key, "scale": scale, "operator": operator})
+    return warnings
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cypher执行计划基准与回归检查")
+    parser.add_argument("--sources", nargs="+", help="扫描的源文件glob（默认见 DEFAULT_SOURCES）")
+    parser.add_argument("--match", help="只处理键包含该字符串的查询")
+    parser.add_argument("--list", action="store_true", help="只列出发现的查询，不连接数据库")
+    parser.add_argument("--uri", default=os.getenv("NEO4J_URI", "bolt://localhost:7687"))
+    parser.add_argument("--user", default=os.getenv("NEO4J_USERNAME", "neo4j"))
+    parser.add_argument("--password", default=os.getenv("NEO4J_PASSWORD", "password"))
+    parser.add_argument("--database", default=os.getenv("NEO4J_DATABASE") or None)
+    parser.add_argument("--seed", action="store_true", help="清空数据库并按各规模生成种子数据")
+    parser.add_argument("--allow-remote", action="store_true", help="允许对非本机数据库执行 --seed")
+    parser.add_argument("--scales", nargs="+", type=int, default=[100, 1000, 10000], help="种子题目数")
+    parser.add_argument("--output", default="benchmarks/results/query_plans.json", help="结果输出路径")
+    parser.add_argument("--baseline", help="用于回归对比的基线结果文件")
+    parser.add_argument("--max-db-hits-regression", type=float, default=0.5)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+    queries = discover_queries(args.sources)
+    if args.match:
+        queries = [q for q in queries if args.match in q.key]
+
+    if args.list:
+        for query in queries:
+            flag = "dynamic" if query.dynamic else "static "
+            print(f"{flag} {query.key} (line {query.line})")
+        print(f"共 {len(queries)} 条查询")
+        return 0
+
+    if args.seed and not args.allow_remote and urlparse(args.uri).hostname not in ("localhost", "127.0.0.1", "::1"):
+        print(f"--seed 会清空数据库，拒绝对非本机地址执行: {args.uri}（确认时加 --allow-remote）")
+        return 2
+
+    from neo4j import GraphDatabase
+    with GraphDatabase.driver(args.uri, auth=(args.user, args.password)) as driver:
+        outcome = run_plans(driver, queries, args.scales, args.seed, args.database)
+
+    report = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {"scales": args.scales if args.seed else ["existing"], "sources": args.sources or DEFAULT_SOURCES},
+        "seeded": outcome["seeded"],
+        "queries": outcome["queries"],
+    }
+    report["warnings"] = plan_warnings(report)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_with_baseline(report, baseline, args.max_db_hits_regression)
+        exit_code = 1 if report["regressions"] else 0
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for key, entry in report["queries"].items():
+        if "skipped" in entry:
+            print(f"{'skipped':8s} {key}")
+            continue
+        for scale, result in entry["scales"].items():
+            if "error" in result:
+                print(f"{'error':8s} {key} @{scale}: {result['error'][:120]}")
+            else:
+                hits = f" hits={result['db_hits']}" if "db_hits" in result else ""
+                print(f"{result['mode']:8s} {key} @{scale}{hits} {','.join(result['operators'])}")
+    for item in report["warnings"]:
+        print(f"WARNING {item['query']} @{item['scale']}: {item['operator']}")
+    for item in report.get("regressions", []):
+        details = {k: v for k, v in item.items() if k not in ("query", "scale", "kind")}
+        print(f"REGRESSION {item['query']} @{item['scale']} {item['kind']}: {details}")
+    print(f"结果已保存: {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
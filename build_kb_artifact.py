@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+构建知识库二进制制品
+
+把关键词表、增强知识库、开源数据、综合题库和黄金语料的构建结果序列化进一个带版本的文件，
+运行时各服务读取并解码，不再在每个进程里执行构建代码。制品只缩短启动时间：不包含预编译的匹配器，
+解码后的对象仍是每个进程私有的。源文件修改后需重新构建（过期的制品会被自动忽略）。
+
+用法:
+    python build_kb_artifact.py                      # 输出到 data/kb_artifact.bin
+    python build_kb_artifact.py --output /tmp/kb.bin --sources nlp_light enhanced_kb
+    python build_kb_artifact.py --info               # 查看已有制品
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+
+from backend.services.kb_artifact import (
+    build_artifact, KnowledgeBaseArtifact, SECTION_BUILDERS, DEFAULT_ARTIFACT_PATH
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="构建知识库二进制制品")
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT_PATH, help="制品路径")
+    parser.add_argument("--sources", nargs="*", choices=list(SECTION_BUILDERS.keys()), help="只构建指定来源，默认全部")
+    parser.add_argument("--info", action="store_true", help="只输出已有制品的信息并校验")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if not args.info:
+        outcome = build_artifact(args.output, args.sources)
+        for name, error in outcome["skipped"].items():
+            print(f"跳过 {name}: {error}")
+
+    if not os.path.exists(args.output):
+        logger.error(f"制品不存在: {args.output}")
+        return 1
+
+    artifact = KnowledgeBaseArtifact(args.output)
+    try:
+        info = artifact.info()
+        info["current"] = artifact.is_current()
+        info["failed_sections"] = artifact.verify()
+    finally:
+        artifact.close()
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+    return 1 if info["failed_sections"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+本地 → 云端 Neo4j 增量同步
+只传输有变化的节点和关系，支持dry-run和断点续传
+
+用法:
+    python delta_sync.py --dry-run
+    python delta_sync.py --delete-missing --batch-size 300 --pause 0.5
+
+源库读取 NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD，
+目标库读取 CLOUD_NEO4J_URI / CLOUD_NEO4J_USERNAME / CLOUD_NEO4J_PASSWORD（均可由命令行覆盖）
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+from backend.services.delta_sync import DeltaSyncEngine
+
+load_dotenv("config.env")
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Neo4j增量同步（本地 → 云端）")
+    parser.add_argument("--source-uri", default=os.getenv("NEO4J_URI", "bolt://localhost:7687"))
+    parser.add_argument("--source-user", default=os.getenv("NEO4J_USERNAME", "neo4j"))
+    parser.add_argument("--source-password", default=os.getenv("NEO4J_PASSWORD", "password"))
+    parser.add_argument("--target-uri", default=os.getenv("CLOUD_NEO4J_URI"))
+    parser.add_argument("--target-user", default=os.getenv("CLOUD_NEO4J_USERNAME", "neo4j"))
+    parser.add_argument("--target-password", default=os.getenv("CLOUD_NEO4J_PASSWORD"))
+    parser.add_argument("--labels", nargs="*", help="参与同步的节点标签，默认全部")
+    parser.add_argument("--batch-size", type=int, default=500, help="每个事务写入的行数")
+    parser.add_argument("--pause", type=float, default=0.0, help="批次间隔（秒），避开云端限流")
+    parser.add_argument("--delete-missing", action="store_true", help="删除目标库中源库已不存在的数据")
+    parser.add_argument("--checkpoint", default="data/sync_checkpoint.json", help="断点文件")
+    parser.add_argument("--dry-run", action="store_true", help="只输出差异报告，不写入")
+    parser.add_argument("--report", help="把报告写入JSON文件")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.target_uri or not args.target_password:
+        logger.error("未配置目标库，请设置 CLOUD_NEO4J_URI / CLOUD_NEO4J_PASSWORD 或使用 --target-uri / --target-password")
+        return 2
+
+    engine = DeltaSyncEngine(
+        labels=args.labels,
+        batch_size=args.batch_size,
+        delete_missing=args.delete_missing,
+        checkpoint_path=args.checkpoint,
+        pause_seconds=args.pause
+    )
+
+    with GraphDatabase.driver(args.source_uri, auth=(args.source_user, args.source_password)) as source, \
+            GraphDatabase.driver(args.target_uri, auth=(args.target_user, args.target_password)) as target:
+        outcome = engine.sync(source, target, dry_run=args.dry_run)
+
+    report = outcome["report"]
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if outcome["result"]:
+        print(json.dumps(outcome["result"], ensure_ascii=False, indent=2))
+    elif not args.dry_run:
+        print("两侧数据一致，无需同步")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(outcome, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
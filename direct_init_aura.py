@@ -4,7 +4,6 @@
 """
 import sys
 import os
-import uuid
 import logging
 
 # 添加项目路径
@@ -12,6 +11,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from neo4j import GraphDatabase
 
+from backend.models.schema import question_id, knowledge_point_id
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -85,7 +86,6 @@ class AuraDBInitializer:
         
         knowledge_points = [
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "一般现在时",
                 "description": "表示经常性、习惯性的动作或状态",
                 "level": "小学四年级",
@@ -93,7 +93,6 @@ class AuraDBInitializer:
                 "keywords": ["always", "usually", "every day", "第三人称单数"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "一般过去时",
                 "description": "表示过去发生的动作或状态",
                 "level": "小学五年级",
@@ -101,7 +100,6 @@ class AuraDBInitializer:
                 "keywords": ["yesterday", "last week", "ago", "过去式"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "现在进行时",
                 "description": "表示现在正在进行的动作",
                 "level": "小学六年级",
@@ -109,7 +107,6 @@ class AuraDBInitializer:
                 "keywords": ["now", "at present", "be doing", "正在"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "现在完成时",
                 "description": "表示过去发生的动作对现在造成的影响",
                 "level": "初中一年级",
@@ -117,7 +114,6 @@ class AuraDBInitializer:
                 "keywords": ["have done", "already", "yet", "since"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "被动语态",
                 "description": "表示动作的承受者作为主语",
                 "level": "初中二年级",
@@ -125,7 +121,6 @@ class AuraDBInitializer:
                 "keywords": ["be done", "by", "被动", "过去分词"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "定语从句",
                 "description": "修饰名词或代词的从句",
                 "level": "初中三年级",
@@ -133,7 +128,6 @@ class AuraDBInitializer:
                 "keywords": ["who", "which", "that", "关系代词"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "宾语从句",
                 "description": "作宾语的从句",
                 "level": "初中三年级",
@@ -141,7 +135,6 @@ class AuraDBInitializer:
                 "keywords": ["that", "what", "if", "whether"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "比较级和最高级",
                 "description": "形容词和副词的比较形式",
                 "level": "小学六年级",
@@ -149,7 +142,6 @@ class AuraDBInitializer:
                 "keywords": ["than", "more", "most", "er", "est"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "介词",
                 "description": "表示名词、代词等与其他词的关系",
                 "level": "小学三年级",
@@ -157,7 +149,6 @@ class AuraDBInitializer:
                 "keywords": ["in", "on", "at", "for", "with"]
             },
             {
-                "id": f"kp_{uuid.uuid4().hex[:6]}",
                 "name": "动词时态",
                 "description": "动词的时间和状态变化",
                 "level": "小学四年级",
@@ -165,19 +156,20 @@ class AuraDBInitializer:
                 "keywords": ["时态", "tense", "动词变化"]
             }
         ]
+        # 与应用相同的确定性ID，之后通过API重复导入时不会产生重复节点
+        for kp in knowledge_points:
+            kp["id"] = knowledge_point_id(kp["name"])
         
         try:
             with self.driver.session(database="neo4j") as session:
                 for kp in knowledge_points:
                     session.run("""
-                        CREATE (kp:KnowledgePoint {
-                            id: $id,
-                            name: $name,
-                            description: $description,
-                            level: $level,
-                            difficulty: $difficulty,
-                            keywords: $keywords
-                        })
+                        MERGE (kp:KnowledgePoint {name: $name})
+                        ON CREATE SET kp.id = $id
+                        SET kp.description = $description,
+                            kp.level = $level,
+                            kp.difficulty = $difficulty,
+                            kp.keywords = $keywords
                     """, kp)
                     logger.info(f"✅ 创建知识点: {kp['name']}")
             
@@ -194,7 +186,6 @@ class AuraDBInitializer:
         
         questions = [
             {
-                "id": f"q_{uuid.uuid4().hex[:6]}",
                 "content": "She _____ to school every day.",
                 "question_type": "选择题",
                 "options": ["go", "goes", "going", "gone"],
@@ -205,7 +196,6 @@ class AuraDBInitializer:
                 "kp_name": "一般现在时"
             },
             {
-                "id": f"q_{uuid.uuid4().hex[:6]}",
                 "content": "Yesterday I _____ to the park.",
                 "question_type": "选择题",
                 "options": ["go", "goes", "went", "going"],
@@ -216,7 +206,6 @@ class AuraDBInitializer:
                 "kp_name": "一般过去时"
             },
             {
-                "id": f"q_{uuid.uuid4().hex[:6]}",
                 "content": "Look! The children _____ in the playground.",
                 "question_type": "选择题",
                 "options": ["play", "plays", "are playing", "played"],
@@ -227,7 +216,6 @@ class AuraDBInitializer:
                 "kp_name": "现在进行时"
             },
             {
-                "id": f"q_{uuid.uuid4().hex[:6]}",
                 "content": "I _____ already _____ my homework.",
                 "question_type": "选择题",
                 "options": ["have, finished", "has, finished", "had, finished", "will, finish"],
@@ -238,7 +226,6 @@ class AuraDBInitializer:
                 "kp_name": "现在完成时"
             },
             {
-                "id": f"q_{uuid.uuid4().hex[:6]}",
                 "content": "The letter _____ by Tom yesterday.",
                 "question_type": "选择题",
                 "options": ["wrote", "was written", "is written", "writes"],
@@ -249,7 +236,6 @@ class AuraDBInitializer:
                 "kp_name": "被动语态"
             },
             {
-                "id": f"q_{uuid.uuid4().hex[:6]}",
                 "content": "This apple is _____ than that one.",
                 "question_type": "选择题",
                 "options": ["sweet", "sweeter", "sweetest", "more sweet"],
@@ -260,6 +246,8 @@ class AuraDBInitializer:
                 "kp_name": "比较级和最高级"
             }
         ]
+        for q in questions:
+            q["id"] = question_id(q["content"])
         
         # 创建知识点名称到ID的映射
         kp_map = {kp["name"]: kp["id"] for kp in knowledge_points}
@@ -269,25 +257,33 @@ class AuraDBInitializer:
                 for q in questions:
                     # 创建题目
                     kp_name = q.pop("kp_name")
-                    session.run("""
-                        CREATE (q:Question {
-                            id: $id,
-                            content: $content,
-                            question_type: $question_type,
-                            options: $options,
-                            answer: $answer,
-                            analysis: $analysis,
-                            difficulty: $difficulty,
-                            source: $source
-                        })
-                    """, q)
+                    # 题干相同（content_hash 即按题干生成的ID）的旧ID题目沿用原ID，避免重复创建
+                    q["id"] = session.run("""
+                        CALL {
+                            MATCH (old:Question {content_hash: $id})
+                            WITH old.id AS old_id ORDER BY old_id
+                            RETURN collect(old_id) AS old_ids
+                        }
+                        MERGE (q:Question {id: CASE WHEN size(old_ids) = 0 OR $id IN old_ids
+                                                    THEN $id ELSE old_ids[0] END})
+                        SET q.content = $content,
+                            q.content_hash = $id,
+                            q.question_type = $question_type,
+                            q.options = $options,
+                            q.answer = $answer,
+                            q.analysis = $analysis,
+                            q.difficulty = $difficulty,
+                            q.source = $source
+                        RETURN q.id AS id
+                    """, q).single()["id"]
                     
                     # 创建关系
                     if kp_name in kp_map:
                         session.run("""
                             MATCH (q:Question {id: $question_id})
                             MATCH (kp:KnowledgePoint {id: $kp_id})
-                            CREATE (q)-[:TESTS {weight: 0.8}]->(kp)
+                            MERGE (q)-[r:TESTS]->(kp)
+                            SET r.weight = 0.8
                         """, {
                             "question_id": q["id"],
                             "kp_id": kp_map[kp_name]
@@ -412,29 +412,34 @@ async function saveQuestion() {
     }
     
     try {
-        // 创建题目
-        const questionResponse = await fetch(`${API_BASE_URL}/questions/`, {
+        // 一次请求保存题目和所选知识点
+        const questionResponse = await fetch(`${API_BASE_URL}/annotation/save`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
-                content: content,
-                question_type: type,
-                answer: answer
+                question: {
+                    content: content,
+                    question_type: type,
+                    answer: answer
+                },
+                knowledge_points: selectedKnowledgePoints.map(kp => ({
+                    knowledge_point_id: kp.id,
+                    weight: kp.weight
+                }))
             })
         });
         
+        if (!questionResponse.ok) {
+            throw new Error(`HTTP ${questionResponse.status}`);
+        }
+        
         const questionData = await questionResponse.json();
         const questionId = questionData.id;
         
-        // 如果用户选择了知识点，手动关联
+        // 如果用户选择了知识点，已随题目一起保存
         if (selectedKnowledgePoints.length > 0) {
-            for (const kp of selectedKnowledgePoints) {
-                await fetch(`${API_BASE_URL}/questions/${questionId}/knowledge/${kp.id}?weight=${kp.weight}`, {
-                    method: 'POST'
-                });
-            }
             showMessage('题目保存成功！', 'success');
         } else {
             // 如果没有手动选择知识点，使用AI Agent自动标注
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+图数据库流式备份 / 恢复
+
+用法:
+    python graph_backup.py export backups/20261019           # 导出为gzip压缩的NDJSON分块 + manifest
+    python graph_backup.py export backups/raw --no-compress
+    python graph_backup.py verify backups/20261019           # 校验分块SHA-256
+    python graph_backup.py import backups/20261019           # 流式导入（MERGE，可重复执行）
+
+连接信息读取 config.env 中的 NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD，可由命令行覆盖
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+from backend.services.graph_archive import GraphArchiveExporter, GraphArchiveImporter
+
+load_dotenv("config.env")
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Neo4j流式备份与恢复")
+    parser.add_argument("command", choices=["export", "import", "verify"])
+    parser.add_argument("directory", help="备份目录")
+    parser.add_argument("--uri", default=os.getenv("NEO4J_URI", "bolt://localhost:7687"))
+    parser.add_argument("--user", default=os.getenv("NEO4J_USERNAME", "neo4j"))
+    parser.add_argument("--password", default=os.getenv("NEO4J_PASSWORD", "password"))
+    parser.add_argument("--labels", nargs="*", help="导出的节点标签，默认全部")
+    parser.add_argument("--page-size", type=int, default=5000, help="导出时每页读取的行数")
+    parser.add_argument("--chunk-rows", type=int, default=100000, help="每个分块文件的最大行数")
+    parser.add_argument("--no-compress", action="store_true", help="不压缩分块文件")
+    parser.add_argument("--batch-size", type=int, default=1000, help="导入时每个事务的行数")
+    parser.add_argument("--skip-verify", action="store_true", help="导入前不校验分块")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "verify":
+        failed = GraphArchiveImporter(driver=None).verify(args.directory)
+        if failed:
+            print(f"❌ 校验失败: {', '.join(failed)}")
+            return 1
+        print("✅ 全部分块校验通过")
+        return 0
+
+    with GraphDatabase.driver(args.uri, auth=(args.user, args.password)) as driver:
+        if args.command == "export":
+            exporter = GraphArchiveExporter(
+                driver,
+                labels=args.labels,
+                page_size=args.page_size,
+                chunk_rows=args.chunk_rows,
+                compress=not args.no_compress
+            )
+            manifest = exporter.export(args.directory)
+            print(f"✅ 导出完成: {len(manifest['chunks'])} 个分块")
+            print(json.dumps(manifest["totals"], ensure_ascii=False, indent=2))
+        else:
+            importer = GraphArchiveImporter(driver, batch_size=args.batch_size)
+            imported = importer.import_archive(args.directory, verify=not args.skip_verify)
+            print("✅ 导入完成")
+            print(json.dumps(imported, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+本地数据集导入（CSV / TSV / JSONL / JSON / XLSX）
+
+用法:
+    python ingest_dataset.py vendor_questions.csv --mapping mappings/vendor.json
+    python ingest_dataset.py questions.jsonl.gz --workers 4 --batch-size 1000
+    python ingest_dataset.py bank.xlsx --sheet 题库 --mapping mappings/vendor.json --dry-run
+    python ingest_dataset.py knowledge_points.csv --kind knowledge_point
+
+列映射格式见 backend/services/dataset_ingest.py 中的 ColumnMapping，未指定时源列名与字段同名；
+知识点应先于引用它们的题目导入。连接信息读取 config.env 中的 NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from dotenv import load_dotenv
+
+from backend.services.dataset_ingest import ColumnMapping, DatasetIngestPipeline
+
+load_dotenv("config.env")
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="从本地文件批量导入题目或知识点")
+    parser.add_argument("files", nargs="+", help="数据文件（.csv/.tsv/.jsonl/.json/.xlsx，CSV和JSONL可为.gz）")
+    parser.add_argument("--mapping", help="列映射JSON文件")
+    parser.add_argument("--kind", choices=["question", "knowledge_point"], help="数据类型，覆盖映射文件")
+    parser.add_argument("--format", choices=["csv", "tsv", "jsonl", "json", "xlsx"], help="文件格式，默认按扩展名判断")
+    parser.add_argument("--sheet", help="XLSX工作表名称，默认第一个")
+    parser.add_argument("--workers", type=int, default=1, help="解析校验的进程数，大文件可设为CPU核数")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每次分发给工作进程的行数")
+    parser.add_argument("--batch-size", type=int, default=500, help="每个写入事务的行数")
+    parser.add_argument("--weight", type=float, default=1.0, help="新建TESTS关系的权重")
+    parser.add_argument("--update-existing", action="store_true", help="更新已存在题目的属性")
+    parser.add_argument("--near-duplicates", action="store_true", help="同时跳过近似重复的题目")
+    parser.add_argument("--rejects", help="无效行写入该JSONL文件")
+    parser.add_argument("--dry-run", action="store_true", help="只解析校验，不写入数据库")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    mapping = ColumnMapping.load(args.mapping, args.kind)
+    pipeline = DatasetIngestPipeline(
+        mapping,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        near_duplicates=args.near_duplicates,
+        update_existing=args.update_existing,
+        weight=args.weight,
+        dry_run=args.dry_run,
+        rejects_path=args.rejects
+    )
+
+    failed = False
+    for path in args.files:
+        try:
+            summary = pipeline.run(path, fmt=args.format, sheet=args.sheet)
+        except Exception as e:
+            print(f"❌ {path} 导入失败: {e}")
+            failed = True
+            continue
+        print(f"✅ {path}: 读取 {summary['read']} 行，有效 {summary['valid']}，无效 {summary['invalid']}，"
+              f"重复 {summary['duplicate']}，写入 {summary['written']}（新建 {summary['created']}），"
+              f"{summary['rows_per_second']} 行/秒")
+        if summary["sample_errors"]:
+            print(json.dumps(summary["sample_errors"][:5], ensure_ascii=False, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 """
 将增强后的关键词库应用到NLP服务中
+
+默认作为关键词表的新版本发布（ANNOTATION_TABLES_SOURCE 指定的表文件或图数据库），
+运行中的worker热加载，无需重启；--patch-source 时沿用旧方式改写 nlp_service.py 源代码
+
+用法:
+    python scripts/apply_enhanced_keywords.py
+    python scripts/apply_enhanced_keywords.py --table nlp_light.keyword_patterns --version kw-2026-10
+    python scripts/apply_enhanced_keywords.py --patch-source
 """
 
 import sys
@@ -8,25 +16,50 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
+import argparse
 import logging
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def apply_enhanced_keywords():
-    """应用增强后的关键词库"""
-    print("🚀 开始应用增强后的关键词库...")
-    
-    # 加载增强后的关键词库
+def load_enhanced_patterns():
+    """加载增强后的关键词库"""
     try:
         with open("enhanced_keyword_patterns_simple.json", 'r', encoding='utf-8') as f:
             enhanced_patterns = json.load(f)
         print("✅ 增强后的关键词库加载成功")
     except FileNotFoundError:
-        print("❌ 增强后的关键词库文件未找到，请先运行 enhance_keywords_simple.py")
+        # 关键词扩展来自离线缓存，重新生成无需联网，耗时可忽略
+        print("⚠️ 增强后的关键词库文件未找到，使用关键词扩展缓存重新生成...")
+        from scripts.enhance_keywords_simple import enhance_keywords_simple
+        enhanced_patterns = enhance_keywords_simple()
+    return enhanced_patterns
+
+def publish_enhanced_keywords(table="nlp.keyword_patterns", version=None):
+    """作为关键词表的新版本发布（编译校验通过后保存，并通知运行中的worker重新加载）"""
+    print(f"🚀 开始发布增强后的关键词库到 {table}...")
+    enhanced_patterns = load_enhanced_patterns()
+    
+    from backend.services.annotation_tables import annotation_tables
+    try:
+        if annotation_tables.source == "graph":
+            from backend.services.database import neo4j_service
+            if not neo4j_service.driver and not neo4j_service.connect():
+                raise RuntimeError("数据库未连接")
+        active = annotation_tables.apply({table: enhanced_patterns}, version)
+    except Exception as e:
+        print(f"❌ 发布关键词表失败: {e}")
         return False
     
+    print(f"✅ 关键词表已发布: 版本 {active['version']}（{active['origin']}）")
+    return True
+
+def apply_enhanced_keywords():
+    """应用增强后的关键词库（改写源代码，需要重启服务）"""
+    print("🚀 开始应用增强后的关键词库...")
+    enhanced_patterns = load_enhanced_patterns()
+    
     # 更新NLP服务的关键词模式
     nlp_service_file = "backend/services/nlp_service.py"
     
@@ -157,9 +190,21 @@ def test_enhanced_nlp_service():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="应用增强后的关键词库")
+    parser.add_argument("--table", default="nlp.keyword_patterns", help="发布到的关键词表")
+    parser.add_argument("--version", default=None, help="表版本号，缺省使用内容摘要")
+    parser.add_argument("--patch-source", action="store_true", help="改写 nlp_service.py 源代码（需要重启服务）")
+    args = parser.parse_args()
+    
     try:
+        if not args.patch_source:
+            if publish_enhanced_keywords(args.table, args.version):
+                print("\n💡 运行中的worker会在收到变更事件或检测到表文件变化后切换到新版本，")
+                print("   GET /api/annotation/tables 查看当前生效的版本")
+            else:
+                sys.exit(1)
         # 应用增强后的关键词库
-        if apply_enhanced_keywords():
+        elif apply_enhanced_keywords():
             print("\n🎉 关键词库应用成功！")
             
             # 测试增强后的效果
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+离线构建关键词扩展缓存
+收集各关键词库中的英文关键词，用WordNet/spaCy计算同义词、相关词和语法形式，
+写入 data/keyword_expansions.json；之后 SimpleWordEnhancer / WordNetEnhancer 直接查缓存
+
+用法:
+    python scripts/build_keyword_expansion_cache.py              # 只计算缓存中缺失的关键词
+    python scripts/build_keyword_expansion_cache.py --refresh    # 全部重新计算
+    python scripts/build_keyword_expansion_cache.py --keywords play tense
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+import json
+import argparse
+import logging
+
+from backend.services.keyword_expansion_cache import KeywordExpansionCache, build_expansions
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 只扩展英文单词/短语（跳过中文、填空模板和选项片段）
+ENGLISH_KEYWORD = re.compile(r"^[a-z][a-z' -]*[a-z]$")
+
+
+def collect_keywords():
+    """从各关键词库收集待扩展的英文关键词"""
+    keywords = []
+
+    from backend.services.nlp_service_light import nlp_service
+    for words in nlp_service.keyword_patterns.values():
+        keywords.extend(words)
+
+    from backend.services.enhanced_knowledge_base import enhanced_knowledge_base
+    for kp_info in enhanced_knowledge_base.knowledge_base.values():
+        for words in kp_info.get("keywords", {}).values():
+            keywords.extend(words)
+
+    from backend.services.simple_word_enhancer import SimpleWordEnhancer
+    enhancer = SimpleWordEnhancer(cache=None)
+    keywords.extend(enhancer.word_expansions.keys())
+    keywords.extend(enhancer.grammar_rules.keys())
+
+    result = []
+    seen = set()
+    for keyword in keywords:
+        normalized = " ".join(keyword.lower().split())
+        if ENGLISH_KEYWORD.match(normalized) and normalized not in seen:
+            seen.add(normalized)
+            result.append(normalized)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线构建关键词扩展缓存")
+    parser.add_argument("--cache", help="缓存文件路径，默认 KEYWORD_EXPANSION_CACHE 或 data/keyword_expansions.json")
+    parser.add_argument("--keywords", nargs="*", help="只扩展指定关键词")
+    parser.add_argument("--refresh", action="store_true", help="重新计算已缓存的关键词")
+    args = parser.parse_args()
+
+    cache = KeywordExpansionCache(args.cache)
+    keywords = args.keywords or collect_keywords()
+    print(f"📚 待扩展关键词 {len(keywords)} 个，缓存中已有 {len(cache)} 个")
+
+    try:
+        stats = build_expansions(keywords, cache, refresh=args.refresh)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    print(f"💾 关键词扩展缓存: {cache.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+题目目录随机测试
+随机增删改题目（跨越追加行整理阈值），逐步对比 query()/count()/facet_counts() 与暴力筛选的结果
+
+用法:
+    python scripts/test_question_catalog.py
+    python -m pytest -q scripts/test_question_catalog.py
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import logging
+
+from backend.services.graph_events import GraphEventBus
+from backend.services.question_catalog import QuestionCatalog, SCALAR_FACETS
+
+logging.basicConfig(level=logging.WARNING)
+
+TYPES = ["选择题", "填空题", "阅读理解", None]
+DIFFICULTIES = ["easy", "medium", "hard"]
+GRADES = ["初中一年级", "初中二年级", "高中一年级", None]
+SOURCES = ["真题", "模拟题", "教材练习", None]
+KNOWLEDGE_POINTS = ["一般现在时", "一般过去时", "定语从句", "被动语态", "冠词"]
+
+
+def _random_row(rng: random.Random, question_id: str):
+    return {
+        "id": question_id,
+        "question_type": rng.choice(TYPES),
+        "difficulty": rng.choice(DIFFICULTIES),
+        "grade_level": rng.choice(GRADES),
+        "source": rng.choice(SOURCES),
+        "knowledge_points": rng.sample(KNOWLEDGE_POINTS, rng.randint(0, 2))
+    }
+
+
+def _random_filters(rng: random.Random):
+    filters = {}
+    if rng.random() < 0.4:
+        filters["question_type"] = rng.choice(TYPES[:-1])
+    if rng.random() < 0.3:
+        filters["difficulty"] = rng.choice(DIFFICULTIES)
+    if rng.random() < 0.2:
+        filters["grade_level"] = rng.choice(GRADES[:-1])
+    if rng.random() < 0.2:
+        filters["source"] = rng.choice(["题", "模拟", "教材"])
+    if rng.random() < 0.3:
+        filters["knowledge_points"] = rng.sample(KNOWLEDGE_POINTS, rng.randint(1, 2))
+    return filters
+
+
+def _brute_force(rows, filters):
+    matched = []
+    for row in rows.values():
+        if any(filters.get(facet) and row.get(facet) != filters[facet]
+               for facet in ("question_type", "difficulty", "grade_level")):
+            continue
+        if filters.get("source") and filters["source"] not in (row.get("source") or ""):
+            continue
+        if not set(filters.get("knowledge_points") or []) <= set(row["knowledge_points"]):
+            continue
+        matched.append(row)
+    return sorted(matched, key=lambda row: row["id"])
+
+
+def _check(catalog, rows, rng, rounds=20):
+    for _ in range(rounds):
+        filters = _random_filters(rng)
+        expected = _brute_force(rows, filters)
+        skip, limit = rng.randint(0, max(0, len(expected) + 5)), rng.randint(1, 50)
+        result = catalog.query(filters, skip, limit)
+        assert result["total"] == len(expected), (filters, result["total"], len(expected))
+        assert result["ids"] == [row["id"] for row in expected[skip:skip + limit]], (filters, skip, limit)
+        assert catalog.count(filters) == len(expected)
+
+        facets = catalog.facet_counts(filters)["facets"]
+        for facet in SCALAR_FACETS:
+            counts = {}
+            for row in expected:
+                counts[row.get(facet)] = counts.get(row.get(facet), 0) + 1
+            assert facets[facet] == counts, (facet, filters)
+
+
+def run_random_catalog_test(seed: int = 0, initial: int = 100, steps: int = 40, batch: int = 100):
+    rng = random.Random(seed)
+    rows = {f"q_{i:05d}": _random_row(rng, f"q_{i:05d}") for i in range(initial)}
+    catalog = QuestionCatalog(loader=lambda ids: [], events=GraphEventBus(), enabled=True)
+    catalog.rebuild(list(rows.values()))
+    _check(catalog, rows, rng)
+
+    next_id = initial
+    compactions = 0
+    for _ in range(steps):
+        for _ in range(batch):
+            action = rng.random()
+            if action < 0.6 and rows:
+                # 重新写入已有题目（标注保存时的常见情况）
+                question_id = rng.choice(list(rows))
+            elif action < 0.9:
+                question_id = f"q_{rng.randint(0, next_id * 2):05d}"
+                next_id += 1
+            else:
+                if rows:
+                    question_id = rng.choice(list(rows))
+                    del rows[question_id]
+                    catalog.remove(question_id)
+                continue
+            rows[question_id] = _random_row(rng, question_id)
+            catalog.upsert(rows[question_id])
+        appended_before = catalog.stats()["rows"] - catalog.stats()["sorted_rows"]
+        _check(catalog, rows, rng)
+        if catalog.stats()["rows"] - catalog.stats()["sorted_rows"] < appended_before:
+            compactions += 1
+    return compactions
+
+
+def test_query_matches_brute_force_across_compaction():
+    for seed in range(3):
+        assert run_random_catalog_test(seed) > 0
+
+
+if __name__ == "__main__":
+    for seed in range(5):
+        compactions = run_random_catalog_test(seed)
+        print(f"✅ seed={seed}: 与暴力筛选一致，经历 {compactions} 次整理")
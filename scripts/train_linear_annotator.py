@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+离线训练线性多标签知识点分类器
+训练数据为黄金语料（各内置题库的标注）加上图数据库中已确认的标注（TESTS关系，
+去掉用户反馈为错误的知识点），可追加JSON/JSONL标注文件。按 --holdout 留出一部分题目
+与规则引擎对比准确率，然后在全部数据上重新训练并保存模型制品。
+
+用法:
+    python scripts/train_linear_annotator.py                        # 输出到 data/linear_annotator.npz
+    python scripts/train_linear_annotator.py --no-graph --holdout 0.2
+    python scripts/train_linear_annotator.py --extra data/sample_questions/sample_questions.json
+启用:
+    ANNOTATION_ENGINE=linear
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import random
+import argparse
+import logging
+from typing import List, Dict, Any
+
+from backend.services.linear_annotator import (
+    LinearAnnotationModel, HashedNgramFeaturizer, DEFAULT_MODEL_PATH
+)
+from benchmarks.golden_corpus import load_golden_corpus
+from benchmarks.annotation_latency import score_accuracy, _suggested_names
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_graph_annotations() -> List[Dict[str, Any]]:
+    """图数据库中已确认的标注；反馈为错误的 (题目, 知识点) 不作为正样本"""
+    from backend.services.database import neo4j_service
+    from backend.services.annotation_history import annotation_history
+
+    if not neo4j_service.driver and not neo4j_service.connect():
+        raise RuntimeError("数据库未连接")
+
+    rejected = set()
+    for record in annotation_history.iter_records(kind="feedback"):
+        for ann in record.get("annotations", []):
+            if not ann.get("is_correct"):
+                rejected.add((record.get("question_id"), ann.get("kp_id")))
+
+    questions = []
+    for row in neo4j_service.get_annotated_questions():
+        labels = [kp["name"] for kp in row["knowledge_points"]
+                  if kp.get("name") and (row["id"], kp.get("id")) not in rejected]
+        if labels:
+            questions.append({
+                "content": row["content"],
+                "question_type": row["question_type"] or "选择题",
+                "knowledge_points": labels
+            })
+    return questions
+
+
+def load_extra(path: str) -> List[Dict[str, Any]]:
+    """JSON数组或JSONL，每条包含 content 和 knowledge_points"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = json.load(f)
+    return [
+        {"content": row["content"], "question_type": row.get("question_type", "选择题"),
+         "knowledge_points": list(row["knowledge_points"])}
+        for row in rows if row.get("content") and row.get("knowledge_points")
+    ]
+
+
+def merge_questions(*sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按题干合并，同一题目的标签取并集"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for source in sources:
+        for q in source:
+            existing = merged.get(q["content"])
+            if existing is None:
+                merged[q["content"]] = {**q, "knowledge_points": list(dict.fromkeys(q["knowledge_points"]))}
+            else:
+                existing["knowledge_points"] = list(dict.fromkeys(existing["knowledge_points"] + q["knowledge_points"]))
+    return list(merged.values())
+
+
+def evaluate(model: LinearAnnotationModel, questions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """线性模型与规则引擎在同一批题目上的准确率和耗时"""
+    from backend.services.nlp_service_light import nlp_service
+
+    labels = [q["knowledge_points"] for q in questions]
+    started = time.perf_counter()
+    linear = model.suggest_batch([(q["content"], q["question_type"]) for q in questions], kp_ids={})
+    linear_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rules = [nlp_service.suggest_knowledge_points(q["content"], q["question_type"]) for q in questions]
+    rules_seconds = time.perf_counter() - started
+
+    return {
+        "questions": len(questions),
+        "linear": {**score_accuracy([_suggested_names(s) for s in linear], labels),
+                   "seconds": round(linear_seconds, 4)},
+        "rules": {**score_accuracy([_suggested_names(s) for s in rules], labels),
+                  "seconds": round(rules_seconds, 4)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线训练线性多标签知识点分类器")
+    parser.add_argument("--output", default=os.getenv("LINEAR_MODEL_PATH", DEFAULT_MODEL_PATH), help="模型制品路径")
+    parser.add_argument("--no-graph", action="store_true", help="不使用图数据库中已确认的标注")
+    parser.add_argument("--extra", nargs="*", default=[], help="追加的标注文件（JSON数组或JSONL）")
+    parser.add_argument("--holdout", type=float, default=0.2, help="留出评估的题目比例，0 表示不评估")
+    parser.add_argument("--dim-bits", type=int, default=18, help="哈希特征维度 2^n")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-5)
+    parser.add_argument("--min-label-count", type=int, default=1, help="样本数少于该值的知识点不训练")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus, corpus_info = load_golden_corpus()
+    print(f"📚 黄金语料 {len(corpus)} 道题目")
+    sources = [corpus]
+    if not args.no_graph:
+        try:
+            graph_questions = load_graph_annotations()
+            print(f"🗂️  图数据库已确认标注 {len(graph_questions)} 道题目")
+            sources.append(graph_questions)
+        except Exception as e:
+            print(f"⚠️  跳过图数据库标注: {e}")
+    for path in args.extra:
+        extra = load_extra(path)
+        print(f"📄 {path}: {len(extra)} 道题目")
+        sources.append(extra)
+
+    questions = merge_questions(*sources)
+    if not questions:
+        print("❌ 没有训练数据")
+        return 1
+
+    def train(rows):
+        return LinearAnnotationModel.train(
+            rows, HashedNgramFeaturizer(1 << args.dim_bits), epochs=args.epochs,
+            learning_rate=args.learning_rate, l2=args.l2,
+            min_label_count=args.min_label_count, seed=args.seed
+        )
+
+    evaluation = None
+    if 0 < args.holdout < 1 and len(questions) >= 10:
+        shuffled = list(questions)
+        random.Random(args.seed).shuffle(shuffled)
+        cut = max(1, int(len(shuffled) * args.holdout))
+        evaluation = evaluate(train(shuffled[cut:]), shuffled[:cut])
+        print(f"🧪 留出评估 ({evaluation['questions']} 道题目):")
+        for engine in ("linear", "rules"):
+            result = evaluation[engine]
+            print(f"   {engine:6s} top1={result['top1_accuracy']:.3f} hit@3={result['hit_at_3']:.3f} "
+                  f"recall@5={result['recall_at_5']:.3f} empty={result['empty_rate']:.3f} {result['seconds']:.3f}s")
+
+    model = train(questions)
+    model.metadata["corpus"] = corpus_info
+    if evaluation:
+        model.metadata["holdout_evaluation"] = evaluation
+    model.save(args.output)
+
+    summary = model.summary()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"💾 模型制品: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())